@@ -0,0 +1,79 @@
+"""
+Execução de Código Bloqueante
+=============================
+Os serviços usam clients síncronos (supabase-py, requests). Chamá-los direto
+de uma rota `async def` trava o event loop do worker para todos os usuários.
+
+`run_blocking` executa a chamada em um pool de threads dedicado, com tamanho
+explícito (BLOCKING_POOL_SIZE), e libera o event loop enquanto espera.
+
+Uso:
+    from app.core.concurrency import run_blocking
+
+    result = await run_blocking(dossier_service.generate_and_save, document=doc, ...)
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+_in_flight = metrics.gauge("blocking_calls_in_flight", "Chamadas bloqueantes em execução no pool")
+_wait_seconds = metrics.histogram("blocking_pool_wait_seconds", "Espera por uma thread livre no pool")
+
+
+def get_blocking_pool() -> ThreadPoolExecutor:
+    """Pool de threads do processo para chamadas bloqueantes (criado no primeiro uso)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BLOCKING_POOL_SIZE,
+                thread_name_prefix="blocking",
+            )
+        return _executor
+
+
+def shutdown_blocking_pool() -> None:
+    """Encerra o pool (chamado no shutdown da aplicação)"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Executa uma função síncrona no pool de threads sem bloquear o event loop
+
+    Args:
+        func: Função síncrona
+        *args, **kwargs: Argumentos repassados à função
+
+    Returns:
+        Retorno da função (exceções são propagadas)
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    queued_at = loop.time()
+
+    def call() -> T:
+        _wait_seconds.observe(loop.time() - queued_at)
+        _in_flight.inc()
+        try:
+            return context.run(functools.partial(func, *args, **kwargs))
+        finally:
+            _in_flight.dec()
+
+    return await loop.run_in_executor(get_blocking_pool(), call)
@@ -24,10 +24,127 @@ class Settings(BaseSettings):
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
     SUPABASE_JWT_SECRET: Optional[str] = os.getenv("SUPABASE_JWT_SECRET")
 
+    # Postgres direto (opcional, requer asyncpg) - caminhos quentes sem PostgREST
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    DATABASE_POOL_MIN_SIZE: int = int(os.getenv("DATABASE_POOL_MIN_SIZE", "1"))
+    DATABASE_POOL_MAX_SIZE: int = int(os.getenv("DATABASE_POOL_MAX_SIZE", "10"))
+    DATABASE_TIMEOUT_SECONDS: float = float(os.getenv("DATABASE_TIMEOUT_SECONDS", "30"))
+
+    # Pools de conexão (clients compartilhados pelo processo, ver core/container.py)
+    AUTH_CLIENT_POOL_SIZE: int = int(os.getenv("AUTH_CLIENT_POOL_SIZE", "4"))
+    HTTP_POOL_SIZE: int = int(os.getenv("HTTP_POOL_SIZE", "20"))
+    # Threads para chamadas síncronas (Supabase/requests) feitas pelas rotas async
+    BLOCKING_POOL_SIZE: int = int(os.getenv("BLOCKING_POOL_SIZE", "32"))
+
+    # Cache de perfil/empresa do login (invalidado por NOTIFY com DATABASE_URL)
+    AUTH_PROFILE_CACHE_TTL_SECONDS: int = int(os.getenv("AUTH_PROFILE_CACHE_TTL_SECONDS", "300"))
+    AUTH_PROFILE_CACHE_SIZE: int = int(os.getenv("AUTH_PROFILE_CACHE_SIZE", "10000"))
+
+    # Cotas por empresa (ver core/quotas.py) - limites por minuto por plano
+    QUOTA_ENABLED: bool = os.getenv("QUOTA_ENABLED", "true").lower() == "true"
+    QUOTA_PLANS: str = os.getenv(
+        "QUOTA_PLANS",
+        '{"basic": {"api": 120, "upstream": 60}, '
+        '"pro": {"api": 600, "upstream": 300}, '
+        '"enterprise": {"api": 3000, "upstream": 1200}}',
+    )
+    QUOTA_DEFAULT_PLAN: str = os.getenv("QUOTA_DEFAULT_PLAN", "basic")
+    QUOTA_MAX_WAIT_SECONDS: float = float(os.getenv("QUOTA_MAX_WAIT_SECONDS", "30"))
+    QUOTA_PLAN_CACHE_TTL_SECONDS: int = int(os.getenv("QUOTA_PLAN_CACHE_TTL_SECONDS", "300"))
+
+    # Limite global das APIs externas, compartilhado entre instâncias (ver core/upstream_limits.py)
+    UPSTREAM_LIMITS: str = os.getenv(
+        "UPSTREAM_LIMITS",
+        '{"brasilapi": 180, "receitaws": 3, "viacep": 300}',
+    )
+    # auto: Postgres (DATABASE_URL ou RPC) quando configurado | local: só em memória
+    UPSTREAM_RATE_BACKEND: str = os.getenv("UPSTREAM_RATE_BACKEND", "auto")
+    UPSTREAM_FALLBACK_INSTANCES: int = int(os.getenv("UPSTREAM_FALLBACK_INSTANCES", "2"))
+    UPSTREAM_COORDINATOR_RETRY_SECONDS: float = float(os.getenv("UPSTREAM_COORDINATOR_RETRY_SECONDS", "30"))
+
+    # Prazo total da verificação KYC (segundos): dossiê avulso / lote e monitoramento
+    KYC_INTERACTIVE_DEADLINE_SECONDS: float = float(os.getenv("KYC_INTERACTIVE_DEADLINE_SECONDS", "12"))
+    KYC_BATCH_DEADLINE_SECONDS: float = float(os.getenv("KYC_BATCH_DEADLINE_SECONDS", "60"))
+    KYC_SOURCE_WORKERS: int = int(os.getenv("KYC_SOURCE_WORKERS", "32"))
+
+    # Streaming (SSE) da criação de dossiê: espera pela IA e keep-alive
+    DOSSIER_STREAM_AI_WAIT_SECONDS: float = float(os.getenv("DOSSIER_STREAM_AI_WAIT_SECONDS", "60"))
+    SSE_KEEPALIVE_SECONDS: float = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+
+    # Eventos por empresa (/api/events): fila por conexão e intervalo de progresso
+    EVENTS_QUEUE_SIZE: int = int(os.getenv("EVENTS_QUEUE_SIZE", "1000"))
+    EVENTS_PROGRESS_INTERVAL_SECONDS: float = float(os.getenv("EVENTS_PROGRESS_INTERVAL_SECONDS", "1"))
+
+    # Jobs de atualização do monitoramento (ver services/refresh_jobs.py)
+    REFRESH_JOB_WORKERS: int = int(os.getenv("REFRESH_JOB_WORKERS", "1"))
+    REFRESH_JOB_POLL_SECONDS: float = float(os.getenv("REFRESH_JOB_POLL_SECONDS", "5"))
+    REFRESH_JOB_STALE_SECONDS: float = float(os.getenv("REFRESH_JOB_STALE_SECONDS", "120"))
+    REFRESH_JOB_PROGRESS_SECONDS: float = float(os.getenv("REFRESH_JOB_PROGRESS_SECONDS", "2"))
+    REFRESH_JOB_MAX_ATTEMPTS: int = int(os.getenv("REFRESH_JOB_MAX_ATTEMPTS", "3"))
+    REFRESH_JOB_RESULTS_LIMIT: int = int(os.getenv("REFRESH_JOB_RESULTS_LIMIT", "1000"))
+
+    # Refresh contínuo com leases (ver services/refresh_workers.py); workers
+    # no próprio backend (0 = só scripts/run_refresh_worker.py)
+    MONITORING_REFRESH_INTERVAL_HOURS: float = float(os.getenv("MONITORING_REFRESH_INTERVAL_HOURS", "24"))
+    MONITORING_REFRESH_WORKERS: int = int(os.getenv("MONITORING_REFRESH_WORKERS", "0"))
+    REFRESH_CLAIM_BATCH: int = int(os.getenv("REFRESH_CLAIM_BATCH", "25"))
+    REFRESH_WORKER_CONCURRENCY: int = int(os.getenv("REFRESH_WORKER_CONCURRENCY", "8"))
+    REFRESH_LEASE_SECONDS: float = float(os.getenv("REFRESH_LEASE_SECONDS", "120"))
+    REFRESH_RETRY_SECONDS: float = float(os.getenv("REFRESH_RETRY_SECONDS", "900"))
+    REFRESH_WORKER_IDLE_SECONDS: float = float(os.getenv("REFRESH_WORKER_IDLE_SECONDS", "30"))
+
+    # Dumps das listas de sanções (ver services/sanctions_dumps.py e sanctions_delta.py)
+    SANCTIONS_DUMPS_URL: str = os.getenv("SANCTIONS_DUMPS_URL", "https://portaldatransparencia.gov.br/download-de-dados")
+    SANCTIONS_DUMP_TIMEOUT_SECONDS: float = float(os.getenv("SANCTIONS_DUMP_TIMEOUT_SECONDS", "120"))
+    # Delta que remove mais que esta fração do snapshot é recusado (dump truncado), salvo com force
+    SANCTIONS_DELTA_MAX_REMOVED_SHARE: float = float(os.getenv("SANCTIONS_DELTA_MAX_REMOVED_SHARE", "0.2"))
+
+    # Listas de sanções consultadas no Portal (ver kyc_engine.query_sanctions):
+    # em paralelo, paginadas e com cache por lista
+    SANCTIONS_LISTS_ENABLED: str = os.getenv("SANCTIONS_LISTS_ENABLED", "ceis,cnep,cepim,ceaf,leniencia")
+    SANCTIONS_LIST_MAX_PAGES: int = int(os.getenv("SANCTIONS_LIST_MAX_PAGES", "5"))
+    SANCTIONS_LIST_WORKERS: int = int(os.getenv("SANCTIONS_LIST_WORKERS", "32"))
+    SANCTIONS_LIST_CACHE_TTL_SECONDS: int = int(os.getenv("SANCTIONS_LIST_CACHE_TTL_SECONDS", "3600"))
+    SANCTIONS_LIST_CACHE_SIZE: int = int(os.getenv("SANCTIONS_LIST_CACHE_SIZE", "10000"))
+
+    # Filtro negativo de sanções em memória (ver core/sanctions_filter.py)
+    SANCTIONS_FILTER_ENABLED: bool = os.getenv("SANCTIONS_FILTER_ENABLED", "true").lower() == "true"
+    SANCTIONS_FILTER_FP_RATE: float = float(os.getenv("SANCTIONS_FILTER_FP_RATE", "0.001"))
+    SANCTIONS_FILTER_MAX_AGE_HOURS: float = float(os.getenv("SANCTIONS_FILTER_MAX_AGE_HOURS", "48"))
+    SANCTIONS_FILTER_RELOAD_SECONDS: float = float(os.getenv("SANCTIONS_FILTER_RELOAD_SECONDS", "3600"))
+
+    # Triagem por nome (razão social e QSA) nas listas (ver services/name_screening.py)
+    NAME_SCREENING_ENABLED: bool = os.getenv("NAME_SCREENING_ENABLED", "true").lower() == "true"
+    NAME_SCREENING_MIN_SCORE: float = float(os.getenv("NAME_SCREENING_MIN_SCORE", "0.85"))
+    NAME_SCREENING_TOP_K: int = int(os.getenv("NAME_SCREENING_TOP_K", "3"))
+    NAME_SCREENING_CANDIDATES: int = int(os.getenv("NAME_SCREENING_CANDIDATES", "50"))
+
+    # Lista PEP (Pessoas Expostas Politicamente) em memória (ver services/pep_list.py)
+    PEP_SCREENING_ENABLED: bool = os.getenv("PEP_SCREENING_ENABLED", "true").lower() == "true"
+    PEP_MAX_AGE_DAYS: float = float(os.getenv("PEP_MAX_AGE_DAYS", "45"))
+    # Ocorrência só pelos dígitos centrais (CPF mascarado no arquivo) eleva o risco para MÉDIO
+    PEP_FLAG_POSSIBLE_MATCHES: bool = os.getenv("PEP_FLAG_POSSIBLE_MATCHES", "true").lower() == "true"
+    PEP_RELOAD_SECONDS: float = float(os.getenv("PEP_RELOAD_SECONDS", "3600"))
+
     # APIs Externas (virão do SSM no App Runner)
     TRANSPARENCIA_API_KEY: str = os.getenv("TRANSPARENCIA_API_KEY", "")
+    # Pool de chaves do Portal (separadas por vírgula; ver core/key_pool.py)
+    TRANSPARENCIA_API_KEYS: str = os.getenv("TRANSPARENCIA_API_KEYS", "")
+    TRANSPARENCIA_KEY_RATE_PER_MINUTE: float = float(os.getenv("TRANSPARENCIA_KEY_RATE_PER_MINUTE", "90"))
+    TRANSPARENCIA_KEY_COOLDOWN_SECONDS: float = float(os.getenv("TRANSPARENCIA_KEY_COOLDOWN_SECONDS", "60"))
+    TRANSPARENCIA_KEY_INVALID_COOLDOWN_SECONDS: float = float(os.getenv("TRANSPARENCIA_KEY_INVALID_COOLDOWN_SECONDS", "600"))
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
 
+    # IA (pipeline assíncrono) - AI_PROVIDER: gemini | stub (modelo local, offline)
+    AI_PROVIDER: str = os.getenv("AI_PROVIDER", "gemini")
+    GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+    AI_WORKERS: int = int(os.getenv("AI_WORKERS", "2"))
+    AI_TIMEOUT_SECONDS: float = float(os.getenv("AI_TIMEOUT_SECONDS", "20"))
+    AI_CACHE_TTL_SECONDS: int = int(os.getenv("AI_CACHE_TTL_SECONDS", "86400"))
+    AI_REQUESTS_PER_MINUTE: int = int(os.getenv("AI_REQUESTS_PER_MINUTE", "60"))
+    AI_TOKENS_PER_MINUTE: int = int(os.getenv("AI_TOKENS_PER_MINUTE", "200000"))
+    AI_PACK_SIZE: int = int(os.getenv("AI_PACK_SIZE", "5"))
+
     # JWT
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
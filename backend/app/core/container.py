@@ -0,0 +1,366 @@
+"""
+Service Container
+=================
+Clientes e serviços compartilhados pelo processo, criados no startup da
+aplicação (lifespan) e injetados nas rotas via dependências do FastAPI.
+
+- Um único Supabase client para o banco (sessão httpx com keep-alive/HTTP2,
+  thread-safe para consultas PostgREST)
+- Pool de clients de autenticação: o login altera a sessão do client, então
+  cada login usa um client exclusivo durante a chamada
+- Sessão HTTP (requests) com pool de conexões para as APIs externas do kyc_engine
+"""
+
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+import requests
+from fastapi import Request
+from requests.adapters import HTTPAdapter
+from supabase import Client, create_client
+from supabase.lib.client_options import SyncClientOptions
+
+from app.core.config import settings
+
+
+def create_supabase_client() -> Client:
+    """Cria um Supabase client sem persistência/refresh de sessão (uso server-side)"""
+    options = SyncClientOptions(auto_refresh_token=False, persist_session=False)
+    return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY, options=options)
+
+
+def create_http_session(pool_size: int) -> requests.Session:
+    """Sessão HTTP com pool de conexões (keep-alive) para APIs externas"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class ClientPool:
+    """Pool de clients de uso exclusivo (criados sob demanda até `size`)"""
+
+    def __init__(self, factory: Callable[[], Client], size: int):
+        self._factory = factory
+        self._size = size
+        self._created = 0
+        self._idle: "queue.LifoQueue[Client]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def checkout(self, timeout: float = 30.0) -> Iterator[Client]:
+        client = self._acquire(timeout)
+        try:
+            yield client
+        finally:
+            self._idle.put(client)
+
+    def _acquire(self, timeout: float) -> Client:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self._size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self._factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get(timeout=timeout)
+
+
+class ServiceContainer:
+    """Clientes e serviços do processo (thread-safe, criados sob demanda)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._supabase: Optional[Client] = None
+        self._http: Optional[requests.Session] = None
+        self.auth_clients = ClientPool(create_supabase_client, size=settings.AUTH_CLIENT_POOL_SIZE)
+        self._auth_service = None
+        self._dossier_service = None
+        self._monitoring_service = None
+        self._refresh_jobs = None
+        self._refresh_job_runner = None
+        self._refresh_workers = None
+
+    @property
+    def supabase(self) -> Client:
+        with self._lock:
+            if self._supabase is None:
+                self._supabase = create_supabase_client()
+            return self._supabase
+
+    @property
+    def http(self) -> requests.Session:
+        with self._lock:
+            if self._http is None:
+                self._http = create_http_session(settings.HTTP_POOL_SIZE)
+            return self._http
+
+    @property
+    def auth_service(self):
+        from app.services.auth_service import AuthService
+
+        with self._lock:
+            if self._auth_service is None:
+                self._auth_service = AuthService(auth_clients=self.auth_clients)
+            return self._auth_service
+
+    @property
+    def dossier_service(self):
+        from app.services.dossier_service import DossierService
+
+        client = self.supabase
+        with self._lock:
+            if self._dossier_service is None:
+                self._dossier_service = DossierService(client=client)
+            return self._dossier_service
+
+    @property
+    def monitoring_service(self):
+        from app.services.monitoring_service import MonitoringService
+
+        refresh_jobs = self.refresh_jobs
+        with self._lock:
+            if self._monitoring_service is None:
+                self._monitoring_service = MonitoringService(
+                    refresh_jobs=refresh_jobs,
+                    on_job_queued=self._wake_refresh_jobs,
+                )
+            return self._monitoring_service
+
+    @property
+    def refresh_jobs(self):
+        """Fila de jobs de atualização do monitoramento (None sem banco configurado)"""
+        from app.core.database import get_database
+        from app.services.refresh_jobs import RefreshJobStore
+
+        try:
+            has_db = get_database() is not None
+        except Exception as e:
+            print(f"Aviso: Postgres direto indisponivel para os jobs de atualizacao: {e}")
+            has_db = False
+        if not has_db and not (settings.SUPABASE_URL and settings.SUPABASE_KEY):
+            return None
+        client = None if has_db else self.supabase
+        with self._lock:
+            if self._refresh_jobs is None:
+                self._refresh_jobs = RefreshJobStore(client=client)
+            return self._refresh_jobs
+
+    def _wake_refresh_jobs(self) -> None:
+        runner = self._refresh_job_runner
+        if runner:
+            runner.wake()
+
+    def start(self) -> None:
+        """Injeta os clients compartilhados nos motores (funções de módulo)"""
+        from app import kyc_engine, monitoring_engine
+
+        kyc_engine.set_http_session(self.http)
+        if settings.SUPABASE_URL and settings.SUPABASE_KEY:
+            monitoring_engine.set_supabase(self.supabase)
+
+        from app.core.database import get_database
+        from app.core.events import EVENTS_CHANNEL, events
+        from app.core.quotas import quotas
+        from app.services.auth_service import subscribe_profile_invalidation
+
+        quotas.set_plan_loader(self._load_company_plan)
+        self._configure_upstream_limits()
+
+        try:
+            db = get_database()
+            if db:
+                subscribe_profile_invalidation(db)
+                db.listen("company_changed", quotas.invalidate_plan)
+        except Exception as e:
+            # Sem NOTIFY os caches de perfis/planos expiram pelo TTL
+            print(f"Aviso: invalidacao do cache de perfis indisponivel: {e}")
+
+        try:
+            db = get_database()
+            if db:
+                # Eventos por empresa entre instâncias (ver core/events.py)
+                db.listen(EVENTS_CHANNEL, events.deliver_payload)
+                events.set_publisher(lambda payload: db.execute("SELECT pg_notify($1, $2)", EVENTS_CHANNEL, payload))
+        except Exception as e:
+            print(f"Aviso: eventos entre instancias indisponiveis (entrega local): {e}")
+
+        self._start_sanctions_indexes()
+        self._start_pep_list()
+        self._start_refresh_jobs()
+
+    def _start_sanctions_indexes(self) -> None:
+        """
+        Filtro negativo de sanções (core/sanctions_filter.py) e índice de nomes
+        sancionados (services/name_screening.py): carga inicial em background e
+        reconstrução a cada importação das listas (NOTIFY), que também descarta
+        o cache da lista em kyc_engine.query_sanctions
+        """
+        from app.core.database import get_database
+        from app.core.sanctions_filter import SANCTIONS_CHANNEL, sanctions_filter
+        from app.kyc_engine import clear_sanctions_cache
+        from app.services.name_screening import sanctioned_names
+        from app.services.sanctions_delta import SanctionsSnapshotStore
+
+        indexes = []
+        if settings.SANCTIONS_FILTER_ENABLED:
+            indexes.append(sanctions_filter)
+        if settings.NAME_SCREENING_ENABLED:
+            indexes.append(sanctioned_names)
+        if not indexes:
+            return
+        try:
+            db = get_database()
+        except Exception as e:
+            print(f"Aviso: Postgres direto indisponivel para os indices de sancoes: {e}")
+            db = None
+        if not db and not (settings.SUPABASE_URL and settings.SUPABASE_KEY):
+            return
+        store = SanctionsSnapshotStore(client=None if db else self.supabase)
+        sanctions_filter.set_loader(store.filter_source)
+        sanctioned_names.set_loader(store.name_source)
+
+        def reload_all(list_name: Optional[str] = None) -> None:
+            clear_sanctions_cache(list_name or None)
+            for index in indexes:
+                index.reload_async()
+
+        if db:
+            try:
+                db.listen(SANCTIONS_CHANNEL, reload_all)
+            except Exception as e:
+                # Sem NOTIFY os índices são reconstruídos a cada SANCTIONS_FILTER_RELOAD_SECONDS
+                print(f"Aviso: reconstrucao dos indices de sancoes por NOTIFY indisponivel: {e}")
+        reload_all()
+
+    def _start_pep_list(self) -> None:
+        """
+        Índice PEP (services/pep_list.py): carga inicial em background e
+        reconstrução a cada importação do arquivo (NOTIFY)
+        """
+        from app.core.database import get_database
+        from app.services.pep_list import PEP_CHANNEL, PepStore, pep_list
+
+        if not settings.PEP_SCREENING_ENABLED:
+            return
+        try:
+            db = get_database()
+        except Exception as e:
+            print(f"Aviso: Postgres direto indisponivel para a lista PEP: {e}")
+            db = None
+        if not db and not (settings.SUPABASE_URL and settings.SUPABASE_KEY):
+            return
+        pep_list.set_loader(PepStore(client=None if db else self.supabase).source)
+        if db:
+            try:
+                db.listen(PEP_CHANNEL, pep_list.reload_async)
+            except Exception as e:
+                # Sem NOTIFY o índice é reconstruído a cada PEP_RELOAD_SECONDS
+                print(f"Aviso: reconstrucao da lista PEP por NOTIFY indisponivel: {e}")
+        pep_list.reload_async()
+
+    def _start_refresh_jobs(self) -> None:
+        """
+        Workers dos jobs de atualização (services/refresh_jobs.py) e do
+        refresh contínuo com leases (services/refresh_workers.py)
+        """
+        from app.services.refresh_jobs import RefreshJobRunner
+        from app.services.refresh_workers import RefreshWorkerPool
+
+        store = self.refresh_jobs
+        if store is None:
+            return
+        if settings.REFRESH_JOB_WORKERS > 0:
+            runner = RefreshJobRunner(store)
+            runner.start()
+            self._refresh_job_runner = runner
+        if settings.MONITORING_REFRESH_WORKERS > 0:
+            workers = RefreshWorkerPool(client=store.client)
+            workers.start()
+            self._refresh_workers = workers
+
+    def _configure_upstream_limits(self) -> None:
+        """Orçamento global das APIs externas no Postgres (compartilhado entre instâncias)"""
+        from app.core.database import get_database
+        from app.core.upstream_limits import PgRateStore, upstream_limiter
+
+        if settings.UPSTREAM_RATE_BACKEND == "local":
+            return
+        try:
+            db = get_database()
+        except Exception as e:
+            print(f"Aviso: Postgres direto indisponivel para o limite global: {e}")
+            db = None
+        if db:
+            upstream_limiter.set_store(PgRateStore.from_database(db))
+        elif settings.SUPABASE_URL and settings.SUPABASE_KEY:
+            upstream_limiter.set_store(PgRateStore.from_supabase(self.supabase))
+
+    def _load_company_plan(self, company_id: str) -> Optional[str]:
+        """Plano da empresa (companies.plan, ver migrations/007)"""
+        from app.core.database import get_database
+
+        db = get_database()
+        if db:
+            return db.fetchval("SELECT plan FROM public.companies WHERE id = $1::uuid", company_id)
+        if not (settings.SUPABASE_URL and settings.SUPABASE_KEY):
+            return None
+        response = self.supabase.table("companies").select("plan").eq("id", company_id).limit(1).execute()
+        return response.data[0].get("plan") if response.data else None
+
+    def close(self) -> None:
+        from app.core.concurrency import shutdown_blocking_pool
+        from app.core.database import close_database
+        from app.core.sanctions_filter import sanctions_filter
+        from app.kyc_engine import shutdown_source_pool
+        from app.services.ai_pipeline import shutdown_ai_scheduler
+        from app.services.name_screening import sanctioned_names
+        from app.services.pep_list import pep_list
+
+        workers, self._refresh_workers = self._refresh_workers, None
+        if workers:
+            workers.stop()
+        runner, self._refresh_job_runner = self._refresh_job_runner, None
+        if runner:
+            # Job interrompido volta para a fila (ver RefreshJobRunner.run)
+            runner.stop()
+        sanctions_filter.set_loader(None)
+        sanctioned_names.set_loader(None)
+        pep_list.set_loader(None)
+        shutdown_ai_scheduler()
+        shutdown_blocking_pool()
+        shutdown_source_pool()
+        close_database()
+        with self._lock:
+            http, self._http = self._http, None
+        if http:
+            http.close()
+
+
+def get_container(request: Request) -> ServiceContainer:
+    return request.app.state.container
+
+
+def get_auth_service(request: Request):
+    return get_container(request).auth_service
+
+
+def get_dossier_service(request: Request):
+    return get_container(request).dossier_service
+
+
+def get_monitoring_service(request: Request):
+    return get_container(request).monitoring_service
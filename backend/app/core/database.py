@@ -0,0 +1,179 @@
+"""
+Acesso Direto ao Postgres (opcional)
+=====================================
+Backend de dados alternativo ao PostgREST para os caminhos quentes
+(listagens, estatísticas, inserções em lote e gravações do refresh do
+monitoramento): conexão direta ao Postgres com pool do asyncpg, sem o salto
+HTTP nem o encode/decode JSON do PostgREST, e com transações.
+
+Ativado quando DATABASE_URL está configurada e o asyncpg está instalado;
+caso contrário os serviços continuam usando o supabase-py.
+
+Os serviços são síncronos (rodam no pool de threads, ver core/concurrency.py),
+então o pool do asyncpg vive em um event loop próprio, em uma thread dedicada,
+e cada chamada é submetida a ele com run_coroutine_threadsafe.
+
+A conexão direta usa o papel do DATABASE_URL (sem RLS, como a SUPABASE_KEY
+de serviço): toda consulta filtra company_id explicitamente.
+"""
+
+import asyncio
+import json
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from app.core.config import settings
+
+try:
+    import asyncpg
+except ImportError:  # dependência opcional
+    asyncpg = None
+
+T = TypeVar("T")
+
+# Função ausente no schema (migração não aplicada): PostgREST (PGRST202) ou
+# Postgres (42883, undefined_function). Só esses erros justificam o fallback
+# sem a função; os demais sobem
+UNDEFINED_FUNCTION_CODES = ("PGRST202", "42883")
+
+_database: Optional["PgDatabase"] = None
+_database_lock = threading.Lock()
+_warned_missing_driver = False
+
+
+async def _init_connection(conn) -> None:
+    """jsonb/json como dict/list (mesmo formato retornado pelo PostgREST)"""
+    for type_name in ("jsonb", "json"):
+        await conn.set_type_codec(
+            type_name,
+            encoder=lambda value: json.dumps(value, default=str),
+            decoder=json.loads,
+            schema="pg_catalog",
+        )
+
+
+class PgDatabase:
+    """Pool asyncpg com interface síncrona para os serviços"""
+
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 10, timeout: float = 30.0):
+        self.timeout = timeout
+        self._dsn = dsn
+        self._listener = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="pg-loop", daemon=True)
+        self._thread.start()
+
+        async def create_pool():
+            return await asyncpg.create_pool(
+                dsn,
+                min_size=min_size,
+                max_size=max_size,
+                command_timeout=timeout,
+                init=_init_connection,
+            )
+
+        try:
+            self._pool = self._run(create_pool())
+        except Exception:
+            self._stop_loop()
+            raise
+
+    def _run(self, coro: Awaitable[T]) -> T:
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(self.timeout)
+
+    def fetch(self, query: str, *args: Any) -> List[Dict]:
+        """Executa a consulta e retorna as linhas como dicts"""
+        rows = self._run(self._pool.fetch(query, *args))
+        return [dict(row) for row in rows]
+
+    def fetchrow(self, query: str, *args: Any) -> Optional[Dict]:
+        row = self._run(self._pool.fetchrow(query, *args))
+        return dict(row) if row is not None else None
+
+    def fetchval(self, query: str, *args: Any) -> Any:
+        return self._run(self._pool.fetchval(query, *args))
+
+    def execute(self, query: str, *args: Any) -> str:
+        return self._run(self._pool.execute(query, *args))
+
+    def transaction(self, func: Callable[[Any], Awaitable[T]]) -> T:
+        """
+        Executa `func(conn)` (corrotina) dentro de uma transação
+
+        Args:
+            func: Corrotina que recebe a conexão asyncpg
+
+        Returns:
+            Retorno de func (rollback em caso de exceção)
+        """
+        async def run() -> T:
+            async with self._pool.acquire() as conn:
+                async with conn.transaction():
+                    return await func(conn)
+
+        return self._run(run())
+
+    def listen(self, channel: str, callback: Callable[[str], None]) -> None:
+        """
+        Assina um canal LISTEN/NOTIFY (conexão dedicada, fora do pool)
+
+        Requer conexão direta (porta 5432): o pooler em modo transação não
+        entrega notificações.
+
+        Args:
+            channel: Nome do canal
+            callback: Recebe o payload; roda na thread do loop (deve ser rápido)
+        """
+        async def subscribe() -> None:
+            if self._listener is None:
+                self._listener = await asyncpg.connect(self._dsn)
+            await self._listener.add_listener(channel, lambda conn, pid, chan, payload: callback(payload))
+
+        self._run(subscribe())
+
+    def close(self) -> None:
+        try:
+            if self._listener is not None:
+                self._run(self._listener.close())
+            self._run(self._pool.close())
+        finally:
+            self._stop_loop()
+
+    def _stop_loop(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+def get_database() -> Optional[PgDatabase]:
+    """
+    Backend Postgres direto, se configurado
+
+    Returns:
+        PgDatabase (criado no primeiro uso) ou None (usar supabase-py)
+    """
+    global _database, _warned_missing_driver
+    if not settings.DATABASE_URL:
+        return None
+    if asyncpg is None:
+        if not _warned_missing_driver:
+            print("DATABASE_URL configurada, mas asyncpg não está instalado: usando PostgREST")
+            _warned_missing_driver = True
+        return None
+    with _database_lock:
+        if _database is None:
+            _database = PgDatabase(
+                settings.DATABASE_URL,
+                min_size=settings.DATABASE_POOL_MIN_SIZE,
+                max_size=settings.DATABASE_POOL_MAX_SIZE,
+                timeout=settings.DATABASE_TIMEOUT_SECONDS,
+            )
+        return _database
+
+
+def close_database() -> None:
+    """Fecha o pool (chamado no shutdown da aplicação)"""
+    global _database
+    with _database_lock:
+        database, _database = _database, None
+    if database:
+        database.close()
@@ -0,0 +1,52 @@
+"""
+Prazo (Deadline)
+================
+Orçamento de tempo total de uma operação, repassado a cada chamada externa:
+cada timeout HTTP, espera de cota e retry usa no máximo o tempo restante.
+
+Uso:
+    deadline = Deadline.after(8)
+    response = session.get(url, timeout=deadline.timeout(10))  # min(10, restante)
+"""
+
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(Exception):
+    """O prazo da operação acabou"""
+
+
+class Deadline:
+    """Instante limite (relógio monotônico)"""
+
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, cap: float) -> float:
+        """
+        Timeout de uma chamada: min(cap, tempo restante)
+
+        Raises:
+            DeadlineExceeded se o prazo já acabou
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("Prazo da consulta esgotado")
+        return min(cap, remaining)
+
+
+def bounded(deadline: Optional[Deadline], cap: float) -> float:
+    """Timeout limitado pelo prazo, se houver"""
+    return deadline.timeout(cap) if deadline else cap
@@ -0,0 +1,143 @@
+"""
+Eventos por Empresa
+===================
+Canal de eventos em tempo real por empresa (tenant), consumido pelo
+frontend via WebSocket (/api/events/ws) ou SSE (/api/events/stream) em vez
+de consultar /stats e /changes/recent durante um refresh:
+
+- refresh.started / refresh.progress / refresh.finished: atualização de
+  todos os registros do monitoramento
+- target.changed: registro cujas restrições mudaram no refresh
+- batch.started / batch.progress / batch.finished: lote de dossiês
+
+Com vários processos/instâncias, quem publica pode não ser quem tem a
+conexão do cliente: com DATABASE_URL os eventos passam por NOTIFY
+(canal company_events) e cada processo entrega aos seus assinantes. Sem
+Postgres direto a entrega é só local.
+
+Uso:
+    from app.core.events import events
+
+    events.publish(company_id, "target.changed", {"document": doc, ...})
+"""
+
+import json
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Set
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.sse import EventChannel
+
+EVENTS_CHANNEL = "company_events"
+# Limite do payload do NOTIFY (8000 bytes no Postgres)
+MAX_NOTIFY_BYTES = 7900
+
+_published = metrics.counter("company_events_published_total", "Eventos publicados por empresa")
+_subscribers = metrics.gauge("company_events_subscribers", "Conexões assinando eventos de empresa")
+
+
+class EventBus:
+    """Assinantes por empresa neste processo, com publicação local ou via NOTIFY"""
+
+    def __init__(self, queue_size: Optional[int] = None):
+        self.queue_size = queue_size if queue_size is not None else settings.EVENTS_QUEUE_SIZE
+        self._subscribers: Dict[str, Set[EventChannel]] = {}
+        self._publisher: Optional[Callable[[str], None]] = None
+        self._lock = threading.Lock()
+
+    def set_publisher(self, publisher: Optional[Callable[[str], None]]) -> None:
+        """Envio entre processos (payload JSON); None = só entrega local"""
+        self._publisher = publisher
+
+    def subscribe(self, company_id: str) -> EventChannel:
+        """Novo assinante (chamar no event loop que vai consumir o canal)"""
+        channel = EventChannel(max_size=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(company_id, set()).add(channel)
+            total = sum(len(channels) for channels in self._subscribers.values())
+        _subscribers.set(total)
+        return channel
+
+    def unsubscribe(self, company_id: str, channel: EventChannel) -> None:
+        with self._lock:
+            channels = self._subscribers.get(company_id)
+            if channels is not None:
+                channels.discard(channel)
+                if not channels:
+                    del self._subscribers[company_id]
+            total = sum(len(channels) for channels in self._subscribers.values())
+        _subscribers.set(total)
+
+    def publish(self, company_id: str, event: str, data: Dict[str, Any]) -> None:
+        """Publica um evento para as conexões da empresa (thread-safe; não levanta)"""
+        message = {
+            "company_id": company_id,
+            "event": event,
+            "data": {**data, "at": datetime.utcnow().isoformat()},
+        }
+        _published.inc(event=event)
+        if self._publisher:
+            payload = json.dumps(message, ensure_ascii=False, default=str)
+            if len(payload.encode()) <= MAX_NOTIFY_BYTES:
+                try:
+                    self._publisher(payload)
+                    return
+                except Exception as e:
+                    print(f"Erro ao publicar evento {event} via NOTIFY: {e}; entrega local")
+        self._deliver(message)
+
+    def deliver_payload(self, payload: str) -> None:
+        """Entrega um evento recebido via NOTIFY aos assinantes deste processo"""
+        try:
+            self._deliver(json.loads(payload))
+        except (ValueError, KeyError) as e:
+            print(f"Evento de empresa inválido: {e}")
+
+    def _deliver(self, message: Dict) -> None:
+        with self._lock:
+            channels = list(self._subscribers.get(message["company_id"], ()))
+        for channel in channels:
+            channel.emit(message["event"], message["data"])
+
+
+events = EventBus()
+
+
+class ProgressReporter:
+    """
+    Progresso de uma operação longa (refresh, lote) publicado no canal da
+    empresa: <prefixo>.started, .progress (no máximo a cada
+    EVENTS_PROGRESS_INTERVAL_SECONDS) e .finished
+    """
+
+    def __init__(self, company_id: str, prefix: str, total: int, id_field: str = "job_id", id: Optional[str] = None):
+        self.company_id = company_id
+        self.prefix = prefix
+        self.id_field = id_field
+        self.id = id or uuid.uuid4().hex
+        self.total = total
+        self._published_at = 0.0
+
+    def _publish(self, stage: str, counters: Dict[str, Any]) -> None:
+        events.publish(
+            self.company_id,
+            f"{self.prefix}.{stage}",
+            {self.id_field: self.id, "total": self.total, **counters},
+        )
+
+    def start(self) -> None:
+        self._publish("started", {})
+        self._published_at = time.monotonic()
+
+    def update(self, **counters: Any) -> None:
+        now = time.monotonic()
+        if now - self._published_at >= settings.EVENTS_PROGRESS_INTERVAL_SECONDS:
+            self._published_at = now
+            self._publish("progress", counters)
+
+    def finish(self, **counters: Any) -> None:
+        self._publish("finished", counters)
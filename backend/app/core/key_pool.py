@@ -0,0 +1,166 @@
+"""
+Pool de Chaves de API
+=====================
+O limite do Portal da Transparência é por chave. Com várias chaves
+(TRANSPARENCIA_API_KEYS), cada chamada usa uma chave com orçamento livre:
+
+- orçamento por chave (TRANSPARENCIA_KEY_RATE_PER_MINUTE) no limitador
+  global (core/upstream_limits.py), compartilhado entre instâncias
+- rotação: começa pela próxima chave da vez e usa a primeira com ficha
+  livre; se todas estiverem no limite, espera a que liberar primeiro
+- 429 tira a chave de uso por Retry-After (ou TRANSPARENCIA_KEY_COOLDOWN_SECONDS);
+  401/403 (chave inválida/revogada) por TRANSPARENCIA_KEY_INVALID_COOLDOWN_SECONDS
+- métricas por chave identificadas pela impressão digital (sha256, 8
+  caracteres) - a chave nunca aparece em logs ou métricas
+"""
+
+import hashlib
+import threading
+import time
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.quotas import QuotaExceeded
+from app.core.upstream_limits import UpstreamLimiter, upstream_limiter
+
+RATE_LIMITED_STATUS = 429
+INVALID_KEY_STATUS = (401, 403)
+
+_key_requests = metrics.counter("api_key_requests_total", "Chamadas por chave de API externa")
+_key_cooldowns = metrics.counter("api_key_cooldowns_total", "Chaves retiradas de uso temporariamente")
+_keys_available = metrics.gauge("api_keys_available", "Chaves fora de cooldown")
+
+
+def fingerprint(key: str) -> str:
+    """Identificação da chave para logs e métricas"""
+    return hashlib.sha256(key.encode()).hexdigest()[:8]
+
+
+class ApiKeyPool:
+    """Chaves de uma API externa com orçamento, rotação e cooldown por chave"""
+
+    def __init__(
+        self,
+        name: str,
+        keys: List[str],
+        per_minute: float,
+        limiter: Optional[UpstreamLimiter] = None,
+        cooldown_seconds: float = 60.0,
+        invalid_cooldown_seconds: float = 600.0,
+    ):
+        self.name = name
+        self.keys = list(dict.fromkeys(k for k in keys if k))
+        self.per_minute = per_minute
+        self.limiter = limiter or upstream_limiter
+        self.cooldown_seconds = cooldown_seconds
+        self.invalid_cooldown_seconds = invalid_cooldown_seconds
+        self._fingerprints = {key: fingerprint(key) for key in self.keys}
+        self._cooldown_until: Dict[str, float] = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _bucket(self, key: str) -> str:
+        return f"{self.name}:{self._fingerprints[key]}"
+
+    def _rotation(self) -> List[str]:
+        """Chaves fora de cooldown, a partir da próxima da vez"""
+        now = time.monotonic()
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % max(len(self.keys), 1)
+            ordered = self.keys[start:] + self.keys[:start]
+            active = [key for key in ordered if self._cooldown_until.get(key, 0) <= now]
+        _keys_available.set(len(active), api=self.name)
+        return active
+
+    def checkout(self, tokens: float = 1.0, max_wait: Optional[float] = None) -> str:
+        """
+        Escolhe uma chave e reserva `tokens` chamadas no orçamento dela
+
+        Args:
+            tokens: Chamadas que serão feitas com a chave
+            max_wait: Espera máxima (padrão QUOTA_MAX_WAIT_SECONDS)
+
+        Returns:
+            A chave (esperou o necessário para o orçamento dela)
+
+        Raises:
+            QuotaExceeded se nenhuma chave liberar dentro de max_wait
+        """
+        if max_wait is None:
+            max_wait = settings.QUOTA_MAX_WAIT_SECONDS
+        deadline = time.monotonic() + max_wait
+
+        while True:
+            remaining = max(deadline - time.monotonic(), 0.0)
+            active = self._rotation()
+            if not active:
+                if not self.keys:
+                    raise QuotaExceeded(self.name, 60.0)
+                with self._lock:
+                    soonest = min(self._cooldown_until.values()) - time.monotonic()
+                if soonest > remaining:
+                    raise QuotaExceeded(self.name, soonest)
+                time.sleep(max(soonest, 0.0))
+                continue
+
+            # Primeira chave com ficha livre agora
+            needed = {}
+            for key in active:
+                wait = self.limiter.reserve(self._bucket(key), tokens, self.per_minute, 0.0)
+                if wait == 0:
+                    return key
+                needed[key] = -wait
+
+            # Todas no limite: fila na que libera primeiro
+            key = min(needed, key=needed.get)
+            wait = self.limiter.reserve(self._bucket(key), tokens, self.per_minute, remaining)
+            if wait < 0:
+                raise QuotaExceeded(self.name, -wait)
+            time.sleep(wait)
+            return key
+
+    def report(self, key: str, status_code: int, retry_after: Optional[str] = None) -> None:
+        """
+        Registra a resposta obtida com a chave (cooldown em 429/401/403)
+
+        Args:
+            key: Chave usada
+            status_code: Status HTTP da resposta
+            retry_after: Cabeçalho Retry-After (segundos), se houver
+        """
+        fp = self._fingerprints.get(key, fingerprint(key))
+        _key_requests.inc(api=self.name, key=fp, status=str(status_code))
+
+        if status_code == RATE_LIMITED_STATUS:
+            try:
+                cooldown = float(retry_after) if retry_after else self.cooldown_seconds
+            except ValueError:
+                cooldown = self.cooldown_seconds
+            reason = "rate_limited"
+        elif status_code in INVALID_KEY_STATUS:
+            cooldown = self.invalid_cooldown_seconds
+            reason = "invalid"
+        else:
+            return
+
+        with self._lock:
+            self._cooldown_until[key] = time.monotonic() + cooldown
+        _key_cooldowns.inc(api=self.name, key=fp, reason=reason)
+        print(f"Chave {fp} de {self.name} em cooldown por {cooldown:.0f}s (status {status_code})")
+
+    def status(self) -> List[Dict]:
+        """Situação das chaves (impressão digital e segundos restantes de cooldown)"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "key": self._fingerprints[key],
+                    "cooldown_seconds": round(max(self._cooldown_until.get(key, 0) - now, 0.0), 1),
+                }
+                for key in self.keys
+            ]
@@ -0,0 +1,257 @@
+"""
+Cotas por Empresa
+=================
+Token buckets por empresa (tenant) na frente da API e das consultas externas
+(BrasilAPI, ReceitaWS, ViaCEP, Portal da Transparência), para que o lote de
+uma empresa não consuma a chave/limite compartilhado de todas as outras.
+
+- API (/api/dossiers, /api/monitoring): acima do limite responde 429 com
+  Retry-After (dependency auth_service.enforce_api_quota)
+- Consultas externas: acima do limite a chamada espera (fila) até
+  QUOTA_MAX_WAIT_SECONDS; se a espera passar disso, QuotaExceeded
+
+Os limites (por minuto) vêm do plano da empresa (companies.plan, ver
+migrations/007) e da configuração QUOTA_PLANS:
+
+    {"basic": {"api": 120, "upstream": 60, "transparencia": 90}, ...}
+
+`upstream` vale para todas as APIs externas sem limite próprio. A capacidade
+do bucket (rajada) é o limite de um minuto.
+
+Uso:
+    from app.core.quotas import quota_scope
+
+    with quota_scope(company_id):
+        kyc_engine.run_kyc_check(document)   # consultas contam para a empresa
+"""
+
+import contextvars
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import metrics
+
+API_SCOPE = "api"
+
+_decisions = metrics.counter("quota_decisions_total", "Decisões das cotas por empresa")
+_wait_seconds = metrics.histogram("quota_wait_seconds", "Espera na fila das cotas de consultas externas")
+
+# Empresa dona das consultas externas feitas na thread/contexto atual
+_current_company: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("quota_company", default=None)
+
+
+class QuotaExceeded(Exception):
+    """Cota da empresa esgotada (retry_after em segundos)"""
+
+    def __init__(self, scope: str, retry_after: float):
+        self.scope = scope
+        self.retry_after = retry_after
+        super().__init__(f"Cota de '{scope}' excedida; tente novamente em {math.ceil(retry_after)}s")
+
+
+class TokenBucket:
+    """Token bucket: `per_minute` fichas por minuto, até `capacity` acumuladas"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.per_minute = per_minute
+        self.capacity = capacity if capacity is not None else per_minute
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.per_minute / 60.0)
+        self._updated_at = now
+
+    def reserve(self, tokens: float = 1.0, max_wait: float = 0.0) -> float:
+        """
+        Reserva fichas, se couberem em até `max_wait` segundos
+
+        Returns:
+            Segundos a esperar antes de usar as fichas (0 = imediato), ou -t se
+            não couber em max_wait (t = espera necessária; nada é reservado)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            if self.per_minute <= 0:
+                return -60.0  # plano sem cota: reavaliar em 1 minuto
+            wait = (tokens - self._tokens) * 60.0 / self.per_minute
+            if wait > max_wait:
+                return -wait
+            # Fichas negativas = reservas na fila, liberadas pelo refill
+            self._tokens -= tokens
+            return wait
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(self._tokens, 0.0)
+
+
+def _load_plans() -> Dict[str, Dict[str, float]]:
+    try:
+        plans = json.loads(settings.QUOTA_PLANS)
+    except ValueError as e:
+        print(f"QUOTA_PLANS inválido ({e}); usando limites padrão")
+        plans = {}
+    return plans or {settings.QUOTA_DEFAULT_PLAN: {API_SCOPE: 120, "upstream": 60}}
+
+
+class QuotaManager:
+    """Buckets e contadores de uso por (empresa, escopo)"""
+
+    def __init__(self, plans: Optional[Dict[str, Dict[str, float]]] = None, default_plan: Optional[str] = None):
+        self.plans = plans if plans is not None else _load_plans()
+        self.default_plan = default_plan or settings.QUOTA_DEFAULT_PLAN
+        self._plan_loader: Optional[Callable[[str], Optional[str]]] = None
+        self._company_plans = TTLCache(max_items=10000, ttl_seconds=settings.QUOTA_PLAN_CACHE_TTL_SECONDS)
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._usage: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    def set_plan_loader(self, loader: Callable[[str], Optional[str]]) -> None:
+        """Função company_id -> plano (consultada na falta do cache)"""
+        self._plan_loader = loader
+
+    def invalidate_plan(self, company_id: str) -> None:
+        self._company_plans.invalidate(company_id)
+
+    def cached_plan(self, company_id: str) -> Optional[str]:
+        return self._company_plans.get(company_id)
+
+    def plan_for(self, company_id: str) -> str:
+        """Plano da empresa (cache com TTL; consulta o plan_loader na falta)"""
+        plan = self._company_plans.get(company_id)
+        if plan is not None:
+            return plan
+        if self._plan_loader:
+            try:
+                plan = self._plan_loader(company_id)
+            except Exception as e:
+                print(f"Erro ao carregar plano da empresa {company_id}: {e}")
+        if plan not in self.plans:
+            plan = self.default_plan
+        self._company_plans.put(company_id, plan)
+        return plan
+
+    def limit_for(self, plan: str, scope: str) -> float:
+        limits = self.plans.get(plan) or self.plans.get(self.default_plan) or {}
+        if scope in limits:
+            return float(limits[scope])
+        if scope != API_SCOPE and "upstream" in limits:
+            return float(limits["upstream"])
+        return math.inf
+
+    def _bucket(self, company_id: str, scope: str) -> Optional[TokenBucket]:
+        limit = self.limit_for(self.plan_for(company_id), scope)
+        if math.isinf(limit):
+            return None
+        key = (company_id, scope)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None or bucket.per_minute != limit:
+                bucket = self._buckets[key] = TokenBucket(limit)
+            return bucket
+
+    def _count(self, company_id: str, scope: str, outcome: str, waited: float = 0.0) -> None:
+        _decisions.inc(scope=scope, outcome=outcome)
+        with self._lock:
+            counters = self._usage.setdefault(company_id, {}).setdefault(
+                scope, {"allowed": 0, "queued": 0, "rejected": 0, "wait_seconds": 0.0}
+            )
+            counters[outcome] += 1
+            counters["wait_seconds"] += waited
+
+    def try_acquire(self, company_id: str, scope: str, tokens: float = 1.0) -> float:
+        """
+        Consome fichas sem esperar
+
+        Returns:
+            0 se permitido; senão segundos até caber (Retry-After)
+        """
+        bucket = self._bucket(company_id, scope)
+        if bucket is None:
+            return 0.0
+        reserved = bucket.reserve(tokens)
+        if reserved == 0:
+            self._count(company_id, scope, "allowed")
+            return 0.0
+        self._count(company_id, scope, "rejected")
+        return -reserved
+
+    def acquire(self, company_id: str, scope: str, tokens: float = 1.0, max_wait: Optional[float] = None) -> None:
+        """
+        Consome fichas, esperando na fila até `max_wait` segundos
+
+        Raises:
+            QuotaExceeded se a espera necessária passar de max_wait
+        """
+        bucket = self._bucket(company_id, scope)
+        if bucket is None:
+            return
+        if max_wait is None:
+            max_wait = settings.QUOTA_MAX_WAIT_SECONDS
+        wait = bucket.reserve(tokens, max_wait)
+        if wait < 0:
+            self._count(company_id, scope, "rejected")
+            raise QuotaExceeded(scope, -wait)
+        if wait > 0:
+            _wait_seconds.observe(wait)
+            self._count(company_id, scope, "queued", wait)
+            time.sleep(wait)
+        else:
+            self._count(company_id, scope, "allowed")
+
+    def usage(self, company_id: str) -> Dict:
+        """Plano, limites, fichas disponíveis e contadores da empresa (neste processo)"""
+        plan = self.plan_for(company_id)
+        with self._lock:
+            counters = {scope: dict(values) for scope, values in self._usage.get(company_id, {}).items()}
+            buckets = {scope: bucket for (cid, scope), bucket in self._buckets.items() if cid == company_id}
+        return {
+            "company_id": company_id,
+            "plan": plan,
+            "limits_per_minute": dict(self.plans.get(plan) or {}),
+            "available": {scope: round(bucket.available(), 2) for scope, bucket in buckets.items()},
+            "counters": counters,
+        }
+
+
+quotas = QuotaManager()
+
+
+@contextmanager
+def quota_scope(company_id: Optional[str]) -> Iterator[None]:
+    """Atribui à empresa as consultas externas feitas dentro do bloco"""
+    token = _current_company.set(company_id)
+    try:
+        yield
+    finally:
+        _current_company.reset(token)
+
+
+def acquire_upstream(api: str, calls: int = 1, max_wait: Optional[float] = None) -> None:
+    """
+    Consome a cota da empresa atual para `calls` chamadas à API externa
+
+    Sem empresa no contexto (scripts, motor legado) não há limite.
+
+    Raises:
+        QuotaExceeded se a fila passar de max_wait (padrão QUOTA_MAX_WAIT_SECONDS)
+    """
+    company_id = _current_company.get()
+    if not company_id or not settings.QUOTA_ENABLED:
+        return
+    quotas.acquire(company_id, api, tokens=calls, max_wait=max_wait)
+
@@ -0,0 +1,228 @@
+"""
+Filtro Negativo de Sanções
+==========================
+Bloom filter em memória com todos os CPF/CNPJ do snapshot das listas de
+sanções (CEIS, CNEP e CEPIM, ver services/sanctions_dumps.py e
+migrations/011). A maioria dos documentos consultados não tem sanção
+nenhuma: se o filtro descarta o documento, query_sanctions responde sem
+nenhuma chamada ao Portal (2 por CPF, 3 por CNPJ).
+
+- sem falso negativo: documento no snapshot sempre passa pelo filtro
+- falso positivo (SANCTIONS_FILTER_FP_RATE): o documento é consultado no
+  Portal normalmente
+- CPF entra pelos dígitos 4 a 9 (os dumps mascaram o CPF: ***.456.789-**)
+- só vale com as três listas importadas e a importação mais antiga com
+  menos de SANCTIONS_FILTER_MAX_AGE_HOURS; fora disso (ou sem snapshot)
+  todo documento é consultado no Portal
+- reconstruído a cada importação (NOTIFY sanctions_lists_changed, ver
+  core/container.py) e a cada SANCTIONS_FILTER_RELOAD_SECONDS
+
+Uso:
+    from app.core.sanctions_filter import sanctions_filter
+
+    if sanctions_filter.check(document, doc_type) is False:
+        ...  # fora de todas as listas
+"""
+
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+SANCTIONS_CHANNEL = "sanctions_lists_changed"
+
+_lookups = metrics.counter("sanctions_filter_lookups_total", "Consultas ao filtro negativo de sanções")
+_saved_calls = metrics.counter("sanctions_filter_saved_calls_total", "Chamadas ao Portal evitadas pelo filtro de sanções")
+_entries = metrics.gauge("sanctions_filter_entries", "Documentos no filtro de sanções")
+_bytes = metrics.gauge("sanctions_filter_bytes", "Memória do bit array do filtro de sanções")
+_fp_rate = metrics.gauge("sanctions_filter_fp_rate", "Taxa estimada de falso positivo do filtro de sanções")
+
+# Linhas do snapshot ({document, doc_type, cpf_core}) e data da importação
+# mais antiga entre as listas; None se alguma lista ainda não foi importada
+FilterSource = Optional[Tuple[Iterable[Dict], datetime]]
+
+
+def filter_key(document: Optional[str], doc_type: Optional[str], cpf_core: Optional[str] = None) -> Optional[str]:
+    """Chave do documento no filtro (CPF pelos dígitos centrais)"""
+    if doc_type == "CNPJ" and document:
+        return f"cnpj:{document}"
+    if doc_type == "CPF":
+        core = cpf_core or (document[3:9] if document and len(document) == 11 else None)
+        return f"cpf:{core}" if core else None
+    return None
+
+
+class BloomFilter:
+    """Bloom filter: bit array em bytearray, k posições por double hashing"""
+
+    def __init__(self, capacity: int, fp_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(64, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+    def false_positive_rate(self) -> float:
+        """Taxa de falso positivo esperada com os itens inseridos"""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class SanctionsFilter:
+    """Filtro negativo das listas de sanções (um por processo)"""
+
+    def __init__(self):
+        self._loader: Optional[Callable[[], FilterSource]] = None
+        self._bloom: Optional[BloomFilter] = None
+        self._imported_at: Optional[datetime] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._reloading = False
+
+    def set_loader(self, loader: Optional[Callable[[], FilterSource]]) -> None:
+        """Função que lê o snapshot das listas (ver SanctionsSnapshotStore.filter_source)"""
+        self._loader = loader
+
+    def reload(self) -> bool:
+        """
+        Reconstrói o filtro a partir do snapshot
+
+        Returns:
+            True se o filtro ficou disponível
+        """
+        loader = self._loader
+        if not settings.SANCTIONS_FILTER_ENABLED or loader is None:
+            return False
+        try:
+            source = loader()
+        except Exception as e:
+            # Mantém o filtro anterior (se houver) até a próxima tentativa
+            print(f"Erro ao carregar o filtro de sanções: {str(e)}")
+            self._loaded_at = time.monotonic()
+            return self._bloom is not None
+        if source is None:
+            self._swap(None, None)
+            return False
+
+        rows, imported_at = source
+        keys = {filter_key(row.get("document"), row.get("doc_type"), row.get("cpf_core")) for row in rows}
+        keys.discard(None)
+        bloom = BloomFilter(len(keys), settings.SANCTIONS_FILTER_FP_RATE)
+        for key in keys:
+            bloom.add(key)
+        self._swap(bloom, imported_at)
+        print(
+            f"Filtro de sanções: {bloom.count} documentos, {bloom.nbytes / 1024:.0f} KiB, "
+            f"falso positivo estimado {bloom.false_positive_rate():.4%}"
+        )
+        return True
+
+    def _swap(self, bloom: Optional[BloomFilter], imported_at: Optional[datetime]) -> None:
+        with self._lock:
+            self._bloom, self._imported_at = bloom, imported_at
+            self._loaded_at = time.monotonic()
+        _entries.set(bloom.count if bloom else 0)
+        _bytes.set(bloom.nbytes if bloom else 0)
+        _fp_rate.set(bloom.false_positive_rate() if bloom else 0)
+
+    def reload_async(self, *_args) -> None:
+        """Reconstrói em outra thread (callback do NOTIFY; uma reconstrução por vez)"""
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+
+        def run() -> None:
+            try:
+                self.reload()
+            finally:
+                with self._lock:
+                    self._reloading = False
+
+        threading.Thread(target=run, name="sanctions-filter-reload", daemon=True).start()
+
+    def _usable(self) -> Optional[BloomFilter]:
+        with self._lock:
+            bloom, imported_at, loaded_at = self._bloom, self._imported_at, self._loaded_at
+        if self._loader and time.monotonic() - loaded_at > settings.SANCTIONS_FILTER_RELOAD_SECONDS:
+            self.reload_async()
+        if bloom is None or not settings.SANCTIONS_FILTER_ENABLED:
+            return None
+        age_hours = (datetime.now(timezone.utc) - imported_at).total_seconds() / 3600
+        return bloom if age_hours <= settings.SANCTIONS_FILTER_MAX_AGE_HOURS else None
+
+    def check(self, document: str, doc_type: str, calls: Optional[int] = None) -> Optional[bool]:
+        """
+        Consulta o filtro
+
+        Args:
+            document: CPF ou CNPJ limpo
+            doc_type: 'CPF' ou 'CNPJ'
+            calls: Chamadas ao Portal evitadas se o documento for descartado
+                (padrão: uma por lista importada aplicável ao tipo)
+
+        Returns:
+            False se o documento não está em nenhuma lista (consulta ao Portal
+            dispensável), True se pode estar, None com o filtro indisponível
+        """
+        bloom = self._usable()
+        key = filter_key(document, doc_type)
+        if bloom is None or key is None:
+            _lookups.inc(outcome="unavailable")
+            return None
+        if key in bloom:
+            _lookups.inc(outcome="maybe")
+            return True
+        _lookups.inc(outcome="skipped")
+        _saved_calls.inc(calls if calls is not None else 3 if doc_type == "CNPJ" else 2)
+        return False
+
+    def record_false_positive(self) -> None:
+        """Documento aceito pelo filtro sem sanção no Portal"""
+        _lookups.inc(outcome="false_positive")
+
+    def stats(self) -> Dict:
+        """Tamanho, memória, taxa de falso positivo (estimada e observada) e economia"""
+        with self._lock:
+            bloom, imported_at = self._bloom, self._imported_at
+        maybe = _lookups.value(outcome="maybe")
+        return {
+            "enabled": settings.SANCTIONS_FILTER_ENABLED,
+            "available": self._usable() is not None,
+            "entries": bloom.count if bloom else 0,
+            "bytes": bloom.nbytes if bloom else 0,
+            "hashes": bloom.hashes if bloom else 0,
+            "estimated_fp_rate": bloom.false_positive_rate() if bloom else None,
+            "observed_fp_rate": _lookups.value(outcome="false_positive") / maybe if maybe else None,
+            "imported_at": imported_at.isoformat() if imported_at else None,
+            "lookups": {
+                outcome: _lookups.value(outcome=outcome)
+                for outcome in ("skipped", "maybe", "unavailable", "false_positive")
+            },
+            "saved_calls": _saved_calls.value(),
+        }
+
+
+sanctions_filter = SanctionsFilter()
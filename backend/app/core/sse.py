@@ -0,0 +1,112 @@
+"""
+Server-Sent Events
+==================
+Respostas em streaming (text/event-stream) alimentadas por código bloqueante:
+os serviços rodam em threads (run_blocking, pool de fontes do kyc_engine,
+scheduler de IA) e publicam eventos num EventChannel; a rota consome o canal
+no event loop e envia cada evento assim que chega.
+
+Uso:
+    channel = EventChannel()
+    ...  # threads chamam channel.emit("secao", {...}) e, no fim, channel.close()
+    return StreamingResponse(channel.stream(), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+"""
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Iterable, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+SSE_MEDIA_TYPE = "text/event-stream"
+# Sem cache e sem buffer de proxy (nginx) para os eventos chegarem na hora
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+_CLOSED = object()
+
+_dropped = metrics.counter("event_channel_dropped_total", "Eventos descartados (consumidor lento, fila cheia)")
+
+
+def format_event(event: str, data: Any, event_id: Optional[str] = None) -> str:
+    """Serializa um evento SSE (data em JSON, uma linha)"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class EventChannel:
+    """
+    Fila de eventos publicada por threads e consumida pelo event loop
+
+    Com `max_size`, um consumidor lento perde eventos em vez de acumular
+    memória; o próximo evento entregue é precedido de events.dropped (o
+    cliente deve recarregar o estado pela API).
+    """
+
+    def __init__(self, max_size: int = 0):
+        self._loop = asyncio.get_running_loop()
+        self._queue: "asyncio.Queue[Tuple[str, Any]]" = asyncio.Queue()
+        self._max_size = max_size
+        self.dropped = 0
+
+    def _offer(self, item) -> None:
+        if self._max_size and item is not _CLOSED and self._queue.qsize() >= self._max_size:
+            self.dropped += 1
+            _dropped.inc()
+            return
+        self._queue.put_nowait(item)
+
+    def _put(self, item) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._offer, item)
+        except RuntimeError:
+            pass  # loop encerrado (shutdown): ninguém mais consome
+
+    def emit(self, event: str, data: Any) -> None:
+        """Publica um evento (thread-safe)"""
+        self._put((event, data))
+
+    def close(self) -> None:
+        """Encerra o stream depois dos eventos já publicados (idempotente)"""
+        self._put(_CLOSED)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Tuple[str, Any]]:
+        """
+        Próximo evento (evento, dados); None se o canal foi fechado
+
+        Raises:
+            asyncio.TimeoutError se nada chegar em `timeout` segundos
+        """
+        if self.dropped and self._queue.qsize() < self._max_size:
+            count, self.dropped = self.dropped, 0
+            return "events.dropped", {"count": count}
+        item = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+        return None if item is _CLOSED else item
+
+    async def stream(self, until: Iterable[str] = ()) -> AsyncIterator[str]:
+        """
+        Eventos formatados, na ordem de publicação
+
+        Args:
+            until: Eventos que encerram o stream (após enviados)
+
+        Envia um comentário de keep-alive a cada SSE_KEEPALIVE_SECONDS sem
+        eventos, para proxies não derrubarem a conexão.
+        """
+        until = set(until)
+        while True:
+            try:
+                item = await self.get(timeout=settings.SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if item is None:
+                return
+            event, data = item
+            yield format_event(event, data)
+            if event in until:
+                return
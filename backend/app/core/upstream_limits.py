@@ -0,0 +1,166 @@
+"""
+Limite Global das APIs Externas
+===============================
+As cotas por empresa (core/quotas.py) são por processo; com várias
+instâncias/workers o tráfego somado ainda estoura o limite das APIs
+externas. Aqui cada API (brasilapi, receitaws, viacep) tem um único
+orçamento global (UPSTREAM_LIMITS, chamadas por minuto) compartilhado por
+todos os processos; no Portal da Transparência o limite é por chave
+(ver core/key_pool.py).
+
+Estado do orçamento (RateStore):
+- PgRateStore: token bucket em public.upstream_rate_buckets, consumido pela
+  função take_upstream_tokens (migrations/008) em uma ida ao banco, via
+  conexão direta (DATABASE_URL) ou RPC do PostgREST
+- LocalRateStore: buckets em memória (uma instância só, scripts)
+
+Justiça entre instâncias: sob disputa, a instância que já usou sua fatia do
+minuto (limite / instâncias ativas) vai para o fim da fila.
+
+Sem coordenador (banco inacessível) o limitador entra em modo degradado:
+cada processo usa um bucket local com limite / UPSTREAM_FALLBACK_INSTANCES e
+tenta o coordenador de novo após UPSTREAM_COORDINATOR_RETRY_SECONDS.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.quotas import QuotaExceeded, TokenBucket
+
+_decisions = metrics.counter("upstream_rate_decisions_total", "Decisões do limite global das APIs externas")
+_coordinator_up = metrics.gauge("upstream_coordinator_up", "Coordenador do limite global disponível (1) ou modo degradado (0)")
+
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LocalRateStore:
+    """Buckets em memória (mesma semântica de take_upstream_tokens)"""
+
+    def __init__(self):
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def take(self, name: str, tokens: float, per_minute: float, max_wait: float) -> float:
+        with self._lock:
+            bucket = self._buckets.get(name)
+            if bucket is None or bucket.per_minute != per_minute:
+                bucket = self._buckets[name] = TokenBucket(per_minute)
+        return bucket.reserve(tokens, max_wait)
+
+
+class PgRateStore:
+    """Token buckets compartilhados no Postgres (ver migrations/008)"""
+
+    def __init__(self, take_tokens: Callable[[Dict], float]):
+        self._take_tokens = take_tokens
+
+    @classmethod
+    def from_database(cls, db) -> "PgRateStore":
+        """Conexão direta (PgDatabase)"""
+        def take_tokens(params: Dict) -> float:
+            return db.fetchval(
+                "SELECT public.take_upstream_tokens($1, $2, $3, $4, $5)",
+                params["p_name"], params["p_instance"], params["p_tokens"],
+                params["p_per_minute"], params["p_max_wait"],
+            )
+        return cls(take_tokens)
+
+    @classmethod
+    def from_supabase(cls, client) -> "PgRateStore":
+        """RPC do PostgREST (sem DATABASE_URL)"""
+        def take_tokens(params: Dict) -> float:
+            return client.rpc("take_upstream_tokens", params).execute().data
+        return cls(take_tokens)
+
+    def take(self, name: str, tokens: float, per_minute: float, max_wait: float) -> float:
+        return float(self._take_tokens({
+            "p_name": name,
+            "p_instance": INSTANCE_ID,
+            "p_tokens": tokens,
+            "p_per_minute": per_minute,
+            "p_max_wait": max_wait,
+        }))
+
+
+def _load_limits() -> Dict[str, float]:
+    try:
+        return {name: float(value) for name, value in json.loads(settings.UPSTREAM_LIMITS).items()}
+    except (ValueError, AttributeError) as e:
+        print(f"UPSTREAM_LIMITS inválido ({e}); sem limite global")
+        return {}
+
+
+class UpstreamLimiter:
+    """Orçamento global por API externa, com modo degradado local"""
+
+    def __init__(self, store=None, limits: Optional[Dict[str, float]] = None):
+        self.store = store or LocalRateStore()
+        self.limits = limits if limits is not None else _load_limits()
+        self._fallback = LocalRateStore()
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        _coordinator_up.set(1)
+
+    def set_store(self, store) -> None:
+        with self._lock:
+            self.store = store
+            self._retry_at = 0.0
+        _coordinator_up.set(1)
+
+    @property
+    def degraded(self) -> bool:
+        return time.monotonic() < self._retry_at
+
+    def _take(self, api: str, tokens: float, limit: float, max_wait: float) -> Tuple[float, str]:
+        if not self.degraded:
+            try:
+                wait = self.store.take(api, tokens, limit, max_wait)
+                _coordinator_up.set(1)
+                return wait, "shared"
+            except Exception as e:
+                with self._lock:
+                    self._retry_at = time.monotonic() + settings.UPSTREAM_COORDINATOR_RETRY_SECONDS
+                _coordinator_up.set(0)
+                print(f"Coordenador do limite global indisponível ({e}); usando limite local")
+        local_limit = limit / max(settings.UPSTREAM_FALLBACK_INSTANCES, 1)
+        return self._fallback.take(api, tokens, local_limit, max_wait), "fallback"
+
+    def reserve(self, name: str, tokens: float, limit: float, max_wait: float) -> float:
+        """
+        Reserva `tokens` chamadas de um orçamento compartilhado com limite explícito
+
+        Returns:
+            Segundos a esperar (0 = imediato), ou -t se a espera passar de
+            max_wait (nada reservado)
+        """
+        wait, mode = self._take(name, tokens, limit, max_wait)
+        outcome = "rejected" if wait < 0 else "queued" if wait > 0 else "allowed"
+        _decisions.inc(api=name, outcome=outcome, mode=mode)
+        return wait
+
+    def acquire(self, api: str, tokens: float = 1.0, max_wait: Optional[float] = None) -> None:
+        """
+        Consome `tokens` chamadas do orçamento global da API, esperando até max_wait
+
+        Raises:
+            QuotaExceeded se a espera passar de max_wait
+        """
+        limit = self.limits.get(api)
+        if limit is None:
+            return
+        if max_wait is None:
+            max_wait = settings.QUOTA_MAX_WAIT_SECONDS
+        wait = self.reserve(api, tokens, limit, max_wait)
+        if wait < 0:
+            raise QuotaExceeded(f"global:{api}", -wait)
+        if wait > 0:
+            time.sleep(wait)
+
+
+upstream_limiter = UpstreamLimiter()
@@ -5,16 +5,105 @@ Motor de consultas para APIs públicas (BrasilAPI, ViaCEP, Portal da Transparên
 Autor: Vinicius Matsumoto
 """
 
+import contextvars
 import requests
 import time
 import os
-from typing import Dict, List, Optional
+import threading
+from dataclasses import dataclass
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from typing import Callable, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.deadline import Deadline, DeadlineExceeded, bounded
+from app.core.key_pool import INVALID_KEY_STATUS, RATE_LIMITED_STATUS, ApiKeyPool
+from app.core.metrics import metrics
+from app.core.quotas import QuotaExceeded, acquire_upstream
+from app.core.sanctions_filter import sanctions_filter
+from app.core.upstream_limits import upstream_limiter
+from app.services.pep_list import pep_list
+
 load_dotenv()
 
 TRANSPARENCIA_API_KEY = os.getenv("TRANSPARENCIA_API_KEY")
-TRANSPARENCIA_BASE_URL = "https://api.portaldatransparencia.gov.br/api-de-dados"
+TRANSPARENCIA_BASE_URL = os.getenv("TRANSPARENCIA_BASE_URL", "https://api.portaldatransparencia.gov.br/api-de-dados")
+
+# Pool de chaves do Portal (TRANSPARENCIA_API_KEYS; senão a chave única)
+transparencia_keys = ApiKeyPool(
+    "transparencia",
+    [key.strip() for key in settings.TRANSPARENCIA_API_KEYS.split(",") if key.strip()] or [TRANSPARENCIA_API_KEY],
+    per_minute=settings.TRANSPARENCIA_KEY_RATE_PER_MINUTE,
+    cooldown_seconds=settings.TRANSPARENCIA_KEY_COOLDOWN_SECONDS,
+    invalid_cooldown_seconds=settings.TRANSPARENCIA_KEY_INVALID_COOLDOWN_SECONDS,
+)
+
+# Sessão HTTP compartilhada (keep-alive); injetada pelo container da aplicação
+_http_session: Optional[requests.Session] = None
+
+
+def get_http_session() -> requests.Session:
+    """Sessão HTTP usada nas consultas (criada no primeiro uso se não injetada)"""
+    global _http_session
+    if _http_session is None:
+        _http_session = requests.Session()
+    return _http_session
+
+
+def set_http_session(session: requests.Session) -> None:
+    """Injeta a sessão HTTP com pool de conexões do processo"""
+    global _http_session
+    _http_session = session
+
+
+def _max_wait(deadline: Optional[Deadline]) -> Optional[float]:
+    """Espera máxima por cota: QUOTA_MAX_WAIT_SECONDS, limitada pelo prazo"""
+    if deadline is None:
+        return None
+    return deadline.timeout(settings.QUOTA_MAX_WAIT_SECONDS)
+
+
+def _upstream_get(api: str, url: str, timeout: float, deadline: Optional[Deadline] = None, **kwargs) -> requests.Response:
+    """
+    GET em API externa: cota da empresa atual + orçamento global da API, com
+    espera e timeout limitados pelo prazo
+
+    Raises:
+        DeadlineExceeded se o prazo acabar antes da chamada
+    """
+    acquire_upstream(api, max_wait=_max_wait(deadline))
+    upstream_limiter.acquire(api, max_wait=_max_wait(deadline))
+    return get_http_session().get(url, timeout=bounded(deadline, timeout), **kwargs)
+
+
+def _transparencia_get(
+    url: str,
+    key: str,
+    remaining: int = 1,
+    deadline: Optional[Deadline] = None
+) -> Tuple[requests.Response, str]:
+    """
+    GET no Portal com uma chave do pool; se a chave for recusada (429/401/403),
+    ela entra em cooldown e a chamada é repetida com outra chave, que passa a
+    ser usada nas `remaining` chamadas restantes (esta inclusa). Com listas
+    consultadas ao mesmo tempo, a outra chave pode ter sido recusada numa
+    chamada paralela ainda não reportada: tenta no máximo uma vez por chave.
+
+    Returns:
+        (resposta, chave usada por último)
+
+    Raises:
+        QuotaExceeded se nenhuma outra chave liberar a tempo
+    """
+    for attempt in range(max(len(transparencia_keys), 2)):
+        if attempt:
+            key = transparencia_keys.checkout(tokens=remaining, max_wait=_max_wait(deadline))
+        response = get_http_session().get(url, headers={"chave-api-dados": key}, timeout=bounded(deadline, 10))
+        transparencia_keys.report(key, response.status_code, response.headers.get("Retry-After"))
+        if response.status_code != RATE_LIMITED_STATUS and response.status_code not in INVALID_KEY_STATUS:
+            break
+    return response, key
 
 
 def validate_document(document: str) -> Dict[str, any]:
@@ -38,23 +127,26 @@ def validate_document(document: str) -> Dict[str, any]:
         return {"success": False, "error": "Documento inválido. Use CPF (11 dígitos) ou CNPJ (14 dígitos)"}
 
 
-def query_cnpj(cnpj: str) -> Dict[str, any]:
+def query_cnpj(cnpj: str, deadline: Optional[Deadline] = None) -> Dict[str, any]:
     """
     Consulta dados de CNPJ via BrasilAPI
 
     Args:
         cnpj: CNPJ limpo (14 dígitos)
+        deadline: Prazo total (timeouts, retries e fallback limitados a ele)
 
     Returns:
         Dict com dados da empresa ou erro
     """
     try:
         url = f"https://brasilapi.com.br/api/cnpj/v1/{cnpj}"
-        response = requests.get(url, timeout=10)
+        response = _upstream_get("brasilapi", url, timeout=10, deadline=deadline)
         if response.status_code == 429:
             for delay in (1, 2, 4):
+                if deadline and deadline.remaining() <= delay:
+                    break
                 time.sleep(delay)
-                response = requests.get(url, timeout=10)
+                response = _upstream_get("brasilapi", url, timeout=10, deadline=deadline)
                 if response.status_code != 429:
                     break
 
@@ -63,8 +155,8 @@ def query_cnpj(cnpj: str) -> Dict[str, any]:
             data_inicio_atividade = data.get("data_inicio_atividade") or data.get("data_abertura") or ""
 
             # Se a BrasilAPI não trouxer data de abertura, tenta ReceitaWS para preencher
-            if not data_inicio_atividade:
-                fallback = query_cnpj_receitaws(cnpj)
+            if not data_inicio_atividade and not (deadline and deadline.expired):
+                fallback = query_cnpj_receitaws(cnpj, deadline)
                 if fallback.get("success"):
                     data_inicio_atividade = (
                         fallback.get("data_abertura")
@@ -118,7 +210,7 @@ def query_cnpj(cnpj: str) -> Dict[str, any]:
             }
         else:
             # Fallback para ReceitaWS quando BrasilAPI falhar
-            fallback = query_cnpj_receitaws(cnpj)
+            fallback = query_cnpj_receitaws(cnpj, deadline)
             if fallback.get("success"):
                 return fallback
             return {"success": False, "error": f"CNPJ não encontrado (status {response.status_code})"}
@@ -127,13 +219,13 @@ def query_cnpj(cnpj: str) -> Dict[str, any]:
         return {"success": False, "error": f"Erro ao consultar CNPJ: {str(e)}"}
 
 
-def query_cnpj_receitaws(cnpj: str) -> Dict[str, any]:
+def query_cnpj_receitaws(cnpj: str, deadline: Optional[Deadline] = None) -> Dict[str, any]:
     """
     Fallback de consulta de CNPJ via ReceitaWS (sem chave)
     """
     try:
         url = f"https://www.receitaws.com.br/v1/cnpj/{cnpj}"
-        response = requests.get(url, timeout=15, headers={"User-Agent": "KYC-System"})
+        response = _upstream_get("receitaws", url, timeout=15, deadline=deadline, headers={"User-Agent": "KYC-System"})
         if response.status_code != 200:
             return {"success": False, "error": f"ReceitaWS erro (status {response.status_code})"}
 
@@ -173,12 +265,13 @@ def query_cnpj_receitaws(cnpj: str) -> Dict[str, any]:
         return {"success": False, "error": f"Erro ao consultar ReceitaWS: {str(e)}"}
 
 
-def query_cep(cep: str) -> Dict[str, any]:
+def query_cep(cep: str, deadline: Optional[Deadline] = None) -> Dict[str, any]:
     """
     Consulta CEP via ViaCEP
 
     Args:
         cep: CEP limpo (8 dígitos)
+        deadline: Prazo total da consulta
 
     Returns:
         Dict com dados do endereço ou erro
@@ -186,7 +279,7 @@ def query_cep(cep: str) -> Dict[str, any]:
     try:
         clean_cep = ''.join(filter(str.isdigit, cep))
         url = f"https://viacep.com.br/ws/{clean_cep}/json/"
-        response = requests.get(url, timeout=10)
+        response = _upstream_get("viacep", url, timeout=10, deadline=deadline)
 
         if response.status_code == 200:
             data = response.json()
@@ -210,84 +303,389 @@ def query_cep(cep: str) -> Dict[str, any]:
         return {"success": False, "error": f"Erro ao consultar CEP: {str(e)}"}
 
 
-def query_sanctions(document: str, doc_type: str) -> Dict[str, any]:
+@dataclass(frozen=True)
+class SanctionsList:
+    """
+    Lista do Portal da Transparência consultada por query_sanctions
+
+    Attributes:
+        name: Chave da lista no resultado (sanctions[name]) e no status
+        endpoint: Caminho na API de dados (ex: 'ceis')
+        params: Parâmetro da consulta por tipo de documento; a lista não é
+            consultada para os tipos ausentes
+        match_fields: Campos (caminhos com ponto, atravessando listas) que
+            trazem o documento de cada registro; o Portal devolve registros
+            parecidos, então só ficam os do documento consultado
+        in_filter: Lista importada dos dumps (coberta pelo filtro negativo)
+        core: Lista essencial: se falhar, a fonte de sanções falha (risco
+            MÉDIO, refresh não grava). Lista opcional que falha só aparece
+            no status dela, com o resultado das demais valendo
+    """
+    name: str
+    endpoint: str
+    params: Dict[str, str]
+    match_fields: Tuple[str, ...]
+    in_filter: bool = False
+    core: bool = True
+
+    def matches(self, item: Dict, document: str) -> bool:
+        """Algum campo do registro traz o documento (CPF mascarado: dígitos centrais)"""
+        for path in self.match_fields:
+            for value in _field_values(item, path.split(".")):
+                text = str(value)
+                digits = "".join(filter(str.isdigit, text))
+                if digits == document or ("*" in text and len(document) == 11 and digits == document[3:9]):
+                    return True
+        return False
+
+
+def _field_values(item, path: List[str]) -> List:
+    if isinstance(item, list):
+        return [value for element in item for value in _field_values(element, path)]
+    if not path:
+        return [] if item is None else [item]
+    if not isinstance(item, dict):
+        return []
+    return _field_values(item.get(path[0]), path[1:])
+
+
+# Registro das listas consultadas (ordem do resultado); novas listas entram
+# com register_sanctions_list e são ligadas em SANCTIONS_LISTS_ENABLED
+SANCTIONS_LISTS: Dict[str, SanctionsList] = {}
+_list_caches: Dict[str, TTLCache] = {}
+
+
+def register_sanctions_list(sanctions_list: SanctionsList) -> None:
+    """Registra (ou substitui) uma lista de sanções, com cache próprio"""
+    SANCTIONS_LISTS[sanctions_list.name] = sanctions_list
+    _list_caches[sanctions_list.name] = TTLCache(
+        max_items=settings.SANCTIONS_LIST_CACHE_SIZE, ttl_seconds=settings.SANCTIONS_LIST_CACHE_TTL_SECONDS
+    )
+
+
+def clear_sanctions_cache(list_name: Optional[str] = None) -> None:
+    """Descarta os resultados em cache de uma lista (ou de todas), ex: após importar o dump dela"""
+    for name, cache in _list_caches.items():
+        if list_name is None or name == list_name:
+            cache.clear()
+
+
+# CEIS - Cadastro de Empresas Inidôneas e Suspensas
+register_sanctions_list(SanctionsList(
+    "ceis", "ceis", {"CNPJ": "codigoCpfCnpj", "CPF": "cpfCnpj"},
+    ("cpfCnpjSancionado", "cnpjSancionado", "sancionado.codigoFormatado"), in_filter=True,
+))
+# CNEP - Cadastro Nacional de Empresas Punidas
+register_sanctions_list(SanctionsList(
+    "cnep", "cnep", {"CNPJ": "codigoCnpj", "CPF": "cpf"},
+    ("cnpjCpfSancionado", "sancionado.codigoFormatado"), in_filter=True,
+))
+# CEPIM - Cadastro de Entidades Privadas Sem Fins Lucrativos Impedidas
+register_sanctions_list(SanctionsList(
+    "cepim", "cepim", {"CNPJ": "cnpj"},
+    ("cnpj", "pessoaJuridica.cnpjFormatado"), in_filter=True,
+))
+# CEAF - Cadastro de Expulsões da Administração Federal (servidores: só CPF)
+register_sanctions_list(SanctionsList(
+    "ceaf", "ceaf", {"CPF": "cpfSancionado"},
+    ("pessoa.cpfFormatado", "cpfSancionado"), core=False,
+))
+# Acordos de leniência (empresas)
+register_sanctions_list(SanctionsList(
+    "leniencia", "acordos-leniencia", {"CNPJ": "cnpjSancionado"},
+    ("sancoes.cnpjFormatado", "cnpjSancionado"), core=False,
+))
+
+# Registros por página da API de dados do Portal
+TRANSPARENCIA_PAGE_SIZE = 15
+
+_list_queries = metrics.counter("kyc_sanctions_list_queries_total", "Consultas às listas de sanções por resultado")
+
+
+def enabled_sanctions_lists(doc_type: str) -> List[SanctionsList]:
+    """Listas ligadas (SANCTIONS_LISTS_ENABLED) que se aplicam ao tipo de documento"""
+    enabled = {name.strip() for name in settings.SANCTIONS_LISTS_ENABLED.split(",") if name.strip()}
+    return [item for name, item in SANCTIONS_LISTS.items() if name in enabled and doc_type in item.params]
+
+
+def _query_list(
+    sanctions_list: SanctionsList,
+    document: str,
+    doc_type: str,
+    key: str,
+    deadline: Optional[Deadline]
+) -> Tuple[List, Dict]:
+    """
+    Consulta uma lista página a página (até SANCTIONS_LIST_MAX_PAGES)
+
+    A primeira página usa a cota e a chave reservadas por query_sanctions;
+    as seguintes reservam mais uma chamada cada.
+
+    Returns:
+        (registros do documento, status da lista)
+    """
+    records: List = []
+    page = 0
+    status = {"status": SOURCE_COMPLETED, "records": 0, "pages": 0, "cached": False}
+    param = sanctions_list.params[doc_type]
+    try:
+        while page < settings.SANCTIONS_LIST_MAX_PAGES:
+            page += 1
+            if page > 1:
+                acquire_upstream("transparencia", max_wait=_max_wait(deadline))
+                key = transparencia_keys.checkout(max_wait=_max_wait(deadline))
+            url = f"{TRANSPARENCIA_BASE_URL}/{sanctions_list.endpoint}?{param}={document}&pagina={page}"
+            response, key = _transparencia_get(url, key, deadline=deadline)
+            status["pages"] = page
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}")
+            data = response.json()
+            records.extend(item for item in data if sanctions_list.matches(item, document))
+            if len(data) < TRANSPARENCIA_PAGE_SIZE:
+                break
+        else:
+            # Mais páginas do que o limite: o que foi lido vale, mas pode faltar registro
+            status["truncated"] = True
+    except Exception as e:
+        timed_out = isinstance(e, DeadlineExceeded) or bool(deadline and deadline.expired)
+        status.update(status=SOURCE_TIMED_OUT if timed_out else SOURCE_FAILED, error=str(e) or type(e).__name__)
+    status["records"] = len(records)
+    if status["status"] == SOURCE_COMPLETED:
+        _list_caches[sanctions_list.name].put(document, list(records))
+    _list_queries.inc(list=sanctions_list.name, outcome=status["status"])
+    return records, status
+
+
+def query_sanctions(
+    document: str,
+    doc_type: str,
+    deadline: Optional[Deadline] = None,
+    on_list: Optional[Callable[[str, List], None]] = None
+) -> Dict[str, any]:
     """
-    Consulta sanções no Portal da Transparência (CEIS, CNEP, CEPIM)
+    Consulta sanções no Portal da Transparência nas listas registradas
+    (CEIS, CNEP, CEPIM, CEAF, acordos de leniência), em paralelo
 
     Args:
         document: CPF ou CNPJ limpo
         doc_type: 'CPF' ou 'CNPJ'
+        deadline: Prazo total; listas que não terminarem a tempo ficam como
+            timed_out
+        on_list: Chamado com (lista, registros) a cada lista consultada com
+            sucesso (na thread da lista)
 
     Returns:
-        Dict com listas de sanções encontradas
+        Dict com os registros de cada lista (chave = nome da lista),
+        total_sanctions e `lists` com o status de cada uma (status, records,
+        pages, cached, error; screened_by quando descartada pelo filtro
+        negativo, sem chamada ao Portal). success=False se alguma lista
+        essencial (core) falhou ou não terminou, mantendo as que responderam;
+        se só opcionais faltaram, partial=True e warning
     """
-    if not TRANSPARENCIA_API_KEY:
-        return {"success": False, "error": "API Key do Portal da Transparência não configurada"}
-
-    headers = {"chave-api-dados": TRANSPARENCIA_API_KEY}
-    results = {
-        "success": True,
-        "ceis": [],
-        "cnep": [],
-        "cepim": [],
-        "total_sanctions": 0
+    lists = enabled_sanctions_lists(doc_type)
+    results: Dict[str, any] = {"success": True, **{name: [] for name in SANCTIONS_LISTS}, "total_sanctions": 0}
+    statuses: Dict[str, Dict] = {
+        name: {"status": SOURCE_SKIPPED, "records": 0, "pages": 0, "cached": False}
+        for name in SANCTIONS_LISTS
     }
 
-    # CEIS - Cadastro de Empresas Inidôneas e Suspensas
-    try:
-        param_name = "codigoCpfCnpj" if doc_type == "CNPJ" else "cpfCnpj"
-        url = f"{TRANSPARENCIA_BASE_URL}/ceis?{param_name}={document}"
-        response = requests.get(url, headers=headers, timeout=10)
+    def finish(name: str, records: List, status: Dict) -> None:
+        results[name] = records
+        statuses[name] = status
+        if on_list:
+            on_list(name, records)
+
+    def query_list(item: SanctionsList, key: str) -> Tuple[List, Dict]:
+        # Na thread da lista: o evento sai assim que ela responde
+        records, status = _query_list(item, document, doc_type, key, deadline)
+        if on_list and status["status"] == SOURCE_COMPLETED and not (deadline and deadline.expired):
+            on_list(item.name, records)
+        return records, status
+
+    # Documento fora do snapshot das listas importadas (core/sanctions_filter.py)
+    in_filter = [item for item in lists if item.in_filter]
+    screened = sanctions_filter.check(document, doc_type, calls=len(in_filter)) if in_filter else None
+    pending: List[SanctionsList] = []
+    for item in lists:
+        if screened is False and item.in_filter:
+            finish(item.name, [], {"status": SOURCE_COMPLETED, "records": 0, "pages": 0, "cached": False,
+                                   "screened_by": "sanctions_filter"})
+            continue
+        cached = _list_caches[item.name].get(document)
+        if cached is not None:
+            _list_queries.inc(list=item.name, outcome="cached")
+            finish(item.name, list(cached), {"status": SOURCE_COMPLETED, "records": len(cached), "pages": 0, "cached": True})
+            continue
+        pending.append(item)
+
+    if pending:
+        if not transparencia_keys:
+            return {"success": False, "error": "API Key do Portal da Transparência não configurada"}
+        # Cota da empresa e orçamento de uma chave para a primeira página de
+        # cada lista, reservados de uma vez: sem cota, falha explícita em vez
+        # de listas de sanções vazias
+        try:
+            acquire_upstream("transparencia", calls=len(pending), max_wait=_max_wait(deadline))
+            key = transparencia_keys.checkout(tokens=len(pending), max_wait=_max_wait(deadline))
+        except (QuotaExceeded, DeadlineExceeded) as e:
+            return {"success": False, "error": str(e)}
+
+        futures = {
+            _submit_list(query_list, item, key): item.name
+            for item in pending
+        }
+        done, not_done = wait(futures, timeout=deadline.remaining() if deadline else None)
+        for future in done:
+            results[futures[future]], statuses[futures[future]] = future.result()
+        for future in not_done:
+            # A consulta segue até o timeout HTTP (limitado pelo prazo), mas não entra no resultado
+            future.cancel()
+            statuses[futures[future]] = {"status": SOURCE_TIMED_OUT, "records": 0, "pages": 0, "cached": False,
+                                         "error": "Prazo da consulta esgotado"}
+
+    results["lists"] = statuses
+    results["total_sanctions"] = sum(len(results[name]) for name in SANCTIONS_LISTS)
+    if screened is False and not pending:
+        results["screened_by"] = "sanctions_filter"
+
+    incomplete = [name for name, status in statuses.items() if status["status"] in (SOURCE_FAILED, SOURCE_TIMED_OUT)]
+    if incomplete:
+        details = ", ".join(
+            f"{name} ({statuses[name].get('error')})" if statuses[name].get("error") else name for name in incomplete
+        )
+        message = f"Listas de sanções não consultadas: {details}"
+        if any(SANCTIONS_LISTS[name].core for name in incomplete):
+            # O que foi obtido vale, mas a ausência de sanções não está confirmada
+            return {**results, "success": False, "error": message}
+        # Só listas opcionais faltaram: resultado parcial, falha visível no status delas
+        results.update(partial=True, warning=message)
+
+    if screened and not any(results[item.name] for item in in_filter):
+        sanctions_filter.record_false_positive()
+    return results
 
-        if response.status_code == 200:
-            data = response.json()
-            # Filtro local para garantir que é o documento correto
-            filtered = [item for item in data if str(item.get("cpfCnpjSancionado", "")).replace("***", "") == document or
-                       str(item.get("cnpjSancionado", "")) == document]
-            results["ceis"] = filtered
-    except:
-        pass
-
-    # CNEP - Cadastro Nacional de Empresas Punidas
-    try:
-        param_name = "codigoCnpj" if doc_type == "CNPJ" else "cpf"
-        url = f"{TRANSPARENCIA_BASE_URL}/cnep?{param_name}={document}"
-        response = requests.get(url, headers=headers, timeout=10)
 
-        if response.status_code == 200:
-            data = response.json()
-            filtered = [item for item in data if str(item.get("cnpjCpfSancionado", "")) == document]
-            results["cnep"] = filtered
-    except:
-        pass
+# Situação de cada fonte no resultado de run_kyc_check (kyc_data["sources"])
+SOURCE_COMPLETED = "completed"
+SOURCE_FAILED = "failed"
+SOURCE_TIMED_OUT = "timed_out"
+SOURCE_SKIPPED = "skipped"
 
-    # CEPIM - Cadastro de Entidades Privadas Sem Fins Lucrativos Impedidas
-    try:
-        url = f"{TRANSPARENCIA_BASE_URL}/cepim?cnpj={document}" if doc_type == "CNPJ" else None
-        if url:
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                filtered = [item for item in data if str(item.get("cnpj", "")) == document]
-                results["cepim"] = filtered
-    except:
-        pass
-
-    results["total_sanctions"] = len(results["ceis"]) + len(results["cnep"]) + len(results["cepim"])
+# Fontes e listas de sanções consultadas em paralelo (pools próprios:
+# run_kyc_check já roda no pool de chamadas bloqueantes e a fonte de sanções
+# espera pelas listas)
+_pools: Dict[str, ThreadPoolExecutor] = {}
+_pools_lock = threading.Lock()
 
-    return results
+
+def _submit(pool_name: str, max_workers: int, func: Callable, *args) -> Future:
+    with _pools_lock:
+        pool = _pools.get(pool_name)
+        if pool is None:
+            pool = _pools[pool_name] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"kyc-{pool_name}")
+    # Cada tarefa herda o contexto (empresa dona da cota, ver core/quotas.py)
+    return pool.submit(contextvars.copy_context().run, func, *args)
+
+
+def _submit_source(func: Callable[..., Dict], *args) -> Future:
+    return _submit("source", settings.KYC_SOURCE_WORKERS, func, *args)
 
 
-def run_kyc_check(document: str, cep: Optional[str] = None) -> Dict[str, any]:
+def _submit_list(func: Callable[..., Tuple], *args) -> Future:
+    return _submit("sanctions-list", settings.SANCTIONS_LIST_WORKERS, func, *args)
+
+
+def shutdown_source_pool() -> None:
+    """Encerra os pools de fontes e de listas (chamado no shutdown da aplicação)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _collect(future: Future, deadline: Optional[Deadline]) -> Tuple[Dict, str]:
+    """
+    Espera o resultado de uma fonte até o prazo
+
+    Returns:
+        (dados, situação). No prazo esgotado a fonte é cancelada (se ainda
+        não começou) ou abandonada - o timeout HTTP dela também é limitado
+        pelo prazo.
+    """
+    try:
+        data = future.result(timeout=deadline.remaining() if deadline else None)
+    except FutureTimeout:
+        future.cancel()
+        return {"success": False, "error": "Prazo da consulta esgotado"}, SOURCE_TIMED_OUT
+    if data.get("success"):
+        return data, SOURCE_COMPLETED
+    return data, SOURCE_TIMED_OUT if deadline and deadline.expired else SOURCE_FAILED
+
+
+def compute_risk_level(
+    doc_type: str,
+    cadastral: Dict,
+    sanctions: Dict,
+    sources: Dict[str, str],
+    pep: Optional[Dict] = None
+) -> str:
+    """
+    Nível de risco básico, tratando explicitamente fontes ausentes
+
+    - sanções encontradas: ALTO (mesmo com resultado parcial)
+    - CPF na lista PEP (confirmado): ALTO - diligência reforçada
+    - sanções não verificadas (falha/prazo): MÉDIO - ausência não confirmada
+    - CPF possivelmente PEP (só os dígitos centrais batem): MÉDIO, com
+      PEP_FLAG_POSSIBLE_MATCHES
+    - CNPJ sem dados cadastrais: MÉDIO
+    - CNPJ: BAIXO se ATIVA, senão MÉDIO; CPF: BAIXO
+    """
+    pep = pep or {}
+    if sanctions.get("total_sanctions", 0) > 0 or pep.get("is_pep"):
+        return "ALTO"
+    if sources.get("sanctions") != SOURCE_COMPLETED:
+        return "MÉDIO"
+    if pep.get("match") and settings.PEP_FLAG_POSSIBLE_MATCHES:
+        return "MÉDIO"
+    if doc_type == "CNPJ":
+        if sources.get("cadastral") != SOURCE_COMPLETED:
+            return "MÉDIO"
+        situacao = (cadastral.get("situacao_cadastral") or "").upper()
+        return "BAIXO" if "ATIVA" in situacao else "MÉDIO"
+    return "BAIXO"
+
+
+def run_kyc_check(
+    document: str,
+    cep: Optional[str] = None,
+    deadline: Optional[Deadline] = None,
+    on_source: Optional[Callable[[str, Dict, str], None]] = None,
+    on_sanctions_list: Optional[Callable[[str, List], None]] = None,
+    name: Optional[str] = None
+) -> Dict[str, any]:
     """
     Executa verificação KYC completa
 
+    Cadastro (BrasilAPI) e sanções (Portal) são consultados em paralelo; o CEP
+    depois do cadastro (usa o CEP da empresa). Com prazo, o que não terminar a
+    tempo entra como timed_out e o resultado sai parcial. CPF é consultado na
+    lista PEP local (services/pep_list.py) antes das fontes externas.
+
     Args:
         document: CPF ou CNPJ
         cep: CEP opcional para consulta adicional
+        deadline: Prazo total da verificação (None = sem prazo)
+        on_source: Chamado com (fonte, dados, situação) assim que cada fonte
+            termina (pep, cadastral, address, sanctions), na ordem de chegada
+        on_sanctions_list: Chamado a cada lista de sanções obtida (ver
+            query_sanctions; roda na thread da lista)
+        name: Nome informado do titular do CPF (confirma a ocorrência na
+            lista PEP pelos dígitos centrais do CPF mascarado)
 
     Returns:
-        Dict com todos os dados coletados
+        Dict com todos os dados coletados, `sources` (situação de cada fonte:
+        completed, failed, timed_out ou skipped), `missing_sources` e `partial`
     """
     # 1. Valida documento
     validation = validate_document(document)
@@ -303,39 +701,58 @@ def run_kyc_check(document: str, cep: Optional[str] = None) -> Dict[str, any]:
         "doc_type": doc_type,
         "cadastral_data": {},
         "sanctions": {},
-        "address_data": {}
+        "address_data": {},
+        "pep": {}
     }
-
-    # 2. Consulta dados cadastrais (apenas CNPJ via BrasilAPI)
+    sources = {"cadastral": SOURCE_SKIPPED, "address": SOURCE_SKIPPED, "sanctions": SOURCE_SKIPPED, "pep": SOURCE_SKIPPED}
+    fields = {"cadastral": "cadastral_data", "address": "address_data", "sanctions": "sanctions", "pep": "pep"}
+
+    def finish(name: str, data: Dict, status: str) -> None:
+        result[fields[name]] = data
+        sources[name] = status
+        if on_source:
+            on_source(name, data, status)
+
+    # 2. Lista PEP (só CPF): índice em memória, sem chamada externa
+    if doc_type == "CPF":
+        pep = pep_list.screen_cpf(clean_document, name)
+        finish("pep", pep, SOURCE_COMPLETED if pep["available"] else SOURCE_SKIPPED)
+
+    # 3. Sanções e dados cadastrais (apenas CNPJ via BrasilAPI) em paralelo; o
+    # CEP (informado ou o da empresa) assim que o cadastro chegar
+    pending = {_submit_source(query_sanctions, clean_document, doc_type, deadline, on_sanctions_list): "sanctions"}
     if doc_type == "CNPJ":
-        cnpj_data = query_cnpj(clean_document)
-        result["cadastral_data"] = cnpj_data
-
-        # Se CNPJ tem CEP, usa ele
-        if cnpj_data.get("success") and cnpj_data.get("endereco", {}).get("cep"):
-            cep = cnpj_data["endereco"]["cep"]
-
-    # 3. Consulta CEP se fornecido
-    if cep:
-        cep_data = query_cep(cep)
-        result["address_data"] = cep_data
-
-    # 4. Consulta sanções
-    sanctions = query_sanctions(clean_document, doc_type)
-    result["sanctions"] = sanctions
-
-    # 5. Calcula nível de risco básico
-    total_sanctions = sanctions.get("total_sanctions", 0)
-    if total_sanctions > 0:
-        result["risk_level"] = "ALTO"
-    elif doc_type == "CNPJ":
-        situacao = result["cadastral_data"].get("situacao_cadastral", "").upper()
-        if "ATIVA" in situacao:
-            result["risk_level"] = "BAIXO"
-        else:
-            result["risk_level"] = "MÉDIO"
-    else:
-        result["risk_level"] = "BAIXO"
+        pending[_submit_source(query_cnpj, clean_document, deadline)] = "cadastral"
+    elif cep:
+        pending[_submit_source(query_cep, cep, deadline)] = "address"
+
+    while pending:
+        done, _ = wait(pending, timeout=deadline.remaining() if deadline else None, return_when=FIRST_COMPLETED)
+        if not done:
+            break  # prazo esgotado
+        for future in done:
+            name = pending.pop(future)
+            data, status = _collect(future, deadline)
+            finish(name, data, status)
+
+            # 4. Se CNPJ tem CEP, usa ele
+            if name == "cadastral":
+                if data.get("success") and data.get("endereco", {}).get("cep"):
+                    cep = data["endereco"]["cep"]
+                if cep:
+                    pending[_submit_source(query_cep, cep, deadline)] = "address"
+
+    # Fontes que não terminaram no prazo
+    for future, name in pending.items():
+        finish(name, *_collect(future, deadline))
+
+    # 5. Calcula nível de risco básico (fontes ausentes tratadas explicitamente)
+    result["sources"] = sources
+    result["missing_sources"] = [name for name, status in sources.items() if status in (SOURCE_FAILED, SOURCE_TIMED_OUT)]
+    result["partial"] = bool(result["missing_sources"])
+    result["risk_level"] = compute_risk_level(
+        doc_type, result["cadastral_data"], result["sanctions"], sources, result["pep"]
+    )
 
     return result
 
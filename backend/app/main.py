@@ -6,16 +6,35 @@ Sistema de análise de risco (KYC) com FastAPI + Next.js
 Author: Vinicius Matsumoto
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.core.config import settings
-from app.routers import auth, dossiers, monitoring
+from app.core.container import ServiceContainer
+from app.core.metrics import metrics
+from app.routers import auth, dossiers, events, monitoring, usage
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Cria os clients/serviços compartilhados no startup e os encerra no shutdown"""
+    container = ServiceContainer()
+    container.start()
+    app.state.container = container
+    try:
+        yield
+    finally:
+        container.close()
+
 
 # Inicializa FastAPI
 app = FastAPI(
     title="KYC System API",
     description="API para sistema de análise de risco (KYC)",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
 )
 
 # CORS - Permite requisições do frontend
@@ -31,6 +50,8 @@ app.add_middleware(
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(dossiers.router, prefix="/api/dossiers", tags=["Dossiers"])
 app.include_router(monitoring.router, prefix="/api/monitoring", tags=["Monitoring"])
+app.include_router(usage.router, prefix="/api/usage", tags=["Usage"])
+app.include_router(events.router, prefix="/api/events", tags=["Events"])
 
 
 @app.get("/")
@@ -54,6 +75,12 @@ async def health_check():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Métricas do processo (formato Prometheus)"""
+    return metrics.render()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -7,10 +7,17 @@ Autor: Vinicius Matsumoto
 
 import os
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
+from postgrest.exceptions import APIError
 from supabase import create_client, Client
 from app import kyc_engine
 from app.core.config import settings
+from app.core.database import UNDEFINED_FUNCTION_CODES, get_database
+from app.core.deadline import Deadline
+from app.core.events import ProgressReporter, events
+from app.core.quotas import quota_scope
+from app.services import pg_queries
+from app.services.payload_store import PayloadStore
 
 # Supabase client - inicializado no primeiro uso
 _supabase_client = None
@@ -23,6 +30,40 @@ def get_supabase() -> Client:
     return _supabase_client
 
 
+def set_supabase(client: Client) -> None:
+    """Injeta o Supabase client compartilhado do processo (ver core/container.py)"""
+    global _supabase_client
+    _supabase_client = client
+
+
+# Respostas externas dentro do data_json gravadas no payload store
+MONITORING_PAYLOAD_PATHS = (
+    ("cadastral_data",),
+    ("address_data",),
+    ("sanctions", "ceis"),
+    ("sanctions", "cnep"),
+    ("sanctions", "cepim"),
+    ("sanctions", "ceaf"),
+    ("sanctions", "leniencia"),
+)
+
+# Registros gravados por instrução no refresh em massa (Postgres direto)
+REFRESH_WRITE_BATCH = 50
+
+
+def get_payload_store() -> PayloadStore:
+    """Payload store compartilhado com os dossiês"""
+    return PayloadStore(get_supabase())
+
+
+def _resolve_records(records: List[Dict]) -> List[Dict]:
+    """Resolve em lote as referências a payloads do data_json dos registros"""
+    data_jsons = get_payload_store().resolve([r.get("data_json") or {} for r in records])
+    for record, data_json in zip(records, data_jsons):
+        record["data_json"] = data_json
+    return records
+
+
 def compute_status(doc_type: Optional[str], kyc_data: Dict) -> str:
     """
     Calcula status do documento com base nos dados KYC.
@@ -49,7 +90,93 @@ def compute_status(doc_type: Optional[str], kyc_data: Dict) -> str:
     return "REGULAR"
 
 
-def add_monitored_record(document: str, notes: str, company_id: str) -> Dict[str, any]:
+def _find_target(company_id: str, document: str) -> Optional[Dict]:
+    """Registro já monitorado pela empresa (id, data_json), ou None"""
+    db = get_database()
+    if db:
+        return pg_queries.find_monitoring_target(db, company_id, document)
+    existing = (
+        get_supabase().table("monitoring_targets")
+        .select("id,data_json")
+        .eq("document", document)
+        .eq("company_id", company_id)
+        .execute()
+    )
+    return existing.data[0] if existing.data else None
+
+
+def _upsert_target(record: Dict) -> Optional[Dict]:
+    """
+    INSERT ... ON CONFLICT (company_id, document) DO NOTHING em uma ida ao banco
+    (função upsert_monitoring_target, ver migrations/004)
+
+    Args:
+        record: company_id, document, doc_type, current_status, data_json
+
+    Returns:
+        Dict com id, data_json e inserted (False = registro já existia)
+
+    Raises:
+        APIError: Erro do PostgREST; o SELECT + INSERT só é usado quando a
+            função não existe (UNDEFINED_FUNCTION_CODES)
+    """
+    db = get_database()
+    if db:
+        row = db.fetchrow(
+            "SELECT * FROM public.upsert_monitoring_target($1::uuid, $2, $3, $4, $5::jsonb)",
+            record["company_id"], record["document"], record["doc_type"], record["current_status"], record["data_json"]
+        )
+        if not row:
+            # Conflito com um insert concorrente ainda fora do snapshot da instrução
+            row = db.fetchrow(
+                "SELECT id, data_json, FALSE AS inserted FROM public.monitoring_targets "
+                "WHERE company_id = $1::uuid AND document = $2",
+                record["company_id"], record["document"]
+            )
+        if row:
+            row["id"] = str(row["id"])
+        return row
+
+    try:
+        response = get_supabase().rpc("upsert_monitoring_target", {
+            "p_company_id": record["company_id"],
+            "p_document": record["document"],
+            "p_doc_type": record["doc_type"],
+            "p_current_status": record["current_status"],
+            "p_data_json": record["data_json"],
+        }).execute()
+    except APIError as e:
+        if e.code not in UNDEFINED_FUNCTION_CODES:
+            raise
+        # Banco sem a migração 004: SELECT + INSERT
+        print(f"upsert_monitoring_target indisponível, usando SELECT + INSERT: {str(e)}")
+        existing = _find_target(record["company_id"], record["document"])
+        if existing:
+            return {**existing, "inserted": False}
+        response = get_supabase().table("monitoring_targets").insert(record).execute()
+        row = response.data[0] if response.data else {}
+        return {"id": row.get("id"), "data_json": record["data_json"], "inserted": True}
+
+    if response.data:
+        return response.data[0]
+    # Conflito com um insert concorrente ainda fora do snapshot da instrução
+    existing = _find_target(record["company_id"], record["document"])
+    return {**existing, "inserted": False} if existing else None
+
+
+def _already_monitored(existing: Dict, document: str) -> Dict[str, any]:
+    data_json = existing.get("data_json") or {}
+    return {
+        "success": True,
+        "record_id": existing.get("id"),
+        "document": document,
+        "entity_name": data_json.get("entity_name") or "",
+        "restriction_count": data_json.get("restriction_count", 0),
+        "already_exists": True
+    }
+
+
+def add_monitored_record(document: str, notes: str, company_id: str, name: Optional[str] = None) -> Dict[str, any]:
     """
     Adiciona documento ao monitoramento contínuo
 
@@ -57,6 +184,9 @@ def add_monitored_record(document: str, notes: str, company_id: str) -> Dict[str
         document: CPF ou CNPJ
         notes: Observações sobre o monitoramento
         company_id: ID da empresa
+        name: Nome informado do titular do CPF; fica no data_json
+            (holder_name) e confirma a ocorrência PEP pelos dígitos
+            centrais também nas atualizações
 
     Returns:
         Dict com success e dados do registro
@@ -70,32 +200,21 @@ def add_monitored_record(document: str, notes: str, company_id: str) -> Dict[str
         clean_doc = validation["clean_document"]
         doc_type = validation["doc_type"]
 
-        # Verifica se já existe (idempotente)
-        existing = (
-            get_supabase().table("monitoring_targets")
-            .select("id,document,doc_type,current_status,data_json")
-            .eq("document", clean_doc)
-            .eq("company_id", company_id)
-            .execute()
-        )
+        # Documento já monitorado: devolve o registro sem consultar as APIs
+        # (nem gastar cota) nem gravar payloads; o upsert abaixo só cobre a
+        # corrida com um cadastro simultâneo
+        existing = _find_target(company_id, clean_doc)
+        if existing:
+            return _already_monitored(existing, clean_doc)
 
-        if existing.data and len(existing.data) > 0:
-            existing_record = existing.data[0]
-            data_json = existing_record.get("data_json", {}) or {}
-            entity_name = data_json.get("entity_name") or ""
-            restriction_count = data_json.get("restriction_count", 0)
-            return {
-                "success": True,
-                "record_id": existing_record.get("id"),
-                "document": clean_doc,
-                "entity_name": entity_name,
-                "restriction_count": restriction_count,
-                "already_exists": True
-            }
+        holder_name = (name or "").strip() if doc_type == "CPF" else ""
 
         # Faz primeira consulta
-        kyc_data = kyc_engine.run_kyc_check(clean_doc)
-        entity_name = kyc_engine.get_entity_name(kyc_data)
+        with quota_scope(company_id):
+            kyc_data = kyc_engine.run_kyc_check(
+                clean_doc, deadline=Deadline.after(settings.KYC_BATCH_DEADLINE_SECONDS), name=holder_name or None
+            )
+        entity_name = holder_name or kyc_engine.get_entity_name(kyc_data)
         if entity_name == "Empresa não identificada":
             entity_name = ""
 
@@ -110,6 +229,8 @@ def add_monitored_record(document: str, notes: str, company_id: str) -> Dict[str
         # Campos que não existem na tabela vão para dentro do data_json
         kyc_data["entity_name"] = entity_name
         kyc_data["notes"] = notes
+        if holder_name:
+            kyc_data["holder_name"] = holder_name
         kyc_data["restriction_count"] = restriction_count
         kyc_data["last_check_at"] = datetime.utcnow().isoformat()
 
@@ -118,31 +239,25 @@ def add_monitored_record(document: str, notes: str, company_id: str) -> Dict[str
             "document": clean_doc,
             "doc_type": doc_type,
             "current_status": current_status,
-            "data_json": kyc_data
+            "data_json": get_payload_store().externalize(kyc_data, MONITORING_PAYLOAD_PATHS)
         }
 
-        response = get_supabase().table("monitoring_targets").insert(record).execute()
+        # Insere ou devolve o registro existente (idempotente, uma ida ao banco)
+        saved = _upsert_target(record)
 
-        if getattr(response, "error", None):
-            return {"success": False, "error": f"Erro ao salvar registro: {response.error}"}
+        if saved is None:
+            return {"success": False, "error": "Erro ao salvar registro"}
 
-        if response.data and len(response.data) > 0:
-            return {
-                "success": True,
-                "record_id": response.data[0]["id"],
-                "document": clean_doc,
-                "entity_name": entity_name,
-                "restriction_count": restriction_count
-            }
-        else:
-            # Alguns clientes do Supabase nÃ£o retornam data no insert, mas o registro Ã© criado
-            return {
-                "success": True,
-                "record_id": None,
-                "document": clean_doc,
-                "entity_name": entity_name,
-                "restriction_count": restriction_count
-            }
+        if not saved["inserted"]:
+            return _already_monitored(saved, clean_doc)
+
+        return {
+            "success": True,
+            "record_id": saved.get("id"),
+            "document": clean_doc,
+            "entity_name": entity_name,
+            "restriction_count": restriction_count
+        }
 
     except Exception as e:
         return {"success": False, "error": f"Erro ao adicionar monitoramento: {str(e)}"}
@@ -187,7 +302,7 @@ def get_monitored_record(document: str, company_id: str) -> Optional[Dict]:
         response = get_supabase().table("monitoring_targets").select("*").eq("document", clean_doc).eq("company_id", company_id).execute()
 
         if response.data and len(response.data) > 0:
-            return response.data[0]
+            return _resolve_records(response.data[:1])[0]
         else:
             return None
 
@@ -216,30 +331,36 @@ def get_all_monitored_records(
     """
     try:
         offset = (page - 1) * page_size
+        doc_type = filter_type.upper() if filter_type else None
 
-        # Monta query
-        query = get_supabase().table("monitoring_targets").select("*", count="exact")
+        db = get_database()
+        if db:
+            # Página + total em uma consulta
+            rows, total = pg_queries.list_monitoring_targets(db, company_id, doc_type, offset, page_size)
+        else:
+            # Monta query
+            query = get_supabase().table("monitoring_targets").select("*", count="exact")
 
-        if company_id:
-            query = query.eq("company_id", company_id)
+            if company_id:
+                query = query.eq("company_id", company_id)
 
-        if filter_type:
-            query = query.eq("doc_type", filter_type.upper())
+            if doc_type:
+                query = query.eq("doc_type", doc_type)
 
-        # Conta total
-        count_response = query.execute()
-        total = count_response.count if hasattr(count_response, 'count') else 0
+            # Conta total
+            count_response = query.execute()
+            total = count_response.count if hasattr(count_response, 'count') else 0
 
-        # Busca registros
-        query = get_supabase().table("monitoring_targets").select("*")
-        if company_id:
-            query = query.eq("company_id", company_id)
-        if filter_type:
-            query = query.eq("doc_type", filter_type.upper())
+            # Busca registros
+            query = get_supabase().table("monitoring_targets").select("*")
+            if company_id:
+                query = query.eq("company_id", company_id)
+            if doc_type:
+                query = query.eq("doc_type", doc_type)
 
-        response = query.order("created_at", desc=True).range(offset, offset + page_size - 1).execute()
+            rows = query.order("created_at", desc=True).range(offset, offset + page_size - 1).execute().data
 
-        records = response.data if response.data else []
+        records = _resolve_records(rows) if rows else []
 
         return {
             "success": True,
@@ -264,23 +385,33 @@ def get_monitoring_stats(company_id: str) -> Dict[str, any]:
         Dict com estatísticas
     """
     try:
-        # Total de registros
-        response = get_supabase().table("monitoring_targets").select("*", count="exact").eq("company_id", company_id).execute()
-        total = response.count if hasattr(response, 'count') else 0
+        db = get_database()
+        if db:
+            # Todas as contagens em uma varredura
+            counts = pg_queries.monitoring_stats(db, company_id)
+            total = counts["total"]
+            total_with_restrictions = counts["with_restrictions"]
+            total_active = counts["active"]
+            total_cpf = counts["cpf"]
+            total_cnpj = counts["cnpj"]
+        else:
+            # Total de registros
+            response = get_supabase().table("monitoring_targets").select("*", count="exact").eq("company_id", company_id).execute()
+            total = response.count if hasattr(response, 'count') else 0
 
-        # Registros com restrições (precisa buscar data_json)
-        all_records = get_supabase().table("monitoring_targets").select("data_json").eq("company_id", company_id).execute()
-        total_with_restrictions = sum(1 for r in (all_records.data or []) if r.get("data_json", {}).get("restriction_count", 0) > 0)
+            # Registros com restrições (precisa buscar data_json)
+            all_records = get_supabase().table("monitoring_targets").select("data_json").eq("company_id", company_id).execute()
+            total_with_restrictions = sum(1 for r in (all_records.data or []) if r.get("data_json", {}).get("restriction_count", 0) > 0)
 
-        # Registros ativos
-        active = get_supabase().table("monitoring_targets").select("id", count="exact").eq("company_id", company_id).eq("current_status", "ATIVO").execute()
-        total_active = active.count if hasattr(active, 'count') else 0
+            # Registros ativos
+            active = get_supabase().table("monitoring_targets").select("id", count="exact").eq("company_id", company_id).eq("current_status", "ATIVO").execute()
+            total_active = active.count if hasattr(active, 'count') else 0
 
-        # Contagem por tipo
-        cpf = get_supabase().table("monitoring_targets").select("id", count="exact").eq("company_id", company_id).eq("doc_type", "CPF").execute()
-        total_cpf = cpf.count if hasattr(cpf, 'count') else 0
-        cnpj = get_supabase().table("monitoring_targets").select("id", count="exact").eq("company_id", company_id).eq("doc_type", "CNPJ").execute()
-        total_cnpj = cnpj.count if hasattr(cnpj, 'count') else 0
+            # Contagem por tipo
+            cpf = get_supabase().table("monitoring_targets").select("id", count="exact").eq("company_id", company_id).eq("doc_type", "CPF").execute()
+            total_cpf = cpf.count if hasattr(cpf, 'count') else 0
+            cnpj = get_supabase().table("monitoring_targets").select("id", count="exact").eq("company_id", company_id).eq("doc_type", "CNPJ").execute()
+            total_cnpj = cnpj.count if hasattr(cnpj, 'count') else 0
 
         return {
             "success": True,
@@ -298,6 +429,142 @@ def get_monitoring_stats(company_id: str) -> Dict[str, any]:
         return {"success": False, "error": f"Erro ao obter estatísticas: {str(e)}"}
 
 
+def _carry_over_failed_lists(kyc_data: Dict, old_data: Dict) -> None:
+    """
+    Listas opcionais que falharam no refresh (kyc_engine.SanctionsList.core)
+    mantêm os registros gravados antes, em vez de zerar as restrições delas;
+    total e risco são recalculados com eles
+    """
+    sanctions = kyc_data.get("sanctions") or {}
+    old_sanctions = old_data.get("sanctions") or {}
+    old_lists = old_sanctions.get("lists") or {}
+    carried = 0
+    for name, status in (sanctions.get("lists") or {}).items():
+        if status.get("status") not in (kyc_engine.SOURCE_FAILED, kyc_engine.SOURCE_TIMED_OUT) or name not in old_sanctions:
+            continue
+        previous = old_sanctions[name]  # pode ser referência do payload store
+        count = (old_lists.get(name) or {}).get("records", len(previous) if isinstance(previous, list) else 0)
+        sanctions[name] = previous
+        status["carried_over"] = True
+        carried += count
+    if carried:
+        sanctions["total_sanctions"] = sanctions.get("total_sanctions", 0) + carried
+        kyc_data["risk_level"] = kyc_engine.compute_risk_level(
+            kyc_data.get("doc_type"), kyc_data.get("cadastral_data") or {}, sanctions,
+            kyc_data.get("sources") or {}, kyc_data.get("pep"),
+        )
+
+
+def _refresh_record(current: Dict) -> Dict[str, any]:
+    """
+    Refaz a consulta KYC de um registro e monta a gravação (sem gravar)
+
+    Args:
+        current: Registro atual (document, doc_type, data_json)
+
+    Returns:
+        Dict com success, resultado e, em caso de sucesso, `update`
+        ({document, data_json, current_status})
+    """
+    clean_doc = current["document"]
+    old_data = current.get("data_json") or {}
+    holder_name = old_data.get("holder_name")
+
+    # Faz nova consulta
+    kyc_data = kyc_engine.run_kyc_check(
+        clean_doc, deadline=Deadline.after(settings.KYC_BATCH_DEADLINE_SECONDS), name=holder_name
+    )
+    if not kyc_data.get("success"):
+        return {"success": False, "error": "Erro na consulta KYC"}
+    if kyc_data.get("sources", {}).get("sanctions") in (kyc_engine.SOURCE_TIMED_OUT, kyc_engine.SOURCE_FAILED):
+        # Sanções não verificadas (prazo ou lista essencial com erro): mantém
+        # o registro em vez de zerar as restrições das listas que faltaram
+        error = kyc_data.get("sanctions", {}).get("error") or "prazo esgotado"
+        return {"success": False, "error": f"Consulta de sanções não concluída: {error}"}
+
+    # Calcula mudanças
+    _carry_over_failed_lists(kyc_data, old_data)
+    old_restrictions = old_data.get("restriction_count", 0)
+    new_restrictions = kyc_data.get("sanctions", {}).get("total_sanctions", 0)
+    has_changes = old_restrictions != new_restrictions
+
+    # Adiciona metadados ao kyc_data (preserva campos salvos)
+    entity_name = kyc_engine.get_entity_name(kyc_data)
+    if not entity_name or entity_name == "Empresa não identificada":
+        entity_name = old_data.get("entity_name")
+    notes = old_data.get("notes")
+    kyc_data["restriction_count"] = new_restrictions
+    if entity_name:
+        kyc_data["entity_name"] = entity_name
+    if notes is not None:
+        kyc_data["notes"] = notes
+    if holder_name:
+        kyc_data["holder_name"] = holder_name
+    kyc_data["last_check_at"] = datetime.utcnow().isoformat()
+    kyc_data["has_changes"] = has_changes
+
+    return {
+        "success": True,
+        "document": clean_doc,
+        "old_restrictions": old_restrictions,
+        "new_restrictions": new_restrictions,
+        "has_changes": has_changes,
+        "update": {
+            "document": clean_doc,
+            "data_json": get_payload_store().externalize(kyc_data, MONITORING_PAYLOAD_PATHS),
+            "current_status": compute_status(current.get("doc_type"), kyc_data)
+        }
+    }
+
+
+def _write_refreshes(company_id: str, updates: List[Dict], owner: Optional[str] = None) -> int:
+    """
+    Grava o resultado do refresh (uma instrução no Postgres direto; uma por registro via PostgREST)
+
+    Args:
+        company_id: ID da empresa
+        updates: Itens {document, data_json, current_status}
+        owner: Dono do lease (refresh contínuo, migrations/010): só grava os
+            registros sem lease ou com lease dele, e libera o lease. Sem
+            owner o lease de outro worker fica como está
+
+    Returns:
+        Quantidade de registros gravados
+    """
+    db = get_database()
+    if db:
+        return pg_queries.update_monitoring_targets(db, company_id, updates, owner)
+    written = 0
+    for update in updates:
+        values = {
+            "data_json": update["data_json"],
+            "current_status": update["current_status"],
+            "refreshed_at": datetime.utcnow().isoformat(),
+        }
+        query = get_supabase().table("monitoring_targets")
+        if owner:
+            query = (
+                query.update({**values, "lease_owner": None, "lease_expires_at": None})
+                .or_(f'lease_owner.is.null,lease_owner.eq."{owner}"')
+            )
+        else:
+            query = query.update(values)
+        response = query.eq("document", update["document"]).eq("company_id", company_id).execute()
+        written += len(response.data or [])
+    return written
+
+
+def _publish_change(company_id: str, result: Dict, status: Optional[str] = None) -> None:
+    """Publica target.changed se as restrições do registro mudaram"""
+    if result.get("has_changes"):
+        events.publish(company_id, "target.changed", {
+            "document": result["document"],
+            "old_restrictions": result["old_restrictions"],
+            "new_restrictions": result["new_restrictions"],
+            "current_status": status or result.get("update", {}).get("current_status"),
+        })
+
+
 def update_single_record(document: str, company_id: str) -> Dict[str, any]:
     """
     Atualiza um único registro de monitoramento
@@ -317,89 +584,123 @@ def update_single_record(document: str, company_id: str) -> Dict[str, any]:
         if not current:
             return {"success": False, "error": "Registro não encontrado"}
 
-        # Faz nova consulta
-        kyc_data = kyc_engine.run_kyc_check(clean_doc)
-        if not kyc_data.get("success"):
-            return {"success": False, "error": "Erro na consulta KYC"}
-
-        # Calcula mudanças
-        old_data = current.get("data_json", {})
-        old_restrictions = old_data.get("restriction_count", 0)
-        new_restrictions = kyc_data.get("sanctions", {}).get("total_sanctions", 0)
-        has_changes = old_restrictions != new_restrictions
-
-        # Adiciona metadados ao kyc_data (preserva campos salvos)
-        entity_name = kyc_engine.get_entity_name(kyc_data)
-        if not entity_name or entity_name == "Empresa não identificada":
-            entity_name = old_data.get("entity_name")
-        notes = old_data.get("notes")
-        kyc_data["restriction_count"] = new_restrictions
-        if entity_name:
-            kyc_data["entity_name"] = entity_name
-        if notes is not None:
-            kyc_data["notes"] = notes
-        kyc_data["last_check_at"] = datetime.utcnow().isoformat()
-        kyc_data["has_changes"] = has_changes
-
-        # Atualiza status
-        current_status = compute_status(current.get("doc_type"), kyc_data)
+        with quota_scope(company_id):
+            result = _refresh_record(current)
+        if not result["success"]:
+            return result
 
         # Atualiza registro (data_json + status)
-        update_data = {
-            "data_json": kyc_data,
-            "current_status": current_status
-        }
-
-        response = get_supabase().table("monitoring_targets").update(update_data).eq("document", clean_doc).eq("company_id", company_id).execute()
-
-        return {
-            "success": True,
-            "document": clean_doc,
-            "old_restrictions": old_restrictions,
-            "new_restrictions": new_restrictions,
-            "has_changes": has_changes
-        }
+        update = result.pop("update")
+        _write_refreshes(company_id, [update])
+        _publish_change(company_id, result, update["current_status"])
+        return result
 
     except Exception as e:
         return {"success": False, "error": f"Erro ao atualizar registro: {str(e)}"}
 
 
-def update_all_records(company_id: str) -> Dict[str, any]:
+def update_all_records(
+    company_id: str,
+    refresh_id: Optional[str] = None,
+    should_cancel: Optional[Callable[[], bool]] = None,
+    on_progress: Optional[Callable[[Dict], None]] = None
+) -> Dict[str, any]:
     """
     Atualiza todos os registros de monitoramento da empresa
 
     Args:
         company_id: ID da empresa
+        refresh_id: ID do refresh nos eventos (ex: job de atualização)
+        should_cancel: Consultado entre registros; True interrompe (o que já
+            foi processado fica gravado)
+        on_progress: Recebe os contadores a cada registro processado
 
     Returns:
-        Dict com estatísticas da atualização
+        Dict com estatísticas da atualização, `cancelled`, `changes`
+        (registros cujas restrições mudaram) e `failures` (documento e erro)
     """
+    progress = None
     try:
-        # Busca todos os registros
-        response = get_supabase().table("monitoring_targets").select("document").eq("company_id", company_id).execute()
-
-        if not response.data:
-            return {"success": True, "total": 0, "updated": 0, "errors": 0}
-
-        total = len(response.data)
-        updated = 0
-        errors = 0
-
-        for record in response.data:
-            result = update_single_record(record["document"], company_id)
-            if result.get("success"):
-                updated += 1
+        # Busca todos os registros (campos usados pelo refresh, sem resolver payloads)
+        db = get_database()
+        if db:
+            records = pg_queries.monitoring_refresh_targets(db, company_id)
+        else:
+            response = (
+                get_supabase().table("monitoring_targets")
+                .select("document,doc_type,data_json")
+                .eq("company_id", company_id)
+                .execute()
+            )
+            records = response.data or []
+
+        total = len(records)
+        counters = {"total": total, "processed": 0, "updated": 0, "errors": 0}
+        changes: List[Dict] = []
+        failures: List[Dict] = []
+        pending: List[Dict] = []
+        changed: List[Dict] = []
+        cancelled = False
+
+        # Progresso e mudanças no canal de eventos da empresa (core/events.py)
+        progress = ProgressReporter(company_id, "refresh", total, id_field="refresh_id", id=refresh_id)
+        progress.start()
+
+        def flush():
+            _write_refreshes(company_id, pending)
+            counters["updated"] += len(pending)
+            for result in changed:
+                _publish_change(company_id, result)
+                changes.append({
+                    "document": result["document"],
+                    "old_restrictions": result["old_restrictions"],
+                    "new_restrictions": result["new_restrictions"],
+                    "current_status": result["update"]["current_status"],
+                })
+            pending.clear()
+            changed.clear()
+
+        for record in records:
+            if should_cancel and should_cancel():
+                cancelled = True
+                break
+            try:
+                with quota_scope(company_id):
+                    result = _refresh_record(record)
+            except Exception as e:
+                print(f"Erro ao atualizar {record.get('document')}: {str(e)}")
+                result = {"success": False, "error": str(e)}
+
+            counters["processed"] += 1
+            if not result.get("success"):
+                counters["errors"] += 1
+                failures.append({"document": record.get("document"), "error": result.get("error", "Erro desconhecido")})
             else:
-                errors += 1
-
+                pending.append(result["update"])
+                if result["has_changes"]:
+                    changed.append(result)
+                if len(pending) >= REFRESH_WRITE_BATCH:
+                    flush()
+            progress.update(**{k: v for k, v in counters.items() if k != "total"})
+            if on_progress:
+                on_progress(dict(counters))
+
+        if pending:
+            flush()
+
+        progress.finish(cancelled=cancelled, **{k: v for k, v in counters.items() if k != "total"})
         return {
             "success": True,
-            "total": total,
-            "updated": updated,
-            "errors": errors
+            "refresh_id": progress.id,
+            **counters,
+            "cancelled": cancelled,
+            "changes": changes,
+            "failures": failures
         }
 
     except Exception as e:
+        if progress:
+            progress.finish(error=str(e))
         return {"success": False, "error": f"Erro ao atualizar registros: {str(e)}"}
 
 
@@ -434,7 +735,7 @@ def get_recent_changes(days: int = 2, company_id: str = None) -> Dict[str, any]:
 
         return {
             "success": True,
-            "changes": records,
+            "changes": _resolve_records(records),
             "total": len(records)
         }
 
@@ -5,26 +5,15 @@ Rotas de autenticacao (login, logout, user info)
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security.http import HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr
 
-from app.services.auth_service import AuthService, security
+from app.core.concurrency import run_blocking
+from app.core.container import get_auth_service
+from app.services.auth_service import AuthService, current_user as get_current_user
 
 router = APIRouter()
 
 
-def get_auth_service():
-    """Lazy initialization of AuthService"""
-    return AuthService()
-
-
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    auth_service: AuthService = Depends(get_auth_service),
-):
-    return await auth_service.get_current_user(credentials)
-
-
 class LoginRequest(BaseModel):
     email: EmailStr
     password: str
@@ -45,7 +34,7 @@ async def login(credentials: LoginRequest, auth_service: AuthService = Depends(g
 
     Retorna access_token JWT e informacoes do usuario/empresa.
     """
-    result = auth_service.sign_in(credentials.email, credentials.password)
+    result = await run_blocking(auth_service.sign_in, credentials.email, credentials.password)
 
     if not result["success"]:
         raise HTTPException(
@@ -4,37 +4,38 @@ Dossiers Router
 Rotas para gerenciamento de dossies
 """
 
+import asyncio
 from typing import List, Optional
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
-from fastapi.security.http import HTTPAuthorizationCredentials
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from app.services.auth_service import AuthService, security
+from app.core.concurrency import run_blocking
+from app.core.config import settings
+from app.core.container import get_dossier_service
+from app.core.sse import SSE_HEADERS, SSE_MEDIA_TYPE, EventChannel
+from app.services import ai_pipeline
+from app.services.auth_service import current_user as get_current_user, enforce_api_quota
 from app.services.dossier_service import DossierService
 
-router = APIRouter()
+# Cota de requisicoes por empresa (429 + Retry-After acima do limite do plano)
+router = APIRouter(dependencies=[Depends(enforce_api_quota)])
 
 
-def get_auth_service():
-    return AuthService()
-
-
-def get_dossier_service():
-    return DossierService()
-
-
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    auth_service: AuthService = Depends(get_auth_service),
-):
-    return await auth_service.get_current_user(credentials)
+def _split_param(value: Optional[str]) -> Optional[List[str]]:
+    """Converte parametro separado por virgula em lista (None = nao informado)"""
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
 
 
 class CreateDossierRequest(BaseModel):
     document: str
     enable_ai: bool = False
     cep: Optional[str] = None
+    # Nome do titular do CPF: confirma a ocorrencia PEP pelos digitos centrais
+    name: Optional[str] = None
 
 
 class BatchDossiersRequest(BaseModel):
@@ -68,11 +69,13 @@ async def create_dossier(
     dossier_service: DossierService = Depends(get_dossier_service),
     user=Depends(get_current_user),
 ):
-    result = dossier_service.generate_and_save(
+    result = await run_blocking(
+        dossier_service.generate_and_save,
         document=request.document,
         company_id=user["company_id"],
         enable_ai=request.enable_ai,
         cep=request.cep,
+        name=request.name,
     )
 
     if not result["success"]:
@@ -81,6 +84,64 @@ async def create_dossier(
     return result
 
 
+@router.post("/stream")
+async def create_dossier_stream(
+    request: CreateDossierRequest,
+    dossier_service: DossierService = Depends(get_dossier_service),
+    user=Depends(get_current_user),
+):
+    """
+    Cria dossie com resultados progressivos (Server-Sent Events).
+
+    Eventos, na ordem em que ficam prontos: pep (CPF: lista PEP local),
+    cadastral, address, sanctions_list (uma por lista consultada com
+    sucesso: ceis, cnep, cepim, ceaf, leniencia), sanctions (com o status de
+    cada lista em lists), risk, name_screening (CNPJ: razao social e socios nos nomes
+    das listas), saved (mesmo corpo do POST /) e ai. Em falha, error. O
+    stream termina apos o evento ai, ou apos saved se a IA nao foi pedida;
+    se a analise demorar mais que DOSSIER_STREAM_AI_WAIT_SECONDS, ai chega
+    com status PENDENTE (o resultado fica no dossie).
+    """
+    channel = EventChannel()
+    loop = asyncio.get_running_loop()
+
+    async def generate():
+        try:
+            result = await run_blocking(
+                dossier_service.generate_and_save,
+                document=request.document,
+                company_id=user["company_id"],
+                enable_ai=request.enable_ai,
+                cep=request.cep,
+                name=request.name,
+                on_event=channel.emit,
+            )
+        except Exception as e:
+            result = {"success": False, "error": f"Erro ao gerar dossiê: {str(e)}"}
+
+        if not result["success"]:
+            channel.emit("error", {"detail": result["error"]})
+            channel.close()
+        elif result.get("ai_status") == ai_pipeline.AI_STATUS_PENDING:
+            loop.call_later(
+                settings.DOSSIER_STREAM_AI_WAIT_SECONDS,
+                channel.emit,
+                "ai",
+                {"dossier_id": result["dossier_id"], "status": ai_pipeline.AI_STATUS_PENDING, "analysis": None},
+            )
+        elif not result.get("ai_status"):
+            channel.close()
+
+    async def events():
+        # O dossie e gravado mesmo se o cliente desconectar no meio
+        task = asyncio.ensure_future(generate())
+        async for chunk in channel.stream(until=("ai",)):
+            yield chunk
+        await task
+
+    return StreamingResponse(events(), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
+
 @router.post("/batch")
 async def create_batch_dossiers(
     request: BatchDossiersRequest,
@@ -109,7 +170,8 @@ async def list_dossiers(
     dossier_service: DossierService = Depends(get_dossier_service),
     user=Depends(get_current_user),
 ):
-    dossiers, total = dossier_service.list_dossiers(
+    dossiers, total = await run_blocking(
+        dossier_service.list_dossiers,
         company_id=user["company_id"],
         page=page,
         page_size=page_size,
@@ -124,7 +186,8 @@ async def check_duplicate(
     dossier_service: DossierService = Depends(get_dossier_service),
     user=Depends(get_current_user),
 ):
-    existing_id = dossier_service.check_duplicate(
+    existing_id = await run_blocking(
+        dossier_service.check_duplicate,
         document=document,
         company_id=user["company_id"],
     )
@@ -135,16 +198,30 @@ async def check_duplicate(
     }
 
 
-@router.get("/{dossier_id}", response_model=DossierResponse)
+@router.get("/{dossier_id}", response_model=DossierResponse, response_model_exclude_unset=True)
 async def get_dossier(
     dossier_id: str,
+    fields: Optional[str] = None,
+    sections: Optional[str] = None,
     dossier_service: DossierService = Depends(get_dossier_service),
     user=Depends(get_current_user),
 ):
-    dossier = dossier_service.get_by_id(
-        dossier_id=dossier_id,
-        company_id=user["company_id"],
-    )
+    """
+    Busca dossie.
+
+    - fields: colunas separadas por virgula (ex: status_decisao,parecer_tecnico_compliance)
+    - sections: secoes do report_data (metadata,input,summary,qsa,sources,sanctions,ai_analysis)
+    """
+    try:
+        dossier = await run_blocking(
+            dossier_service.get_by_id,
+            dossier_id=dossier_id,
+            company_id=user["company_id"],
+            fields=_split_param(fields),
+            sections=_split_param(sections),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     if not dossier:
         raise HTTPException(status_code=404, detail="Dossie nao encontrado")
@@ -152,6 +229,53 @@ async def get_dossier(
     return dossier
 
 
+@router.get("/{dossier_id}/sections/{section}")
+async def get_dossier_section(
+    dossier_id: str,
+    section: str,
+    dossier_service: DossierService = Depends(get_dossier_service),
+    user=Depends(get_current_user),
+):
+    try:
+        dossier = await run_blocking(
+            dossier_service.get_by_id,
+            dossier_id=dossier_id,
+            company_id=user["company_id"],
+            fields=[],
+            sections=[section],
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not dossier:
+        raise HTTPException(status_code=404, detail="Dossie nao encontrado")
+
+    return {"dossier_id": dossier_id, "section": section, "report_data": dossier["report_data"]}
+
+
+@router.get("/{dossier_id}/sources/{source}")
+async def get_dossier_source(
+    dossier_id: str,
+    source: str,
+    dossier_service: DossierService = Depends(get_dossier_service),
+    user=Depends(get_current_user),
+):
+    try:
+        data = await run_blocking(
+            dossier_service.get_source,
+            dossier_id=dossier_id,
+            company_id=user["company_id"],
+            source=source,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if data is None:
+        raise HTTPException(status_code=404, detail="Dossie nao encontrado")
+
+    return {"dossier_id": dossier_id, "source": source, **data}
+
+
 @router.put("/{dossier_id}/decide")
 async def decide_dossier(
     dossier_id: str,
@@ -159,7 +283,8 @@ async def decide_dossier(
     dossier_service: DossierService = Depends(get_dossier_service),
     user=Depends(get_current_user),
 ):
-    dossier = dossier_service.get_by_id(
+    dossier = await run_blocking(
+        dossier_service.get_by_id,
         dossier_id=dossier_id,
         company_id=user["company_id"],
     )
@@ -167,7 +292,8 @@ async def decide_dossier(
     if not dossier:
         raise HTTPException(status_code=404, detail="Dossie nao encontrado")
 
-    result = dossier_service.update_decision(
+    result = await run_blocking(
+        dossier_service.update_decision,
         dossier_id=dossier_id,
         company_id=user["company_id"],
         parecer_tecnico=request.parecer_tecnico,
@@ -0,0 +1,86 @@
+"""
+Events Router
+=============
+Eventos em tempo real da empresa (progresso do refresh do monitoramento,
+mudancas por registro, progresso de lotes; ver core/events.py)
+
+- WebSocket /api/events/ws: o navegador nao envia Authorization no
+  WebSocket, entao a primeira mensagem do cliente e {"token": "<jwt>"}
+- SSE /api/events/stream: Authorization: Bearer (fetch com stream)
+"""
+
+import asyncio
+from typing import Dict
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.core.events import events
+from app.core.sse import SSE_HEADERS, SSE_MEDIA_TYPE
+from app.services.auth_service import current_user as get_current_user, verify_access_token
+
+router = APIRouter()
+
+WS_AUTH_TIMEOUT_SECONDS = 10
+WS_POLICY_VIOLATION = 1008
+
+
+async def _authenticate(websocket: WebSocket) -> Dict[str, str]:
+    """Primeira mensagem do WebSocket: {"token": "<jwt>"}"""
+    message = await asyncio.wait_for(websocket.receive_json(), timeout=WS_AUTH_TIMEOUT_SECONDS)
+    if not isinstance(message, dict):
+        raise HTTPException(status_code=401, detail="Token invalido")
+    return verify_access_token(str(message.get("token", "")))
+
+
+@router.websocket("/ws")
+async def events_websocket(websocket: WebSocket):
+    await websocket.accept()
+    try:
+        user = await _authenticate(websocket)
+    except (asyncio.TimeoutError, HTTPException, ValueError, KeyError, WebSocketDisconnect):
+        await websocket.close(code=WS_POLICY_VIOLATION)
+        return
+
+    company_id = user["company_id"]
+    channel = events.subscribe(company_id)
+
+    async def send_events(group):
+        await websocket.send_json({"event": "subscribed", "data": {"company_id": company_id}})
+        while True:
+            item = await channel.get()
+            if item is None:
+                break
+            event, data = item
+            await websocket.send_json({"event": event, "data": data})
+        group.cancel_scope.cancel()
+
+    async def wait_disconnect(group):
+        # Mensagens do cliente sao ignoradas; so detecta o fechamento
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+        group.cancel_scope.cancel()
+
+    try:
+        async with anyio.create_task_group() as group:
+            group.start_soon(send_events, group)
+            group.start_soon(wait_disconnect, group)
+    finally:
+        events.unsubscribe(company_id, channel)
+
+
+@router.get("/stream")
+async def events_stream(user=Depends(get_current_user)):
+    company_id = user["company_id"]
+    channel = events.subscribe(company_id)
+    channel.emit("subscribed", {"company_id": company_id})
+
+    async def stream():
+        try:
+            async for chunk in channel.stream():
+                yield chunk
+        finally:
+            events.unsubscribe(company_id, channel)
+
+    return StreamingResponse(stream(), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
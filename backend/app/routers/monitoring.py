@@ -5,35 +5,25 @@ Rotas para monitoramento continuo de documentos
 """
 
 from typing import Optional
+from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi.security.http import HTTPAuthorizationCredentials
 from pydantic import BaseModel
 
-from app.services.auth_service import AuthService, security
+from app.core.concurrency import run_blocking
+from app.core.container import get_monitoring_service
+from app.services.auth_service import current_user as get_current_user, enforce_api_quota
 from app.services.monitoring_service import MonitoringService
 
-router = APIRouter()
-
-
-def get_auth_service():
-    return AuthService()
-
-
-def get_monitoring_service():
-    return MonitoringService()
-
-
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    auth_service: AuthService = Depends(get_auth_service),
-):
-    return await auth_service.get_current_user(credentials)
+# Cota de requisicoes por empresa (429 + Retry-After acima do limite do plano)
+router = APIRouter(dependencies=[Depends(enforce_api_quota)])
 
 
 class AddMonitoringRequest(BaseModel):
     document: str
     notes: Optional[str] = ""
+    # Nome do titular do CPF: confirma a ocorrencia PEP pelos digitos centrais
+    name: Optional[str] = None
 
 
 @router.post("/")
@@ -42,10 +32,12 @@ async def add_to_monitoring(
     monitoring_service: MonitoringService = Depends(get_monitoring_service),
     user=Depends(get_current_user),
 ):
-    result = monitoring_service.add_record(
+    result = await run_blocking(
+        monitoring_service.add_record,
         document=request.document,
         company_id=user["company_id"],
         notes=request.notes,
+        name=request.name,
     )
 
     if not result["success"]:
@@ -62,7 +54,8 @@ async def list_monitored(
     monitoring_service: MonitoringService = Depends(get_monitoring_service),
     user=Depends(get_current_user),
 ):
-    result = monitoring_service.get_all_records(
+    result = await run_blocking(
+        monitoring_service.get_all_records,
         company_id=user["company_id"],
         page=page,
         page_size=page_size,
@@ -82,33 +75,112 @@ async def get_monitoring_stats(
     monitoring_service: MonitoringService = Depends(get_monitoring_service),
     user=Depends(get_current_user),
 ):
-    stats = monitoring_service.get_stats(company_id=user["company_id"])
+    stats = await run_blocking(monitoring_service.get_stats, company_id=user["company_id"])
     return stats
 
 
-@router.put("/{document}")
-async def update_monitored(
-    document: str,
+# ---------- Jobs de atualizacao de todos os registros ----------
+# A atualizacao roda em workers (services/refresh_jobs.py); a requisicao so
+# enfileira o job e o cliente acompanha por /refresh-jobs/{id} ou /api/events
+
+
+async def _create_refresh_job(monitoring_service: MonitoringService, user) -> dict:
+    try:
+        return await run_blocking(
+            monitoring_service.create_refresh_job,
+            company_id=user["company_id"],
+            requested_by=user["id"],
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.post("/refresh-jobs", status_code=202)
+async def create_refresh_job(
     monitoring_service: MonitoringService = Depends(get_monitoring_service),
     user=Depends(get_current_user),
 ):
-    result = monitoring_service.update_single(
-        document=document,
+    return await _create_refresh_job(monitoring_service, user)
+
+
+@router.get("/refresh-jobs")
+async def list_refresh_jobs(
+    limit: int = 20,
+    monitoring_service: MonitoringService = Depends(get_monitoring_service),
+    user=Depends(get_current_user),
+):
+    jobs = await run_blocking(
+        monitoring_service.list_refresh_jobs,
         company_id=user["company_id"],
+        limit=max(1, min(limit, 100)),
     )
+    return {"jobs": jobs, "total": len(jobs)}
 
-    if not result["success"]:
-        raise HTTPException(status_code=400, detail=result["error"])
 
+@router.get("/refresh-jobs/{job_id}")
+async def get_refresh_job(
+    job_id: UUID,
+    monitoring_service: MonitoringService = Depends(get_monitoring_service),
+    user=Depends(get_current_user),
+):
+    job = await run_blocking(monitoring_service.get_refresh_job, company_id=user["company_id"], job_id=str(job_id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job nao encontrado")
+    return job
+
+
+@router.post("/refresh-jobs/{job_id}/cancel", status_code=202)
+async def cancel_refresh_job(
+    job_id: UUID,
+    monitoring_service: MonitoringService = Depends(get_monitoring_service),
+    user=Depends(get_current_user),
+):
+    job = await run_blocking(monitoring_service.cancel_refresh_job, company_id=user["company_id"], job_id=str(job_id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job nao encontrado")
+    return job
+
+
+@router.get("/refresh-jobs/{job_id}/results")
+async def get_refresh_job_results(
+    job_id: UUID,
+    monitoring_service: MonitoringService = Depends(get_monitoring_service),
+    user=Depends(get_current_user),
+):
+    result = await run_blocking(
+        monitoring_service.get_refresh_job_results,
+        company_id=user["company_id"],
+        job_id=str(job_id),
+    )
+    if not result:
+        raise HTTPException(status_code=404, detail="Job nao encontrado")
     return result
 
 
-@router.put("/all")
+# Antes de /{document}: senao "all" seria tratado como documento
+@router.put("/all", status_code=202)
 async def update_all_monitored(
     monitoring_service: MonitoringService = Depends(get_monitoring_service),
     user=Depends(get_current_user),
 ):
-    result = monitoring_service.update_all(company_id=user["company_id"])
+    return await _create_refresh_job(monitoring_service, user)
+
+
+@router.put("/{document}")
+async def update_monitored(
+    document: str,
+    monitoring_service: MonitoringService = Depends(get_monitoring_service),
+    user=Depends(get_current_user),
+):
+    result = await run_blocking(
+        monitoring_service.update_single,
+        document=document,
+        company_id=user["company_id"],
+    )
+
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["error"])
+
     return result
 
 
@@ -118,7 +190,8 @@ async def remove_from_monitoring(
     monitoring_service: MonitoringService = Depends(get_monitoring_service),
     user=Depends(get_current_user),
 ):
-    result = monitoring_service.remove_record(
+    result = await run_blocking(
+        monitoring_service.remove_record,
         document=document,
         company_id=user["company_id"],
     )
@@ -135,7 +208,7 @@ async def get_recent_changes(
     monitoring_service: MonitoringService = Depends(get_monitoring_service),
     user=Depends(get_current_user),
 ):
-    result = monitoring_service.get_recent_changes(company_id=user["company_id"], days=days)
+    result = await run_blocking(monitoring_service.get_recent_changes, company_id=user["company_id"], days=days)
 
     if isinstance(result, dict):
         changes = result.get("changes", [])
@@ -0,0 +1,39 @@
+"""
+Usage Router
+============
+Consumo das cotas da empresa (ver core/quotas.py) e economia do filtro
+negativo de sanções (ver core/sanctions_filter.py)
+"""
+
+from fastapi import APIRouter, Depends
+
+from app.core.concurrency import run_blocking
+from app.core.quotas import quotas
+from app.core.sanctions_filter import sanctions_filter
+from app.services.auth_service import current_user as get_current_user
+
+router = APIRouter()
+
+
+@router.get("/")
+async def get_usage(user=Depends(get_current_user)):
+    """
+    Plano, limites por minuto, fichas disponíveis e contadores da empresa
+
+    Os contadores são deste processo (allowed, queued, rejected, wait_seconds)
+    por escopo: `api` e cada API externa (brasilapi, receitaws, viacep,
+    transparencia).
+    """
+    return await run_blocking(quotas.usage, user["company_id"])
+
+
+@router.get("/sanctions-filter")
+async def get_sanctions_filter_usage(user=Depends(get_current_user)):
+    """
+    Estado e economia do filtro negativo de sanções deste processo
+
+    Documentos no filtro, memória do bit array, taxa de falso positivo
+    (estimada e observada), consultas por resultado (skipped, maybe,
+    unavailable, false_positive) e chamadas ao Portal evitadas.
+    """
+    return sanctions_filter.stats()
@@ -0,0 +1,706 @@
+"""
+AI Pipeline - Análise de IA assíncrona
+=======================================
+A análise de IA (Gemini) roda fora da requisição: o dossiê é salvo com
+`ai_status = "PENDENTE"` e o scheduler de IA preenche `ai_analysis` depois.
+
+- Clientes de modelo reaproveitados (genai.configure uma única vez)
+- Timeout por chamada e modelos indisponíveis marcados para não serem retentados
+- Cache de resultados por hash dos fatos usados no prompt
+- Orçamento de requisições/tokens por minuto, fila justa por empresa e
+  prioridade para dossiês interativos sobre itens de lote
+- Itens de lote curtos empacotados em uma única chamada ao modelo
+- Modelo stub local (AI_PROVIDER=stub) para rodar o pipeline offline
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from postgrest.exceptions import APIError
+from supabase import Client
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import UNDEFINED_FUNCTION_CODES, get_database
+from app.core.metrics import metrics
+from app.services import pg_queries
+
+try:
+    import google.generativeai as genai
+except Exception:
+    genai = None
+
+AI_STATUS_PENDING = "PENDENTE"
+AI_STATUS_DONE = "CONCLUIDO"
+AI_STATUS_ERROR = "ERRO"
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BATCH = "batch"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BATCH)
+
+# Estimativa grosseira: ~4 caracteres por token + tamanho esperado da resposta
+CHARS_PER_TOKEN = 4
+OUTPUT_TOKENS_PER_ITEM = 250
+
+FALLBACK_MODELS = ("gemini-2.0-flash", "gemini-1.5-flash")
+
+_request_seconds = metrics.histogram("ai_request_seconds", "Duração das chamadas ao modelo")
+_requests = metrics.counter("ai_requests_total", "Chamadas ao modelo de IA")
+_pack_split_failures = metrics.counter("ai_pack_split_failures_total", "Respostas empacotadas que não puderam ser separadas")
+_jobs_rejected = metrics.counter("ai_jobs_rejected_total", "Jobs de IA rejeitados (fila cheia)")
+_queue_depth = metrics.gauge("ai_queue_depth", "Jobs de IA aguardando na fila")
+_budget_waits = metrics.counter("ai_budget_waits_total", "Esperas por orçamento de IA")
+_queue_wait_seconds = metrics.histogram("ai_queue_wait_seconds", "Tempo de espera na fila de IA")
+_tokens_estimated = metrics.counter("ai_tokens_estimated_total", "Tokens estimados enviados ao modelo")
+_packed_items = metrics.counter("ai_packed_items_total", "Itens de lote enviados em chamadas empacotadas")
+
+
+def build_ai_facts(kyc_data: Dict) -> Dict[str, any]:
+    """Extrai do resultado KYC os fatos usados no prompt (e na chave do cache)"""
+    doc = kyc_data.get("document", "")
+    doc_type = kyc_data.get("doc_type", "")
+    cadastral = kyc_data.get("cadastral_data", {}) or {}
+    sanctions = kyc_data.get("sanctions", {}) or {}
+    name = (
+        cadastral.get("razao_social")
+        or cadastral.get("nome_fantasia")
+        or cadastral.get("nome")
+        or f"{doc_type} {doc}"
+    )
+    situacao = (
+        cadastral.get("situacao_cadastral")
+        or cadastral.get("descricao_situacao_cadastral")
+        or cadastral.get("situacao")
+        or "N/A"
+    )
+
+    return {
+        "document": doc,
+        "doc_type": doc_type,
+        "name": name,
+        "situacao": situacao,
+        "risk_level": kyc_data.get("risk_level", "DESCONHECIDO"),
+        "total_sanctions": sanctions.get("total_sanctions", 0),
+    }
+
+
+def build_ai_prompt(facts: Dict) -> str:
+    return (
+        "Você é um analista de compliance. Gere uma análise curta (4-6 linhas) e objetiva.\n"
+        f"Documento: {facts['document']} ({facts['doc_type']})\n"
+        f"Entidade: {facts['name']}\n"
+        f"Situação cadastral: {facts['situacao']}\n"
+        f"Nível de risco calculado: {facts['risk_level']}\n"
+        f"Total de sanções encontradas: {facts['total_sanctions']}\n"
+        "Inclua uma recomendação final simples (Aprovar / Revisar / Reprovar) com base nos dados.\n"
+    )
+
+
+PACK_HEADER = re.compile(r"^\s*#{2,}\s*ITEM\s+(\d+)\s*$", re.MULTILINE | re.IGNORECASE)
+
+
+def build_packed_prompt(facts_list: List[Dict]) -> str:
+    """Prompt com vários dossiês; cada resposta deve começar com '### ITEM n'"""
+    items = []
+    for idx, facts in enumerate(facts_list, start=1):
+        items.append(
+            f"### ITEM {idx}\n"
+            f"Documento: {facts['document']} ({facts['doc_type']})\n"
+            f"Entidade: {facts['name']}\n"
+            f"Situação cadastral: {facts['situacao']}\n"
+            f"Nível de risco calculado: {facts['risk_level']}\n"
+            f"Total de sanções encontradas: {facts['total_sanctions']}\n"
+        )
+    return (
+        "Você é um analista de compliance. Para CADA item abaixo, gere uma análise curta "
+        "(4-6 linhas) e objetiva, com uma recomendação final simples (Aprovar / Revisar / Reprovar).\n"
+        "Responda na mesma ordem, iniciando cada análise com a linha '### ITEM <n>'.\n\n"
+        + "\n".join(items)
+    )
+
+
+def split_packed_response(text: str, expected: int) -> Optional[List[str]]:
+    """Separa a resposta empacotada por item; None se o formato não bater"""
+    matches = list(PACK_HEADER.finditer(text))
+    parts: Dict[int, str] = {}
+    for idx, match in enumerate(matches):
+        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(text)
+        parts[int(match.group(1))] = text[match.end():end].strip()
+    if sorted(parts) != list(range(1, expected + 1)) or not all(parts.values()):
+        return None
+    return [parts[i] for i in range(1, expected + 1)]
+
+
+def estimate_tokens(prompt: str, items: int = 1) -> int:
+    return len(prompt) // CHARS_PER_TOKEN + OUTPUT_TOKENS_PER_ITEM * items
+
+
+def facts_key(facts: Dict) -> str:
+    """Chave do cache: hash dos fatos + provedor (o mesmo prompt gera a mesma análise)"""
+    canonical = json.dumps(facts, sort_keys=True, ensure_ascii=False, default=str)
+    raw = f"{settings.AI_PROVIDER}:{settings.GEMINI_MODEL}:{canonical}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# ============================================
+# Modelos
+# ============================================
+
+class _StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+def _stub_analysis(block: str) -> str:
+    lines = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+    risk = lines.get("Nível de risco calculado", "DESCONHECIDO")
+    recommendation = {"BAIXO": "Aprovar", "ALTO": "Reprovar"}.get(risk, "Revisar")
+    return (
+        f"[stub] Entidade {lines.get('Entidade', '-')} com risco {risk} "
+        f"e {lines.get('Total de sanções encontradas', '0')} sanção(ões). "
+        f"Recomendação: {recommendation}."
+    )
+
+
+class StubModel:
+    """Modelo local determinístico para desenvolvimento e testes offline"""
+
+    model_name = "stub"
+
+    def __init__(self, delay_seconds: float = 0.0):
+        self.delay_seconds = delay_seconds
+
+    def generate_content(self, prompt: str, request_options: Optional[Dict] = None) -> _StubResponse:
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        matches = list(PACK_HEADER.finditer(prompt))
+        if not matches:
+            return _StubResponse(_stub_analysis(prompt))
+        answers = []
+        for idx, match in enumerate(matches):
+            end = matches[idx + 1].start() if idx + 1 < len(matches) else len(prompt)
+            answers.append(f"### ITEM {match.group(1)}\n{_stub_analysis(prompt[match.end():end])}")
+        return _StubResponse("\n\n".join(answers))
+
+
+_models: Dict[str, any] = {}
+_unavailable_models: Dict[str, str] = {}
+_models_lock = threading.Lock()
+_configured = False
+
+
+def _get_model(model_name: str):
+    """Retorna o cliente do modelo, criado uma única vez por processo"""
+    global _configured
+    with _models_lock:
+        if model_name in _models:
+            return _models[model_name]
+        if model_name == "stub":
+            model = StubModel()
+        else:
+            if not _configured:
+                genai.configure(api_key=settings.GEMINI_API_KEY)
+                _configured = True
+            model = genai.GenerativeModel(model_name)
+        _models[model_name] = model
+        return model
+
+
+def _model_chain() -> List[str]:
+    if settings.AI_PROVIDER == "stub":
+        return ["stub"]
+    chain = [settings.GEMINI_MODEL, *FALLBACK_MODELS]
+    with _models_lock:
+        return [m for m in dict.fromkeys(chain) if m not in _unavailable_models]
+
+
+def _is_permanent_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return "not found" in message or "404" in message or "not supported" in message
+
+
+# ============================================
+# Cache de resultados
+# ============================================
+
+_result_cache = TTLCache(max_items=4096, ttl_seconds=settings.AI_CACHE_TTL_SECONDS)
+
+
+def cached_analysis(facts: Dict) -> Optional[str]:
+    """Análise já gerada para os mesmos fatos, se houver"""
+    return _result_cache.get(facts_key(facts))
+
+
+def _provider_error() -> Optional[str]:
+    if settings.AI_PROVIDER == "stub":
+        return None
+    if not settings.GEMINI_API_KEY:
+        return "IA não configurada: defina GEMINI_API_KEY para habilitar a análise."
+    if genai is None:
+        return "IA indisponível: biblioteca google-generativeai não está instalada."
+    return None
+
+
+def _call_model(prompt: str) -> Tuple[bool, str]:
+    """
+    Chama o primeiro modelo disponível da cadeia de fallback
+
+    Returns:
+        Tuple (sucesso, texto ou mensagem de erro)
+    """
+    last_error = None
+    for model_name in _model_chain():
+        started = time.monotonic()
+        try:
+            model = _get_model(model_name)
+            response = model.generate_content(
+                prompt,
+                request_options={"timeout": settings.AI_TIMEOUT_SECONDS},
+            )
+            text = getattr(response, "text", None)
+            _request_seconds.observe(time.monotonic() - started, model=model_name)
+            if text:
+                _requests.inc(model=model_name, outcome="ok")
+                return True, text.strip()
+            last_error = "IA retornou resposta vazia."
+        except Exception as e:
+            last_error = str(e)
+            if _is_permanent_error(e):
+                with _models_lock:
+                    _unavailable_models[model_name] = last_error
+        _requests.inc(model=model_name, outcome="error")
+
+    return False, f"IA falhou ao gerar análise: {last_error}"
+
+
+def generate_analysis(facts: Dict) -> Tuple[str, str]:
+    """
+    Gera a análise de IA de um dossiê (síncrono, usado pelos workers)
+
+    Args:
+        facts: Fatos extraídos por build_ai_facts
+
+    Returns:
+        Tuple (status, texto)
+    """
+    error = _provider_error()
+    if error:
+        return AI_STATUS_ERROR, error
+
+    key = facts_key(facts)
+    cached = _result_cache.get(key)
+    if cached:
+        return AI_STATUS_DONE, cached
+
+    ok, text = _call_model(build_ai_prompt(facts))
+    if not ok:
+        return AI_STATUS_ERROR, text
+    _result_cache.put(key, text)
+    return AI_STATUS_DONE, text
+
+
+def generate_packed_analyses(facts_list: List[Dict]) -> Optional[List[Tuple[str, str]]]:
+    """
+    Gera análises de vários dossiês em uma única chamada
+
+    Returns:
+        Lista de (status, texto) na mesma ordem, ou None se a resposta não
+        puder ser separada por item (o chamador deve processar individualmente)
+    """
+    error = _provider_error()
+    if error:
+        return [(AI_STATUS_ERROR, error)] * len(facts_list)
+
+    ok, text = _call_model(build_packed_prompt(facts_list))
+    if not ok:
+        return None
+    parts = split_packed_response(text, len(facts_list))
+    if parts is None:
+        _pack_split_failures.inc()
+        return None
+    for facts, part in zip(facts_list, parts):
+        _result_cache.put(facts_key(facts), part)
+    return [(AI_STATUS_DONE, part) for part in parts]
+
+
+# ============================================
+# Scheduler
+# ============================================
+
+AI_INTERRUPTED_MESSAGE = "Análise de IA interrompida pelo reinício do servidor, gere o dossiê novamente."
+
+
+def save_analysis(client: Client, dossier_id: str, company_id: str, status: str, analysis: str) -> None:
+    """
+    Grava ai_analysis/ai_status no report_data do dossiê
+
+    Com DATABASE_URL grava pela conexão direta; senão pela função
+    set_dossier_ai_analysis (migrations/002). O read-modify-write só é usado
+    quando o PostgREST informa que a função não existe.
+
+    Raises:
+        Exception: Falha ao gravar (banco indisponível etc.)
+    """
+    db = get_database()
+    if db:
+        pg_queries.set_dossier_ai_analysis(db, dossier_id, company_id, status, analysis)
+        return
+
+    try:
+        client.rpc("set_dossier_ai_analysis", {
+            "p_dossier_id": dossier_id,
+            "p_company_id": company_id,
+            "p_status": status,
+            "p_analysis": analysis,
+        }).execute()
+        return
+    except APIError as e:
+        if e.code not in UNDEFINED_FUNCTION_CODES:
+            raise
+
+    # Banco sem a função (migrations/002): read-modify-write
+    response = client.table("dossiers").select("report_data").eq("id", dossier_id).eq("company_id", company_id).execute()
+    if not response.data:
+        return
+    report_data = response.data[0].get("report_data") or {}
+    report_data["ai_status"] = status
+    report_data["ai_analysis"] = analysis
+    client.table("dossiers").update({"report_data": report_data}).eq("id", dossier_id).eq("company_id", company_id).execute()
+
+
+class RateBudget:
+    """Orçamento de requisições e tokens em janela deslizante de 1 minuto"""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, window_seconds: float = 60.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.window_seconds = window_seconds
+        self._events: Deque[Tuple[float, int]] = deque()
+        self._tokens = 0
+
+    def _prune(self, now: float) -> None:
+        while self._events and now - self._events[0][0] >= self.window_seconds:
+            _, tokens = self._events.popleft()
+            self._tokens -= tokens
+
+    def wait_time(self, tokens: int) -> float:
+        """Segundos até caber uma requisição com `tokens` no orçamento (0 = já cabe)"""
+        now = time.monotonic()
+        self._prune(now)
+        if not self._events:
+            # Requisição maior que o orçamento inteiro passa sozinha (evita travar a fila)
+            return 0.0
+        fits_requests = len(self._events) + 1 <= self.requests_per_minute
+        fits_tokens = self._tokens + tokens <= self.tokens_per_minute
+        if fits_requests and fits_tokens:
+            return 0.0
+        # Espera o evento mais antigo sair da janela e reavalia
+        return max(0.01, self.window_seconds - (now - self._events[0][0]))
+
+    def consume(self, tokens: int) -> None:
+        self._events.append((time.monotonic(), tokens))
+        self._tokens += tokens
+
+    def usage(self) -> Dict[str, int]:
+        self._prune(time.monotonic())
+        return {"requests": len(self._events), "tokens": self._tokens}
+
+
+@dataclass(eq=False)
+class AIJob:
+    dossier_id: str
+    company_id: str
+    facts: Dict
+    priority: str = PRIORITY_INTERACTIVE
+    enqueued_at: float = field(default_factory=time.monotonic)
+    tokens: int = 0
+    packable: bool = True
+    # Chamado com (status, análise) depois de gravar (streaming do dossiê)
+    on_done: Optional[Callable[[str, str], None]] = None
+
+    def notify(self, status: str, analysis: str) -> None:
+        if self.on_done:
+            try:
+                self.on_done(status, analysis)
+            except Exception as e:
+                print(f"Erro ao notificar análise de IA do dossiê {self.dossier_id}: {str(e)}")
+
+
+class AIScheduler:
+    """
+    Scheduler de análises de IA
+
+    - Duas classes de prioridade: interativo (dossiê único) antes de lote
+    - Dentro de cada classe, round-robin entre empresas (uma empresa com
+      5.000 itens não bloqueia as demais)
+    - Orçamento global de requisições/tokens por minuto (RateBudget)
+    - Itens de lote são empacotados em uma chamada (até AI_PACK_SIZE itens)
+    - No máximo `workers` chamadas simultâneas ao modelo
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        workers: int = 2,
+        requests_per_minute: int = 60,
+        tokens_per_minute: int = 200000,
+        pack_size: int = 5,
+        pack_max_tokens: int = 4000,
+        max_queued: int = 10000
+    ):
+        self.client = client
+        self.workers = workers
+        self.pack_size = pack_size
+        self.pack_max_tokens = pack_max_tokens
+        self.max_queued = max_queued
+        self.budget = RateBudget(requests_per_minute, tokens_per_minute)
+        self._queues: Dict[str, "OrderedDict[str, Deque[AIJob]]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._size = 0
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(workers)
+        self._stopping = False
+        self._threads: List[threading.Thread] = []
+        self._dispatcher: Optional[threading.Thread] = None
+
+    # ---------- API ----------
+
+    def submit(
+        self,
+        dossier_id: str,
+        company_id: str,
+        facts: Dict,
+        priority: str = PRIORITY_INTERACTIVE,
+        on_done: Optional[Callable[[str, str], None]] = None
+    ) -> bool:
+        """
+        Enfileira a análise de um dossiê
+
+        Args:
+            on_done: Chamado com (status, análise) quando a análise for gravada
+
+        Returns:
+            True se enfileirado; False se a fila estiver cheia (dossiê marcado com erro)
+        """
+        job = AIJob(
+            dossier_id=dossier_id,
+            company_id=company_id,
+            facts=facts,
+            priority=priority if priority in PRIORITIES else PRIORITY_INTERACTIVE,
+            tokens=estimate_tokens(build_ai_prompt(facts)),
+            on_done=on_done,
+        )
+        with self._cond:
+            if self._size >= self.max_queued:
+                full = True
+            else:
+                full = False
+                self._queues[job.priority].setdefault(company_id, deque()).append(job)
+                self._size += 1
+                self._update_depth_metrics()
+                self._cond.notify_all()
+
+        if full:
+            _jobs_rejected.inc(priority=job.priority)
+            save_analysis(self.client, dossier_id, company_id, AI_STATUS_ERROR, "Fila de IA cheia, tente novamente.")
+            job.notify(AI_STATUS_ERROR, "Fila de IA cheia, tente novamente.")
+            return False
+
+        self._ensure_started()
+        return True
+
+    def pending(self) -> Dict[str, int]:
+        """Quantidade de jobs na fila por prioridade"""
+        with self._cond:
+            return {p: sum(len(jobs) for jobs in self._queues[p].values()) for p in PRIORITIES}
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        Para o dispatcher e espera as chamadas em andamento
+
+        A fila só existe em memória: os jobs que não chegaram a ser despachados
+        têm o dossiê marcado com ERRO, para não ficarem PENDENTE para sempre.
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._dispatcher:
+            self._dispatcher.join(timeout=timeout)
+        for thread in list(self._threads):
+            thread.join(timeout=timeout)
+
+        for job in self._drain():
+            try:
+                save_analysis(self.client, job.dossier_id, job.company_id, AI_STATUS_ERROR, AI_INTERRUPTED_MESSAGE)
+            except Exception as e:
+                print(f"Erro ao salvar análise de IA do dossiê {job.dossier_id}: {str(e)}")
+            job.notify(AI_STATUS_ERROR, AI_INTERRUPTED_MESSAGE)
+
+    def _drain(self) -> List[AIJob]:
+        """Remove e devolve os jobs ainda na fila (incluindo os reenfileirados)"""
+        with self._cond:
+            jobs = [job for priority in PRIORITIES for queued in self._queues[priority].values() for job in queued]
+            for priority in PRIORITIES:
+                self._queues[priority].clear()
+            self._size = 0
+            self._update_depth_metrics()
+        return jobs
+
+    # ---------- Seleção ----------
+
+    def _select(self) -> List[AIJob]:
+        """Próximos jobs a despachar (sem removê-los da fila)"""
+        for priority in PRIORITIES:
+            companies = self._queues[priority]
+            if not companies:
+                continue
+
+            first_company = next(iter(companies))
+            first_job = companies[first_company][0]
+            if priority != PRIORITY_BATCH or self.pack_size <= 1 or not first_job.packable:
+                return [first_job]
+
+            # Empacota itens de lote alternando entre empresas
+            picked: List[AIJob] = []
+            tokens = 0
+            offsets = {company: 0 for company in companies}
+            while len(picked) < self.pack_size:
+                progressed = False
+                for company, jobs in companies.items():
+                    idx = offsets[company]
+                    if idx >= len(jobs) or len(picked) >= self.pack_size:
+                        continue
+                    job = jobs[idx]
+                    if not job.packable or (picked and tokens + job.tokens > self.pack_max_tokens):
+                        continue
+                    picked.append(job)
+                    tokens += job.tokens
+                    offsets[company] += 1
+                    progressed = True
+                if not progressed:
+                    break
+            return picked or [first_job]
+        return []
+
+    def _remove(self, jobs: List[AIJob]) -> None:
+        for job in jobs:
+            companies = self._queues[job.priority]
+            queued = companies[job.company_id]
+            queued.remove(job)
+            if queued:
+                companies.move_to_end(job.company_id)
+            else:
+                del companies[job.company_id]
+            self._size -= 1
+        self._update_depth_metrics()
+
+    def _update_depth_metrics(self) -> None:
+        for priority in PRIORITIES:
+            _queue_depth.set(sum(len(jobs) for jobs in self._queues[priority].values()), priority=priority)
+
+    # ---------- Execução ----------
+
+    def _ensure_started(self) -> None:
+        with self._cond:
+            if self._dispatcher and self._dispatcher.is_alive():
+                return
+            self._stopping = False
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name="ai-dispatcher", daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            self._slots.acquire()
+            with self._cond:
+                jobs: List[AIJob] = []
+                while not self._stopping:
+                    jobs = self._select()
+                    if not jobs:
+                        self._cond.wait()
+                        continue
+                    prompt_tokens = sum(job.tokens for job in jobs)
+                    wait = self.budget.wait_time(prompt_tokens)
+                    if wait <= 0:
+                        break
+                    # Sem orçamento: espera (um job interativo novo pode passar na frente)
+                    _budget_waits.inc()
+                    self._cond.wait(timeout=wait)
+                if self._stopping:
+                    self._slots.release()
+                    return
+                self._remove(jobs)
+                self.budget.consume(prompt_tokens)
+
+            now = time.monotonic()
+            for job in jobs:
+                _queue_wait_seconds.observe(now - job.enqueued_at, priority=job.priority)
+            _tokens_estimated.inc(prompt_tokens)
+
+            thread = threading.Thread(target=self._run, args=(jobs,), name="ai-worker", daemon=True)
+            self._threads = [t for t in self._threads if t.is_alive()] + [thread]
+            thread.start()
+
+    def _run(self, jobs: List[AIJob]) -> None:
+        try:
+            if len(jobs) == 1:
+                results = [generate_analysis(jobs[0].facts)]
+            else:
+                _packed_items.inc(len(jobs))
+                results = generate_packed_analyses([job.facts for job in jobs])
+                if results is None:
+                    # Resposta não separável: reenfileira os itens para chamadas individuais
+                    self._requeue_unpacked(jobs)
+                    return
+
+            for job, (status, text) in zip(jobs, results):
+                try:
+                    save_analysis(self.client, job.dossier_id, job.company_id, status, text)
+                except Exception as e:
+                    print(f"Erro ao salvar análise de IA do dossiê {job.dossier_id}: {str(e)}")
+                job.notify(status, text)
+        except Exception as e:
+            print(f"Erro na análise de IA: {str(e)}")
+        finally:
+            self._slots.release()
+
+    def _requeue_unpacked(self, jobs: List[AIJob]) -> None:
+        with self._cond:
+            for job in reversed(jobs):
+                job.packable = False
+                queued = self._queues[job.priority].setdefault(job.company_id, deque())
+                queued.appendleft(job)
+                self._size += 1
+            self._update_depth_metrics()
+            self._cond.notify_all()
+
+
+_ai_scheduler: Optional[AIScheduler] = None
+_ai_scheduler_lock = threading.Lock()
+
+
+def get_ai_scheduler(client: Client) -> AIScheduler:
+    """Scheduler de IA do processo (criado no primeiro uso)"""
+    global _ai_scheduler
+    with _ai_scheduler_lock:
+        if _ai_scheduler is None:
+            _ai_scheduler = AIScheduler(
+                client,
+                workers=settings.AI_WORKERS,
+                requests_per_minute=settings.AI_REQUESTS_PER_MINUTE,
+                tokens_per_minute=settings.AI_TOKENS_PER_MINUTE,
+                pack_size=settings.AI_PACK_SIZE,
+            )
+        return _ai_scheduler
+
+
+def shutdown_ai_scheduler() -> None:
+    global _ai_scheduler
+    with _ai_scheduler_lock:
+        scheduler, _ai_scheduler = _ai_scheduler, None
+    if scheduler:
+        scheduler.stop()
@@ -2,26 +2,129 @@
 Authentication Service
 ======================
 Servico de autenticacao usando Supabase
+
+- Rotas protegidas validam o JWT emitido no login sem client nem consulta
+  (verify_access_token / current_user)
+- Perfil e empresa do usuario ficam em cache (TTL) entre logins,
+  invalidados por NOTIFY quando profiles/companies mudam (migrations/006)
 """
 
+import math
+import time
 from datetime import datetime, timedelta
+from typing import Dict, Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
 from fastapi.security.http import HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from supabase import Client, create_client
+from supabase import Client
 
+from app.core.cache import TTLCache
+from app.core.concurrency import run_blocking
 from app.core.config import settings
+from app.core.container import ClientPool, create_supabase_client
+from app.core.metrics import metrics
+from app.core.quotas import API_SCOPE, quotas
 
 security = HTTPBearer()
 
+_auth_overhead = metrics.histogram(
+    "auth_overhead_seconds",
+    "Tempo gasto com autenticacao por requisicao",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+_profile_cache_requests = metrics.counter("auth_profile_cache_total", "Consultas ao cache de perfis do login")
+
+# user_id -> {company_id, company_name, role, full_name}
+_profile_cache = TTLCache(
+    max_items=settings.AUTH_PROFILE_CACHE_SIZE,
+    ttl_seconds=settings.AUTH_PROFILE_CACHE_TTL_SECONDS,
+)
+
+
+def invalidate_profile(user_id: str) -> None:
+    """Remove o perfil do cache (perfil alterado/removido)"""
+    _profile_cache.invalidate(user_id)
+
+
+def invalidate_company(company_id: str) -> None:
+    """Remove do cache os perfis da empresa (nome alterado/removida)"""
+    _profile_cache.invalidate_where(lambda account: account.get("company_id") == company_id)
+
+
+def subscribe_profile_invalidation(db) -> None:
+    """
+    Assina as notificacoes de alteracao de profiles/companies (migrations/006)
+
+    Args:
+        db: PgDatabase (backend Postgres direto)
+    """
+    db.listen("profile_changed", invalidate_profile)
+    db.listen("company_changed", invalidate_company)
+
+
+def verify_access_token(token: str) -> Dict[str, str]:
+    """
+    Valida o JWT emitido no login (sem client, sem consulta)
+
+    Returns:
+        dict com id, email e company_id
+
+    Raises:
+        HTTPException 401 se o token for invalido ou estiver expirado
+    """
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalido ou expirado")
+
+    user_id: str = payload.get("sub")
+    company_id: str = payload.get("company_id")
+
+    if user_id is None or company_id is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalido")
+
+    return {"id": user_id, "email": payload.get("email"), "company_id": company_id}
+
+
+async def current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, str]:
+    """Dependency para rotas protegidas."""
+    started = time.perf_counter()
+    try:
+        return verify_access_token(credentials.credentials)
+    finally:
+        _auth_overhead.observe(time.perf_counter() - started, stage="verify")
+
+
+async def enforce_api_quota(user: Dict[str, str] = Depends(current_user)) -> Dict[str, str]:
+    """
+    Dependency das rotas com cota por empresa (ver core/quotas.py)
+
+    Raises:
+        HTTPException 429 com Retry-After acima do limite do plano
+    """
+    if settings.QUOTA_ENABLED:
+        if quotas.cached_plan(user["company_id"]) is None:
+            # Carrega o plano fora do event loop (consulta ao banco)
+            await run_blocking(quotas.plan_for, user["company_id"])
+        retry_after = quotas.try_acquire(user["company_id"], API_SCOPE)
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Limite de requisicoes da empresa excedido",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+    return user
+
 
 class AuthService:
     """Servico de autenticacao"""
 
-    def __init__(self):
-        self.client: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+    def __init__(self, auth_clients: Optional[ClientPool] = None):
+        # O login grava a sessao do usuario no client, entao cada login usa
+        # um client exclusivo do pool (nunca o client compartilhado do banco)
+        self.auth_clients = auth_clients or ClientPool(create_supabase_client, size=1)
 
     def sign_in(self, email: str, password: str) -> dict:
         """
@@ -30,26 +133,28 @@ class AuthService:
         Returns:
             dict com access_token, user, company_id, company_name
         """
+        started = time.perf_counter()
         try:
-            auth_response = self.client.auth.sign_in_with_password({
-                "email": email,
-                "password": password,
-            })
+            with self.auth_clients.checkout() as client:
+                auth_response = client.auth.sign_in_with_password({
+                    "email": email,
+                    "password": password,
+                })
 
-            if not auth_response.user:
-                return {"success": False, "error": "Credenciais invalidas"}
+                if not auth_response.user:
+                    return {"success": False, "error": "Credenciais invalidas"}
 
-            user_id = auth_response.user.id
-            profile = self._get_user_profile(user_id)
+                user_id = auth_response.user.id
+                account = self._get_account(client, user_id)
 
-            if not profile:
+            if not account:
                 return {"success": False, "error": "Perfil nao encontrado"}
 
-            company_id = profile.get("company_id")
+            company_id = account.get("company_id")
             if not company_id:
                 return {"success": False, "error": "Usuario sem empresa vinculada"}
 
-            company_name = self._resolve_company_name(profile, company_id)
+            company_name = account["company_name"]
 
             access_token = self._create_access_token(
                 data={
@@ -77,30 +182,61 @@ class AuthService:
                 return {"success": False, "error": "Email ou senha incorretos"}
             return {"success": False, "error": f"Erro ao fazer login: {error_msg}"}
 
-    def _get_user_profile(self, user_id: str):
+        finally:
+            _auth_overhead.observe(time.perf_counter() - started, stage="sign_in")
+
+    def _get_account(self, client: Client, user_id: str) -> Optional[Dict]:
+        """
+        Perfil e empresa do usuario (cache com TTL; consulta so na falta)
+
+        Returns:
+            dict com company_id, company_name, role e full_name, ou None
+        """
+        account = _profile_cache.get(user_id)
+        if account is not None:
+            _profile_cache_requests.inc(result="hit")
+            return account
+        _profile_cache_requests.inc(result="miss")
+
+        profile = self._get_user_profile(client, user_id)
+        if not profile:
+            return None
+
+        company_id = profile.get("company_id")
+        account = {
+            "company_id": company_id,
+            "company_name": self._resolve_company_name(client, profile, company_id) if company_id else None,
+            "role": profile.get("role"),
+            "full_name": profile.get("full_name"),
+        }
+        if company_id:
+            _profile_cache.put(user_id, account)
+        return account
+
+    def _get_user_profile(self, client: Client, user_id: str):
         """
         Busca profile do usuario.
         Tenta com join em companies e faz fallback sem join para schemas diferentes.
         """
         try:
-            response = self.client.table("profiles").select(
+            response = client.table("profiles").select(
                 "id, company_id, role, full_name, companies(id, name)"
             ).eq("id", user_id).single().execute()
             return response.data
         except Exception:
-            fallback = self.client.table("profiles").select(
+            fallback = client.table("profiles").select(
                 "id, company_id, role, full_name"
             ).eq("id", user_id).single().execute()
             return fallback.data
 
-    def _resolve_company_name(self, profile: dict, company_id: str) -> str:
+    def _resolve_company_name(self, client: Client, profile: dict, company_id: str) -> str:
         """Resolve company_name mesmo quando nested relation nao vier no profile."""
         companies_data = profile.get("companies")
         if companies_data and isinstance(companies_data, dict):
             return companies_data.get("name", "N/A")
 
         try:
-            company_response = self.client.table("companies").select("name").eq("id", company_id).single().execute()
+            company_response = client.table("companies").select("name").eq("id", company_id).single().execute()
             if company_response.data and company_response.data.get("name"):
                 return company_response.data["name"]
         except Exception:
@@ -118,19 +254,5 @@ class AuthService:
         return encoded_jwt
 
     async def get_current_user(self, credentials: HTTPAuthorizationCredentials = Depends(security)):
-        """Dependency para rotas protegidas."""
-        token = credentials.credentials
-
-        try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-
-            user_id: str = payload.get("sub")
-            company_id: str = payload.get("company_id")
-
-            if user_id is None or company_id is None:
-                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalido")
-
-            return {"id": user_id, "email": payload.get("email"), "company_id": company_id}
-
-        except JWTError:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalido ou expirado")
+        """Dependency para rotas protegidas (ver current_user)."""
+        return await current_user(credentials)
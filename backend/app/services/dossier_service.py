@@ -5,81 +5,99 @@ Gerencia dossiês persistentes no Supabase com snapshot dos dados
 Autor: Vinicius Matsumoto
 """
 
-import os
+import uuid
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 from supabase import create_client, Client
 from app.core.config import settings
+from app.core.database import get_database
+from app.core.deadline import Deadline
+from app.core.events import ProgressReporter
+from app.core.quotas import quota_scope
 from app import kyc_engine
+from app.services import ai_pipeline, pg_queries, report_format
+from app.services.name_screening import sanctioned_names
+from app.services.payload_store import PayloadStore
+
+# Colunas da tabela dossiers que podem ser selecionadas via `fields`
+DOSSIER_FIELDS = (
+    "id",
+    "document_value",
+    "entity_name",
+    "risk_level",
+    "created_at",
+    "report_data",
+    "status_decisao",
+    "aprovado_por_diretoria",
+    "parecer_tecnico_compliance",
+    "justificativa_diretoria",
+    "data_decisao",
+)
+
+# Colunas sempre retornadas (exigidas pelo DossierResponse)
+DOSSIER_BASE_FIELDS = ("id", "document_value", "entity_name", "risk_level", "created_at")
+
+# Dossiês gravados por inserção no processamento em lote
+BATCH_INSERT_SIZE = 20
+
+
+def _json_path(path: Iterable[str]) -> str:
+    """Monta caminho JSON no formato PostgREST (report_data->a->b)"""
+    return "->".join(["report_data", *path])
+
+
+def _path_alias(path: Iterable[str]) -> str:
+    return "rd_" + "__".join(path)
+
+
+def _build_projection(
+    fields: Optional[List[str]],
+    storage_paths: Optional[List[Tuple[str, ...]]]
+) -> str:
+    """
+    Monta o select do PostgREST para projeção de colunas/seções no banco
+
+    Args:
+        fields: Colunas de topo desejadas (None = todas)
+        storage_paths: Caminhos do report_data v2 desejados (None = report_data completo)
+
+    Returns:
+        String de select
+    """
+    if fields is None and storage_paths is None:
+        return "*"
+
+    if fields is None:
+        columns = list(DOSSIER_FIELDS)
+    else:
+        invalid = [f for f in fields if f not in DOSSIER_FIELDS]
+        if invalid:
+            raise ValueError(f"Campos inválidos: {', '.join(invalid)}")
+        columns = list(DOSSIER_BASE_FIELDS) + [f for f in fields if f not in DOSSIER_BASE_FIELDS]
+
+    if storage_paths is not None:
+        # Seções substituem o report_data completo
+        columns = [c for c in columns if c != "report_data"]
+        columns.append(f"{_path_alias(('format_version',))}:{_json_path(('format_version',))}")
+        for path in storage_paths:
+            columns.append(f"{_path_alias(path)}:{_json_path(path)}")
+
+    return ",".join(dict.fromkeys(columns))
+
+
+def _pop_projected(row: Dict, storage_paths: List[Tuple[str, ...]]) -> Tuple[bool, Dict]:
+    """
+    Remove as colunas projetadas da linha e remonta o report_data v2 parcial
+
+    Returns:
+        Tuple (linha está em v2, report_data v2 parcial)
+    """
+    version = row.pop(_path_alias(("format_version",)), None)
+    values = {path: row.pop(_path_alias(path), None) for path in storage_paths}
+    stored = report_format.nest_paths(values)
+    stored["format_version"] = version
+    return version == report_format.REPORT_FORMAT_VERSION, stored
 
-try:
-    import google.generativeai as genai
-except Exception:
-    genai = None
-
-
-def _build_ai_prompt(kyc_data: Dict, report_data: Dict) -> str:
-    doc = kyc_data.get("document", "")
-    doc_type = kyc_data.get("doc_type", "")
-    risk = kyc_data.get("risk_level", "DESCONHECIDO")
-    cadastral = kyc_data.get("cadastral_data", {}) or {}
-    sanctions = kyc_data.get("sanctions", {}) or {}
-    total_sanctions = sanctions.get("total_sanctions", 0)
-    name = (
-        cadastral.get("razao_social")
-        or cadastral.get("nome_fantasia")
-        or cadastral.get("nome")
-        or f"{doc_type} {doc}"
-    )
-    situacao = (
-        cadastral.get("situacao_cadastral")
-        or cadastral.get("descricao_situacao_cadastral")
-        or cadastral.get("situacao")
-        or "N/A"
-    )
-
-    return (
-        "Você é um analista de compliance. Gere uma análise curta (4-6 linhas) e objetiva.\n"
-        f"Documento: {doc} ({doc_type})\n"
-        f"Entidade: {name}\n"
-        f"Situação cadastral: {situacao}\n"
-        f"Nível de risco calculado: {risk}\n"
-        f"Total de sanções encontradas: {total_sanctions}\n"
-        "Inclua uma recomendação final simples (Aprovar / Revisar / Reprovar) com base nos dados.\n"
-    )
-
-
-def _generate_ai_analysis(kyc_data: Dict, report_data: Dict) -> str:
-    api_key = settings.GEMINI_API_KEY
-    if not api_key:
-        return "IA não configurada: defina GEMINI_API_KEY para habilitar a análise."
-    if genai is None:
-        return "IA indisponível: biblioteca google-generativeai não está instalada."
-
-    try:
-        genai.configure(api_key=api_key)
-        preferred_model = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
-        fallback_models = [
-            preferred_model,
-            "gemini-2.0-flash",
-            "gemini-1.5-flash",
-        ]
-        prompt = _build_ai_prompt(kyc_data, report_data)
-        last_error = None
-        for model_name in fallback_models:
-            try:
-                model = genai.GenerativeModel(model_name)
-                response = model.generate_content(prompt)
-                text = getattr(response, "text", None)
-                if text:
-                    return text.strip()
-                last_error = "IA retornou resposta vazia."
-            except Exception as e:
-                last_error = str(e)
-                continue
-        return f"IA falhou ao gerar análise: {last_error}"
-    except Exception as e:
-        return f"IA falhou ao gerar análise: {str(e)}"
 
 def _normalize_cnpj_cadastral(cadastral: Dict) -> Dict[str, any]:
     if not cadastral:
@@ -165,9 +183,15 @@ def _fallback_entity_name(dossier: Dict) -> str:
 class DossierService:
     """Serviço de gerenciamento de dossiês"""
 
-    def __init__(self):
-        """Inicializa o serviço com lazy loading do Supabase client"""
-        self._supabase = None
+    def __init__(self, client: Optional[Client] = None):
+        """
+        Inicializa o serviço
+
+        Args:
+            client: Supabase client compartilhado (ver core/container.py).
+                Se omitido, cria um client no primeiro uso.
+        """
+        self._supabase = client
 
     @property
     def supabase(self) -> Client:
@@ -176,12 +200,20 @@ class DossierService:
             self._supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
         return self._supabase
 
+    @property
+    def payloads(self) -> PayloadStore:
+        """Payload store (respostas externas endereçadas por conteúdo)"""
+        return PayloadStore(self.supabase)
+
     def generate_and_save(
         self,
         document: str,
         company_id: str,
         enable_ai: bool = False,
-        cep: Optional[str] = None
+        cep: Optional[str] = None,
+        interactive: bool = True,
+        on_event: Optional[Callable[[str, Dict], None]] = None,
+        name: Optional[str] = None
     ) -> Dict[str, any]:
         """
         Gera e salva dossiê no Supabase
@@ -191,13 +223,67 @@ class DossierService:
             company_id: ID da empresa (multi-tenant)
             enable_ai: Se deve executar análise de IA (Gemini)
             cep: CEP opcional
+            interactive: Dossiê avulso (prioridade na fila de IA) ou item de lote
+            on_event: Recebe (evento, dados) a cada seção pronta - pep,
+                cadastral, address, sanctions_list, sanctions, risk,
+                name_screening, saved e ai (ver POST /api/dossiers/stream);
+                chamado de várias threads
+            name: Nome informado do titular do CPF (confirma a ocorrência
+                PEP pelos dígitos centrais; vira o entity_name do dossiê)
 
         Returns:
             Dict com success, dossier_id e dados
         """
         try:
-            # 1. Executa consulta KYC
-            kyc_data = kyc_engine.run_kyc_check(document, cep)
+            # Teto de latência do dossiê avulso (o que não responder a tempo sai como fonte ausente)
+            deadline = Deadline.after(
+                settings.KYC_INTERACTIVE_DEADLINE_SECONDS if interactive else settings.KYC_BATCH_DEADLINE_SECONDS
+            )
+            prepared = self._build_dossier(document, company_id, enable_ai, cep, deadline, on_event, name)
+            if not prepared["success"]:
+                return prepared
+            return self._save_dossiers([prepared], interactive, on_event)[0]
+
+        except Exception as e:
+            return {"success": False, "error": f"Erro ao gerar dossiê: {str(e)}"}
+
+    def _build_dossier(
+        self,
+        document: str,
+        company_id: str,
+        enable_ai: bool,
+        cep: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        on_event: Optional[Callable[[str, Dict], None]] = None,
+        name: Optional[str] = None
+    ) -> Dict[str, any]:
+        """
+        Executa a consulta KYC e monta o registro do dossiê (sem gravar)
+
+        Args:
+            deadline: Prazo total das consultas externas (resultado parcial
+                se acabar; ver kyc_engine.run_kyc_check)
+            on_event: Recebe cada seção assim que fica pronta (ver generate_and_save)
+            name: Nome informado do titular do CPF (ver generate_and_save)
+
+        Returns:
+            Dict com success e, em caso de sucesso, record (linha da tabela,
+            com id gerado), ai_facts (análise pendente) e result (resumo)
+        """
+        try:
+            # 1. Executa consulta KYC (consultas externas contam na cota da empresa)
+            on_source = on_sanctions_list = None
+            if on_event:
+                def on_source(name: str, data: Dict, status: str) -> None:
+                    if name == "cadastral" and data.get("success"):
+                        data = _normalize_cnpj_cadastral(data)
+                    on_event(name, {"status": status, "data": data})
+
+                def on_sanctions_list(name: str, records: List) -> None:
+                    on_event("sanctions_list", {"list": name, "records": records})
+
+            with quota_scope(company_id):
+                kyc_data = kyc_engine.run_kyc_check(document, cep, deadline, on_source, on_sanctions_list, name=name)
 
             if not kyc_data.get("success"):
                 return {"success": False, "error": kyc_data.get("error", "Erro na consulta KYC")}
@@ -218,14 +304,29 @@ class DossierService:
                         entity_name = f"CNPJ {kyc_data.get('document', '')}"
                     else:
                         entity_name = f"CPF {kyc_data.get('document', '')}"
+            if kyc_data.get("doc_type") == "CPF" and name and name.strip():
+                entity_name = name.strip()
             risk_level = kyc_data.get("risk_level", "BAIXO")
+            if on_event:
+                on_event("risk", {
+                    "risk_level": risk_level,
+                    "entity_name": entity_name,
+                    "sources": kyc_data.get("sources", {}),
+                    "missing_sources": kyc_data.get("missing_sources", []),
+                    "partial": kyc_data.get("partial", False)
+                })
 
             # 3. Monta report_data (formato esperado pelo frontend)
             cadastral = kyc_data.get("cadastral_data", {})
             normalized_cadastral = _normalize_cnpj_cadastral(cadastral) if kyc_data.get("doc_type") == "CNPJ" else {}
             receitaws_data = {}
-            if kyc_data.get("doc_type") == "CNPJ" and not normalized_cadastral.get("data_abertura"):
-                receitaws_data = kyc_engine.query_cnpj_receitaws(kyc_data.get("document", "")) or {}
+            if (
+                kyc_data.get("doc_type") == "CNPJ"
+                and not normalized_cadastral.get("data_abertura")
+                and not (deadline and deadline.expired)
+            ):
+                with quota_scope(company_id):
+                    receitaws_data = kyc_engine.query_cnpj_receitaws(kyc_data.get("document", ""), deadline) or {}
                 if receitaws_data.get("success"):
                     # Preenche campos faltantes com fallback ReceitaWS
                     for key in [
@@ -242,13 +343,26 @@ class DossierService:
                         if not normalized_cadastral.get(key):
                             normalized_cadastral[key] = receitaws_data.get(key, normalized_cadastral.get(key))
                     normalized_cadastral["success"] = True
+                    if on_event:
+                        on_event("cadastral", {"status": kyc_engine.SOURCE_COMPLETED, "data": normalized_cadastral})
             sanctions_data = kyc_data.get("sanctions", {})
 
+            # Triagem por nome da razão social e dos sócios do QSA (índice
+            # local dos nomes das listas; o CPF dos sócios vem mascarado)
+            name_screening = None
+            if kyc_data.get("doc_type") == "CNPJ" and normalized_cadastral.get("success"):
+                name_screening = sanctioned_names.screen_company(normalized_cadastral)
+                if on_event:
+                    on_event("name_screening", name_screening)
+
             # Estrutura compatível com o frontend
             report_data = {
                 "metadata": {
                     "document_type": kyc_data.get("doc_type"),
-                    "generated_at": datetime.utcnow().isoformat()
+                    "generated_at": datetime.utcnow().isoformat(),
+                    "sources": kyc_data.get("sources", {}),
+                    "missing_sources": kyc_data.get("missing_sources", []),
+                    "partial": kyc_data.get("partial", False)
                 },
                 "technical_report": {
                     "input": {
@@ -264,17 +378,9 @@ class DossierService:
                             "ok": bool(receitaws_data) and receitaws_data.get("success", False),
                             "data": receitaws_data if receitaws_data else {}
                         },
-                        "transparencia_ceis": {
-                            "ok": sanctions_data.get("success", False),
-                            "data": sanctions_data.get("ceis", [])
-                        },
-                        "transparencia_cnep": {
-                            "ok": sanctions_data.get("success", False),
-                            "data": sanctions_data.get("cnep", [])
-                        },
-                        "transparencia_cepim": {
-                            "ok": sanctions_data.get("success", False),
-                            "data": sanctions_data.get("cepim", [])
+                        **{
+                            source: report_format.sanction_source(sanctions_data, key)
+                            for source, key in report_format.SANCTION_SOURCES.items()
                         }
                     },
                     "derived": {
@@ -293,18 +399,38 @@ class DossierService:
                 "sanctions": sanctions_data,
                 "ai_analysis": None
             }
+            if name_screening is not None:
+                report_data["name_screening"] = name_screening
+            if kyc_data.get("pep"):
+                report_data["pep"] = kyc_data["pep"]
 
-            # 4. Análise de IA (se habilitada)
+            # 4. Análise de IA (se habilitada): processada em background pela fila de IA
+            ai_facts = None
             if enable_ai:
-                report_data["ai_analysis"] = _generate_ai_analysis(kyc_data, report_data)
+                ai_facts = ai_pipeline.build_ai_facts(kyc_data)
+                cached_analysis = ai_pipeline.cached_analysis(ai_facts)
+                if cached_analysis:
+                    report_data["ai_status"] = ai_pipeline.AI_STATUS_DONE
+                    report_data["ai_analysis"] = cached_analysis
+                    ai_facts = None
+                else:
+                    report_data["ai_status"] = ai_pipeline.AI_STATUS_PENDING
+
+            # 5. Monta o registro (schema correto da tabela, report_data compacto v2)
+            stored_report = self.payloads.externalize(
+                report_format.compact_report_data(report_data),
+                report_format.PAYLOAD_PATHS
+            )
+            expanded_bytes = report_format.json_size(report_data)
+            stored_bytes = report_format.json_size(stored_report)
 
-            # 5. Salva no Supabase (schema correto da tabela)
             dossier_record = {
+                "id": str(uuid.uuid4()),
                 "company_id": company_id,
                 "document_value": kyc_data.get("document"),
                 "entity_name": entity_name,
                 "risk_level": risk_level,
-                "report_data": report_data,
+                "report_data": stored_report,
                 "status_decisao": "PENDENTE",
                 "aprovado_por_diretoria": False,
                 "parecer_tecnico_compliance": None,
@@ -313,24 +439,100 @@ class DossierService:
                 "decisor_id": None
             }
 
-            response = self.supabase.table("dossiers").insert(dossier_record).execute()
-
-            if response.data and len(response.data) > 0:
-                dossier_id = response.data[0]["id"]
-                return {
-                    "success": True,
-                    "dossier_id": dossier_id,
+            return {
+                "success": True,
+                "record": dossier_record,
+                "ai_facts": ai_facts,
+                "ai_analysis": report_data["ai_analysis"],
+                "result": {
                     "entity_name": entity_name,
                     "risk_level": risk_level,
                     "document": kyc_data.get("document"),
-                    "doc_type": kyc_data.get("doc_type")
+                    "doc_type": kyc_data.get("doc_type"),
+                    "ai_status": report_data.get("ai_status"),
+                    "partial": kyc_data.get("partial", False),
+                    "missing_sources": kyc_data.get("missing_sources", []),
+                    "storage": {
+                        "format_version": report_format.REPORT_FORMAT_VERSION,
+                        "stored_bytes": stored_bytes,
+                        "expanded_bytes": expanded_bytes,
+                        "saved_bytes": expanded_bytes - stored_bytes
+                    }
                 }
-            else:
-                return {"success": False, "error": "Erro ao salvar dossiê no banco"}
+            }
 
         except Exception as e:
             return {"success": False, "error": f"Erro ao gerar dossiê: {str(e)}"}
 
+    def _save_dossiers(
+        self,
+        prepared: List[Dict],
+        interactive: bool = True,
+        on_event: Optional[Callable[[str, Dict], None]] = None
+    ) -> List[Dict]:
+        """
+        Grava dossiês montados por _build_dossier em uma única inserção
+
+        Args:
+            prepared: Itens retornados por _build_dossier (com success=True)
+            interactive: Prioridade na fila de IA
+            on_event: Recebe saved e, quando a análise ficar pronta, ai
+
+        Returns:
+            Resultado por item, na mesma ordem
+        """
+        records = [item["record"] for item in prepared]
+        try:
+            self._insert_dossiers(records)
+        except Exception as e:
+            print(f"Erro ao salvar dossiês: {str(e)}")
+            return [
+                {
+                    "success": False,
+                    "document": item["result"]["document"],
+                    "error": f"Erro ao salvar dossiê no banco: {str(e)}"
+                }
+                for item in prepared
+            ]
+
+        results = []
+        for item in prepared:
+            dossier_id = item["record"]["id"]
+            result = {"success": True, "dossier_id": dossier_id, **item["result"]}
+            on_done = None
+            if on_event:
+                on_event("saved", result)
+                if item["ai_analysis"]:
+                    on_event("ai", {
+                        "dossier_id": dossier_id,
+                        "status": ai_pipeline.AI_STATUS_DONE,
+                        "analysis": item["ai_analysis"]
+                    })
+
+                def on_done(status: str, analysis: str, dossier_id=dossier_id) -> None:
+                    on_event("ai", {"dossier_id": dossier_id, "status": status, "analysis": analysis})
+            if item["ai_facts"]:
+                ai_pipeline.get_ai_scheduler(self.supabase).submit(
+                    dossier_id,
+                    item["record"]["company_id"],
+                    item["ai_facts"],
+                    priority=ai_pipeline.PRIORITY_INTERACTIVE if interactive else ai_pipeline.PRIORITY_BATCH,
+                    on_done=on_done
+                )
+            results.append(result)
+        return results
+
+    def _insert_dossiers(self, records: List[Dict]) -> None:
+        """Insere os registros (Postgres direto, se configurado, ou PostgREST)"""
+        db = get_database()
+        if db:
+            pg_queries.insert_dossiers(db, records)
+            return
+
+        response = self.supabase.table("dossiers").insert(records).execute()
+        if len(response.data or []) != len(records):
+            raise RuntimeError("insert sem retorno")
+
     def list_dossiers(
         self,
         company_id: str,
@@ -351,15 +553,22 @@ class DossierService:
         try:
             offset = (page - 1) * page_size
 
-            # Conta total
-            count_response = self.supabase.table("dossiers").select("id", count="exact").eq("company_id", company_id).execute()
-            total = count_response.count if hasattr(count_response, 'count') else 0
+            db = get_database()
+            if db:
+                # Página + total em uma consulta
+                dossiers, total = pg_queries.list_dossiers(db, company_id, offset, page_size)
+            else:
+                # Conta total
+                count_response = self.supabase.table("dossiers").select("id", count="exact").eq("company_id", company_id).execute()
+                total = count_response.count if hasattr(count_response, 'count') else 0
 
-            # Busca registros paginados
-            response = self.supabase.table("dossiers").select("*").eq("company_id", company_id).order("created_at", desc=True).range(offset, offset + page_size - 1).execute()
+                # Busca registros paginados
+                response = self.supabase.table("dossiers").select("*").eq("company_id", company_id).order("created_at", desc=True).range(offset, offset + page_size - 1).execute()
 
-            dossiers = response.data if response.data else []
-            for d in dossiers:
+                dossiers = response.data if response.data else []
+            reports = self.payloads.resolve([d.get("report_data") or {} for d in dossiers])
+            for d, stored in zip(dossiers, reports):
+                d["report_data"] = report_format.expand_report_data(stored)
                 d["entity_name"] = _fallback_entity_name(d)
 
             return dossiers, total
@@ -368,31 +577,112 @@ class DossierService:
             print(f"Erro ao listar dossiês: {str(e)}")
             return [], 0
 
-    def get_by_id(self, dossier_id: str, company_id: str) -> Optional[Dict]:
+    def get_by_id(
+        self,
+        dossier_id: str,
+        company_id: str,
+        fields: Optional[List[str]] = None,
+        sections: Optional[List[str]] = None
+    ) -> Optional[Dict]:
         """
         Busca dossiê por ID (com validação de empresa)
 
+        A projeção de `fields` e `sections` é feita pelo PostgREST no banco,
+        então seções grandes não trafegam quando não são pedidas.
+
         Args:
             dossier_id: ID do dossiê
             company_id: ID da empresa (segurança multi-tenant)
+            fields: Colunas de topo desejadas (None = todas)
+            sections: Seções do report_data (ver report_format.SECTION_PATHS; None = completo)
 
         Returns:
-            Dossiê ou None
+            Dossiê (report_data no formato do frontend) ou None
+
+        Raises:
+            ValueError: Se algum campo ou seção não for suportado
         """
+        storage_paths = None
+        if sections is not None:
+            invalid = [s for s in sections if s not in report_format.SECTION_PATHS]
+            if invalid:
+                raise ValueError(f"Seções inválidas: {', '.join(invalid)}")
+            storage_paths = report_format.storage_paths_for(sections)
+
+        select = _build_projection(fields, storage_paths)
+
         try:
-            response = self.supabase.table("dossiers").select("*").eq("id", dossier_id).eq("company_id", company_id).execute()
+            dossier = self._fetch_one(select, dossier_id, company_id)
+            if not dossier:
+                return None
 
-            if response.data and len(response.data) > 0:
-                dossier = response.data[0]
-                dossier["entity_name"] = _fallback_entity_name(dossier)
-                return dossier
+            if storage_paths is None:
+                if "report_data" in dossier:
+                    stored = self.payloads.resolve_one(dossier["report_data"] or {})
+                    dossier["report_data"] = report_format.expand_report_data(stored)
             else:
-                return None
+                compact, stored = _pop_projected(dossier, storage_paths)
+                if not compact:
+                    # Linha ainda em v1 (antes da migração): busca o report_data completo
+                    legacy = self._fetch_one("report_data", dossier_id, company_id) or {}
+                    stored = legacy.get("report_data") or {}
+                dossier["report_data"] = report_format.select_sections(
+                    report_format.expand_report_data(self.payloads.resolve_one(stored)), sections
+                )
+
+            dossier["entity_name"] = _fallback_entity_name(dossier)
+            return dossier
 
         except Exception as e:
             print(f"Erro ao buscar dossiê: {str(e)}")
             return None
 
+    def get_source(self, dossier_id: str, company_id: str, source: str) -> Optional[Dict]:
+        """
+        Busca apenas uma fonte bruta do report_data (ex: transparencia_ceis)
+
+        Args:
+            dossier_id: ID do dossiê
+            company_id: ID da empresa
+            source: Nome da fonte (ver report_format.SOURCE_STORAGE_PATHS)
+
+        Returns:
+            Dict {"ok", "data"} da fonte, {} se o dossiê não tiver a fonte, ou None se não existir
+
+        Raises:
+            ValueError: Se a fonte não for suportada
+        """
+        if source not in report_format.SOURCE_STORAGE_PATHS:
+            raise ValueError(f"Fonte inválida: {source}")
+
+        storage_paths = list(report_format.SOURCE_STORAGE_PATHS[source])
+        legacy_path = ("technical_report", "sources", source)
+        select = _build_projection([], storage_paths + [legacy_path])
+
+        try:
+            row = self._fetch_one(select, dossier_id, company_id)
+            if not row:
+                return None
+
+            legacy_source = row.pop(_path_alias(legacy_path), None)
+            compact, stored = _pop_projected(row, storage_paths)
+            if not compact:
+                return legacy_source or {}
+
+            stored = self.payloads.resolve_one(stored)
+            sources = report_format.expand_report_data(stored)["technical_report"]["sources"]
+            return sources.get(source) or {}
+
+        except Exception as e:
+            print(f"Erro ao buscar fonte do dossiê: {str(e)}")
+            return None
+
+    def _fetch_one(self, select: str, dossier_id: str, company_id: str) -> Optional[Dict]:
+        response = self.supabase.table("dossiers").select(select).eq("id", dossier_id).eq("company_id", company_id).execute()
+        if response.data and len(response.data) > 0:
+            return response.data[0]
+        return None
+
     def check_duplicate(self, document: str, company_id: str) -> Optional[str]:
         """
         Verifica se já existe dossiê para o documento
@@ -419,6 +709,34 @@ class DossierService:
             print(f"Erro ao verificar duplicata: {str(e)}")
             return None
 
+    def find_existing(self, documents: List[str], company_id: str) -> Dict[str, str]:
+        """
+        Dossiês já existentes para vários documentos, em uma consulta
+
+        Args:
+            documents: Lista de CPF/CNPJ
+            company_id: ID da empresa
+
+        Returns:
+            Dict documento (apenas números) -> ID do dossiê mais recente
+        """
+        clean_docs = list(dict.fromkeys(''.join(filter(str.isdigit, d)) for d in documents))
+        if not clean_docs:
+            return {}
+
+        response = (
+            self.supabase.table("dossiers")
+            .select("id,document_value")
+            .eq("company_id", company_id)
+            .in_("document_value", clean_docs)
+            .order("created_at", desc=True)
+            .execute()
+        )
+        existing: Dict[str, str] = {}
+        for row in response.data or []:
+            existing.setdefault(row["document_value"], row["id"])
+        return existing
+
     def process_batch(
         self,
         documents: List[str],
@@ -448,11 +766,39 @@ class DossierService:
             "errors": []
         }
 
+        pending: List[Dict] = []
+        seen = set()
+
+        # Progresso no canal de eventos da empresa (core/events.py)
+        progress = ProgressReporter(company_id, "batch", len(documents), id_field="batch_id")
+        progress.start()
+
+        # Duplicatas no banco: uma consulta para o lote inteiro
+        try:
+            existing = self.find_existing(documents, company_id)
+        except Exception as e:
+            print(f"Erro ao verificar duplicatas: {str(e)}")
+            existing = {}
+
+        def flush():
+            for result in self._save_dossiers(pending, interactive=False):
+                if result.get("success"):
+                    results["dossiers"].append(result)
+                    results["success_count"] += 1
+                else:
+                    results["errors"].append({
+                        "document": result.get("document"),
+                        "error": result.get("error", "Erro desconhecido")
+                    })
+                    results["error_count"] += 1
+            pending.clear()
+
         for idx, document in enumerate(documents):
             try:
-                # Verifica duplicata
-                existing_id = self.check_duplicate(document, company_id)
-                if existing_id:
+                # Verifica duplicata (no banco e no próprio lote)
+                clean_doc = ''.join(filter(str.isdigit, document))
+                existing_id = existing.get(clean_doc)
+                if existing_id or clean_doc in seen:
                     results["errors"].append({
                         "document": document,
                         "error": "Dossiê já existe",
@@ -460,17 +806,22 @@ class DossierService:
                     })
                     results["error_count"] += 1
                     continue
-
-                # Gera dossiê
-                result = self.generate_and_save(document, company_id, enable_ai)
-
-                if result.get("success"):
-                    results["dossiers"].append(result)
-                    results["success_count"] += 1
+                seen.add(clean_doc)
+
+                # Gera dossiê (gravação agrupada em lotes de BATCH_INSERT_SIZE)
+                prepared = self._build_dossier(
+                    document, company_id, enable_ai,
+                    deadline=Deadline.after(settings.KYC_BATCH_DEADLINE_SECONDS)
+                )
+
+                if prepared.get("success"):
+                    pending.append(prepared)
+                    if len(pending) >= BATCH_INSERT_SIZE:
+                        flush()
                 else:
                     results["errors"].append({
                         "document": document,
-                        "error": result.get("error", "Erro desconhecido")
+                        "error": prepared.get("error", "Erro desconhecido")
                     })
                     results["error_count"] += 1
 
@@ -485,6 +836,21 @@ class DossierService:
                 })
                 results["error_count"] += 1
 
+            progress.update(
+                processed=idx + 1,
+                success_count=results["success_count"],
+                error_count=results["error_count"]
+            )
+
+        if pending:
+            flush()
+
+        progress.finish(
+            processed=len(documents),
+            success_count=results["success_count"],
+            error_count=results["error_count"]
+        )
+        results["batch_id"] = progress.id
         return results
 
     def update_decision(
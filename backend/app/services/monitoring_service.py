@@ -5,6 +5,7 @@ Wrapper para o monitoring_engine.py existente
 """
 
 import json
+from typing import Callable, Dict, List, Optional
 
 from app.monitoring_engine import (
     add_monitored_record,
@@ -17,14 +18,19 @@ from app.monitoring_engine import (
     get_recent_changes,
     compute_status
 )
+from app.services.refresh_jobs import RefreshJobStore
 
 
 class MonitoringService:
     """Serviço de monitoramento (wrapper)"""
 
-    def add_record(self, document: str, company_id: str, notes: str = ""):
+    def __init__(self, refresh_jobs: Optional[RefreshJobStore] = None, on_job_queued: Optional[Callable[[], None]] = None):
+        self.refresh_jobs = refresh_jobs
+        self._on_job_queued = on_job_queued
+
+    def add_record(self, document: str, company_id: str, notes: str = "", name: Optional[str] = None):
         """Adiciona registro ao monitoramento"""
-        return add_monitored_record(document, notes, company_id)
+        return add_monitored_record(document, notes, company_id, name)
 
     def remove_record(self, document: str, company_id: str):
         """Remove registro"""
@@ -107,9 +113,44 @@ class MonitoringService:
         return update_single_record(document, company_id)
 
     def update_all(self, company_id: str):
-        """Atualiza todos os registros"""
+        """Atualiza todos os registros (na requisição; a API usa os jobs abaixo)"""
         return update_all_records(company_id)
 
+    # ---------- Jobs de atualização (services/refresh_jobs.py) ----------
+
+    def _jobs(self) -> RefreshJobStore:
+        if self.refresh_jobs is None:
+            raise RuntimeError("Jobs de atualização indisponíveis (banco não configurado)")
+        return self.refresh_jobs
+
+    def create_refresh_job(self, company_id: str, requested_by: Optional[str] = None) -> Dict:
+        """Enfileira a atualização de todos os registros (ou devolve o job já aberto)"""
+        job = self._jobs().create(company_id, requested_by)
+        if job["created"] and self._on_job_queued:
+            self._on_job_queued()
+        return job
+
+    def get_refresh_job(self, company_id: str, job_id: str) -> Optional[Dict]:
+        return self._jobs().get(company_id, job_id)
+
+    def list_refresh_jobs(self, company_id: str, limit: int = 20) -> List[Dict]:
+        return self._jobs().list(company_id, limit)
+
+    def cancel_refresh_job(self, company_id: str, job_id: str) -> Optional[Dict]:
+        return self._jobs().cancel(company_id, job_id)
+
+    def get_refresh_job_results(self, company_id: str, job_id: str) -> Optional[Dict]:
+        """Registros com mudança e falhas do job"""
+        job = self._jobs().get(company_id, job_id, with_results=True)
+        if job is None:
+            return None
+        results = job.pop("results", None) or {}
+        return {
+            "job": job,
+            "changes": results.get("changes", []),
+            "errors": results.get("errors", []),
+        }
+
     def get_recent_changes(self, company_id: str, days: int = 2):
         """Obtém mudanças recentes"""
         return get_recent_changes(days=days, company_id=company_id)
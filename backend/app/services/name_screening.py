@@ -0,0 +1,369 @@
+"""
+Triagem por Nome nas Listas de Sanções
+======================================
+A triagem por documento não pega um sócio sancionado que aparece no `qsa`
+só pelo nome (a BrasilAPI mascara o CPF do sócio: ***456789**). Este módulo
+mantém um índice invertido dos nomes do snapshot das listas
+(public.sanctions_entries.name, ver services/sanctions_delta.py):
+
+- normalização de nomes em português: maiúsculas sem acento, sem
+  pontuação, sem partículas (DA, DE, DOS...) e sufixos societários (LTDA,
+  S/A, ME, EPP...), abreviações expandidas (CIA -> COMPANHIA, COM ->
+  COMERCIO, JR -> JUNIOR...)
+- trigramas por palavra e chave fonética por palavra (regras do português:
+  PH -> F, LH -> L, C/G antes de E/I, Z -> S, sem H e sem vogais internas)
+- consulta: Dice ponderado por IDF sobre as listas de postings (numpy
+  bincount) e nova pontuação dos NAME_SCREENING_CANDIDATES melhores por
+  similaridade (Dice de trigramas e de chaves fonéticas), top-k em
+  milissegundos com centenas de milhares de nomes
+
+O índice de cada processo é reconstruído como o filtro de sanções
+(core/sanctions_filter.py): na inicialização, a cada importação das listas
+(NOTIFY sanctions_lists_changed) e a cada SANCTIONS_FILTER_RELOAD_SECONDS.
+
+Uso:
+    from app.services.name_screening import sanctioned_names
+
+    sanctioned_names.search("Construtora Irmãos Silva Ltda")
+"""
+
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+_searches = metrics.histogram("name_screening_search_seconds", "Duração das buscas no índice de nomes sancionados")
+_names = metrics.gauge("name_screening_names", "Nomes distintos no índice de nomes sancionados")
+
+PARTICLES = frozenset({"A", "E", "O", "DA", "DAS", "DE", "DI", "DO", "DOS", "DU", "DEL", "DELA", "DELLA", "VAN", "VON", "Y"})
+COMPANY_SUFFIXES = frozenset({"LTDA", "ME", "EPP", "EIRELI", "SA", "MEI", "SS", "SLU"})
+ABBREVIATIONS = {
+    "CIA": "COMPANHIA",
+    "COM": "COMERCIO",
+    "COML": "COMERCIAL",
+    "IND": "INDUSTRIA",
+    "INDL": "INDUSTRIAL",
+    "SERV": "SERVICOS",
+    "ADM": "ADMINISTRACAO",
+    "ASSOC": "ASSOCIACAO",
+    "EMP": "EMPREENDIMENTOS",
+    "PART": "PARTICIPACOES",
+    "TRANSP": "TRANSPORTES",
+    "DISTR": "DISTRIBUIDORA",
+    "ENG": "ENGENHARIA",
+    "CONSTR": "CONSTRUTORA",
+    "PROD": "PRODUTOS",
+    "BRAS": "BRASILEIRA",
+    "NAC": "NACIONAL",
+    "JR": "JUNIOR",
+    "JUN": "JUNIOR",
+    "FO": "FILHO",
+    "STA": "SANTA",
+    "STO": "SANTO",
+    "MA": "MARIA",
+}
+
+_SA_SUFFIX = re.compile(r"\bS\s*[/.]\s*A\b\.?")
+_NON_ALNUM = re.compile(r"[^A-Z0-9 ]+")
+
+# Regras fonéticas (ordem importa: dígrafos antes das letras isoladas)
+_PHONETIC_RULES = [(re.compile(pattern), replacement) for pattern, replacement in (
+    (r"PH", "F"),
+    (r"TH", "T"),
+    (r"LH", "L"),
+    (r"NH", "N"),
+    (r"[CS]H", "X"),
+    (r"SC(?=[EI])", "S"),
+    (r"QU", "K"),
+    (r"GU(?=[EI])", "G"),
+    (r"C(?=[EI])", "S"),
+    (r"G(?=[EI])", "J"),
+    (r"[CQ]", "K"),
+    (r"Y", "I"),
+    (r"W", "V"),
+    (r"Z", "S"),
+    (r"H", ""),
+    (r"M$", "N"),
+    (r"(.)\1+", r"\1"),
+)]
+_INNER_VOWELS = re.compile(r"(?<=.)[AEIOU]")
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Nome em maiúsculas, sem acento/pontuação/partículas/sufixos, abreviações expandidas"""
+    if not name:
+        return ""
+    text = unicodedata.normalize("NFKD", str(name).upper())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _NON_ALNUM.sub(" ", _SA_SUFFIX.sub(" ", text))
+    tokens = [ABBREVIATIONS.get(token, token) for token in text.split()]
+    kept = [t for t in tokens if t not in PARTICLES and t not in COMPANY_SUFFIXES]
+    return " ".join(kept or tokens)
+
+
+def phonetic_key(token: str) -> str:
+    """Chave fonética de uma palavra normalizada"""
+    key = token
+    for pattern, replacement in _PHONETIC_RULES:
+        key = pattern.sub(replacement, key)
+    return _INNER_VOWELS.sub("", key) or token[:1]
+
+
+def trigrams(normalized: str) -> set:
+    """Trigramas de cada palavra (com bordas), para busca insensível à ordem"""
+    grams = set()
+    for token in normalized.split():
+        padded = f" {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def phonetic_tokens(normalized: str) -> set:
+    return {phonetic_key(token) for token in normalized.split()}
+
+
+def _dice(a: set, b: set) -> float:
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+
+def similarity(query: str, candidate: str) -> float:
+    """Similaridade entre dois nomes normalizados (0 a 1)"""
+    if query == candidate:
+        return 1.0
+    return 0.6 * _dice(trigrams(query), trigrams(candidate)) + 0.4 * _dice(phonetic_tokens(query), phonetic_tokens(candidate))
+
+
+class NameIndex:
+    """Índice invertido (trigramas e chaves fonéticas) dos nomes sancionados"""
+
+    def __init__(self, rows: Iterable[Dict]):
+        """
+        Args:
+            rows: Registros do snapshot com name, list_name, record_key,
+                document e cpf_core
+        """
+        ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.records: List[List[Tuple]] = []
+        grams: Dict[str, List[int]] = defaultdict(list)
+        sounds: Dict[str, List[int]] = defaultdict(list)
+        for row in rows:
+            normalized = normalize_name(row.get("name"))
+            if not normalized:
+                continue
+            record = (row.get("list_name"), row.get("record_key"), row.get("name"), row.get("document"), row.get("cpf_core"))
+            name_id = ids.get(normalized)
+            if name_id is not None:
+                self.records[name_id].append(record)
+                continue
+            name_id = ids[normalized] = len(self.names)
+            self.names.append(normalized)
+            self.records.append([record])
+            for gram in trigrams(normalized):
+                grams[gram].append(name_id)
+            for sound in phonetic_tokens(normalized):
+                sounds[sound].append(name_id)
+
+        total = max(len(self.names), 1)
+        self._unseen_weight = math.log(1 + total)
+        # Postings em int32 e peso IDF por termo (termos comuns pesam pouco)
+        self._postings: Dict[str, Tuple[np.ndarray, float]] = {}
+        for prefix, table in (("t", grams), ("p", sounds)):
+            for term, posting in table.items():
+                self._postings[f"{prefix}{term}"] = (np.array(posting, dtype=np.int32), math.log(1 + total / len(posting)))
+        # Peso total de cada nome: normaliza a pré-seleção (nomes longos não
+        # passam na frente do nome exato só por terem mais termos)
+        self._norms = self._accumulate(list(self._postings.values()), len(self.names))
+
+    @staticmethod
+    def _accumulate(found: List[Tuple[np.ndarray, float]], size: int) -> np.ndarray:
+        if not found:
+            return np.zeros(size)
+        postings = np.concatenate([posting for posting, _ in found])
+        weights = np.repeat([weight for _, weight in found], [len(posting) for posting, _ in found])
+        return np.bincount(postings, weights=weights, minlength=size)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(posting.nbytes for posting, _ in self._postings.values())
+
+    def search(self, name: str, k: int = 5, min_score: float = 0.0, candidates: int = 50) -> List[Dict]:
+        """
+        Nomes sancionados mais parecidos
+
+        Returns:
+            Até k ocorrências {matched_name, score, records} com score >=
+            min_score, da mais parecida para a menos
+        """
+        query = normalize_name(name)
+        if not query or not self.names:
+            return []
+        terms = [f"t{gram}" for gram in trigrams(query)] + [f"p{sound}" for sound in phonetic_tokens(query)]
+        found = [self._postings[term] for term in terms if term in self._postings]
+        if not found:
+            return []
+
+        # Dice ponderado por IDF entre os termos da consulta e os de cada nome
+        query_weight = sum(weight for _, weight in found) + self._unseen_weight * (len(terms) - len(found))
+        scores = 2 * self._accumulate(found, len(self.names)) / (query_weight + self._norms)
+        if len(scores) > candidates:
+            top = np.argpartition(scores, -candidates)[-candidates:]
+        else:
+            top = np.arange(len(scores))
+        top = top[scores[top] > 0]
+
+        # Empate (mesmos termos): o nome de tamanho mais próximo primeiro
+        ranked = sorted(
+            ((similarity(query, self.names[i]), -abs(len(self.names[i]) - len(query)), int(i)) for i in top),
+            reverse=True,
+        )
+        matches = []
+        for score, _, i in ranked[:k]:
+            if score < min_score:
+                break
+            matches.append({
+                "matched_name": self.records[i][0][2],
+                "score": round(score, 3),
+                "records": [
+                    {"list": r[0], "record_key": r[1], "name": r[2], "document": r[3], "cpf_core": r[4]}
+                    for r in self.records[i]
+                ],
+            })
+        return matches
+
+
+class SanctionedNames:
+    """Índice de nomes sancionados do processo (reconstruído a partir do snapshot)"""
+
+    def __init__(self):
+        self._loader: Optional[Callable[[], Optional[Iterable[Dict]]]] = None
+        self._index: Optional[NameIndex] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._reloading = False
+
+    def set_loader(self, loader: Optional[Callable[[], Optional[Iterable[Dict]]]]) -> None:
+        """Função que lê os nomes do snapshot (ver SanctionsSnapshotStore.name_source)"""
+        self._loader = loader
+
+    def reload(self) -> bool:
+        """
+        Reconstrói o índice a partir do snapshot
+
+        Returns:
+            True se o índice ficou disponível
+        """
+        loader = self._loader
+        if not settings.NAME_SCREENING_ENABLED or loader is None:
+            return False
+        try:
+            rows = loader()
+        except Exception as e:
+            # Mantém o índice anterior (se houver) até a próxima tentativa
+            print(f"Erro ao carregar o índice de nomes sancionados: {str(e)}")
+            self._loaded_at = time.monotonic()
+            return self._index is not None
+
+        started = time.perf_counter()
+        index = NameIndex(rows or [])
+        with self._lock:
+            self._index = index if len(index) else None
+            self._loaded_at = time.monotonic()
+        _names.set(len(index))
+        print(
+            f"Índice de nomes sancionados: {len(index)} nomes, {index.nbytes / 2 ** 20:.1f} MiB de postings, "
+            f"construído em {time.perf_counter() - started:.1f} s"
+        )
+        return bool(len(index))
+
+    def reload_async(self, *_args) -> None:
+        """Reconstrói em outra thread (callback do NOTIFY; uma reconstrução por vez)"""
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+
+        def run() -> None:
+            try:
+                self.reload()
+            finally:
+                with self._lock:
+                    self._reloading = False
+
+        threading.Thread(target=run, name="sanctioned-names-reload", daemon=True).start()
+
+    def search(self, name: str, k: Optional[int] = None, min_score: Optional[float] = None) -> Optional[List[Dict]]:
+        """
+        Top-k nomes sancionados parecidos (None com o índice indisponível)
+        """
+        with self._lock:
+            index, loaded_at = self._index, self._loaded_at
+        if self._loader and time.monotonic() - loaded_at > settings.SANCTIONS_FILTER_RELOAD_SECONDS:
+            self.reload_async()
+        if index is None or not settings.NAME_SCREENING_ENABLED:
+            return None
+        started = time.perf_counter()
+        matches = index.search(
+            name,
+            k=k or settings.NAME_SCREENING_TOP_K,
+            min_score=settings.NAME_SCREENING_MIN_SCORE if min_score is None else min_score,
+            candidates=settings.NAME_SCREENING_CANDIDATES,
+        )
+        _searches.observe(time.perf_counter() - started)
+        return matches
+
+    def screen_company(self, cadastral: Dict) -> Dict:
+        """
+        Triagem por nome da razão social e de cada sócio do QSA
+
+        Args:
+            cadastral: Cadastro normalizado do CNPJ (razao_social, qsa)
+
+        Returns:
+            Dict com available, checked e matches ({subject, name,
+            qualificacao, matched_name, score, document_match, records});
+            document_match indica que o CPF mascarado do sócio tem os mesmos
+            dígitos centrais do registro sancionado
+        """
+        subjects = []
+        if cadastral.get("razao_social"):
+            subjects.append(("razao_social", cadastral["razao_social"], None, None))
+        for partner in cadastral.get("qsa") or []:
+            name = partner.get("nome_socio") or partner.get("nome")
+            if name:
+                masked = re.sub(r"\D", "", str(partner.get("cnpj_cpf_do_socio") or ""))
+                qualification = partner.get("qualificacao_socio") or partner.get("qual")
+                subjects.append(("qsa", name, qualification, masked if len(masked) == 6 else None))
+
+        matches = []
+        for subject, name, qualification, core in subjects:
+            found = self.search(name)
+            if found is None:
+                return {"available": False, "checked": 0, "matches": []}
+            for match in found:
+                document_match = bool(core) and any(
+                    r["cpf_core"] == core or (r["document"] and len(r["document"]) == 11 and r["document"][3:9] == core)
+                    for r in match["records"]
+                )
+                matches.append({
+                    "subject": subject,
+                    "name": name,
+                    "qualificacao": qualification,
+                    **match,
+                    "document_match": document_match,
+                })
+        return {"available": True, "checked": len(subjects), "matches": matches}
+
+
+sanctioned_names = SanctionedNames()
@@ -0,0 +1,235 @@
+"""
+Payload Store - Armazenamento endereçado por conteúdo
+======================================================
+Respostas das APIs externas (BrasilAPI, ReceitaWS, Portal da Transparência) se
+repetem entre dossiês e registros de monitoramento, inclusive de empresas
+diferentes. Cada payload é gravado uma única vez na tabela `upstream_payloads`,
+com chave no hash SHA-256 do JSON canônico, e os documentos guardam apenas a
+referência `{"$payload": "sha256:..."}`.
+
+Como o conteúdo de um hash nunca muda, as leituras usam um cache local em
+memória e resolvem as referências que faltam com uma única consulta.
+"""
+
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from postgrest.types import ReturnMethod
+from supabase import Client
+
+from app.core.database import get_database
+from app.services import pg_queries
+
+PAYLOAD_TABLE = "upstream_payloads"
+PAYLOAD_REF_KEY = "$payload"
+
+# Payloads pequenos (listas vazias, dicts curtos) ficam inline: a referência não compensa
+MIN_EXTERNAL_BYTES = 256
+
+# Cache local de payloads já resolvidos (imutáveis por definição)
+_CACHE_MAX_ITEMS = 2048
+_cache: "OrderedDict[str, Any]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def canonical_json(payload: Any) -> str:
+    """Serialização canônica (chaves ordenadas, sem espaços) usada no hash"""
+    return json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def payload_hash(payload: Any) -> str:
+    """Hash do payload canonicalizado no formato 'sha256:<hex>'"""
+    digest = hashlib.sha256(canonical_json(payload).encode("utf-8")).hexdigest()
+    return f"sha256:{digest}"
+
+
+def is_ref(value: Any) -> bool:
+    """Indica se o valor é uma referência a payload"""
+    return isinstance(value, dict) and len(value) == 1 and PAYLOAD_REF_KEY in value
+
+
+def _cache_get(key: str) -> Tuple[bool, Any]:
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return True, _cache[key]
+    return False, None
+
+
+def _cache_put(key: str, payload: Any) -> None:
+    with _cache_lock:
+        _cache[key] = payload
+        _cache.move_to_end(key)
+        while len(_cache) > _CACHE_MAX_ITEMS:
+            _cache.popitem(last=False)
+
+
+def _collect_refs(value: Any, found: Set[str]) -> None:
+    if is_ref(value):
+        found.add(value[PAYLOAD_REF_KEY])
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_refs(item, found)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_refs(item, found)
+
+
+def _replace_refs(value: Any, payloads: Dict[str, Any]) -> Any:
+    if is_ref(value):
+        key = value[PAYLOAD_REF_KEY]
+        # Cópia: o payload em cache é compartilhado entre leituras
+        return copy.deepcopy(payloads[key]) if key in payloads else value
+    if isinstance(value, dict):
+        return {k: _replace_refs(v, payloads) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_replace_refs(v, payloads) for v in value]
+    return value
+
+
+class PayloadStore:
+    """Repositório de payloads endereçados por conteúdo"""
+
+    def __init__(self, client: Client):
+        self.client = client
+
+    def put_many(self, payloads: Iterable[Any]) -> List[str]:
+        """
+        Grava payloads (idempotente) e retorna seus hashes, na mesma ordem
+
+        Um único upsert com ON CONFLICT DO NOTHING; payloads já existentes
+        (de qualquer empresa) não são regravados.
+        """
+        hashes: List[str] = []
+        rows: Dict[str, Dict] = {}
+        for payload in payloads:
+            key = payload_hash(payload)
+            hashes.append(key)
+            if key not in rows:
+                rows[key] = {
+                    "hash": key,
+                    "payload": payload,
+                    "size_bytes": len(canonical_json(payload).encode("utf-8")),
+                }
+
+        if rows:
+            db = get_database()
+            if db:
+                pg_queries.insert_payloads(db, list(rows.values()))
+            else:
+                (
+                    self.client.table(PAYLOAD_TABLE)
+                    .upsert(list(rows.values()), on_conflict="hash", ignore_duplicates=True, returning=ReturnMethod.minimal)
+                    .execute()
+                )
+            for key, row in rows.items():
+                _cache_put(key, row["payload"])
+
+        return hashes
+
+    def externalize(self, document: Dict, paths: Iterable[Tuple[str, ...]]) -> Dict:
+        """
+        Substitui os valores nos caminhos indicados por referências
+
+        Valores ausentes, já referenciados ou menores que MIN_EXTERNAL_BYTES
+        ficam inline. Em caso de erro no banco, o documento é mantido inline.
+
+        Args:
+            document: Documento (não é alterado)
+            paths: Caminhos (tuplas de chaves) dos payloads a externalizar
+
+        Returns:
+            Cópia do documento com referências
+        """
+        targets: List[Tuple[Tuple[str, ...], Any]] = []
+        for path in paths:
+            value = _get_path(document, path)
+            if value is None or is_ref(value):
+                continue
+            if len(canonical_json(value).encode("utf-8")) < MIN_EXTERNAL_BYTES:
+                continue
+            targets.append((path, value))
+
+        if not targets:
+            return document
+
+        try:
+            hashes = self.put_many(value for _, value in targets)
+        except Exception as e:
+            print(f"Erro ao gravar payloads (mantendo inline): {str(e)}")
+            return document
+
+        result = copy.deepcopy(document)
+        for (path, _), key in zip(targets, hashes):
+            _set_path(result, path, {PAYLOAD_REF_KEY: key})
+        return result
+
+    def resolve_many(self, hashes: Iterable[str]) -> Dict[str, Any]:
+        """Resolve hashes em payloads (cache local + uma consulta para o restante)"""
+        resolved: Dict[str, Any] = {}
+        missing: List[str] = []
+        for key in dict.fromkeys(hashes):
+            hit, payload = _cache_get(key)
+            if hit:
+                resolved[key] = payload
+            else:
+                missing.append(key)
+
+        if missing:
+            db = get_database()
+            if db:
+                found_rows = pg_queries.fetch_payloads(db, missing)
+            else:
+                found_rows = self.client.table(PAYLOAD_TABLE).select("hash,payload").in_("hash", missing).execute().data
+            for row in found_rows or []:
+                resolved[row["hash"]] = row["payload"]
+                _cache_put(row["hash"], row["payload"])
+
+        return resolved
+
+    def resolve(self, documents: List[Any]) -> List[Any]:
+        """
+        Substitui todas as referências dos documentos pelos payloads, em lote
+
+        Args:
+            documents: Lista de documentos (dicts/listas) possivelmente com referências
+
+        Returns:
+            Nova lista com as referências resolvidas (referências não encontradas ficam como estão)
+        """
+        found: Set[str] = set()
+        for document in documents:
+            _collect_refs(document, found)
+        if not found:
+            return documents
+
+        try:
+            payloads = self.resolve_many(found)
+        except Exception as e:
+            print(f"Erro ao resolver payloads: {str(e)}")
+            return documents
+
+        return [_replace_refs(document, payloads) for document in documents]
+
+    def resolve_one(self, document: Any) -> Any:
+        return self.resolve([document])[0]
+
+
+def _get_path(document: Dict, path: Tuple[str, ...]) -> Optional[Any]:
+    node: Any = document
+    for key in path:
+        if not isinstance(node, dict):
+            return None
+        node = node.get(key)
+    return node
+
+
+def _set_path(document: Dict, path: Tuple[str, ...], value: Any) -> None:
+    node = document
+    for key in path[:-1]:
+        node = node[key]
+    node[path[-1]] = value
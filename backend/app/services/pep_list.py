@@ -0,0 +1,510 @@
+"""
+Lista de Pessoas Expostas Politicamente (PEP)
+=============================================
+O Portal da Transparência publica mensalmente o arquivo PEP ("Download de
+dados" > PEP: ZIP com um CSV separado por ';' em latin-1, uma linha por
+exercício de função). Este módulo:
+
+- lê o arquivo (parse_pep_dump / load_pep_dump); o CPF vem mascarado
+  (***.456.789-**), então fica só cpf_core (dígitos 4 a 9), e completo
+  quando vier sem máscara
+- grava cada importação como uma nova geração (PepImporter, migrations/013):
+  a geração só vale depois de gravada por inteiro
+- mantém em cada processo um índice em memória (dicts) por CPF completo,
+  dígitos centrais e nome normalizado (services/name_screening.py), com
+  consulta em microssegundos; reconstruído em outra thread e trocado de uma
+  vez (sem indisponibilidade) a cada importação (NOTIFY pep_list_changed) e
+  a cada PEP_RELOAD_SECONDS
+
+Ocorrência (screen_cpf):
+- cpf: CPF completo igual - PEP confirmado
+- cpf_core_name: dígitos centrais e nome informado iguais - PEP confirmado
+- cpf_core: só os dígitos centrais - PEP possível (a confirmar pelo nome)
+
+Uso:
+    from app.services.pep_list import pep_list
+
+    pep_list.screen_cpf("52998224725")
+"""
+
+import csv
+import io
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import requests
+from supabase import Client
+
+from app.core.config import settings
+from app.core.database import get_database
+from app.core.metrics import metrics
+from app.services import pg_queries
+from app.services.name_screening import normalize_name, similarity
+from app.services.sanctions_dumps import _csv_text, _normalize_header, cpf_core, record_key
+
+PEP_CHANNEL = "pep_list_changed"
+
+# Itens por requisição no caminho PostgREST e por instrução no Postgres
+_CHUNK = 500
+_PG_CHUNK = 20000
+
+_imports = metrics.counter("pep_imports_total", "Importações do arquivo PEP")
+_lookups = metrics.counter("pep_lookups_total", "Consultas de CPF no índice PEP")
+_entries = metrics.gauge("pep_entries", "Registros em vigor no índice PEP")
+
+# Colunas (normalizadas: maiúsculas, sem acento, '_' como espaço)
+_COLUMNS = {
+    "cpf": ("CPF",),
+    "name": ("NOME PEP", "NOME"),
+    "role": ("DESCRICAO FUNCAO",),
+    "role_acronym": ("SIGLA FUNCAO",),
+    "role_level": ("NIVEL FUNCAO",),
+    "agency": ("NOME ORGAO",),
+    "start_date": ("DATA INICIO EXERCICIO",),
+    "end_date": ("DATA FIM EXERCICIO",),
+    "grace_end_date": ("DATA FIM CARENCIA",),
+}
+_DATE = re.compile(r"^(\d{2})/(\d{2})/(\d{4})$")
+_NON_DIGIT = re.compile(r"\D")
+
+# Linhas da geração em vigor e data da importação; None sem importação
+PepSource = Optional[Tuple[Iterable[Dict], datetime]]
+
+
+@dataclass
+class PepEntry:
+    """Um exercício de função do arquivo PEP"""
+
+    record_key: str
+    cpf: Optional[str]
+    cpf_core: Optional[str]
+    name: str
+    role: Optional[str] = None
+    role_acronym: Optional[str] = None
+    role_level: Optional[str] = None
+    agency: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    grace_end_date: Optional[str] = None
+
+    def to_row(self) -> Dict:
+        return asdict(self)
+
+
+def _parse_date(value: str) -> Optional[str]:
+    """dd/mm/aaaa (ou aaaa-mm-dd) em ISO; None para vazio/"Não informada" """
+    value = value.strip()
+    match = _DATE.match(value)
+    if match:
+        day, month, year = match.groups()
+        value = f"{year}-{month}-{day}"
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        return None
+
+
+def parse_pep_dump(data: bytes) -> List[PepEntry]:
+    """
+    Registros do arquivo PEP (ZIP ou CSV)
+
+    Raises:
+        ValueError se o arquivo não tiver as colunas de CPF e nome
+    """
+    reader = csv.reader(io.StringIO(_csv_text(data)), delimiter=";")
+    try:
+        headers = next(reader)
+    except StopIteration:
+        return []
+    normalized = [_normalize_header(h).replace("_", " ") for h in headers]
+    positions = {
+        field: next((normalized.index(column) for column in columns if column in normalized), None)
+        for field, columns in _COLUMNS.items()
+    }
+    if positions["cpf"] is None or positions["name"] is None:
+        raise ValueError(f"Arquivo PEP sem colunas de CPF e nome: {headers}")
+
+    entries: Dict[str, PepEntry] = {}
+    for values in reader:
+        if not any(v.strip() for v in values):
+            continue
+        row = {
+            field: (values[index].strip() if index is not None and index < len(values) else "")
+            for field, index in positions.items()
+        }
+        if not row["name"]:
+            continue
+        raw = row["cpf"]
+        digits = _NON_DIGIT.sub("", raw)
+        full = digits if len(digits) == 11 and "*" not in raw else None
+        key = record_key("pep", dict(zip(normalized, values)))
+        entries[key] = PepEntry(
+            record_key=key,
+            cpf=full,
+            cpf_core=full[3:9] if full else cpf_core(raw),
+            name=row["name"],
+            role=row["role"] or None,
+            role_acronym=row["role_acronym"] or None,
+            role_level=row["role_level"] or None,
+            agency=row["agency"] or None,
+            start_date=_parse_date(row["start_date"]),
+            end_date=_parse_date(row["end_date"]),
+            grace_end_date=_parse_date(row["grace_end_date"]),
+        )
+    return list(entries.values())
+
+
+def download_pep_dump(month: Optional[date] = None) -> bytes:
+    """Baixa o arquivo do mês (padrão: o atual) em SANCTIONS_DUMPS_URL/pep/<AAAAMM>"""
+    month = month or date.today()
+    url = f"{settings.SANCTIONS_DUMPS_URL.rstrip('/')}/pep/{month:%Y%m}"
+    response = requests.get(url, timeout=settings.SANCTIONS_DUMP_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return response.content
+
+
+def load_pep_dump(source: Union[str, bytes, None] = None, month: Optional[date] = None) -> List[PepEntry]:
+    """Registros do arquivo PEP a partir de um arquivo, dos bytes ou do Portal"""
+    if isinstance(source, bytes):
+        data = source
+    elif source:
+        with open(source, "rb") as f:
+            data = f.read()
+    else:
+        data = download_pep_dump(month)
+    return parse_pep_dump(data)
+
+
+# ---------- Índice em memória ----------
+
+_ENTRY_FIELDS = (
+    "name", "cpf", "cpf_core", "role", "role_acronym", "role_level",
+    "agency", "start_date", "end_date", "grace_end_date",
+)
+
+
+def _text(value) -> Optional[str]:
+    if value is None:
+        return None
+    return value.isoformat() if isinstance(value, (date, datetime)) else str(value)
+
+
+class PepIndex:
+    """Registros PEP em vigor com dicts por CPF completo, dígitos centrais e nome normalizado"""
+
+    def __init__(self, rows: Iterable[Dict], today: Optional[date] = None):
+        """
+        Args:
+            rows: Registros da geração (cpf, cpf_core, name, role...)
+            today: Data de referência da carência (padrão: hoje)
+        """
+        today_iso = (today or date.today()).isoformat()
+        self.entries: List[Tuple] = []
+        self.names: List[str] = []
+        by_cpf: Dict[str, List[int]] = defaultdict(list)
+        by_core: Dict[str, List[int]] = defaultdict(list)
+        by_name: Dict[str, List[int]] = defaultdict(list)
+        for row in rows:
+            entry = tuple(_text(row.get(field)) for field in _ENTRY_FIELDS)
+            grace_end = entry[-1]
+            if grace_end and grace_end < today_iso:
+                continue
+            cpf = entry[1]
+            core = entry[2] or (cpf[3:9] if cpf else None)
+            if not core:
+                continue
+            position = len(self.entries)
+            self.entries.append(entry)
+            self.names.append(normalize_name(entry[0]))
+            if cpf:
+                by_cpf[cpf].append(position)
+            by_core[core].append(position)
+            by_name[self.names[-1]].append(position)
+        # Tuplas: menos memória e imutáveis depois da troca
+        self.by_cpf = {key: tuple(value) for key, value in by_cpf.items()}
+        self.by_core = {key: tuple(value) for key, value in by_core.items()}
+        self.by_name = {key: tuple(value) for key, value in by_name.items()}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def entry(self, position: int, match_type: str) -> Dict:
+        return {**dict(zip(_ENTRY_FIELDS, self.entries[position])), "match_type": match_type}
+
+    def lookup(self, cpf: str, name: Optional[str] = None) -> Tuple[Optional[str], List[int]]:
+        """
+        Registros do CPF (limpo, 11 dígitos)
+
+        Returns:
+            (tipo de ocorrência, posições): cpf, cpf_core_name, cpf_core ou
+            (None, [])
+        """
+        exact = self.by_cpf.get(cpf)
+        if exact:
+            return "cpf", list(exact)
+        # Registros com o CPF completo diferente são de outra pessoa
+        candidates = [i for i in self.by_core.get(cpf[3:9], ()) if not self.entries[i][1]]
+        if not candidates:
+            return None, []
+        if name:
+            normalized = normalize_name(name)
+            same_name = set(self.by_name.get(normalized, ()))
+            confirmed = [i for i in candidates if i in same_name] or [
+                i for i in candidates if similarity(normalized, self.names[i]) >= settings.NAME_SCREENING_MIN_SCORE
+            ]
+            if confirmed:
+                return "cpf_core_name", confirmed
+        return "cpf_core", candidates
+
+
+class PepList:
+    """Índice PEP do processo (reconstruído a partir da última geração importada)"""
+
+    def __init__(self):
+        self._loader: Optional[Callable[[], PepSource]] = None
+        self._index: Optional[PepIndex] = None
+        self._imported_at: Optional[datetime] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._reloading = False
+
+    def set_loader(self, loader: Optional[Callable[[], PepSource]]) -> None:
+        """Função que lê a geração em vigor (ver PepStore.source)"""
+        self._loader = loader
+
+    def reload(self) -> bool:
+        """
+        Reconstrói o índice a partir da última geração importada
+
+        Returns:
+            True se o índice ficou disponível
+        """
+        loader = self._loader
+        if not settings.PEP_SCREENING_ENABLED or loader is None:
+            return False
+        try:
+            source = loader()
+        except Exception as e:
+            # Mantém o índice anterior (se houver) até a próxima tentativa
+            print(f"Erro ao carregar a lista PEP: {str(e)}")
+            self._loaded_at = time.monotonic()
+            return self._index is not None
+        if source is None:
+            self._swap(None, None)
+            return False
+
+        rows, imported_at = source
+        started = time.perf_counter()
+        index = PepIndex(rows)
+        self._swap(index, imported_at)
+        print(f"Lista PEP: {len(index)} registros em vigor, índice construído em {time.perf_counter() - started:.1f} s")
+        return True
+
+    def _swap(self, index: Optional[PepIndex], imported_at: Optional[datetime]) -> None:
+        with self._lock:
+            self._index, self._imported_at = index, imported_at
+            self._loaded_at = time.monotonic()
+        _entries.set(len(index) if index else 0)
+
+    def reload_async(self, *_args) -> None:
+        """Reconstrói em outra thread (callback do NOTIFY; uma reconstrução por vez)"""
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+
+        def run() -> None:
+            try:
+                self.reload()
+            finally:
+                with self._lock:
+                    self._reloading = False
+
+        threading.Thread(target=run, name="pep-list-reload", daemon=True).start()
+
+    def _usable(self) -> Optional[PepIndex]:
+        with self._lock:
+            index, imported_at, loaded_at = self._index, self._imported_at, self._loaded_at
+        if self._loader and time.monotonic() - loaded_at > settings.PEP_RELOAD_SECONDS:
+            self.reload_async()
+        if index is None or not settings.PEP_SCREENING_ENABLED:
+            return None
+        age_days = (datetime.now(timezone.utc) - imported_at).total_seconds() / 86400
+        return index if age_days <= settings.PEP_MAX_AGE_DAYS else None
+
+    def screen_cpf(self, cpf: str, name: Optional[str] = None) -> Dict:
+        """
+        Consulta o CPF na lista PEP
+
+        Args:
+            cpf: CPF limpo (11 dígitos)
+            name: Nome informado (confirma a ocorrência pelos dígitos centrais)
+
+        Returns:
+            Dict com available, is_pep (confirmado), match (cpf,
+            cpf_core_name, cpf_core ou None), matches (registros com
+            função, órgão e datas) e imported_at
+        """
+        index = self._usable()
+        if index is None:
+            _lookups.inc(outcome="unavailable")
+            return {"available": False, "is_pep": False, "match": None, "matches": []}
+        match, positions = index.lookup(cpf, name)
+        is_pep = match in ("cpf", "cpf_core_name")
+        _lookups.inc(outcome="pep" if is_pep else "possible" if match else "clear")
+        return {
+            "available": True,
+            "is_pep": is_pep,
+            "match": match,
+            "matches": [index.entry(position, match) for position in positions],
+            "imported_at": self._imported_at.isoformat() if self._imported_at else None,
+        }
+
+
+pep_list = PepList()
+
+
+# ---------- Importação ----------
+
+class PepStore:
+    """Gerações da lista PEP (Postgres direto ou PostgREST)"""
+
+    def __init__(self, client: Optional[Client] = None):
+        self.client = client
+
+    def start_import(self, source: Optional[str]) -> str:
+        db = get_database()
+        if db:
+            return pg_queries.insert_pep_import(db, source)
+        response = self.client.table("pep_imports").insert({"source": source}).execute()
+        return response.data[0]["id"]
+
+    def write(self, import_id: str, entries: List[PepEntry]) -> int:
+        rows = [entry.to_row() for entry in entries]
+        db = get_database()
+        if db:
+            return sum(
+                pg_queries.insert_pep_entries(db, import_id, rows[i:i + _PG_CHUNK])
+                for i in range(0, len(rows), _PG_CHUNK)
+            )
+        table = self.client.table("pep_entries")
+        for i in range(0, len(rows), _CHUNK):
+            chunk = [{**row, "import_id": import_id} for row in rows[i:i + _CHUNK]]
+            table.upsert(chunk, on_conflict="import_id,record_key", ignore_duplicates=True).execute()
+        return len(rows)
+
+    def finish_import(self, import_id: str, fields: Dict) -> None:
+        db = get_database()
+        if db:
+            pg_queries.finish_pep_import(db, import_id, fields)
+            return
+        (
+            self.client.table("pep_imports")
+            .update({**fields, "finished_at": datetime.now(timezone.utc).isoformat()})
+            .eq("id", import_id)
+            .execute()
+        )
+
+    def prune(self, keep: int = 2) -> None:
+        """Remove as gerações antigas; a anterior fica para quem ainda está carregando"""
+        db = get_database()
+        if db:
+            pg_queries.prune_pep_imports(db, keep)
+            return
+        table = self.client.table("pep_imports")
+        kept = (
+            table.select("id").eq("status", "completed")
+            .order("finished_at", desc=True).limit(keep).execute()
+        ).data or []
+        stale = table.select("id").neq("status", "running").execute().data or []
+        ids = [row["id"] for row in stale if row["id"] not in {k["id"] for k in kept}]
+        for i in range(0, len(ids), _CHUNK):
+            table.delete().in_("id", ids[i:i + _CHUNK]).execute()
+
+    def source(self) -> PepSource:
+        """Registros em vigor da última geração completa e a data da importação"""
+        db = get_database()
+        if db:
+            latest = pg_queries.latest_pep_import(db)
+            if not latest:
+                return None
+            return pg_queries.pep_entries(db, latest["id"]), latest["finished_at"]
+
+        response = (
+            self.client.table("pep_imports").select("id,finished_at")
+            .eq("status", "completed")
+            .order("finished_at", desc=True).limit(1).execute()
+        )
+        if not response.data:
+            return None
+        latest = response.data[0]
+        today = date.today().isoformat()
+        rows, offset = [], 0
+        while True:
+            page = (
+                self.client.table("pep_entries")
+                .select(",".join(_ENTRY_FIELDS))
+                .eq("import_id", latest["id"])
+                .or_(f"grace_end_date.is.null,grace_end_date.gte.{today}")
+                .order("record_key")
+                .range(offset, offset + 999)
+                .execute()
+            ).data or []
+            rows += page
+            if len(page) < 1000:
+                return rows, datetime.fromisoformat(latest["finished_at"])
+            offset += 1000
+
+    def notify_changed(self) -> None:
+        """Reconstrói o índice deste processo e avisa os demais"""
+        pep_list.reload()
+        db = get_database()
+        if db:
+            db.execute("SELECT pg_notify($1, $2)", PEP_CHANNEL, "pep")
+
+
+class PepImporter:
+    """Importa o arquivo PEP como uma nova geração"""
+
+    def __init__(self, store: Optional[PepStore] = None, client: Optional[Client] = None):
+        self.store = store or PepStore(client)
+
+    def ingest(self, entries: List[PepEntry], source: Optional[str] = None) -> Dict:
+        """
+        Grava os registros do arquivo como a geração em vigor
+
+        Args:
+            entries: Registros do arquivo (load_pep_dump)
+            source: Origem do arquivo (caminho/URL) para o histórico
+
+        Returns:
+            Dict com success, import_id e records
+        """
+        import_id = self.store.start_import(source)
+        try:
+            if not entries:
+                raise ValueError("Arquivo PEP sem registros")
+            records = self.store.write(import_id, entries)
+            self.store.finish_import(import_id, {"status": "completed", "records": records})
+            _imports.inc(status="completed")
+        except Exception as e:
+            print(f"Erro na importação da lista PEP: {str(e)}")
+            try:
+                self.store.finish_import(import_id, {"status": "failed", "error": str(e)})
+            except Exception as finish_error:
+                print(f"Erro ao registrar falha da importação: {str(finish_error)}")
+            _imports.inc(status="failed")
+            return {"success": False, "import_id": import_id, "error": str(e)}
+
+        try:
+            self.store.prune()
+            self.store.notify_changed()
+        except Exception as e:
+            # Os índices também são reconstruídos a cada PEP_RELOAD_SECONDS
+            print(f"Aviso: processos não avisados da importação PEP: {str(e)}")
+        return {"success": True, "import_id": import_id, "records": records}
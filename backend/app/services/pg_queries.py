@@ -0,0 +1,786 @@
+"""
+Consultas SQL - Backend Postgres Direto
+========================================
+Implementação em SQL dos caminhos quentes usados pelos serviços quando
+DATABASE_URL está configurada (ver core/database.py). Cada função recebe o
+PgDatabase e devolve os mesmos formatos que a versão via PostgREST
+(UUIDs e datas como string, jsonb como dict).
+"""
+
+import datetime
+import decimal
+import re
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.database import PgDatabase
+
+_IDENTIFIER = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def _jsonable(value):
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+
+def _row(row: Dict) -> Dict:
+    return {key: _jsonable(value) for key, value in row.items()}
+
+
+def _columns(records: Iterable[Dict]) -> List[str]:
+    """Colunas presentes nos registros (ordem da primeira ocorrência), validadas"""
+    columns: Dict[str, None] = {}
+    for record in records:
+        for key in record:
+            if not _IDENTIFIER.match(key):
+                raise ValueError(f"Coluna invalida: {key}")
+            columns[key] = None
+    return list(columns)
+
+
+def _paginated(db: PgDatabase, query: str, count_query: str, args: List) -> Tuple[List[Dict], int]:
+    """Página + total em uma consulta (count(*) OVER ()); conta à parte se a página vier vazia"""
+    rows = db.fetch(query, *args)
+    if rows:
+        total = rows[0]["_total"]
+    else:
+        total = db.fetchval(count_query, *args[:-2])
+    return [_row({k: v for k, v in row.items() if k != "_total"}) for row in rows], total or 0
+
+
+# ============================================
+# Dossiês
+# ============================================
+
+def list_dossiers(db: PgDatabase, company_id: str, offset: int, limit: int) -> Tuple[List[Dict], int]:
+    """Dossiês da empresa (mais recentes primeiro) e total"""
+    return _paginated(
+        db,
+        """
+        SELECT d.*, count(*) OVER () AS _total
+        FROM public.dossiers d
+        WHERE d.company_id = $1::uuid
+        ORDER BY d.created_at DESC
+        OFFSET $2 LIMIT $3
+        """,
+        "SELECT count(*) FROM public.dossiers WHERE company_id = $1::uuid",
+        [company_id, offset, limit],
+    )
+
+
+def insert_dossiers(db: PgDatabase, records: List[Dict]) -> List[str]:
+    """
+    Insere dossiês em uma única instrução (transação implícita)
+
+    Args:
+        db: Backend Postgres
+        records: Registros com as colunas da tabela (incluindo id)
+
+    Returns:
+        IDs inseridos
+    """
+    if not records:
+        return []
+    columns = ", ".join(_columns(records))
+    rows = db.fetch(
+        f"""
+        INSERT INTO public.dossiers ({columns})
+        SELECT {columns} FROM jsonb_populate_recordset(NULL::public.dossiers, $1::jsonb)
+        RETURNING id
+        """,
+        records,
+    )
+    return [str(row["id"]) for row in rows]
+
+
+def set_dossier_ai_analysis(db: PgDatabase, dossier_id: str, company_id: str, status: str, analysis: str) -> None:
+    """Grava ai_status/ai_analysis no report_data em uma instrução (sem read-modify-write)"""
+    db.execute(
+        """
+        UPDATE public.dossiers
+        SET report_data = jsonb_set(
+                jsonb_set(COALESCE(report_data, '{}'::jsonb), '{ai_status}', to_jsonb($3::text)),
+                '{ai_analysis}', to_jsonb($4::text)
+            )
+        WHERE id = $1::uuid AND company_id = $2::uuid
+        """,
+        dossier_id, company_id, status, analysis,
+    )
+
+
+# ============================================
+# Monitoramento
+# ============================================
+
+def list_monitoring_targets(
+    db: PgDatabase,
+    company_id: Optional[str],
+    doc_type: Optional[str],
+    offset: int,
+    limit: int
+) -> Tuple[List[Dict], int]:
+    """Registros monitorados (mais recentes primeiro) e total"""
+    conditions = []
+    args: List = []
+    if company_id:
+        args.append(company_id)
+        conditions.append(f"company_id = ${len(args)}::uuid")
+    if doc_type:
+        args.append(doc_type)
+        conditions.append(f"doc_type = ${len(args)}")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    return _paginated(
+        db,
+        f"""
+        SELECT t.*, count(*) OVER () AS _total
+        FROM public.monitoring_targets t
+        {where}
+        ORDER BY t.created_at DESC
+        OFFSET ${len(args) + 1} LIMIT ${len(args) + 2}
+        """,
+        f"SELECT count(*) FROM public.monitoring_targets {where}",
+        args + [offset, limit],
+    )
+
+
+def monitoring_stats(db: PgDatabase, company_id: str) -> Dict[str, int]:
+    """Contagens do monitoramento em uma única varredura"""
+    row = db.fetchrow(
+        """
+        SELECT
+            count(*) AS total,
+            count(*) FILTER (
+                WHERE jsonb_typeof(data_json->'restriction_count') = 'number'
+                  AND (data_json->>'restriction_count')::numeric > 0
+            ) AS with_restrictions,
+            count(*) FILTER (WHERE current_status = 'ATIVO') AS active,
+            count(*) FILTER (WHERE doc_type = 'CPF') AS cpf,
+            count(*) FILTER (WHERE doc_type = 'CNPJ') AS cnpj
+        FROM public.monitoring_targets
+        WHERE company_id = $1::uuid
+        """,
+        company_id,
+    )
+    return dict(row) if row else {"total": 0, "with_restrictions": 0, "active": 0, "cpf": 0, "cnpj": 0}
+
+
+def find_monitoring_target(db: PgDatabase, company_id: str, document: str) -> Optional[Dict]:
+    """Registro da empresa para o documento (id e data_json), se existir"""
+    row = db.fetchrow(
+        """
+        SELECT id, data_json
+        FROM public.monitoring_targets
+        WHERE company_id = $1::uuid AND document = $2
+        """,
+        company_id, document,
+    )
+    return _row(row) if row else None
+
+
+def monitoring_refresh_targets(db: PgDatabase, company_id: str) -> List[Dict]:
+    """Registros da empresa com os campos usados pelo refresh"""
+    rows = db.fetch(
+        """
+        SELECT document, doc_type, data_json
+        FROM public.monitoring_targets
+        WHERE company_id = $1::uuid
+        """,
+        company_id,
+    )
+    return [_row(row) for row in rows]
+
+
+def update_monitoring_targets(
+    db: PgDatabase,
+    company_id: str,
+    updates: List[Dict],
+    owner: Optional[str] = None
+) -> int:
+    """
+    Grava o resultado do refresh de vários registros em uma única instrução
+
+    Args:
+        db: Backend Postgres
+        company_id: ID da empresa
+        updates: Itens {document, data_json, current_status}
+        owner: Dono do lease (refresh contínuo): só grava os registros sem
+            lease ou com lease dele, e libera o lease; sem owner (atualização
+            pedida pelo usuário) o lease fica como está
+
+    Returns:
+        Quantidade de registros atualizados
+    """
+    if not updates:
+        return 0
+    status = db.execute(
+        """
+        UPDATE public.monitoring_targets AS t
+        SET data_json = u.data_json, current_status = u.current_status, refreshed_at = NOW(),
+            lease_owner = CASE WHEN $3::text IS NULL THEN t.lease_owner END,
+            lease_expires_at = CASE WHEN $3::text IS NULL THEN t.lease_expires_at END
+        FROM jsonb_to_recordset($2::jsonb) AS u(document text, data_json jsonb, current_status text)
+        WHERE t.company_id = $1::uuid AND t.document = u.document
+          AND ($3::text IS NULL OR t.lease_owner IS NULL OR t.lease_owner = $3::text)
+        """,
+        company_id,
+        updates,
+        owner,
+    )
+    return int(status.split()[-1])
+
+
+def claim_monitoring_targets(
+    db: PgDatabase,
+    owner: str,
+    limit: int,
+    lease_seconds: float,
+    due_before: datetime.datetime,
+    company_id: Optional[str] = None
+) -> List[Dict]:
+    """Lote de registros vencidos com lease para `owner` (migrations/010)"""
+    rows = db.fetch(
+        "SELECT * FROM public.claim_monitoring_targets($1, $2, $3, $4, $5::uuid)",
+        owner,
+        limit,
+        lease_seconds,
+        due_before,
+        company_id,
+    )
+    return [_row(row) for row in rows]
+
+
+def renew_target_leases(db: PgDatabase, owner: str, target_ids: List[str], lease_seconds: float) -> int:
+    """Renova os leases de `owner`; retorna quantos ainda são dele"""
+    return db.fetchval(
+        "SELECT public.renew_monitoring_target_leases($1, $2::uuid[], $3)",
+        owner,
+        target_ids,
+        lease_seconds,
+    )
+
+
+def release_target_leases(db: PgDatabase, owner: str, target_ids: List[str], retry_seconds: float) -> int:
+    """Devolve registros que falharam, pegáveis de novo após `retry_seconds`"""
+    return db.fetchval(
+        "SELECT public.release_monitoring_target_leases($1, $2::uuid[], $3)",
+        owner,
+        target_ids,
+        retry_seconds,
+    )
+
+
+# ============================================
+# Snapshot das listas de sanções (migrations/011)
+# ============================================
+
+def sanctions_snapshot(db: PgDatabase, list_name: str) -> Dict[str, Dict]:
+    """record_key -> {document, cpf_core} do snapshot atual da lista"""
+    rows = db.fetch(
+        "SELECT record_key, document, cpf_core FROM public.sanctions_entries WHERE list_name = $1",
+        list_name,
+    )
+    return {row["record_key"]: {"document": row["document"], "cpf_core": row["cpf_core"]} for row in rows}
+
+
+def apply_sanctions_delta(db: PgDatabase, list_name: str, added: List[Dict], removed_keys: List[str]) -> None:
+    """Troca o snapshot da lista pelo do dump novo em uma única instrução"""
+    db.execute(
+        """
+        WITH removed AS (
+            DELETE FROM public.sanctions_entries
+            WHERE list_name = $1 AND record_key = ANY($2::text[])
+        ),
+        added AS (
+            INSERT INTO public.sanctions_entries (list_name, record_key, document, doc_type, cpf_core, name, payload)
+            SELECT $1, a.record_key, a.document, a.doc_type, a.cpf_core, a.name, a.payload
+            FROM jsonb_to_recordset($3::jsonb)
+                AS a(record_key text, document text, doc_type text, cpf_core text, name text, payload jsonb)
+            ON CONFLICT (list_name, record_key) DO NOTHING
+        )
+        UPDATE public.sanctions_entries
+        SET last_seen_at = NOW()
+        WHERE list_name = $1 AND record_key <> ALL($2::text[])
+        """,
+        list_name,
+        removed_keys,
+        added,
+    )
+
+
+def sanctions_filter_rows(db: PgDatabase) -> List[Dict]:
+    """Documentos distintos do snapshot (todas as listas) para o filtro negativo"""
+    rows = db.fetch(
+        """
+        SELECT DISTINCT document, doc_type, cpf_core
+        FROM public.sanctions_entries
+        WHERE doc_type IS NOT NULL
+        """
+    )
+    return [dict(row) for row in rows]
+
+
+def sanctions_names(db: PgDatabase) -> List[Dict]:
+    """Registros do snapshot com nome, para o índice de triagem por nome"""
+    rows = db.fetch(
+        """
+        SELECT list_name, record_key, name, document, cpf_core
+        FROM public.sanctions_entries
+        WHERE name IS NOT NULL
+        """
+    )
+    return [dict(row) for row in rows]
+
+
+def sanctions_imported_at(db: PgDatabase) -> Dict[str, datetime.datetime]:
+    """Última importação concluída de cada lista"""
+    rows = db.fetch(
+        """
+        SELECT list_name, max(finished_at) AS finished_at
+        FROM public.sanctions_list_imports
+        WHERE status = 'completed'
+        GROUP BY list_name
+        """
+    )
+    return {row["list_name"]: row["finished_at"] for row in rows}
+
+
+def targets_for_documents(db: PgDatabase, documents: List[str], cpf_cores: List[str]) -> List[Dict]:
+    """
+    Índice reverso: registros monitorados (todas as empresas) com os
+    documentos ou, para CPF mascarado, com os dígitos centrais
+    """
+    if not documents and not cpf_cores:
+        return []
+    rows = db.fetch(
+        """
+        SELECT id, company_id, document, doc_type, data_json
+        FROM public.monitoring_targets
+        WHERE document = ANY($1::text[])
+        UNION
+        SELECT id, company_id, document, doc_type, data_json
+        FROM public.monitoring_targets
+        WHERE doc_type = 'CPF' AND substr(document, 4, 6) = ANY($2::text[])
+        """,
+        documents,
+        cpf_cores,
+    )
+    return [_row(row) for row in rows]
+
+
+def flag_targets_for_rescreen(
+    db: PgDatabase,
+    target_ids: List[str],
+    owner: Optional[str] = None,
+    lease_seconds: float = 0
+) -> List[Dict]:
+    """
+    Registros afetados por um delta de sanções voltam para o início da fila
+    do refresh contínuo (migrations/010); com `owner`, os que estão sem lease
+    válido ficam reservados para ele (claimed=True)
+    """
+    rows = db.fetch(
+        """
+        UPDATE public.monitoring_targets t
+        SET refreshed_at = NULL,
+            lease_owner = CASE WHEN free AND $2::text IS NOT NULL THEN $2::text ELSE t.lease_owner END,
+            lease_expires_at = CASE WHEN free AND $2::text IS NOT NULL
+                THEN clock_timestamp() + make_interval(secs => $3) ELSE t.lease_expires_at END
+        FROM (
+            SELECT id, (lease_expires_at IS NULL OR lease_expires_at < clock_timestamp()) AS free
+            FROM public.monitoring_targets
+            WHERE id = ANY($1::uuid[])
+            FOR UPDATE
+        ) f
+        WHERE t.id = f.id
+        RETURNING t.id, t.company_id, t.document, t.doc_type, t.data_json,
+                  (f.free AND $2::text IS NOT NULL) AS claimed
+        """,
+        target_ids,
+        owner,
+        lease_seconds,
+    )
+    return [_row(row) for row in rows]
+
+
+def last_sanctions_import(db: PgDatabase, list_name: str) -> Optional[Dict]:
+    row = db.fetchrow(
+        """
+        SELECT * FROM public.sanctions_list_imports
+        WHERE list_name = $1 AND status = 'completed'
+        ORDER BY created_at DESC
+        LIMIT 1
+        """,
+        list_name,
+    )
+    return _row(row) if row else None
+
+
+def insert_sanctions_import(db: PgDatabase, list_name: str, source: Optional[str]) -> str:
+    return str(db.fetchval(
+        "INSERT INTO public.sanctions_list_imports (list_name, source) VALUES ($1, $2) RETURNING id",
+        list_name,
+        source,
+    ))
+
+
+def finish_sanctions_import(db: PgDatabase, import_id: str, fields: Dict) -> None:
+    """Encerra a importação com os contadores do delta (status, records, added...)"""
+    columns = [column for column in fields if _IDENTIFIER.match(column)]
+    assignments = ", ".join(f"{column} = ${i + 2}" for i, column in enumerate(columns))
+    db.execute(
+        f"UPDATE public.sanctions_list_imports SET {assignments}, finished_at = NOW() WHERE id = $1::uuid",
+        import_id,
+        *[fields[column] for column in columns],
+    )
+
+
+# ============================================
+# Triagem da carteira contra as listas (migrations/012)
+# ============================================
+
+def screening_portfolio(db: PgDatabase, company_id: Optional[str] = None) -> List[Dict]:
+    """Documentos de dossiês e registros monitorados (da empresa ou de todas)"""
+    rows = db.fetch(
+        """
+        SELECT 'dossier' AS source, id::text AS subject_id, company_id::text AS company_id,
+               document_value AS document, document_type AS doc_type
+        FROM public.dossiers
+        WHERE $1::uuid IS NULL OR company_id = $1::uuid
+        UNION ALL
+        SELECT 'monitoring', id::text, company_id::text, document, doc_type
+        FROM public.monitoring_targets
+        WHERE $1::uuid IS NULL OR company_id = $1::uuid
+        """,
+        company_id,
+    )
+    return [dict(row) for row in rows]
+
+
+def screening_entries(db: PgDatabase) -> List[Dict]:
+    """Registros do snapshot das listas com documento ou CPF mascarado"""
+    rows = db.fetch(
+        """
+        SELECT list_name, record_key, document, doc_type, cpf_core, name
+        FROM public.sanctions_entries
+        WHERE document IS NOT NULL OR cpf_core IS NOT NULL
+        """
+    )
+    return [dict(row) for row in rows]
+
+
+def insert_screening_run(db: PgDatabase, company_id: Optional[str]) -> str:
+    return str(db.fetchval(
+        "INSERT INTO public.sanctions_screening_runs (company_id) VALUES ($1::uuid) RETURNING id",
+        company_id,
+    ))
+
+
+def insert_screening_hits(db: PgDatabase, run_id: str, hits: List[Dict]) -> int:
+    """Grava as ocorrências da triagem em uma única instrução"""
+    if not hits:
+        return 0
+    status = db.execute(
+        """
+        INSERT INTO public.sanctions_screening_hits
+            (run_id, company_id, source, subject_id, document, doc_type, list_name, record_key, match_type, name)
+        SELECT $1::uuid, h.company_id, h.source, h.subject_id, h.document, h.doc_type,
+               h.list_name, h.record_key, h.match_type, h.name
+        FROM jsonb_to_recordset($2::jsonb) AS h(
+            company_id uuid, source text, subject_id uuid, document text, doc_type text,
+            list_name text, record_key text, match_type text, name text
+        )
+        """,
+        run_id,
+        hits,
+    )
+    return int(status.split()[-1])
+
+
+def finish_screening_run(db: PgDatabase, run_id: str, fields: Dict) -> None:
+    """Encerra a triagem com os volumes e a vazão (status, hits, rows_per_second...)"""
+    columns = [column for column in fields if _IDENTIFIER.match(column)]
+    assignments = ", ".join(f"{column} = ${i + 2}" for i, column in enumerate(columns))
+    db.execute(
+        f"UPDATE public.sanctions_screening_runs SET {assignments}, finished_at = NOW() WHERE id = $1::uuid",
+        run_id,
+        *[fields[column] for column in columns],
+    )
+
+
+# ============================================
+# Lista PEP (migrations/013)
+# ============================================
+
+def insert_pep_import(db: PgDatabase, source: Optional[str]) -> str:
+    return str(db.fetchval("INSERT INTO public.pep_imports (source) VALUES ($1) RETURNING id", source))
+
+
+def insert_pep_entries(db: PgDatabase, import_id: str, entries: List[Dict]) -> int:
+    """Grava os registros da geração em uma única instrução"""
+    if not entries:
+        return 0
+    status = db.execute(
+        """
+        INSERT INTO public.pep_entries
+            (import_id, record_key, cpf, cpf_core, name, role, role_acronym, role_level,
+             agency, start_date, end_date, grace_end_date)
+        SELECT $1::uuid, e.record_key, e.cpf, e.cpf_core, e.name, e.role, e.role_acronym, e.role_level,
+               e.agency, e.start_date, e.end_date, e.grace_end_date
+        FROM jsonb_to_recordset($2::jsonb) AS e(
+            record_key text, cpf text, cpf_core text, name text, role text, role_acronym text,
+            role_level text, agency text, start_date date, end_date date, grace_end_date date
+        )
+        ON CONFLICT (import_id, record_key) DO NOTHING
+        """,
+        import_id,
+        entries,
+    )
+    return int(status.split()[-1])
+
+
+def finish_pep_import(db: PgDatabase, import_id: str, fields: Dict) -> None:
+    """Encerra a importação (status, records, error)"""
+    columns = [column for column in fields if _IDENTIFIER.match(column)]
+    assignments = ", ".join(f"{column} = ${i + 2}" for i, column in enumerate(columns))
+    db.execute(
+        f"UPDATE public.pep_imports SET {assignments}, finished_at = NOW() WHERE id = $1::uuid",
+        import_id,
+        *[fields[column] for column in columns],
+    )
+
+
+def prune_pep_imports(db: PgDatabase, keep: int = 2) -> int:
+    """Remove as gerações antigas (e as que falharam), mantendo as `keep` últimas completas"""
+    status = db.execute(
+        """
+        DELETE FROM public.pep_imports
+        WHERE status <> 'running'
+          AND id NOT IN (
+              SELECT id FROM public.pep_imports
+              WHERE status = 'completed'
+              ORDER BY finished_at DESC
+              LIMIT $1
+          )
+        """,
+        keep,
+    )
+    return int(status.split()[-1])
+
+
+def latest_pep_import(db: PgDatabase) -> Optional[Dict]:
+    """Última geração completa da lista PEP"""
+    row = db.fetchrow(
+        """
+        SELECT id::text AS id, records, finished_at
+        FROM public.pep_imports
+        WHERE status = 'completed'
+        ORDER BY finished_at DESC
+        LIMIT 1
+        """
+    )
+    return dict(row) if row else None
+
+
+def pep_entries(db: PgDatabase, import_id: str) -> List[Dict]:
+    """Registros ainda em vigor (carência não encerrada) de uma geração"""
+    rows = db.fetch(
+        """
+        SELECT cpf, cpf_core, name, role, role_acronym, role_level, agency,
+               start_date, end_date, grace_end_date
+        FROM public.pep_entries
+        WHERE import_id = $1::uuid
+          AND (grace_end_date IS NULL OR grace_end_date >= CURRENT_DATE)
+        """,
+        import_id,
+    )
+    return [dict(row) for row in rows]
+
+
+# ============================================
+# Jobs de atualização do monitoramento (migrations/009)
+# ============================================
+
+REFRESH_JOB_SUMMARY = """
+    id, company_id, requested_by, status, total, processed, updated, errors,
+    cancel_requested, attempts, error, created_at, started_at, heartbeat_at, finished_at
+"""
+
+
+def open_refresh_job(db: PgDatabase, company_id: str) -> Optional[Dict]:
+    """Job da empresa ainda na fila ou em execução"""
+    row = db.fetchrow(
+        f"""
+        SELECT {REFRESH_JOB_SUMMARY}
+        FROM public.monitoring_refresh_jobs
+        WHERE company_id = $1::uuid AND status IN ('queued', 'running')
+        """,
+        company_id,
+    )
+    return _row(row) if row else None
+
+
+def insert_refresh_job(db: PgDatabase, company_id: str, requested_by: Optional[str]) -> Optional[Dict]:
+    """Novo job na fila (None se a empresa já tem um job aberto)"""
+    row = db.fetchrow(
+        f"""
+        INSERT INTO public.monitoring_refresh_jobs (company_id, requested_by)
+        VALUES ($1::uuid, $2::uuid)
+        ON CONFLICT (company_id) WHERE status IN ('queued', 'running') DO NOTHING
+        RETURNING {REFRESH_JOB_SUMMARY}
+        """,
+        company_id,
+        requested_by,
+    )
+    return _row(row) if row else None
+
+
+def get_refresh_job(db: PgDatabase, company_id: str, job_id: str, with_results: bool = False) -> Optional[Dict]:
+    columns = REFRESH_JOB_SUMMARY + (", results" if with_results else "")
+    row = db.fetchrow(
+        f"SELECT {columns} FROM public.monitoring_refresh_jobs WHERE id = $1::uuid AND company_id = $2::uuid",
+        job_id,
+        company_id,
+    )
+    return _row(row) if row else None
+
+
+def list_refresh_jobs(db: PgDatabase, company_id: str, limit: int) -> List[Dict]:
+    rows = db.fetch(
+        f"""
+        SELECT {REFRESH_JOB_SUMMARY}
+        FROM public.monitoring_refresh_jobs
+        WHERE company_id = $1::uuid
+        ORDER BY created_at DESC
+        LIMIT $2
+        """,
+        company_id,
+        limit,
+    )
+    return [_row(row) for row in rows]
+
+
+def cancel_refresh_job(db: PgDatabase, company_id: str, job_id: str) -> Optional[Dict]:
+    """Job na fila: cancelado na hora; em execução: pedido de cancelamento ao worker"""
+    row = db.fetchrow(
+        f"""
+        UPDATE public.monitoring_refresh_jobs
+        SET cancel_requested = TRUE,
+            status = CASE WHEN status = 'queued' THEN 'cancelled' ELSE status END,
+            finished_at = CASE WHEN status = 'queued' THEN NOW() ELSE finished_at END
+        WHERE id = $1::uuid AND company_id = $2::uuid
+        RETURNING {REFRESH_JOB_SUMMARY}
+        """,
+        job_id,
+        company_id,
+    )
+    return _row(row) if row else None
+
+
+def claim_refresh_job(db: PgDatabase, stale_seconds: float) -> Optional[Dict]:
+    """Próximo job da fila (ou abandonado) para este worker, com o token da reserva (claimed_by)"""
+    row = db.fetchrow(
+        f"SELECT {REFRESH_JOB_SUMMARY}, claimed_by::text AS claimed_by FROM public.claim_monitoring_refresh_job($1)",
+        stale_seconds,
+    )
+    return _row(row) if row else None
+
+
+def save_refresh_job_progress(db: PgDatabase, job_id: str, claimed_by: str, counters: Dict) -> bool:
+    """
+    Grava o progresso e renova o heartbeat (só com o token da reserva atual)
+
+    Returns:
+        True se o cancelamento foi pedido (ou o job não está mais com este worker)
+    """
+    cancel_requested = db.fetchval(
+        """
+        UPDATE public.monitoring_refresh_jobs
+        SET total = $3, processed = $4, updated = $5, errors = $6, heartbeat_at = NOW()
+        WHERE id = $1::uuid AND claimed_by = $2::uuid AND status = 'running'
+        RETURNING cancel_requested
+        """,
+        job_id,
+        claimed_by,
+        counters.get("total", 0),
+        counters.get("processed", 0),
+        counters.get("updated", 0),
+        counters.get("errors", 0),
+    )
+    return cancel_requested is not False
+
+
+def finish_refresh_job(
+    db: PgDatabase,
+    job_id: str,
+    claimed_by: str,
+    status: str,
+    counters: Dict,
+    results: Dict,
+    error: Optional[str] = None
+) -> bool:
+    """Encerra o job; False se ele foi retomado por outro worker (nada gravado)"""
+    finished = db.fetchval(
+        """
+        UPDATE public.monitoring_refresh_jobs
+        SET status = $3, total = $4, processed = $5, updated = $6, errors = $7,
+            results = $8::jsonb, error = $9, finished_at = NOW(), heartbeat_at = NOW()
+        WHERE id = $1::uuid AND claimed_by = $2::uuid AND status = 'running'
+        RETURNING id
+        """,
+        job_id,
+        claimed_by,
+        status,
+        counters.get("total", 0),
+        counters.get("processed", 0),
+        counters.get("updated", 0),
+        counters.get("errors", 0),
+        results,
+        error,
+    )
+    return finished is not None
+
+
+def requeue_refresh_job(db: PgDatabase, job_id: str, claimed_by: str) -> None:
+    """Devolve o job à fila (worker encerrando), se ainda for deste worker"""
+    db.execute(
+        """
+        UPDATE public.monitoring_refresh_jobs
+        SET status = 'queued', heartbeat_at = NULL, claimed_by = NULL
+        WHERE id = $1::uuid AND claimed_by = $2::uuid AND status = 'running'
+        """,
+        job_id,
+        claimed_by,
+    )
+
+
+# ============================================
+# Payloads externos
+# ============================================
+
+def insert_payloads(db: PgDatabase, rows: List[Dict]) -> None:
+    """Grava payloads {hash, payload, size_bytes} (ON CONFLICT DO NOTHING)"""
+    if not rows:
+        return
+    db.execute(
+        """
+        INSERT INTO public.upstream_payloads (hash, payload, size_bytes)
+        SELECT hash, payload, size_bytes
+        FROM jsonb_to_recordset($1::jsonb) AS r(hash text, payload jsonb, size_bytes integer)
+        ON CONFLICT (hash) DO NOTHING
+        """,
+        rows,
+    )
+
+
+def fetch_payloads(db: PgDatabase, hashes: List[str]) -> List[Dict]:
+    """Payloads pelos hashes"""
+    return db.fetch(
+        "SELECT hash, payload FROM public.upstream_payloads WHERE hash = ANY($1::text[])",
+        hashes,
+    )
@@ -0,0 +1,233 @@
+"""
+Triagem da Carteira contra as Listas de Sanções
+===============================================
+Auditoria da carteira inteira (dossiês e registros monitorados) contra o
+snapshot atual das listas (public.sanctions_entries, ver
+services/sanctions_delta.py), sem consultar o Portal documento a documento:
+
+1. carteira e snapshot carregados em DataFrames (pandas)
+2. documentos normalizados de uma vez (só dígitos, CPF com 11 e CNPJ com
+   14 posições)
+3. join vetorizado: por documento completo e, para o CPF mascarado nos
+   dumps (***.456.789-**), pelos dígitos centrais - o mesmo critério do
+   filtro de "***" em kyc_engine.query_sanctions; essas ocorrências ficam
+   como match_type 'cpf_core' (a confirmar pela consulta ao Portal)
+4. ocorrências gravadas em lote (sanctions_screening_hits, migrations/012)
+   com o resumo e a vazão da execução em sanctions_screening_runs
+
+Uso:
+    from app.services.portfolio_screening import PortfolioScreening
+
+    PortfolioScreening().run(company_id)   # None = todas as empresas
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from supabase import Client
+
+from app.core.database import get_database
+from app.core.metrics import metrics
+from app.services import pg_queries
+
+# Itens por requisição no caminho PostgREST
+_PAGE = 1000
+_CHUNK = 500
+
+PORTFOLIO_COLUMNS = ["source", "subject_id", "company_id", "document", "doc_type"]
+ENTRY_COLUMNS = ["list_name", "record_key", "document", "doc_type", "cpf_core", "name"]
+HIT_COLUMNS = [
+    "company_id", "source", "subject_id", "document", "doc_type",
+    "list_name", "record_key", "match_type", "name",
+]
+
+_runs = metrics.counter("sanctions_screening_runs_total", "Triagens da carteira contra as listas de sanções")
+_rows_per_second = metrics.gauge("sanctions_screening_rows_per_second", "Vazão da última triagem da carteira")
+
+
+def normalize_portfolio(portfolio: pd.DataFrame) -> pd.DataFrame:
+    """
+    Documentos da carteira só com dígitos, no tamanho do tipo, e os dígitos
+    centrais do CPF (cpf_core). Sem tipo (dossiês não gravam document_type)
+    o tipo vem da quantidade de dígitos
+    """
+    frame = portfolio.copy()
+    digits = frame["document"].astype("string").str.replace(r"\D", "", regex=True)
+    inferred = pd.Series(np.where(digits.str.len() > 11, "CNPJ", "CPF"), index=frame.index)
+    frame["doc_type"] = frame["doc_type"].where(frame["doc_type"].notna(), inferred)
+    is_cnpj = frame["doc_type"].eq("CNPJ")
+    frame["document"] = np.where(is_cnpj, digits.str.zfill(14), digits.str.zfill(11))
+    frame["cpf_core"] = frame["document"].str.slice(3, 9).where(~is_cnpj)
+    return frame
+
+
+def match_portfolio(portfolio: pd.DataFrame, entries: pd.DataFrame) -> pd.DataFrame:
+    """
+    Join vetorizado da carteira (normalize_portfolio) com o snapshot das listas
+
+    Returns:
+        DataFrame com HIT_COLUMNS, uma linha por (registro da carteira,
+        registro da lista)
+    """
+    full = entries[entries["document"].notna()][["list_name", "record_key", "document", "name"]]
+    exact = portfolio.merge(full, on="document", how="inner")
+    exact["match_type"] = "document"
+
+    masked = entries[entries["document"].isna() & entries["cpf_core"].notna()]
+    masked = masked[["list_name", "record_key", "cpf_core", "name"]]
+    by_core = portfolio[portfolio["doc_type"].eq("CPF")].merge(masked, on="cpf_core", how="inner")
+    by_core["match_type"] = "cpf_core"
+
+    hits = pd.concat([exact, by_core], ignore_index=True)
+    return hits[HIT_COLUMNS]
+
+
+class PortfolioScreening:
+    """Triagem em lote da carteira (Postgres direto ou PostgREST)"""
+
+    def __init__(self, client: Optional[Client] = None):
+        self.client = client
+
+    # ---------- Leitura ----------
+
+    def _pages(self, table: str, columns: str, company_id: Optional[str] = None) -> List[Dict]:
+        rows, offset = [], 0
+        while True:
+            query = self.client.table(table).select(columns)
+            if company_id:
+                query = query.eq("company_id", company_id)
+            page = query.order("id").range(offset, offset + _PAGE - 1).execute().data or []
+            rows += page
+            if len(page) < _PAGE:
+                return rows
+            offset += _PAGE
+
+    def load_portfolio(self, company_id: Optional[str] = None) -> pd.DataFrame:
+        db = get_database()
+        if db:
+            rows = pg_queries.screening_portfolio(db, company_id)
+        else:
+            rows = [
+                {"source": "dossier", "subject_id": r["id"], "company_id": r["company_id"],
+                 "document": r["document_value"], "doc_type": r["document_type"]}
+                for r in self._pages("dossiers", "id,company_id,document_value,document_type", company_id)
+            ] + [
+                {"source": "monitoring", "subject_id": r["id"], "company_id": r["company_id"],
+                 "document": r["document"], "doc_type": r["doc_type"]}
+                for r in self._pages("monitoring_targets", "id,company_id,document,doc_type", company_id)
+            ]
+        return pd.DataFrame.from_records(rows, columns=PORTFOLIO_COLUMNS)
+
+    def load_entries(self) -> pd.DataFrame:
+        db = get_database()
+        if db:
+            rows = pg_queries.screening_entries(db)
+        else:
+            rows, offset = [], 0
+            while True:
+                page = (
+                    self.client.table("sanctions_entries").select(",".join(ENTRY_COLUMNS))
+                    .order("list_name").order("record_key")
+                    .range(offset, offset + _PAGE - 1).execute()
+                ).data or []
+                rows += page
+                if len(page) < _PAGE:
+                    break
+                offset += _PAGE
+        return pd.DataFrame.from_records(rows, columns=ENTRY_COLUMNS)
+
+    # ---------- Gravação ----------
+
+    def _start_run(self, company_id: Optional[str]) -> str:
+        db = get_database()
+        if db:
+            return pg_queries.insert_screening_run(db, company_id)
+        response = self.client.table("sanctions_screening_runs").insert({"company_id": company_id}).execute()
+        return response.data[0]["id"]
+
+    def _write_hits(self, run_id: str, hits: pd.DataFrame) -> None:
+        records = hits.astype(object).where(hits.notna(), None).to_dict("records")
+        db = get_database()
+        if db:
+            pg_queries.insert_screening_hits(db, run_id, records)
+            return
+        table = self.client.table("sanctions_screening_hits")
+        for i in range(0, len(records), _CHUNK):
+            table.insert([{**record, "run_id": run_id} for record in records[i:i + _CHUNK]]).execute()
+
+    def _finish_run(self, run_id: str, fields: Dict) -> None:
+        db = get_database()
+        if db:
+            pg_queries.finish_screening_run(db, run_id, fields)
+            return
+        (
+            self.client.table("sanctions_screening_runs")
+            .update({**fields, "finished_at": datetime.now(timezone.utc).isoformat()})
+            .eq("id", run_id)
+            .execute()
+        )
+
+    # ---------- Execução ----------
+
+    def run(self, company_id: Optional[str] = None) -> Dict:
+        """
+        Triagem da carteira contra o snapshot atual das listas
+
+        Args:
+            company_id: Empresa auditada (None = todas)
+
+        Returns:
+            Dict com success, run_id, portfolio_rows, entries, hits,
+            subjects_hit, elapsed_seconds, rows_per_second e o tempo de cada
+            etapa (timings: load, match, write)
+        """
+        run_id = self._start_run(company_id)
+        started = time.perf_counter()
+        try:
+            portfolio = self.load_portfolio(company_id)
+            entries = self.load_entries()
+            if entries.empty:
+                raise ValueError("Snapshot das listas vazio: importe os dumps (scripts/import_sanctions_dump.py)")
+            loaded = time.perf_counter()
+
+            hits = match_portfolio(normalize_portfolio(portfolio), entries)
+            matched = time.perf_counter()
+
+            self._write_hits(run_id, hits)
+            finished = time.perf_counter()
+
+            elapsed = finished - started
+            fields = {
+                "status": "completed",
+                "portfolio_rows": len(portfolio),
+                "entries": len(entries),
+                "hits": len(hits),
+                "subjects_hit": int(hits[["source", "subject_id"]].drop_duplicates().shape[0]),
+                "elapsed_seconds": round(elapsed, 3),
+                "rows_per_second": round(len(portfolio) / elapsed, 1) if elapsed > 0 else None,
+            }
+            self._finish_run(run_id, fields)
+            _runs.inc(status="completed")
+            if fields["rows_per_second"]:
+                _rows_per_second.set(fields["rows_per_second"])
+            return {
+                "success": True,
+                "run_id": run_id,
+                **fields,
+                "timings": {
+                    "load": round(loaded - started, 3),
+                    "match": round(matched - loaded, 3),
+                    "write": round(finished - matched, 3),
+                },
+            }
+        except Exception as e:
+            print(f"Erro na triagem da carteira: {str(e)}")
+            try:
+                self._finish_run(run_id, {"status": "failed", "error": str(e)})
+            except Exception as finish_error:
+                print(f"Erro ao registrar falha da triagem: {str(finish_error)}")
+            _runs.inc(status="failed")
+            return {"success": False, "run_id": run_id, "error": str(e)}
@@ -0,0 +1,304 @@
+"""
+Jobs de Atualização do Monitoramento
+====================================
+A atualização de todos os registros de uma empresa roda fora da requisição:
+POST /api/monitoring/refresh-jobs grava o job (migrations/009) e responde na
+hora; workers em segundo plano (REFRESH_JOB_WORKERS por instância) pegam os
+jobs da fila e executam monitoring_engine.update_all_records.
+
+- um job aberto por empresa: pedir de novo devolve o job em andamento
+- progresso gravado no job (e publicado em /api/events) a cada
+  REFRESH_JOB_PROGRESS_SECONDS, renovando o heartbeat
+- cancelamento conferido entre registros (o que já foi atualizado fica)
+- instância que cai: o job sem heartbeat há REFRESH_JOB_STALE_SECONDS volta
+  para outro worker (até REFRESH_JOB_MAX_ATTEMPTS tentativas); no shutdown
+  o worker devolve o job à fila
+- cada reserva grava um token (claimed_by, migrations/015): progresso,
+  encerramento e devolução à fila só valem com o token da reserva atual, e
+  o worker que perdeu o job para outro para sem gravar por cima
+- resultados: registros com mudança e falhas (até REFRESH_JOB_RESULTS_LIMIT
+  de cada)
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from supabase import Client
+
+from app import monitoring_engine
+from app.core.config import settings
+from app.core.database import get_database
+from app.core.metrics import metrics
+from app.services import pg_queries
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+OPEN_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+_SUMMARY_COLUMNS = ",".join(column.strip() for column in pg_queries.REFRESH_JOB_SUMMARY.split(","))
+
+_jobs_finished = metrics.counter("refresh_jobs_finished_total", "Jobs de atualização do monitoramento encerrados")
+_job_seconds = metrics.histogram("refresh_job_seconds", "Duração dos jobs de atualização do monitoramento")
+
+
+class RefreshJobStore:
+    """Jobs em public.monitoring_refresh_jobs (Postgres direto ou PostgREST)"""
+
+    def __init__(self, client: Optional[Client] = None):
+        self.client = client
+
+    def _table(self):
+        return self.client.table("monitoring_refresh_jobs")
+
+    def create(self, company_id: str, requested_by: Optional[str] = None) -> Dict:
+        """
+        Enfileira a atualização da empresa
+
+        Returns:
+            O job criado, ou o job já aberto da empresa (created=False)
+        """
+        db = get_database()
+        if db:
+            job = pg_queries.insert_refresh_job(db, company_id, requested_by)
+            if job:
+                return {**job, "created": True}
+            existing = pg_queries.open_refresh_job(db, company_id)
+        else:
+            existing = self._open_job(company_id)
+            if not existing:
+                try:
+                    response = self._table().insert({"company_id": company_id, "requested_by": requested_by}).execute()
+                    return {**self._summary(response.data[0]), "created": True}
+                except Exception:
+                    # Outro pedido criou o job primeiro (índice único de job aberto)
+                    existing = self._open_job(company_id)
+        if not existing:
+            raise RuntimeError("Não foi possível criar o job de atualização")
+        return {**existing, "created": False}
+
+    def _open_job(self, company_id: str) -> Optional[Dict]:
+        response = (
+            self._table().select(_SUMMARY_COLUMNS)
+            .eq("company_id", company_id)
+            .in_("status", list(OPEN_STATUSES))
+            .limit(1)
+            .execute()
+        )
+        return response.data[0] if response.data else None
+
+    @staticmethod
+    def _summary(job: Dict) -> Dict:
+        return {key: value for key, value in job.items() if key != "results"}
+
+    def get(self, company_id: str, job_id: str, with_results: bool = False) -> Optional[Dict]:
+        db = get_database()
+        if db:
+            return pg_queries.get_refresh_job(db, company_id, job_id, with_results)
+        columns = _SUMMARY_COLUMNS + (",results" if with_results else "")
+        response = self._table().select(columns).eq("id", job_id).eq("company_id", company_id).limit(1).execute()
+        return response.data[0] if response.data else None
+
+    def list(self, company_id: str, limit: int = 20) -> List[Dict]:
+        db = get_database()
+        if db:
+            return pg_queries.list_refresh_jobs(db, company_id, limit)
+        response = (
+            self._table().select(_SUMMARY_COLUMNS)
+            .eq("company_id", company_id)
+            .order("created_at", desc=True)
+            .limit(limit)
+            .execute()
+        )
+        return response.data or []
+
+    def cancel(self, company_id: str, job_id: str) -> Optional[Dict]:
+        """Na fila: cancelado na hora; em execução: o worker para no próximo registro"""
+        db = get_database()
+        if db:
+            return pg_queries.cancel_refresh_job(db, company_id, job_id)
+        job = self.get(company_id, job_id)
+        if not job:
+            return None
+        if job["status"] == JOB_QUEUED:
+            response = (
+                self._table()
+                .update({"cancel_requested": True, "status": JOB_CANCELLED, "finished_at": datetime.utcnow().isoformat()})
+                .eq("id", job_id).eq("status", JOB_QUEUED)
+                .execute()
+            )
+            if response.data:
+                return self._summary(response.data[0])
+        response = self._table().update({"cancel_requested": True}).eq("id", job_id).execute()
+        return self._summary(response.data[0]) if response.data else job
+
+    # ---------- Worker ----------
+
+    def claim(self) -> Optional[Dict]:
+        stale = settings.REFRESH_JOB_STALE_SECONDS
+        db = get_database()
+        if db:
+            return pg_queries.claim_refresh_job(db, stale)
+        data = self.client.rpc("claim_monitoring_refresh_job", {"p_stale_seconds": stale}).execute().data
+        return self._summary(data[0]) if data else None
+
+    def save_progress(self, job_id: str, claimed_by: str, counters: Dict) -> bool:
+        """Grava o progresso; True se o job deve parar (cancelado ou retomado por outro worker)"""
+        db = get_database()
+        if db:
+            return pg_queries.save_refresh_job_progress(db, job_id, claimed_by, counters)
+        response = (
+            self._table()
+            .update({
+                "total": counters.get("total", 0),
+                "processed": counters.get("processed", 0),
+                "updated": counters.get("updated", 0),
+                "errors": counters.get("errors", 0),
+                "heartbeat_at": datetime.utcnow().isoformat(),
+            })
+            .eq("id", job_id).eq("claimed_by", claimed_by).eq("status", JOB_RUNNING)
+            .execute()
+        )
+        return not response.data or bool(response.data[0].get("cancel_requested"))
+
+    def finish(
+        self,
+        job_id: str,
+        claimed_by: str,
+        status: str,
+        counters: Dict,
+        results: Dict,
+        error: Optional[str] = None
+    ) -> bool:
+        """Encerra o job; False se ele foi retomado por outro worker (nada gravado)"""
+        db = get_database()
+        if db:
+            return pg_queries.finish_refresh_job(db, job_id, claimed_by, status, counters, results, error)
+        now = datetime.utcnow().isoformat()
+        response = self._table().update({
+            "status": status,
+            "total": counters.get("total", 0),
+            "processed": counters.get("processed", 0),
+            "updated": counters.get("updated", 0),
+            "errors": counters.get("errors", 0),
+            "results": results,
+            "error": error,
+            "finished_at": now,
+            "heartbeat_at": now,
+        }).eq("id", job_id).eq("claimed_by", claimed_by).eq("status", JOB_RUNNING).execute()
+        return bool(response.data)
+
+    def requeue(self, job_id: str, claimed_by: str) -> None:
+        """Devolve o job à fila (worker encerrando), se ainda for deste worker"""
+        db = get_database()
+        if db:
+            pg_queries.requeue_refresh_job(db, job_id, claimed_by)
+            return
+        (
+            self._table()
+            .update({"status": JOB_QUEUED, "heartbeat_at": None, "claimed_by": None})
+            .eq("id", job_id).eq("claimed_by", claimed_by).eq("status", JOB_RUNNING)
+            .execute()
+        )
+
+
+class RefreshJobRunner:
+    """Workers que executam os jobs da fila (threads do processo)"""
+
+    def __init__(self, store: RefreshJobStore, workers: Optional[int] = None):
+        self.store = store
+        self.workers = workers if workers is not None else settings.REFRESH_JOB_WORKERS
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"refresh-job-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def wake(self) -> None:
+        """Job novo na fila: procura sem esperar o próximo ciclo"""
+        self._wake.set()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = self.store.claim()
+            except Exception as e:
+                print(f"Erro ao buscar job de atualização: {str(e)}")
+                job = None
+            if job:
+                try:
+                    self.run(job)
+                except Exception as e:
+                    # Sem heartbeat o job volta para a fila após REFRESH_JOB_STALE_SECONDS
+                    print(f"Erro no job de atualização {job['id']}: {str(e)}")
+                continue
+            self._wake.wait(settings.REFRESH_JOB_POLL_SECONDS)
+            self._wake.clear()
+
+    def run(self, job: Dict) -> None:
+        """Executa um job já reservado por este worker"""
+        job_id, claimed_by = job["id"], job["claimed_by"]
+        if job.get("attempts", 1) > settings.REFRESH_JOB_MAX_ATTEMPTS:
+            self.store.finish(job_id, claimed_by, JOB_FAILED, job, {"changes": [], "errors": []}, "Tentativas esgotadas")
+            _jobs_finished.inc(status=JOB_FAILED)
+            return
+
+        state = {"stop": bool(job.get("cancel_requested")), "saved_at": time.monotonic()}
+
+        def on_progress(counters: Dict) -> None:
+            now = time.monotonic()
+            if now - state["saved_at"] >= settings.REFRESH_JOB_PROGRESS_SECONDS:
+                state["saved_at"] = now
+                try:
+                    state["stop"] = self.store.save_progress(job_id, claimed_by, counters)
+                except Exception as e:
+                    print(f"Erro ao gravar progresso do job {job_id}: {str(e)}")
+
+        started = time.monotonic()
+        result = monitoring_engine.update_all_records(
+            job["company_id"],
+            refresh_id=job_id,
+            should_cancel=lambda: state["stop"] or self._stopping.is_set(),
+            on_progress=on_progress,
+        )
+
+        if self._stopping.is_set() and not state["stop"] and result.get("cancelled"):
+            # Shutdown no meio do job: outra instância (ou esta, ao voltar) retoma
+            self.store.requeue(job_id, claimed_by)
+            return
+
+        limit = settings.REFRESH_JOB_RESULTS_LIMIT
+        results = {
+            "changes": result.get("changes", [])[:limit],
+            "errors": result.get("failures", [])[:limit],
+        }
+        if not result.get("success"):
+            status, error = JOB_FAILED, result.get("error")
+        elif result.get("cancelled"):
+            status, error = JOB_CANCELLED, None
+        else:
+            status, error = JOB_COMPLETED, None
+        try:
+            if not self.store.finish(job_id, claimed_by, status, result, results, error):
+                # Retomado por outro worker (este ficou sem heartbeat): o resultado é do novo dono
+                print(f"Job de atualização {job_id} retomado por outro worker; resultado descartado")
+                return
+        except Exception as e:
+            print(f"Erro ao encerrar job {job_id}: {str(e)}")
+        _jobs_finished.inc(status=status)
+        _job_seconds.observe(time.monotonic() - started)
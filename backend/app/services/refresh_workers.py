@@ -0,0 +1,248 @@
+"""
+Refresh Contínuo do Monitoramento
+=================================
+Workers que reconsultam os registros monitorados vencidos (última
+atualização há mais de MONITORING_REFRESH_INTERVAL_HOURS), divididos entre
+quantos processos houver (scripts/run_refresh_worker.py, ou
+MONITORING_REFRESH_WORKERS threads no próprio backend):
+
+- cada worker pega um lote (REFRESH_CLAIM_BATCH) com lease próprio
+  (migrations/010, FOR UPDATE SKIP LOCKED): dois workers nunca pegam o
+  mesmo registro enquanto o lease vale
+- o lote é processado com REFRESH_WORKER_CONCURRENCY consultas em paralelo,
+  renovando os leases a cada REFRESH_LEASE_SECONDS / 3
+- worker que cai: o lease expira e outro worker pega os registros
+- falha na consulta: o registro volta à fila depois de REFRESH_RETRY_SECONDS
+
+A vazão cresce com o número de workers até os limites das APIs externas
+(core/upstream_limits.py e chaves do Portal), que são globais.
+"""
+
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from supabase import Client
+
+from app import monitoring_engine
+from app.core.config import settings
+from app.core.database import get_database
+from app.core.metrics import metrics
+from app.core.quotas import quota_scope
+from app.services import pg_queries
+
+_targets = metrics.counter("monitoring_refresh_targets_total", "Registros processados pelo refresh contínuo")
+_batch_seconds = metrics.histogram("monitoring_refresh_batch_seconds", "Duração dos lotes do refresh contínuo")
+
+
+def worker_id() -> str:
+    """Dono dos leases: host, processo e um sufixo por worker"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class TargetRefreshWorker:
+    """Um worker do refresh contínuo (lotes com lease de monitoring_targets)"""
+
+    def __init__(
+        self,
+        client: Optional[Client] = None,
+        owner: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        lease_seconds: Optional[float] = None
+    ):
+        self.client = client
+        self.owner = owner or worker_id()
+        self.batch_size = batch_size or settings.REFRESH_CLAIM_BATCH
+        self.concurrency = concurrency or settings.REFRESH_WORKER_CONCURRENCY
+        self.lease_seconds = lease_seconds or settings.REFRESH_LEASE_SECONDS
+
+    # ---------- Leases ----------
+
+    def claim(self, company_id: Optional[str] = None) -> List[Dict]:
+        """Lote de registros vencidos, com lease para este worker"""
+        due_before = datetime.now(timezone.utc) - timedelta(hours=settings.MONITORING_REFRESH_INTERVAL_HOURS)
+        db = get_database()
+        if db:
+            return pg_queries.claim_monitoring_targets(
+                db, self.owner, self.batch_size, self.lease_seconds, due_before, company_id
+            )
+        return self.client.rpc("claim_monitoring_targets", {
+            "p_owner": self.owner,
+            "p_limit": self.batch_size,
+            "p_lease_seconds": self.lease_seconds,
+            "p_due_before": due_before.isoformat(),
+            "p_company_id": company_id,
+        }).execute().data or []
+
+    def _renew(self, target_ids: List[str]) -> int:
+        db = get_database()
+        if db:
+            return pg_queries.renew_target_leases(db, self.owner, target_ids, self.lease_seconds)
+        return self.client.rpc("renew_monitoring_target_leases", {
+            "p_owner": self.owner,
+            "p_ids": target_ids,
+            "p_lease_seconds": self.lease_seconds,
+        }).execute().data
+
+    def _release(self, target_ids: List[str]) -> None:
+        if not target_ids:
+            return
+        db = get_database()
+        if db:
+            pg_queries.release_target_leases(db, self.owner, target_ids, settings.REFRESH_RETRY_SECONDS)
+            return
+        self.client.rpc("release_monitoring_target_leases", {
+            "p_owner": self.owner,
+            "p_ids": target_ids,
+            "p_retry_seconds": settings.REFRESH_RETRY_SECONDS,
+        }).execute()
+
+    def _keep_leases(self, target_ids: List[str], done: threading.Event) -> None:
+        """Renova os leases do lote até `done` (thread auxiliar)"""
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                held = self._renew(target_ids)
+                if held is not None and held < len(target_ids):
+                    print(f"Refresh {self.owner}: {len(target_ids) - held} leases perdidos (expirados)")
+            except Exception as e:
+                print(f"Erro ao renovar leases do refresh: {str(e)}")
+
+    # ---------- Processamento ----------
+
+    @staticmethod
+    def _refresh(target: Dict) -> Dict:
+        try:
+            with quota_scope(target["company_id"]):
+                return monitoring_engine._refresh_record(target)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def run_batch(self, company_id: Optional[str] = None) -> Dict[str, int]:
+        """
+        Pega e processa um lote
+
+        Returns:
+            Contadores {claimed, updated, errors} (claimed 0 = nada vencido)
+        """
+        return self.process(self.claim(company_id))
+
+    def process(self, targets: List[Dict]) -> Dict[str, int]:
+        """
+        Reconsulta registros com lease deste worker, grava e libera os leases
+
+        Returns:
+            Contadores {claimed, updated, changed, errors}
+        """
+        counters = {"claimed": len(targets), "updated": 0, "changed": 0, "errors": 0}
+        if not targets:
+            return counters
+
+        started = time.monotonic()
+        done = threading.Event()
+        renewer = threading.Thread(
+            target=self._keep_leases,
+            args=([t["id"] for t in targets], done),
+            name=f"refresh-lease-{self.owner}",
+            daemon=True,
+        )
+        renewer.start()
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(targets))) as pool:
+                results = list(pool.map(self._refresh, targets))
+        finally:
+            done.set()
+
+        updates: Dict[str, List[Dict]] = defaultdict(list)
+        changed: Dict[str, List[Dict]] = defaultdict(list)
+        failed: List[str] = []
+        for target, result in zip(targets, results):
+            if result.get("success"):
+                updates[target["company_id"]].append(result["update"])
+                if result["has_changes"]:
+                    changed[target["company_id"]].append(result)
+            else:
+                print(f"Erro ao atualizar {target.get('document')}: {result.get('error')}")
+                failed.append(target["id"])
+
+        for cid, company_updates in updates.items():
+            try:
+                written = monitoring_engine._write_refreshes(cid, company_updates, self.owner)
+                counters["updated"] += written
+                if written < len(company_updates):
+                    # Lease expirado e retomado por outro worker: o novo dono grava
+                    print(f"Refresh {self.owner}: {len(company_updates) - written} registros com lease de outro worker")
+            except Exception as e:
+                # Lease expira sozinho e outro worker refaz o registro
+                print(f"Erro ao gravar refresh da empresa {cid}: {str(e)}")
+                counters["errors"] += len(company_updates)
+                continue
+            counters["changed"] += len(changed[cid])
+            for result in changed[cid]:
+                monitoring_engine._publish_change(cid, result)
+
+        try:
+            self._release(failed)
+        except Exception as e:
+            print(f"Erro ao devolver registros com falha: {str(e)}")
+        counters["errors"] += len(failed)
+
+        _targets.inc(counters["updated"], outcome="updated")
+        _targets.inc(len(failed), outcome="failed")
+        _batch_seconds.observe(time.monotonic() - started)
+        return counters
+
+    def run(self, stop: threading.Event, until_idle: bool = False, company_id: Optional[str] = None) -> Dict[str, int]:
+        """
+        Processa lotes até `stop` (ou, com until_idle, até não haver vencidos)
+
+        Sem registros vencidos espera REFRESH_WORKER_IDLE_SECONDS.
+        """
+        totals = {"batches": 0, "claimed": 0, "updated": 0, "errors": 0}
+        while not stop.is_set():
+            try:
+                counters = self.run_batch(company_id)
+            except Exception as e:
+                print(f"Erro no refresh contínuo ({self.owner}): {str(e)}")
+                counters = {"claimed": 0}
+                if until_idle:
+                    break
+            if counters["claimed"]:
+                totals["batches"] += 1
+                for key in ("claimed", "updated", "errors"):
+                    totals[key] += counters[key]
+                continue
+            if until_idle:
+                break
+            stop.wait(settings.REFRESH_WORKER_IDLE_SECONDS)
+        return totals
+
+
+class RefreshWorkerPool:
+    """Workers do refresh contínuo em threads deste processo"""
+
+    def __init__(self, client: Optional[Client] = None, workers: Optional[int] = None):
+        self.client = client
+        self.workers = workers if workers is not None else settings.MONITORING_REFRESH_WORKERS
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        for index in range(self.workers):
+            worker = TargetRefreshWorker(client=self.client)
+            thread = threading.Thread(target=worker.run, args=(self._stop,), name=f"monitoring-refresh-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Para de pegar lotes; o lote em andamento termina ou o lease expira"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
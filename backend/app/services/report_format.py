@@ -0,0 +1,276 @@
+"""
+Report Format - Armazenamento compacto do report_data
+======================================================
+O report_data no formato do frontend (v1, ver FORMATO_REPORT_DATA.md) repete
+os mesmos dados em vários lugares: sanções em `sanctions` e nas fontes
+`transparencia_*` (uma por lista), dados cadastrais em `brasilapi_cnpj.data`, `company_summary`
+e `qsa_enriched`, e a ReceitaWS repete boa parte do cadastro.
+
+O formato v2 guarda cada dado uma única vez e é expandido na leitura para o
+formato v1, que continua sendo o contrato com o frontend.
+
+Formato v2:
+    {
+        "format_version": 2,
+        "metadata": {...},
+        "input": {"document": ..., "type": ...},
+        "cadastral": {...},            # cadastro normalizado (sem qsa)
+        "qsa": [...],
+        "receitaws": {"shared": [...], "data": {...}},  # só o que difere do cadastro
+        "sanctions": {...},
+        "ai_analysis": ...
+    }
+
+Os payloads em PAYLOAD_PATHS podem estar substituídos por referências do
+payload store ({"$payload": "sha256:..."}); resolva-as antes de expandir.
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Tuple
+
+REPORT_FORMAT_VERSION = 2
+
+# Caminho de cada seção no formato expandido (v1)
+SECTION_PATHS = {
+    "metadata": ("metadata",),
+    "input": ("technical_report", "input"),
+    "summary": ("technical_report", "derived", "company_summary"),
+    "qsa": ("technical_report", "derived", "qsa_enriched"),
+    "sources": ("technical_report", "sources"),
+    "sanctions": ("sanctions",),
+    "ai_analysis": ("ai_analysis",),
+}
+
+# Caminhos no formato v2 necessários para expandir cada seção
+SECTION_STORAGE_PATHS = {
+    "metadata": (("metadata",),),
+    "input": (("input",),),
+    "summary": (("cadastral",),),
+    "qsa": (("qsa",),),
+    "sources": (("cadastral",), ("qsa",), ("receitaws",), ("sanctions",)),
+    "sanctions": (("sanctions",),),
+    "ai_analysis": (("ai_analysis",),),
+}
+
+# Caminhos no formato v2 necessários para expandir cada fonte bruta
+SOURCE_STORAGE_PATHS = {
+    "brasilapi_cnpj": (("cadastral",), ("qsa",)),
+    "receitaws_cnpj": (("cadastral",), ("qsa",), ("receitaws",)),
+    "transparencia_ceis": (("sanctions", "success"), ("sanctions", "lists"), ("sanctions", "ceis")),
+    "transparencia_cnep": (("sanctions", "success"), ("sanctions", "lists"), ("sanctions", "cnep")),
+    "transparencia_cepim": (("sanctions", "success"), ("sanctions", "lists"), ("sanctions", "cepim")),
+    "transparencia_ceaf": (("sanctions", "success"), ("sanctions", "lists"), ("sanctions", "ceaf")),
+    "transparencia_leniencia": (("sanctions", "success"), ("sanctions", "lists"), ("sanctions", "leniencia")),
+}
+
+# Caminhos do formato v2 gravados no payload store (ver payload_store.py)
+PAYLOAD_PATHS = (
+    ("cadastral",),
+    ("qsa",),
+    ("receitaws", "data"),
+    ("sanctions", "ceis"),
+    ("sanctions", "cnep"),
+    ("sanctions", "cepim"),
+    ("sanctions", "ceaf"),
+    ("sanctions", "leniencia"),
+)
+
+SANCTION_SOURCES = {
+    "transparencia_ceis": "ceis",
+    "transparencia_cnep": "cnep",
+    "transparencia_cepim": "cepim",
+    "transparencia_ceaf": "ceaf",
+    "transparencia_leniencia": "leniencia",
+}
+
+COMPANY_SUMMARY_KEYS = (
+    "razao_social",
+    "nome_fantasia",
+    "situacao_cadastral",
+    "data_abertura",
+    "capital_social",
+    "porte",
+    "natureza_juridica",
+)
+
+
+def is_compact(report_data: Any) -> bool:
+    """Indica se o report_data já está no formato v2"""
+    return isinstance(report_data, dict) and report_data.get("format_version") == REPORT_FORMAT_VERSION
+
+
+def json_size(data: Any) -> int:
+    """Tamanho em bytes do JSON serializado (aproximação do armazenamento JSONB)"""
+    return len(json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8"))
+
+
+def sanction_source(sanctions: Dict, key: str) -> Dict:
+    """
+    Fonte `transparencia_*` de uma lista: ok pelo status da lista em
+    sanctions["lists"] (dossiês antigos, sem status: pelo success geral)
+    """
+    status = (sanctions.get("lists") or {}).get(key)
+    if status is None:
+        return {"ok": sanctions.get("success", False), "data": sanctions.get(key, []) or []}
+    source = {"ok": status.get("status") in ("completed", "skipped"), "data": sanctions.get(key, []) or []}
+    if status.get("error"):
+        source["error"] = status["error"]
+    return source
+
+
+def compact_report_data(report_data: Dict) -> Dict:
+    """
+    Converte report_data v1 (formato do frontend) para o formato v2
+
+    Args:
+        report_data: report_data no formato expandido
+
+    Returns:
+        report_data deduplicado (v2). Se já estiver em v2, retorna como está.
+    """
+    if is_compact(report_data):
+        return report_data
+
+    technical = report_data.get("technical_report", {}) or {}
+    sources = technical.get("sources", {}) or {}
+    derived = technical.get("derived", {}) or {}
+
+    brasilapi = (sources.get("brasilapi_cnpj", {}) or {}).get("data", {}) or {}
+    cadastral = {k: v for k, v in brasilapi.items() if k != "qsa"}
+    qsa = brasilapi.get("qsa", derived.get("qsa_enriched", [])) or []
+
+    sanctions = report_data.get("sanctions")
+    if sanctions is None:
+        # Dossiês antigos sem o bloco `sanctions`: reconstrói a partir das fontes
+        sanctions = {"success": False, "total_sanctions": 0}
+        for source, key in SANCTION_SOURCES.items():
+            source_data = sources.get(source, {}) or {}
+            sanctions["success"] = sanctions["success"] or bool(source_data.get("ok"))
+            sanctions[key] = source_data.get("data", []) or []
+        sanctions["total_sanctions"] = sum(len(sanctions[k]) for k in SANCTION_SOURCES.values())
+
+    receitaws = (sources.get("receitaws_cnpj", {}) or {}).get("data", {}) or {}
+    full_cadastral = {**cadastral, "qsa": qsa} if brasilapi else {}
+    shared = [k for k, v in receitaws.items() if k in full_cadastral and full_cadastral[k] == v]
+    receitaws_compact = (
+        {"shared": shared, "data": {k: v for k, v in receitaws.items() if k not in shared}}
+        if receitaws else {}
+    )
+
+    compact = {
+        "format_version": REPORT_FORMAT_VERSION,
+        "metadata": report_data.get("metadata", {}) or {},
+        "input": technical.get("input", {}) or {},
+        "cadastral": cadastral,
+        "qsa": qsa,
+        "receitaws": receitaws_compact,
+        "sanctions": sanctions,
+        "ai_analysis": report_data.get("ai_analysis"),
+    }
+
+    # Preserva chaves extras de topo (ex: pep_data, media_findings)
+    for key, value in report_data.items():
+        if key not in ("metadata", "technical_report", "sanctions", "ai_analysis"):
+            compact.setdefault(key, value)
+
+    return compact
+
+
+def expand_report_data(stored: Dict) -> Dict:
+    """
+    Expande report_data v2 para o formato do frontend (v1)
+
+    Args:
+        stored: report_data como está no banco (v1 ou v2, completo ou parcial)
+
+    Returns:
+        report_data no formato v1. Dados v1 são retornados sem alteração.
+    """
+    if not is_compact(stored):
+        return stored
+
+    cadastral = stored.get("cadastral", {}) or {}
+    qsa = stored.get("qsa", []) or []
+    full_cadastral = {**cadastral, "qsa": qsa} if cadastral else {}
+
+    receitaws_compact = stored.get("receitaws", {}) or {}
+    receitaws = {}
+    if receitaws_compact:
+        receitaws = {k: full_cadastral.get(k) for k in receitaws_compact.get("shared", [])}
+        receitaws.update(receitaws_compact.get("data", {}) or {})
+
+    sanctions = stored.get("sanctions", {}) or {}
+    sources = {
+        "brasilapi_cnpj": {
+            "ok": bool(full_cadastral) and full_cadastral.get("success", False),
+            "data": full_cadastral,
+        },
+        "receitaws_cnpj": {
+            "ok": bool(receitaws) and receitaws.get("success", False),
+            "data": receitaws,
+        },
+    }
+    for source, key in SANCTION_SOURCES.items():
+        sources[source] = sanction_source(sanctions, key)
+
+    expanded = {
+        "metadata": stored.get("metadata", {}) or {},
+        "technical_report": {
+            "input": stored.get("input", {}) or {},
+            "sources": sources,
+            "derived": {
+                "company_summary": {k: cadastral.get(k) for k in COMPANY_SUMMARY_KEYS},
+                "qsa_enriched": qsa,
+            },
+        },
+        "sanctions": sanctions,
+        "ai_analysis": stored.get("ai_analysis"),
+    }
+
+    for key, value in stored.items():
+        if key not in ("format_version", "input", "cadastral", "qsa", "receitaws") and key not in expanded:
+            expanded[key] = value
+
+    return expanded
+
+
+def select_sections(report_data: Dict, sections: Iterable[str]) -> Dict:
+    """Mantém apenas as seções pedidas de um report_data v1, preservando o aninhamento"""
+    selected: Dict = {}
+    for section in sections:
+        path = SECTION_PATHS[section]
+        node = report_data
+        for key in path:
+            node = node.get(key) if isinstance(node, dict) else None
+            if node is None:
+                break
+        if node is None:
+            continue
+        target = selected
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = node
+    return selected
+
+
+def storage_paths_for(sections: Iterable[str]) -> List[Tuple[str, ...]]:
+    """Caminhos v2 (sem repetição) necessários para as seções pedidas"""
+    paths: List[Tuple[str, ...]] = []
+    for section in sections:
+        for path in SECTION_STORAGE_PATHS[section]:
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+def nest_paths(values: Dict[Tuple[str, ...], Any]) -> Dict:
+    """Monta um dict aninhado a partir de {caminho: valor} (ignora valores None)"""
+    nested: Dict = {}
+    for path, value in values.items():
+        if value is None:
+            continue
+        node = nested
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+    return nested
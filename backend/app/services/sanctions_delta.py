@@ -0,0 +1,369 @@
+"""
+Ingestão por Delta das Listas de Sanções
+========================================
+Em vez de reconsultar as três listas do Portal para cada registro
+monitorado, o dump diário de cada lista (services/sanctions_dumps.py) é
+comparado com o snapshot anterior (public.sanctions_entries,
+migrations/011):
+
+1. delta: registros que entraram e saíram da lista (por record_key)
+2. documentos afetados: CPF/CNPJ desses registros (CPF mascarado pelos
+   dígitos centrais)
+3. índice reverso documento -> monitoring_targets, em todas as empresas
+4. os registros afetados voltam para o início da fila do refresh contínuo
+   (refreshed_at NULL) e, com rescreen, são reconsultados na hora com lease
+   próprio (services/refresh_workers.py): mudanças geram target.changed
+
+O custo diário fica proporcional às mudanças da lista, não à carteira.
+A primeira importação de uma lista só grava o snapshot (baseline), a não
+ser que rescreen_baseline seja pedido. Dump vazio é recusado, e um delta
+que remove mais que SANCTIONS_DELTA_MAX_REMOVED_SHARE do snapshot também
+(dump truncado esvaziaria a lista e o filtro negativo), salvo com force. Cada importação avisa os processos
+(NOTIFY sanctions_lists_changed) para reconstruírem o filtro negativo
+(core/sanctions_filter.py) e o índice de nomes (services/name_screening.py)
+e descartarem o cache da lista em kyc_engine.query_sanctions.
+
+Uso:
+    from app.services.sanctions_delta import SanctionsDeltaIngester
+    from app.services.sanctions_dumps import load_dump
+
+    SanctionsDeltaIngester().ingest("ceis", load_dump("ceis"))
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from supabase import Client
+
+from app import kyc_engine
+from app.core.config import settings
+from app.core.database import get_database
+from app.core.metrics import metrics
+from app.core.sanctions_filter import SANCTIONS_CHANNEL, FilterSource, sanctions_filter
+from app.services import pg_queries
+from app.services.name_screening import sanctioned_names
+from app.services.refresh_workers import TargetRefreshWorker, worker_id
+from app.services.sanctions_dumps import SANCTIONS_LISTS, SanctionEntry
+
+# Itens por requisição no caminho PostgREST
+_CHUNK = 500
+
+_imports = metrics.counter("sanctions_imports_total", "Importações de dumps das listas de sanções")
+_affected = metrics.counter("sanctions_delta_targets_total", "Registros monitorados afetados por deltas de sanções")
+
+
+def compute_delta(previous: Dict[str, Dict], entries: List[SanctionEntry]) -> Dict:
+    """
+    Diferença entre o snapshot (record_key -> {document, cpf_core}) e o dump
+
+    Returns:
+        {added, removed_keys, documents, cpf_cores} com os documentos (e
+        dígitos centrais de CPF mascarado) dos registros que entraram ou saíram
+    """
+    current = {entry.record_key for entry in entries}
+    added = [entry for entry in entries if entry.record_key not in previous]
+    removed_keys = [key for key in previous if key not in current]
+
+    documents, cpf_cores = set(), set()
+    touched = [(e.document, e.cpf_core) for e in added]
+    touched += [(previous[key]["document"], previous[key]["cpf_core"]) for key in removed_keys]
+    for document, core in touched:
+        if document:
+            documents.add(document)
+        elif core:
+            cpf_cores.add(core)
+    return {
+        "added": added,
+        "removed_keys": removed_keys,
+        "documents": sorted(documents),
+        "cpf_cores": sorted(cpf_cores),
+    }
+
+
+class SanctionsSnapshotStore:
+    """Snapshot das listas e índice reverso (Postgres direto ou PostgREST)"""
+
+    def __init__(self, client: Optional[Client] = None):
+        self.client = client
+
+    def snapshot(self, list_name: str) -> Dict[str, Dict]:
+        db = get_database()
+        if db:
+            return pg_queries.sanctions_snapshot(db, list_name)
+        snapshot, offset = {}, 0
+        while True:
+            page = (
+                self.client.table("sanctions_entries")
+                .select("record_key,document,cpf_core")
+                .eq("list_name", list_name)
+                .order("record_key")
+                .range(offset, offset + 999)
+                .execute()
+            ).data or []
+            for row in page:
+                snapshot[row["record_key"]] = {"document": row["document"], "cpf_core": row["cpf_core"]}
+            if len(page) < 1000:
+                return snapshot
+            offset += 1000
+
+    def apply(self, list_name: str, added: List[SanctionEntry], removed_keys: List[str]) -> None:
+        rows = [{k: v for k, v in entry.to_row().items() if k != "list_name"} for entry in added]
+        db = get_database()
+        if db:
+            pg_queries.apply_sanctions_delta(db, list_name, rows, removed_keys)
+            return
+        table = self.client.table("sanctions_entries")
+        for i in range(0, len(removed_keys), _CHUNK):
+            table.delete().eq("list_name", list_name).in_("record_key", removed_keys[i:i + _CHUNK]).execute()
+        for i in range(0, len(rows), _CHUNK):
+            chunk = [{**row, "list_name": list_name} for row in rows[i:i + _CHUNK]]
+            table.upsert(chunk, on_conflict="list_name,record_key", ignore_duplicates=True).execute()
+
+    def targets_for(self, documents: List[str], cpf_cores: List[str]) -> List[Dict]:
+        """Índice reverso: registros monitorados com os documentos afetados"""
+        db = get_database()
+        if db:
+            return pg_queries.targets_for_documents(db, documents, cpf_cores)
+        columns = "id,company_id,document,doc_type,data_json"
+        table = self.client.table("monitoring_targets")
+        found: Dict[str, Dict] = {}
+        for i in range(0, len(documents), _CHUNK):
+            for row in table.select(columns).in_("document", documents[i:i + _CHUNK]).execute().data or []:
+                found[row["id"]] = row
+        for core in cpf_cores:
+            for row in table.select(columns).eq("doc_type", "CPF").like("document", f"___{core}__").execute().data or []:
+                found[row["id"]] = row
+        return list(found.values())
+
+    def flag(self, target_ids: List[str], owner: Optional[str], lease_seconds: float) -> List[Dict]:
+        """Marca os registros para o refresh; com owner, reserva os livres (claimed)"""
+        db = get_database()
+        if db:
+            return pg_queries.flag_targets_for_rescreen(db, target_ids, owner, lease_seconds)
+        table = self.client.table("monitoring_targets")
+        now = datetime.now(timezone.utc)
+        flagged: List[Dict] = []
+        for i in range(0, len(target_ids), _CHUNK):
+            chunk = target_ids[i:i + _CHUNK]
+            claimed_ids = set()
+            if owner:
+                expires = datetime.fromtimestamp(now.timestamp() + lease_seconds, timezone.utc).isoformat()
+                claimed = (
+                    table.update({"refreshed_at": None, "lease_owner": owner, "lease_expires_at": expires})
+                    .in_("id", chunk)
+                    .or_(f"lease_expires_at.is.null,lease_expires_at.lt.{now.isoformat()}")
+                    .execute()
+                ).data or []
+                claimed_ids = {row["id"] for row in claimed}
+                flagged += [{**row, "claimed": True} for row in claimed]
+            rest = [target_id for target_id in chunk if target_id not in claimed_ids]
+            if rest:
+                updated = table.update({"refreshed_at": None}).in_("id", rest).execute().data or []
+                flagged += [{**row, "claimed": False} for row in updated]
+        return flagged
+
+    # ---------- Filtro negativo ----------
+
+    def filter_source(self) -> FilterSource:
+        """Documentos do snapshot e data da importação mais antiga (None se falta lista)"""
+        db = get_database()
+        if db:
+            imported = pg_queries.sanctions_imported_at(db)
+            if any(imported.get(name) is None for name in SANCTIONS_LISTS):
+                return None
+            return pg_queries.sanctions_filter_rows(db), min(imported.values())
+
+        imported = {}
+        for name in SANCTIONS_LISTS:
+            response = (
+                self.client.table("sanctions_list_imports").select("finished_at")
+                .eq("list_name", name).eq("status", "completed")
+                .order("finished_at", desc=True).limit(1).execute()
+            )
+            if not response.data or not response.data[0].get("finished_at"):
+                return None
+            imported[name] = datetime.fromisoformat(response.data[0]["finished_at"])
+        rows, offset = [], 0
+        while True:
+            page = (
+                self.client.table("sanctions_entries")
+                .select("document,doc_type,cpf_core")
+                .not_.is_("doc_type", "null")
+                .order("list_name").order("record_key")
+                .range(offset, offset + 999)
+                .execute()
+            ).data or []
+            rows += page
+            if len(page) < 1000:
+                return rows, min(imported.values())
+            offset += 1000
+
+    def name_source(self) -> List[Dict]:
+        """Registros do snapshot com nome (índice de triagem por nome)"""
+        db = get_database()
+        if db:
+            return pg_queries.sanctions_names(db)
+        rows, offset = [], 0
+        while True:
+            page = (
+                self.client.table("sanctions_entries")
+                .select("list_name,record_key,name,document,cpf_core")
+                .not_.is_("name", "null")
+                .order("list_name").order("record_key")
+                .range(offset, offset + 999)
+                .execute()
+            ).data or []
+            rows += page
+            if len(page) < 1000:
+                return rows
+            offset += 1000
+
+    def notify_changed(self, list_name: str) -> None:
+        """Reconstrói o filtro negativo deste processo e avisa os demais"""
+        # Antes da reconsulta dos afetados: sem resultado da lista anterior em cache
+        kyc_engine.clear_sanctions_cache(list_name)
+        sanctions_filter.reload()
+        sanctioned_names.reload_async()
+        db = get_database()
+        if db:
+            db.execute("SELECT pg_notify($1, $2)", SANCTIONS_CHANNEL, list_name)
+
+    # ---------- Histórico ----------
+
+    def has_previous_import(self, list_name: str) -> bool:
+        db = get_database()
+        if db:
+            return pg_queries.last_sanctions_import(db, list_name) is not None
+        response = (
+            self.client.table("sanctions_list_imports").select("id")
+            .eq("list_name", list_name).eq("status", "completed")
+            .limit(1).execute()
+        )
+        return bool(response.data)
+
+    def start_import(self, list_name: str, source: Optional[str]) -> str:
+        db = get_database()
+        if db:
+            return pg_queries.insert_sanctions_import(db, list_name, source)
+        response = self.client.table("sanctions_list_imports").insert({"list_name": list_name, "source": source}).execute()
+        return response.data[0]["id"]
+
+    def finish_import(self, import_id: str, fields: Dict) -> None:
+        db = get_database()
+        if db:
+            pg_queries.finish_sanctions_import(db, import_id, fields)
+            return
+        (
+            self.client.table("sanctions_list_imports")
+            .update({**fields, "finished_at": datetime.now(timezone.utc).isoformat()})
+            .eq("id", import_id)
+            .execute()
+        )
+
+
+class SanctionsDeltaIngester:
+    """Importa o dump de uma lista e re-verifica só os registros afetados"""
+
+    def __init__(self, store: Optional[SanctionsSnapshotStore] = None, client: Optional[Client] = None):
+        self.client = client
+        self.store = store or SanctionsSnapshotStore(client)
+
+    def ingest(
+        self,
+        list_name: str,
+        entries: List[SanctionEntry],
+        source: Optional[str] = None,
+        rescreen: bool = True,
+        rescreen_baseline: bool = False,
+        force: bool = False
+    ) -> Dict:
+        """
+        Aplica o dump da lista e re-verifica os registros afetados
+
+        Args:
+            list_name: ceis | cnep | cepim
+            entries: Registros do dump (sanctions_dumps.load_dump)
+            source: Origem do dump (arquivo/URL) para o histórico
+            rescreen: Reconsulta os afetados agora; sem rescreen só ficam
+                no início da fila do refresh contínuo
+            rescreen_baseline: Re-verifica também na primeira importação
+            force: Aplica o delta mesmo removendo mais que
+                SANCTIONS_DELTA_MAX_REMOVED_SHARE do snapshot
+
+        Returns:
+            Dict com success e os contadores do delta (added, removed,
+            affected_documents, affected_targets, rescreened, changed)
+        """
+        import_id = self.store.start_import(list_name, source)
+        try:
+            if not entries:
+                raise ValueError(f"Dump da lista {list_name} sem registros")
+            baseline = not self.store.has_previous_import(list_name)
+            previous = self.store.snapshot(list_name)
+            delta = compute_delta(previous, entries)
+            removed_share = len(delta["removed_keys"]) / len(previous) if previous else 0.0
+            if removed_share > settings.SANCTIONS_DELTA_MAX_REMOVED_SHARE and not force:
+                raise ValueError(
+                    f"Dump da lista {list_name} remove {removed_share:.0%} do snapshot "
+                    f"({len(delta['removed_keys'])} de {len(previous)} registros); confira o arquivo ou use force"
+                )
+            self.store.apply(list_name, delta["added"], delta["removed_keys"])
+            if delta["added"] or delta["removed_keys"]:
+                # Antes do rescreen: documento que entrou na lista não pode
+                # ser descartado pelo filtro antigo
+                self._notify_filter(list_name)
+
+            targets: List[Dict] = []
+            if not baseline or rescreen_baseline:
+                targets = self.store.targets_for(delta["documents"], delta["cpf_cores"])
+            result = self._rescreen(targets, rescreen)
+            _affected.inc(len(targets), list=list_name)
+
+            fields = {
+                "status": "completed",
+                "records": len(entries),
+                "added": len(delta["added"]),
+                "removed": len(delta["removed_keys"]),
+                "affected_documents": len(delta["documents"]) + len(delta["cpf_cores"]),
+                "affected_targets": len(targets),
+                "rescreened": result["updated"],
+                "baseline": baseline,
+            }
+            self.store.finish_import(import_id, fields)
+            _imports.inc(list=list_name, status="completed")
+            return {"success": True, "import_id": import_id, "list": list_name, **fields, **result}
+        except Exception as e:
+            print(f"Erro na importação da lista {list_name}: {str(e)}")
+            try:
+                self.store.finish_import(import_id, {"status": "failed", "error": str(e)})
+            except Exception as finish_error:
+                print(f"Erro ao registrar falha da importação: {str(finish_error)}")
+            _imports.inc(list=list_name, status="failed")
+            return {"success": False, "import_id": import_id, "list": list_name, "error": str(e)}
+
+    def _notify_filter(self, list_name: str) -> None:
+        try:
+            self.store.notify_changed(list_name)
+        except Exception as e:
+            # O filtro também é reconstruído a cada SANCTIONS_FILTER_RELOAD_SECONDS
+            print(f"Aviso: filtro de sanções não avisado da importação: {str(e)}")
+
+    def _rescreen(self, targets: List[Dict], rescreen: bool) -> Dict[str, int]:
+        """Marca os afetados para o refresh e reconsulta os que ficaram com este worker"""
+        result = {"updated": 0, "changed": 0, "errors": 0, "deferred": 0}
+        if not targets:
+            return result
+        worker = TargetRefreshWorker(client=self.client, owner=f"sanctions-delta:{worker_id()}")
+        flagged = self.store.flag(
+            [t["id"] for t in targets],
+            worker.owner if rescreen else None,
+            worker.lease_seconds,
+        )
+        claimed = [t for t in flagged if t.get("claimed")]
+        # Os demais (sem rescreen ou com lease de outro worker) ficam na fila
+        result["deferred"] = len(flagged) - len(claimed)
+        # Um único process: os leases de todos os reservados são renovados juntos
+        counters = worker.process(claimed)
+        for key in ("updated", "changed", "errors"):
+            result[key] = counters[key]
+        return result
@@ -0,0 +1,191 @@
+"""
+Dumps das Listas de Sanções
+===========================
+Leitura dos arquivos de "Download de dados" do Portal da Transparência
+(CEIS, CNEP e CEPIM): ZIP com um CSV separado por ';' em latin-1, um
+registro de sanção por linha.
+
+Cada linha vira um SanctionEntry com o documento normalizado:
+- CNPJ: 14 dígitos
+- CPF: 11 dígitos quando completo; os dumps costumam mascarar o CPF de
+  pessoa física (***.456.789-**), então fica só cpf_core (dígitos 4 a 9)
+
+Uso:
+    entries = load_dump("ceis", path_or_bytes)
+"""
+
+import csv
+import hashlib
+import io
+import json
+import re
+import unicodedata
+import zipfile
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Union
+
+import requests
+
+from app.core.config import settings
+
+SANCTIONS_LISTS = ("ceis", "cnep", "cepim")
+
+# Colunas (normalizadas: maiúsculas, sem acento) com documento, tipo e nome
+_DOCUMENT_COLUMNS = ("CPF OU CNPJ DO SANCIONADO", "CNPJ ENTIDADE", "CNPJ")
+_PERSON_TYPE_COLUMNS = ("TIPO DE PESSOA",)
+_NAME_COLUMNS = (
+    "NOME DO SANCIONADO",
+    "RAZAO SOCIAL - CADASTRO RECEITA",
+    "NOME INFORMADO PELO ORGAO SANCIONADOR",
+    "NOME ENTIDADE",
+)
+
+_NON_DIGIT = re.compile(r"\D")
+
+
+@dataclass
+class SanctionEntry:
+    """Um registro de sanção do dump"""
+
+    list_name: str
+    record_key: str
+    document: Optional[str]
+    doc_type: Optional[str]
+    cpf_core: Optional[str]
+    name: Optional[str]
+    payload: Dict[str, str] = field(default_factory=dict)
+
+    def to_row(self) -> Dict:
+        return {
+            "list_name": self.list_name,
+            "record_key": self.record_key,
+            "document": self.document,
+            "doc_type": self.doc_type,
+            "cpf_core": self.cpf_core,
+            "name": self.name,
+            "payload": self.payload,
+        }
+
+
+def _normalize_header(header: str) -> str:
+    text = unicodedata.normalize("NFKD", header.strip().strip('"').upper())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def _first(row: Dict[str, str], columns: Iterable[str]) -> str:
+    for column in columns:
+        value = (row.get(column) or "").strip()
+        if value:
+            return value
+    return ""
+
+
+def cpf_core(document: str) -> Optional[str]:
+    """Dígitos 4 a 9 do CPF (a parte visível no CPF mascarado dos dumps)"""
+    digits = _NON_DIGIT.sub("", document)
+    if len(digits) == 11:
+        return digits[3:9]
+    if len(digits) == 6 and "*" in document:
+        return digits
+    return None
+
+
+def parse_document(raw: str, person_type: str = "") -> Dict[str, Optional[str]]:
+    """
+    Normaliza o documento de uma linha do dump
+
+    Returns:
+        {document, doc_type, cpf_core} (document None se mascarado/inválido)
+    """
+    digits = _NON_DIGIT.sub("", raw)
+    masked = "*" in raw
+    person_type = person_type.strip().upper()[:1]
+    if len(digits) == 14 and not masked:
+        return {"document": digits, "doc_type": "CNPJ", "cpf_core": None}
+    if person_type == "J" and not masked and digits:
+        return {"document": digits.zfill(14), "doc_type": "CNPJ", "cpf_core": None}
+    if len(digits) == 11 and not masked:
+        return {"document": digits, "doc_type": "CPF", "cpf_core": digits[3:9]}
+    core = cpf_core(raw)
+    if core:
+        return {"document": None, "doc_type": "CPF", "cpf_core": core}
+    return {"document": None, "doc_type": None, "cpf_core": None}
+
+
+def record_key(list_name: str, row: Dict[str, str]) -> str:
+    """Hash do registro (mesma linha em dumps diferentes = mesma chave)"""
+    canonical = json.dumps([list_name, sorted(row.items())], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def _csv_text(data: bytes) -> str:
+    """Conteúdo do CSV (dentro do ZIP ou direto)"""
+    if data[:2] == b"PK":
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            names = [n for n in archive.namelist() if n.lower().endswith(".csv")]
+            if not names:
+                raise ValueError("ZIP sem arquivo CSV")
+            data = archive.read(names[0])
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("latin-1")
+
+
+def parse_dump(list_name: str, data: bytes) -> List[SanctionEntry]:
+    """
+    Registros de um dump (ZIP ou CSV)
+
+    Raises:
+        ValueError se a lista for desconhecida ou o arquivo não tiver a
+        coluna de documento
+    """
+    if list_name not in SANCTIONS_LISTS:
+        raise ValueError(f"Lista desconhecida: {list_name}")
+
+    reader = csv.reader(io.StringIO(_csv_text(data)), delimiter=";")
+    try:
+        headers = next(reader)
+    except StopIteration:
+        return []
+    normalized = [_normalize_header(h) for h in headers]
+    if not any(column in normalized for column in _DOCUMENT_COLUMNS):
+        raise ValueError(f"Dump de {list_name} sem coluna de documento: {headers}")
+
+    entries: Dict[str, SanctionEntry] = {}
+    for values in reader:
+        if not any(v.strip() for v in values):
+            continue
+        row = {header: value.strip() for header, value in zip(normalized, values)}
+        document = parse_document(_first(row, _DOCUMENT_COLUMNS), _first(row, _PERSON_TYPE_COLUMNS))
+        key = record_key(list_name, row)
+        entries[key] = SanctionEntry(
+            list_name=list_name,
+            record_key=key,
+            name=_first(row, _NAME_COLUMNS) or None,
+            payload={header: value for header, value in zip(headers, values)},
+            **document,
+        )
+    return list(entries.values())
+
+
+def download_dump(list_name: str, day: Optional[date] = None) -> bytes:
+    """Baixa o dump do dia (padrão: hoje) em SANCTIONS_DUMPS_URL/<lista>/<AAAAMMDD>"""
+    day = day or date.today()
+    url = f"{settings.SANCTIONS_DUMPS_URL.rstrip('/')}/{list_name}/{day:%Y%m%d}"
+    response = requests.get(url, timeout=settings.SANCTIONS_DUMP_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return response.content
+
+
+def load_dump(list_name: str, source: Union[str, bytes, None] = None, day: Optional[date] = None) -> List[SanctionEntry]:
+    """Registros do dump a partir de um arquivo, dos bytes ou do Portal"""
+    if isinstance(source, bytes):
+        data = source
+    elif source:
+        with open(source, "rb") as f:
+            data = f.read()
+    else:
+        data = download_dump(list_name, day)
+    return parse_dump(list_name, data)
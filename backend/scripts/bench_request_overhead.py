@@ -0,0 +1,82 @@
+"""
+Benchmark - Overhead por requisição
+====================================
+Compara o custo de uma rota autenticada (/api/auth/me) em dois modos:
+
+- legado: cada requisição constrói o serviço e um Supabase client novo
+  (comportamento anterior das dependências dos routers)
+- container: serviços e clients compartilhados, criados no lifespan da
+  aplicação (ver app/core/container.py)
+
+Não acessa a rede: só mede construção de clients/serviços + validação do JWT.
+
+Uso (a partir de backend/):
+    python scripts/bench_request_overhead.py --requests 500
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "bench-key")
+
+from fastapi.testclient import TestClient
+
+from app.core import container as container_module
+from app.main import app
+from app.services.auth_service import AuthService
+
+
+def legacy_auth_service():
+    """Dependência como era antes: um client novo por requisição"""
+    container_module.create_supabase_client()
+    return AuthService()
+
+
+def run(client: TestClient, headers: dict, total: int) -> list:
+    timings = []
+    for _ in range(total):
+        start = time.perf_counter()
+        response = client.get("/api/auth/me", headers=headers)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.text
+    return timings
+
+
+def report(label: str, timings: list) -> None:
+    ordered = sorted(timings)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{label:<10} média {statistics.mean(timings):7.3f} ms | p50 {statistics.median(timings):7.3f} ms | p95 {p95:7.3f} ms")
+
+
+def main(total: int) -> None:
+    with TestClient(app) as client:
+        token = client.app.state.container.auth_service._create_access_token(
+            {"sub": "bench-user", "email": "bench@example.com", "company_id": "bench-company"}
+        )
+        headers = {"Authorization": f"Bearer {token}"}
+
+        # Aquecimento
+        run(client, headers, 20)
+
+        app.dependency_overrides[container_module.get_auth_service] = legacy_auth_service
+        legacy = run(client, headers, total)
+        app.dependency_overrides.clear()
+
+        shared = run(client, headers, total)
+
+    print(f"{total} requisições GET /api/auth/me")
+    report("legado", legacy)
+    report("container", shared)
+    print(f"Redução média: {(1 - statistics.mean(shared) / statistics.mean(legacy)) * 100:.1f}%")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mede o overhead por requisição das dependências")
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    main(args.requests)
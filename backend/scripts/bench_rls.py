@@ -0,0 +1,157 @@
+"""
+Benchmark - Custo da RLS por varredura
+=======================================
+Compara, em um Postgres local (scripts/setup_local_postgres.py), o custo das
+consultas de um tenant sob três configurações de RLS:
+
+- legado:  company_id IN (SELECT company_id FROM profiles WHERE id = auth.uid())
+- claim:   company_id = (SELECT current_company_id()) com company_id no JWT
+- profile: company_id = (SELECT current_company_id()) sem a claim (fallback
+           para profiles, avaliado uma vez por instrução)
+
+Popula --tenants empresas com --rows dossiês e registros de monitoramento
+cada, executa cada consulta --iterations vezes como o papel `authenticated`
+(claims em request.jwt.claims, como o PostgREST) e mostra latência média e
+consultas/s. Ao final restaura as políticas da migração 005.
+
+Uso (a partir de backend/):
+    python scripts/bench_rls.py postgresql://postgres@localhost/kyc --rows 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+
+import asyncpg
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MIGRATION_005 = os.path.join(ROOT_DIR, "migrations", "005_rls_company_claim.sql")
+
+LEGACY_POLICIES = """
+DROP POLICY IF EXISTS "Usuários podem ver seu próprio perfil" ON public.profiles;
+CREATE POLICY "Usuários podem ver seu próprio perfil"
+    ON public.profiles FOR SELECT
+    USING (id = auth.uid());
+
+DROP POLICY IF EXISTS "Usuários veem apenas dossiês da própria empresa" ON public.dossiers;
+CREATE POLICY "Usuários veem apenas dossiês da própria empresa"
+    ON public.dossiers FOR SELECT
+    USING (company_id IN (
+        SELECT company_id FROM public.profiles WHERE id = auth.uid()
+    ));
+
+DROP POLICY IF EXISTS "Usuários veem apenas monitoramentos da própria empresa" ON public.monitoring_targets;
+CREATE POLICY "Usuários veem apenas monitoramentos da própria empresa"
+    ON public.monitoring_targets FOR SELECT
+    USING (company_id IN (
+        SELECT company_id FROM public.profiles WHERE id = auth.uid()
+    ));
+"""
+
+QUERIES = {
+    "count dossiers": "SELECT count(*) FROM public.dossiers",
+    "página dossiers": "SELECT id, entity_name, created_at FROM public.dossiers ORDER BY created_at DESC LIMIT 20",
+    "stats monitoramento": """
+        SELECT count(*), count(*) FILTER (WHERE current_status = 'ATIVO')
+        FROM public.monitoring_targets
+    """,
+}
+
+
+async def seed(conn, tenants: int, rows: int) -> list:
+    users = []
+    for idx in range(tenants):
+        company_id, user_id = uuid.uuid4(), uuid.uuid4()
+        await conn.execute("INSERT INTO public.companies (id, name) VALUES ($1, $2)", company_id, f"Bench RLS {idx}")
+        await conn.execute("INSERT INTO auth.users (id, email) VALUES ($1, $2)", user_id, f"bench{idx}@example.com")
+        await conn.execute("INSERT INTO public.profiles (id, company_id) VALUES ($1, $2)", user_id, company_id)
+        await conn.execute(
+            """
+            INSERT INTO public.dossiers (company_id, document_value, entity_name, risk_level, report_data, created_at)
+            SELECT $1, lpad(g::text, 14, '0'), 'Empresa ' || g, 'BAIXO', '{}'::jsonb, now() - g * interval '1 second'
+            FROM generate_series(1, $2) g
+            """,
+            company_id, rows,
+        )
+        await conn.execute(
+            """
+            INSERT INTO public.monitoring_targets (company_id, document, doc_type, current_status, data_json)
+            SELECT $1, lpad(g::text, 14, '0'), 'CNPJ', CASE WHEN g % 3 = 0 THEN 'INATIVO' ELSE 'ATIVO' END, '{}'::jsonb
+            FROM generate_series(1, $2) g
+            """,
+            company_id, rows,
+        )
+        users.append((company_id, user_id))
+    await conn.execute("ANALYZE public.dossiers; ANALYZE public.monitoring_targets; ANALYZE public.profiles")
+    return users
+
+
+async def cleanup(conn, users: list) -> None:
+    for company_id, user_id in users:
+        await conn.execute("DELETE FROM public.monitoring_targets WHERE company_id = $1", company_id)
+        await conn.execute("DELETE FROM public.dossiers WHERE company_id = $1", company_id)
+        await conn.execute("DELETE FROM public.profiles WHERE id = $1", user_id)
+        await conn.execute("DELETE FROM auth.users WHERE id = $1", user_id)
+        await conn.execute("DELETE FROM public.companies WHERE id = $1", company_id)
+
+
+async def run_as_user(conn, claims: dict, query: str):
+    async with conn.transaction():
+        await conn.execute("SET LOCAL ROLE authenticated")
+        await conn.execute("SELECT set_config('request.jwt.claims', $1, true)", json.dumps(claims))
+        start = time.perf_counter()
+        result = await conn.fetch(query)
+        return (time.perf_counter() - start) * 1000, result
+
+
+async def bench(database_url: str, tenants: int, rows: int, iterations: int) -> None:
+    conn = await asyncpg.connect(database_url)
+    with open(MIGRATION_005, encoding="utf-8") as f:
+        new_policies = f.read()
+
+    print(f"Populando {tenants} empresa(s) x {rows} linhas...")
+    users = await seed(conn, tenants, rows)
+    company_id, user_id = users[0]
+
+    variants = [
+        ("legado", LEGACY_POLICIES, {"sub": str(user_id), "role": "authenticated"}),
+        ("claim", new_policies, {"sub": str(user_id), "role": "authenticated",
+                                 "app_metadata": {"company_id": str(company_id)}}),
+        ("profile", new_policies, {"sub": str(user_id), "role": "authenticated"}),
+    ]
+
+    try:
+        print(f"{'política':<9} {'consulta':<20} {'média ms':>9} {'p95 ms':>8} {'cons/s':>8}")
+        for name, policies, claims in variants:
+            await conn.execute(policies)
+            for label, query in QUERIES.items():
+                _, result = await run_as_user(conn, claims, query)  # aquecimento
+                if label == "count dossiers" and result[0][0] != rows:
+                    print(f"FALHA: {name} enxerga {result[0][0]} dossiês (esperado {rows})")
+                    sys.exit(1)
+                timings = [(await run_as_user(conn, claims, query))[0] for _ in range(iterations)]
+                ordered = sorted(timings)
+                p95 = ordered[max(int(len(ordered) * 0.95) - 1, 0)]
+                mean = statistics.mean(timings)
+                print(f"{name:<9} {label:<20} {mean:9.2f} {p95:8.2f} {1000 / mean:8.1f}")
+    finally:
+        await conn.execute(new_policies)
+        await cleanup(conn, users)
+        await conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compara o custo das políticas RLS")
+    parser.add_argument("database_url", nargs="?", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--tenants", type=int, default=2)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    if not args.database_url:
+        print("ERRO: informe a URL do banco (ou DATABASE_URL)")
+        sys.exit(1)
+    asyncio.run(bench(args.database_url, args.tenants, args.rows, args.iterations))
@@ -0,0 +1,56 @@
+"""
+Importação - Arquivo PEP (Pessoas Expostas Politicamente)
+=========================================================
+Importa o arquivo PEP do Portal da Transparência (arquivo local ou download
+do mês) como a nova geração da lista e avisa os processos para trocarem o
+índice em memória (ver app/services/pep_list.py). Agende uma vez por mês,
+depois da publicação do arquivo.
+
+Usa a mesma configuração do backend (.env: DATABASE_URL ou SUPABASE_*,
+SANCTIONS_DUMPS_URL).
+
+Uso (a partir de backend/):
+    python scripts/import_pep_dump.py                        # arquivo do mês atual
+    python scripts/import_pep_dump.py --file 202601_PEP.zip
+    python scripts/import_pep_dump.py --month 2026-01
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.container import create_supabase_client
+from app.core.database import close_database, get_database
+from app.services.pep_list import PepImporter, load_pep_dump
+
+
+def main(file_path, month) -> None:
+    source = file_path or f"pep/{month:%Y%m}"
+    try:
+        entries = load_pep_dump(file_path, month)
+    except Exception as e:
+        print(f"pep: erro ao ler o arquivo ({source}): {e}")
+        sys.exit(1)
+
+    client = None if get_database() else create_supabase_client()
+    try:
+        result = PepImporter(client=client).ingest(entries, source)
+    finally:
+        close_database()
+    print(json.dumps(result, ensure_ascii=False))
+    if not result["success"]:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", help="arquivo local (ZIP ou CSV)")
+    parser.add_argument(
+        "--month", type=lambda value: datetime.strptime(value, "%Y-%m").date(),
+        default=date.today(), help="mês do arquivo (AAAA-MM)",
+    )
+    args = parser.parse_args()
+    main(args.file, args.month)
@@ -0,0 +1,75 @@
+"""
+Importação - Dumps das listas de sanções
+========================================
+Importa o dump diário de CEIS/CNEP/CEPIM (arquivo local ou download do
+Portal), aplica o delta ao snapshot e re-verifica os registros monitorados
+afetados (ver app/services/sanctions_delta.py). Agende uma vez por dia,
+depois da publicação dos dumps.
+
+Usa a mesma configuração do backend (.env: DATABASE_URL ou SUPABASE_*,
+chaves do Portal, SANCTIONS_DUMPS_URL).
+
+Uso (a partir de backend/):
+    python scripts/import_sanctions_dump.py                          # 3 listas, dump de hoje
+    python scripts/import_sanctions_dump.py --list ceis --file 20260110_CEIS.zip
+    python scripts/import_sanctions_dump.py --date 2026-01-10 --no-rescreen
+    python scripts/import_sanctions_dump.py --list ceis --force       # aceita remoção grande
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.container import ServiceContainer
+from app.core.database import get_database
+from app.services.sanctions_delta import SanctionsDeltaIngester
+from app.services.sanctions_dumps import SANCTIONS_LISTS, load_dump
+
+
+def main(lists, file_path, day, rescreen, rescreen_baseline, force) -> None:
+    container = ServiceContainer()
+    container.start()
+    client = None if get_database() else container.supabase
+    ingester = SanctionsDeltaIngester(client=client)
+
+    failed = False
+    try:
+        for list_name in lists:
+            source = file_path or f"{list_name}/{day:%Y%m%d}"
+            try:
+                entries = load_dump(list_name, file_path, day)
+            except Exception as e:
+                print(f"{list_name}: erro ao ler o dump ({source}): {e}")
+                failed = True
+                continue
+            result = ingester.ingest(
+                list_name, entries, source, rescreen=rescreen, rescreen_baseline=rescreen_baseline, force=force
+            )
+            print(json.dumps(result, ensure_ascii=False))
+            failed = failed or not result["success"]
+    finally:
+        container.close()
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--list", choices=SANCTIONS_LISTS, help="só esta lista (padrão: as três)")
+    parser.add_argument("--file", help="dump local (ZIP ou CSV); exige --list")
+    parser.add_argument("--date", type=date.fromisoformat, default=date.today(), help="dia do dump (AAAA-MM-DD)")
+    parser.add_argument("--no-rescreen", action="store_true", help="só marca os afetados para o refresh contínuo")
+    parser.add_argument("--rescreen-baseline", action="store_true", help="re-verifica também na primeira importação")
+    parser.add_argument("--force", action="store_true",
+                        help="aplica mesmo removendo mais que SANCTIONS_DELTA_MAX_REMOVED_SHARE do snapshot")
+    args = parser.parse_args()
+    if args.file and not args.list:
+        parser.error("--file exige --list")
+    main(
+        [args.list] if args.list else list(SANCTIONS_LISTS), args.file, args.date,
+        not args.no_rescreen, args.rescreen_baseline, args.force,
+    )
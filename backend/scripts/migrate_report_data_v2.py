@@ -0,0 +1,92 @@
+"""
+Migração - report_data v2 (compacto)
+=====================================
+Converte os dossiês existentes para o formato deduplicado v2
+(ver app/services/report_format.py), move as respostas externas para o
+payload store (ver migrations/001_upstream_payloads.sql) e reporta a
+economia por dossiê.
+
+Uso (a partir de backend/):
+    python scripts/migrate_report_data_v2.py            # aplica
+    python scripts/migrate_report_data_v2.py --dry-run  # só calcula a economia
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from supabase import create_client
+
+from app.core.config import settings
+from app.services import report_format
+from app.services.payload_store import PayloadStore
+
+PAGE_SIZE = 100
+
+
+def migrate(dry_run: bool = False) -> None:
+    if not settings.SUPABASE_URL or not settings.SUPABASE_KEY:
+        print('ERRO: Configure SUPABASE_URL e SUPABASE_KEY no .env')
+        sys.exit(1)
+
+    client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+    payloads = PayloadStore(client)
+
+    print('=' * 60)
+    print('Migração report_data -> v2' + (' (dry-run)' if dry_run else ''))
+    print('=' * 60)
+
+    offset = 0
+    migrated = 0
+    skipped = 0
+    total_before = 0
+    total_after = 0
+
+    while True:
+        response = (
+            client.table("dossiers")
+            .select("id,document_value,report_data")
+            .order("id")
+            .range(offset, offset + PAGE_SIZE - 1)
+            .execute()
+        )
+        rows = response.data or []
+        if not rows:
+            break
+
+        for row in rows:
+            report_data = row.get("report_data") or {}
+            compact = report_format.compact_report_data(report_data)
+            if not dry_run:
+                compact = payloads.externalize(compact, report_format.PAYLOAD_PATHS)
+            if compact == report_data:
+                skipped += 1
+                continue
+
+            before = report_format.json_size(report_data)
+            after = report_format.json_size(compact)
+
+            if not dry_run:
+                client.table("dossiers").update({"report_data": compact}).eq("id", row["id"]).execute()
+
+            migrated += 1
+            total_before += before
+            total_after += after
+            saved_pct = (1 - after / before) * 100 if before else 0
+            print(f"{row['id']} ({row.get('document_value')}): {before} -> {after} bytes ({saved_pct:.1f}% menor)")
+
+        offset += PAGE_SIZE
+
+    print()
+    print(f"Migrados: {migrated} | Já migrados: {skipped}")
+    if migrated:
+        print(f"Total: {total_before} -> {total_after} bytes")
+        print(f"Economia média por dossiê: {(total_before - total_after) / migrated:.0f} bytes")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Migra report_data dos dossiês para o formato v2")
+    parser.add_argument("--dry-run", action="store_true", help="Não grava, apenas calcula a economia")
+    args = parser.parse_args()
+    migrate(dry_run=args.dry_run)
@@ -0,0 +1,74 @@
+"""
+Worker - Refresh contínuo do monitoramento
+==========================================
+Processo dedicado ao refresh dos registros monitorados vencidos (ver
+app/services/refresh_workers.py). Rode quantos processos/instâncias forem
+necessários: os leases (migrations/010) garantem que cada registro vencido
+seja processado por um único worker, e registros de um worker que caiu
+voltam à fila quando o lease expira.
+
+Usa a mesma configuração do backend (.env: DATABASE_URL ou SUPABASE_*,
+chaves do Portal, UPSTREAM_LIMITS, REFRESH_*); MONITORING_REFRESH_WORKERS
+é ignorado (os workers do processo são os de --threads).
+
+Uso (a partir de backend/):
+    python scripts/run_refresh_worker.py --threads 2
+    python scripts/run_refresh_worker.py --until-idle   # sai sem vencidos
+    python scripts/run_refresh_worker.py --until-idle --company-id <uuid>
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.container import ServiceContainer
+from app.core.database import get_database
+from app.services.refresh_workers import TargetRefreshWorker
+
+
+def main(threads: int, until_idle: bool, company_id: Optional[str]) -> None:
+    # Os workers deste processo são os de --threads (não os do backend)
+    settings.MONITORING_REFRESH_WORKERS = 0
+    container = ServiceContainer()
+    # Sessão HTTP, limites globais das APIs externas e eventos (NOTIFY), como
+    # no backend; os jobs de atualização da API também são atendidos aqui
+    container.start()
+    client = None if get_database() else container.supabase
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    results = []
+    workers = [TargetRefreshWorker(client=client) for _ in range(threads)]
+    pool = [
+        threading.Thread(target=lambda w=w: results.append(w.run(stop, until_idle=until_idle, company_id=company_id)), daemon=True)
+        for w in workers
+    ]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        while thread.is_alive():
+            thread.join(0.5)
+    elapsed = time.perf_counter() - start
+
+    updated = sum(r["updated"] for r in results)
+    errors = sum(r["errors"] for r in results)
+    print(f"Refresh {os.getpid()}: {updated} atualizados, {errors} erros em {elapsed:.1f} s")
+    container.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=1, help="workers neste processo")
+    parser.add_argument("--until-idle", action="store_true", help="sai quando não houver registros vencidos")
+    parser.add_argument("--company-id", help="só os registros desta empresa")
+    args = parser.parse_args()
+    main(args.threads, args.until_idle, args.company_id)
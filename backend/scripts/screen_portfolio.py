@@ -0,0 +1,41 @@
+"""
+Triagem - Carteira inteira contra as listas de sanções
+======================================================
+Cruza todos os dossiês e registros monitorados (de uma empresa ou de
+todas) com o snapshot atual das listas (importado por
+scripts/import_sanctions_dump.py) e grava as ocorrências em
+sanctions_screening_hits (ver app/services/portfolio_screening.py).
+
+Usa a mesma configuração do backend (.env: DATABASE_URL ou SUPABASE_*).
+
+Uso (a partir de backend/):
+    python scripts/screen_portfolio.py                       # todas as empresas
+    python scripts/screen_portfolio.py --company-id <uuid>
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.container import create_supabase_client
+from app.core.database import close_database, get_database
+from app.services.portfolio_screening import PortfolioScreening
+
+
+def main(company_id) -> None:
+    client = None if get_database() else create_supabase_client()
+    try:
+        result = PortfolioScreening(client=client).run(company_id)
+    finally:
+        close_database()
+    print(json.dumps(result, ensure_ascii=False))
+    if not result["success"]:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--company-id", help="só a carteira desta empresa (padrão: todas)")
+    main(parser.parse_args().company_id)
@@ -0,0 +1,54 @@
+"""
+Setup - Postgres local
+=======================
+Cria o schema do sistema em um Postgres comum (sem Supabase), para
+desenvolvimento e para testar o backend Postgres direto (app/core/database.py):
+
+1. scripts/sql/local_supabase_auth.sql (stub do schema auth)
+2. setup_database.sql
+3. migrations/*.sql, em ordem
+
+Use em um banco vazio (o setup cria políticas sem IF NOT EXISTS).
+
+Uso (a partir de backend/):
+    python scripts/setup_local_postgres.py postgresql://postgres@localhost:5432/kyc
+"""
+import argparse
+import asyncio
+import glob
+import os
+import sys
+
+import asyncpg
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(BACKEND_DIR)
+
+
+def sql_files() -> list:
+    return [
+        os.path.join(BACKEND_DIR, "scripts", "sql", "local_supabase_auth.sql"),
+        os.path.join(ROOT_DIR, "setup_database.sql"),
+        *sorted(glob.glob(os.path.join(ROOT_DIR, "migrations", "*.sql"))),
+    ]
+
+
+async def setup(database_url: str) -> None:
+    conn = await asyncpg.connect(database_url)
+    try:
+        for path in sql_files():
+            with open(path, encoding="utf-8") as f:
+                await conn.execute(f.read())
+            print(f"OK  {os.path.relpath(path, ROOT_DIR)}")
+    finally:
+        await conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Cria o schema em um Postgres local")
+    parser.add_argument("database_url", nargs="?", default=os.getenv("DATABASE_URL"))
+    args = parser.parse_args()
+    if not args.database_url:
+        print("ERRO: informe a URL do banco (ou DATABASE_URL)")
+        sys.exit(1)
+    asyncio.run(setup(args.database_url))
@@ -0,0 +1,50 @@
+-- ============================================
+-- Stub local do schema auth do Supabase
+-- ============================================
+-- Permite aplicar setup_database.sql e migrations/ em um Postgres comum
+-- (desenvolvimento e testes do backend Postgres direto). NÃO aplicar no Supabase.
+--
+-- auth.uid()/auth.role() leem as claims do JWT como o Supabase:
+--   SET request.jwt.claims = '{"sub": "<uuid>", "role": "authenticated"}';
+-- ============================================
+
+CREATE SCHEMA IF NOT EXISTS auth;
+
+CREATE TABLE IF NOT EXISTS auth.users (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    email TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION auth.uid()
+RETURNS UUID AS $$
+    SELECT NULLIF(current_setting('request.jwt.claims', true)::jsonb ->> 'sub', '')::uuid;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION auth.role()
+RETURNS TEXT AS $$
+    SELECT COALESCE(current_setting('request.jwt.claims', true)::jsonb ->> 'role', 'service_role');
+$$ LANGUAGE sql STABLE;
+
+-- Papéis do Supabase (RLS vale para authenticated/anon; service_role ignora)
+DO $$
+BEGIN
+    CREATE ROLE anon NOLOGIN;
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+DO $$
+BEGIN
+    CREATE ROLE authenticated NOLOGIN;
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+DO $$
+BEGIN
+    CREATE ROLE service_role NOLOGIN BYPASSRLS;
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+GRANT USAGE ON SCHEMA public, auth TO anon, authenticated, service_role;
+ALTER DEFAULT PRIVILEGES IN SCHEMA public
+    GRANT SELECT, INSERT, UPDATE, DELETE ON TABLES TO anon, authenticated, service_role;
@@ -0,0 +1,415 @@
+"""
+Fixtures compartilhadas dos testes do backend
+=============================================
+- portal: stub local do Portal da Transparência (um servidor HTTP por
+  sessão; registros, atrasos e erros configurados por teste)
+- fake_supabase: client Supabase em memória que conta as consultas
+- database: Postgres direto (DATABASE_URL, com o schema de
+  scripts/setup_local_postgres.py); testes marcados com `db` são pulados
+  sem DATABASE_URL
+- no_sanctions_cache: query_sanctions sempre consulta o Portal
+
+O ambiente é configurado antes de importar a aplicação: settings e
+kyc_engine leem as variáveis no import.
+
+Uso (a partir de backend/):
+    python -m pytest -q
+    DATABASE_URL=postgresql://postgres@localhost/kyc python -m pytest -q
+"""
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# O Postgres só entra nos testes que pedem a fixture `database`
+DATABASE_URL = os.environ.pop("DATABASE_URL", "")
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+os.environ["TRANSPARENCIA_API_KEYS"] = "chave-teste"
+os.environ["TRANSPARENCIA_KEY_RATE_PER_MINUTE"] = "1000000"
+os.environ["UPSTREAM_LIMITS"] = "{}"
+os.environ["UPSTREAM_RATE_BACKEND"] = "local"
+os.environ["QUOTA_ENABLED"] = "false"
+os.environ["AI_PROVIDER"] = "stub"
+os.environ["REFRESH_JOB_WORKERS"] = "0"
+
+
+class _PortalHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        portal: "PortalStub" = self.server.portal
+        url = urlparse(self.path)
+        endpoint = url.path.rsplit("/", 1)[-1]
+        query = parse_qs(url.query)
+        # O primeiro parâmetro é o documento (ver kyc_engine._query_list)
+        document = next(iter(query.values()), [""])[0]
+        page = int(query.get("pagina", ["1"])[0])
+        key = self.headers.get("chave-api-dados", "")
+        with portal.lock:
+            portal.calls[(endpoint, document)] += 1
+            portal.keys[key] += 1
+            hits = portal.keys[key]
+
+        reply = portal.responder(endpoint, document, key, hits) if portal.responder else None
+        if reply is None:
+            time.sleep(portal.delays.get((endpoint, document), portal.delays.get(endpoint, portal.delay)))
+            status = portal.errors.get((endpoint, document), 200)
+            items = portal.records.get((endpoint, document), [])
+            body = items[(page - 1) * portal.page_size:page * portal.page_size] if status == 200 else {"erro": "indisponível"}
+            reply = (status, body, {})
+        status, body, headers = reply
+
+        payload = json.dumps(body).encode()
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # cliente desistiu (prazo)
+
+    def log_message(self, *args):
+        pass
+
+
+class PortalStub:
+    """
+    Portal da Transparência local
+
+    - records[(endpoint, documento)]: registros devolvidos (paginados em
+      page_size, como no Portal)
+    - errors[(endpoint, documento)]: status HTTP de erro
+    - delays[(endpoint, documento)] ou delays[endpoint], senão delay: atraso
+    - responder(endpoint, documento, chave, chamadas da chave): resposta
+      própria (status, corpo, headers) ou None para a padrão
+    - calls[(endpoint, documento)] e keys[chave]: chamadas recebidas
+    """
+
+    page_size = 15
+
+    def __init__(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _PortalHandler)
+        self.server.daemon_threads = True
+        self.server.portal = self
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/api-de-dados"
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.records: Dict[Tuple[str, str], List] = {}
+        self.errors: Dict[Tuple[str, str], int] = {}
+        self.delays: Dict = {}
+        self.delay = 0.0
+        self.responder: Optional[Callable[[str, str, str, int], Optional[Tuple[int, object, Dict]]]] = None
+        self.clear_calls()
+
+    def clear_calls(self) -> None:
+        with self.lock:
+            self.calls: Counter = Counter()
+            self.keys: Counter = Counter()
+
+    def lists_called(self, document: str) -> List[str]:
+        return sorted(endpoint for endpoint, doc in self.calls if doc == document)
+
+    def document_calls(self) -> Counter:
+        counts: Counter = Counter()
+        for (_, document), n in list(self.calls.items()):
+            counts[document] += n
+        return counts
+
+
+_portal = PortalStub()
+os.environ["TRANSPARENCIA_BASE_URL"] = _portal.base_url
+threading.Thread(target=_portal.server.serve_forever, daemon=True).start()
+
+from app import kyc_engine  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.database import close_database, get_database  # noqa: E402
+from app.core.events import events  # noqa: E402
+from app.core.sanctions_filter import sanctions_filter  # noqa: E402
+from app.services.auth_service import AuthService  # noqa: E402
+from app.services.name_screening import sanctioned_names  # noqa: E402
+from app.services.pep_list import pep_list  # noqa: E402
+
+
+def pytest_collection_modifyitems(config, items):
+    if DATABASE_URL:
+        return
+    skip = pytest.mark.skip(reason="sem DATABASE_URL")
+    for item in items:
+        if "db" in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    _portal.server.shutdown()
+    kyc_engine.shutdown_source_pool()
+
+
+def _unload(index) -> None:
+    """Descarta o índice carregado (filtro de sanções, nomes ou PEP)"""
+    index.set_loader(lambda: None)
+    index.reload()
+    index.set_loader(None)
+
+
+@pytest.fixture(autouse=True)
+def _reset_process_state():
+    """Estado de processo que um teste não pode deixar para o próximo"""
+    kyc_engine.clear_sanctions_cache()
+    yield
+    kyc_engine.clear_sanctions_cache()
+    kyc_engine.set_http_session(None)
+    events.set_publisher(None)
+    for index in (sanctions_filter, sanctioned_names, pep_list):
+        _unload(index)
+    close_database()
+
+
+@pytest.fixture
+def portal() -> PortalStub:
+    _portal.reset()
+    yield _portal
+    _portal.reset()
+
+
+def _register_lists() -> None:
+    for sanctions_list in list(kyc_engine.SANCTIONS_LISTS.values()):
+        kyc_engine.register_sanctions_list(sanctions_list)
+
+
+@pytest.fixture
+def no_sanctions_cache():
+    """Caches por lista de query_sanctions com TTL zero (cada consulta vai ao Portal)"""
+    ttl = settings.SANCTIONS_LIST_CACHE_TTL_SECONDS
+    settings.SANCTIONS_LIST_CACHE_TTL_SECONDS = 0
+    _register_lists()
+    try:
+        yield
+    finally:
+        settings.SANCTIONS_LIST_CACHE_TTL_SECONDS = ttl
+        _register_lists()
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """Backend Postgres direto (get_database) apontado para DATABASE_URL"""
+    if not DATABASE_URL:
+        pytest.skip("sem DATABASE_URL")
+    monkeypatch.setattr(settings, "DATABASE_URL", DATABASE_URL)
+    db = get_database()
+    if db is None:
+        pytest.skip("asyncpg não instalado")
+    yield db
+    close_database()
+
+
+@pytest.fixture
+def database_url() -> str:
+    """DATABASE_URL para processos filhos (workers)"""
+    if not DATABASE_URL:
+        pytest.skip("sem DATABASE_URL")
+    return DATABASE_URL
+
+
+@pytest.fixture
+def make_company(database):
+    """Cria empresas de teste; remove os dados delas ao final"""
+    created: List[str] = []
+
+    def make(name: str = "Teste") -> str:
+        company_id = str(uuid.uuid4())
+        database.execute("INSERT INTO public.companies (id, name) VALUES ($1::uuid, $2)", company_id, name)
+        created.append(company_id)
+        return company_id
+
+    yield make
+    if created:
+        db = get_database()  # o shutdown da aplicação (TestClient) fecha o pool
+        for table in ("monitoring_refresh_jobs", "monitoring_targets", "dossiers"):
+            db.execute(f"DELETE FROM public.{table} WHERE company_id = ANY($1::uuid[])", created)
+        db.execute("DELETE FROM public.companies WHERE id = ANY($1::uuid[])", created)
+
+
+@pytest.fixture
+def access_token() -> Callable[..., str]:
+    """Token de acesso do backend para a empresa"""
+    service = AuthService(auth_clients=None)
+
+    def token(company_id: str, user_id: Optional[str] = None) -> str:
+        return service._create_access_token(
+            {"sub": user_id or str(uuid.uuid4()), "email": "teste@example.com", "company_id": company_id}
+        )
+
+    return token
+
+
+@pytest.fixture
+def auth_headers(access_token) -> Callable[..., Dict[str, str]]:
+    """Authorization com um token de acesso do backend para a empresa"""
+    return lambda company_id, user_id=None: {"Authorization": f"Bearer {access_token(company_id, user_id)}"}
+
+
+# ============================================
+# Supabase em memória
+# ============================================
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    """Encadeamento do PostgREST (select/eq/in_/single/...) sobre linhas fixas"""
+
+    def __init__(self, client: "FakeSupabase", table: str):
+        self.client, self.table = client, table
+        self.filters: Dict[str, object] = {}
+        self.payload = None
+        self.action = "select"
+        self.bounds: Optional[Tuple[int, int]] = None
+        self.columns = "*"
+
+    def select(self, columns: str = "*", **kwargs):
+        self.columns = self.payload = columns
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def in_(self, column, values):
+        self.filters[column] = list(values)
+        return self
+
+    def single(self):
+        return self
+
+    def limit(self, *args):
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def update(self, payload):
+        self.action, self.payload = "update", payload
+        return self
+
+    def insert(self, payload):
+        self.action, self.payload = "insert", payload
+        return self
+
+    def upsert(self, payload, **kwargs):
+        self.action, self.payload = "upsert", payload
+        return self
+
+    def _matches(self, row: Dict) -> bool:
+        return all(
+            row.get(column) in value if isinstance(value, list) else row.get(column) == value
+            for column, value in self.filters.items()
+        )
+
+    def _project(self, row: Dict) -> Dict:
+        """Colunas do select, com alias e caminhos JSON (alias:report_data->a->b)"""
+        if self.columns == "*":
+            return row
+        projected = {}
+        for column in self.columns.split(","):
+            alias, _, expression = column.rpartition(":")
+            path = expression.split("->")
+            node = row
+            for key in path:
+                node = node.get(key) if isinstance(node, dict) else None
+            projected[alias or path[-1]] = node
+        return projected
+
+    def execute(self):
+        self.client.queries.append((self.table, self.action, dict(self.filters), self.payload))
+        error = self.client.errors.get(self.table)
+        if error:
+            raise error
+        if self.action != "select":
+            return FakeResult([self.payload] if isinstance(self.payload, dict) else self.payload)
+        rows = self.client.rows.get(self.table)
+        if isinstance(rows, list):
+            rows = [row for row in rows if self._matches(row)]
+            if self.bounds:
+                rows = rows[self.bounds[0]:self.bounds[1] + 1]
+            rows = [self._project(row) for row in rows]
+        return FakeResult(rows)
+
+
+class FakeRpc:
+    def __init__(self, client: "FakeSupabase", name: str, params: Dict):
+        self.client, self.name, self.params = client, name, params
+
+    def _project(self, row: Dict) -> Dict:
+        """Colunas do select, com alias e caminhos JSON (alias:report_data->a->b)"""
+        if self.columns == "*":
+            return row
+        projected = {}
+        for column in self.columns.split(","):
+            alias, _, expression = column.rpartition(":")
+            path = expression.split("->")
+            node = row
+            for key in path:
+                node = node.get(key) if isinstance(node, dict) else None
+            projected[alias or path[-1]] = node
+        return projected
+
+    def execute(self):
+        self.client.rpcs.append((self.name, self.params))
+        handler = self.client.functions.get(self.name)
+        if isinstance(handler, Exception):
+            raise handler
+        return FakeResult(handler(self.params) if handler else None)
+
+
+class FakeSupabase:
+    """
+    Client Supabase mínimo
+
+    - rows[tabela]: resultado dos selects na tabela (lista de linhas:
+      filtrada por eq/in_, paginada por range e projetada pelas colunas do
+      select, inclusive alias:report_data->a->b; dict: devolvido como está)
+    - functions[nome]: função params -> data, ou exceção levantada no rpc
+    - errors[tabela]: exceção levantada em qualquer execute na tabela
+    - queries e rpcs: chamadas feitas, na ordem; queries como (tabela,
+      ação, filtros, payload ou colunas do select)
+    """
+
+    def __init__(self, rows: Optional[Dict] = None, functions: Optional[Dict] = None):
+        self.rows = rows or {}
+        self.functions = functions or {}
+        self.errors: Dict[str, Exception] = {}
+        self.queries: List[Tuple] = []
+        self.rpcs: List[Tuple] = []
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: Dict) -> FakeRpc:
+        return FakeRpc(self, name, params)
+
+
+@pytest.fixture
+def fake_supabase() -> FakeSupabase:
+    return FakeSupabase()
@@ -0,0 +1,253 @@
+"""
+Pipeline de IA
+==============
+AIScheduler com o modelo stub (AI_PROVIDER=stub) e um Supabase em memória;
+um único worker, com o primeiro job segurando o slot enquanto os demais
+entram na fila:
+
+- jobs interativos saem antes dos de lote
+- round-robin entre empresas dentro da mesma prioridade
+- RateBudget segura o despacho até a janela liberar orçamento
+- itens de lote empacotados em uma chamada; resposta empacotada fora do
+  formato (split_packed_response) volta para chamadas individuais
+  (_requeue_unpacked)
+- dossiê com IA gravado com ai_status PENDENTE e atualizado pela fila
+- save_analysis: read-modify-write só quando a função não existe
+  (PGRST202/42883); outros erros sobem
+- stop() marca com ERRO os jobs que ficaram na fila (_drain)
+"""
+import threading
+import time
+
+import pytest
+from postgrest.exceptions import APIError
+
+from app.core.config import settings
+from app.services import ai_pipeline
+from app.services.ai_pipeline import (
+    AI_INTERRUPTED_MESSAGE, AI_STATUS_DONE, AI_STATUS_ERROR, AI_STATUS_PENDING, PRIORITY_BATCH, PRIORITY_INTERACTIVE,
+    AIScheduler, RateBudget, StubModel, build_ai_facts, save_analysis, split_packed_response,
+)
+from app.services.dossier_service import DossierService
+
+HOLD = 0.2
+
+
+def facts(name: str) -> dict:
+    """Fatos de um dossiê (documento único: sem acerto no cache de análises)"""
+    return build_ai_facts({"document": f"{name}-{time.monotonic_ns()}", "doc_type": "CNPJ"})
+
+
+class RecordingModel:
+    """Stub que registra os prompts; `packed_reply` substitui a resposta empacotada"""
+
+    model_name = "stub"
+
+    def __init__(self, delay_seconds: float = 0.0, packed_reply=None):
+        self.stub = StubModel(delay_seconds)
+        self.packed_reply = packed_reply
+        self.prompts = []
+
+    def generate_content(self, prompt, request_options=None):
+        self.prompts.append(prompt)
+        response = self.stub.generate_content(prompt, request_options)
+        if self.packed_reply is not None and ai_pipeline.PACK_HEADER.search(prompt):
+            response.text = self.packed_reply
+        return response
+
+    def packed_calls(self) -> int:
+        return sum(bool(ai_pipeline.PACK_HEADER.search(prompt)) for prompt in self.prompts)
+
+
+class Done:
+    """Coleta os on_done na ordem em que as análises ficam prontas"""
+
+    def __init__(self):
+        self.items = []
+        self._cond = threading.Condition()
+
+    def callback(self, label: str):
+        def on_done(status: str, analysis: str) -> None:
+            with self._cond:
+                self.items.append((label, status, analysis, time.monotonic()))
+                self._cond.notify_all()
+        return on_done
+
+    def wait(self, count: int, timeout: float = 10.0) -> list:
+        with self._cond:
+            assert self._cond.wait_for(lambda: len(self.items) >= count, timeout), self.items
+        return self.items
+
+    def labels(self) -> list:
+        return [label for label, *_ in self.items]
+
+
+@pytest.fixture
+def stub_model(monkeypatch):
+    """Modelo stub lento (HOLD por chamada) no lugar dos clientes do processo"""
+    monkeypatch.setattr(settings, "AI_PROVIDER", "stub")
+    model = RecordingModel(HOLD)
+    monkeypatch.setattr(ai_pipeline, "_models", {"stub": model})
+    ai_pipeline._result_cache.clear()
+    yield model
+    ai_pipeline._result_cache.clear()
+
+
+@pytest.fixture
+def make_scheduler(fake_supabase, stub_model):
+    """AIScheduler com um worker; parado ao final do teste"""
+    created = []
+
+    def make(**kwargs):
+        scheduler = AIScheduler(fake_supabase, **{"workers": 1, "pack_size": 1, **kwargs})
+        created.append(scheduler)
+        return scheduler
+
+    yield make
+    for scheduler in created:
+        scheduler.stop()
+
+
+def hold_slot(scheduler: AIScheduler, done: Done) -> None:
+    """Primeiro job ocupa o único worker; os seguintes ficam na fila"""
+    scheduler.submit("segura", "empresa-0", facts("segura"), PRIORITY_BATCH, done.callback("segura"))
+    deadline = time.monotonic() + 5
+    while sum(scheduler.pending().values()) and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_interactive_before_batch(make_scheduler):
+    scheduler, done = make_scheduler(), Done()
+    hold_slot(scheduler, done)
+    for i in range(2):
+        scheduler.submit(f"lote-{i}", "empresa-a", facts("lote"), PRIORITY_BATCH, done.callback(f"lote-{i}"))
+    scheduler.submit("interativo", "empresa-b", facts("interativo"), PRIORITY_INTERACTIVE, done.callback("interativo"))
+    assert scheduler.pending() == {PRIORITY_INTERACTIVE: 1, PRIORITY_BATCH: 2}
+
+    done.wait(4)
+    assert done.labels() == ["segura", "interativo", "lote-0", "lote-1"]
+    assert all(status == AI_STATUS_DONE for _, status, *_ in done.items)
+
+
+def test_round_robin_across_companies(make_scheduler):
+    scheduler, done = make_scheduler(), Done()
+    hold_slot(scheduler, done)
+    for i in range(4):
+        scheduler.submit(f"a{i}", "empresa-a", facts("a"), PRIORITY_BATCH, done.callback(f"a{i}"))
+    for i in range(2):
+        scheduler.submit(f"b{i}", "empresa-b", facts("b"), PRIORITY_BATCH, done.callback(f"b{i}"))
+
+    done.wait(7)
+    # A empresa com mais itens não segura a outra
+    assert done.labels() == ["segura", "a0", "b0", "a1", "b1", "a2", "a3"]
+
+
+def test_rate_budget_holds_dispatch(make_scheduler, stub_model):
+    budget = RateBudget(requests_per_minute=2, tokens_per_minute=10 ** 6, window_seconds=0.6)
+    assert budget.wait_time(100) == 0
+    budget.consume(100)
+    budget.consume(100)
+    assert budget.wait_time(100) > 0 and budget.usage() == {"requests": 2, "tokens": 200}
+
+    stub_model.stub.delay_seconds = 0
+    scheduler, done = make_scheduler(workers=4), Done()
+    scheduler.budget = RateBudget(requests_per_minute=2, tokens_per_minute=10 ** 6, window_seconds=0.6)
+    started = time.monotonic()
+    for i in range(3):
+        scheduler.submit(f"i{i}", f"empresa-{i}", facts("i"), PRIORITY_INTERACTIVE, done.callback(f"i{i}"))
+
+    items = done.wait(3)
+    elapsed = [at - started for *_, at in items]
+    assert elapsed[1] < 0.3, elapsed
+    # O terceiro só sai quando a primeira requisição deixa a janela
+    assert elapsed[2] >= 0.55, elapsed
+
+
+def test_batch_items_packed(make_scheduler, stub_model):
+    scheduler, done = make_scheduler(pack_size=3), Done()
+    hold_slot(scheduler, done)
+    for company in ("a", "b", "c"):
+        scheduler.submit(company, f"empresa-{company}", facts(company), PRIORITY_BATCH, done.callback(company))
+
+    done.wait(4)
+    assert stub_model.packed_calls() == 1 and len(stub_model.prompts) == 2
+    assert all(status == AI_STATUS_DONE and analysis.startswith("[stub]") for _, status, analysis, _ in done.items)
+
+
+def test_malformed_packed_response_falls_back(make_scheduler, stub_model):
+    stub_model.packed_reply = "### ITEM 1\nanálise\n\n### ITEM 3\noutra"
+    scheduler, done = make_scheduler(pack_size=3), Done()
+    hold_slot(scheduler, done)
+    for company in ("a", "b", "c"):
+        scheduler.submit(company, f"empresa-{company}", facts(company), PRIORITY_BATCH, done.callback(company))
+
+    done.wait(4)
+    # Uma chamada empacotada descartada e os três itens reenviados sozinhos
+    assert stub_model.packed_calls() == 1 and len(stub_model.prompts) == 5
+    assert sorted(done.labels()[1:]) == ["a", "b", "c"]
+    assert all(status == AI_STATUS_DONE and analysis.startswith("[stub]") for _, status, analysis, _ in done.items)
+
+
+def test_split_packed_response():
+    text = "### ITEM 1\nprimeira\n### ITEM 2\nsegunda"
+    assert split_packed_response(text, 2) == ["primeira", "segunda"]
+    assert split_packed_response(text, 3) is None
+    assert split_packed_response("### ITEM 1\n\n### ITEM 2\nsegunda", 2) is None
+    assert split_packed_response("sem cabeçalhos", 1) is None
+
+
+def test_dossier_saved_pending_then_updated(portal, fake_supabase, stub_model, monkeypatch):
+    monkeypatch.setattr(ai_pipeline, "_ai_scheduler", None)
+    events = []
+    ready = threading.Event()
+
+    def on_event(name, data):
+        events.append((name, data))
+        if name == "ai":
+            ready.set()
+
+    try:
+        result = DossierService(client=fake_supabase).generate_and_save(
+            "39053344705", "empresa-a", enable_ai=True, on_event=on_event
+        )
+        assert result["success"], result.get("error")
+        inserted = next(payload for table, action, _, payload in fake_supabase.queries if action == "insert")
+        assert inserted[0]["report_data"]["ai_status"] == AI_STATUS_PENDING and result["ai_status"] == AI_STATUS_PENDING
+
+        assert ready.wait(10)
+        name, params = fake_supabase.rpcs[-1]
+        assert name == "set_dossier_ai_analysis" and params["p_dossier_id"] == result["dossier_id"]
+        assert params["p_status"] == AI_STATUS_DONE and params["p_analysis"].startswith("[stub]")
+        assert events[-1][1]["status"] == AI_STATUS_DONE
+    finally:
+        ai_pipeline.shutdown_ai_scheduler()
+
+
+@pytest.mark.parametrize("code", ["PGRST202", "42883"])
+def test_save_analysis_fallback_without_function(fake_supabase, code):
+    fake_supabase.functions["set_dossier_ai_analysis"] = APIError({"code": code, "message": "função não existe"})
+    fake_supabase.rows["dossiers"] = [{"id": "d1", "company_id": "c1", "report_data": {"risk": "BAIXO"}}]
+    save_analysis(fake_supabase, "d1", "c1", AI_STATUS_DONE, "análise")
+    updates = [payload for table, action, _, payload in fake_supabase.queries if action == "update"]
+    assert updates == [{"report_data": {"risk": "BAIXO", "ai_status": AI_STATUS_DONE, "ai_analysis": "análise"}}]
+
+
+def test_save_analysis_other_errors_propagate(fake_supabase):
+    fake_supabase.functions["set_dossier_ai_analysis"] = APIError({"code": "57014", "message": "statement timeout"})
+    with pytest.raises(APIError):
+        save_analysis(fake_supabase, "d1", "c1", AI_STATUS_DONE, "análise")
+    assert not fake_supabase.queries
+
+
+def test_stop_fails_queued_jobs(make_scheduler, fake_supabase):
+    scheduler, done = make_scheduler(), Done()
+    hold_slot(scheduler, done)
+    for i in range(3):
+        scheduler.submit(f"fila-{i}", "empresa-a", facts("fila"), PRIORITY_BATCH, done.callback(f"fila-{i}"))
+
+    scheduler.stop()
+    queued = [item for item in done.wait(4) if item[0].startswith("fila-")]
+    assert len(queued) == 3 and all(status == AI_STATUS_ERROR for _, status, *_ in queued)
+    assert all(analysis == AI_INTERRUPTED_MESSAGE for _, _, analysis, _ in queued)
+    failed = [params for name, params in fake_supabase.rpcs if params["p_status"] == AI_STATUS_ERROR]
+    assert len(failed) == 3 and scheduler.pending() == {PRIORITY_INTERACTIVE: 0, PRIORITY_BATCH: 0}
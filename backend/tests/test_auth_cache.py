@@ -0,0 +1,85 @@
+"""
+Cache de perfis do login e validação do token
+=============================================
+- verify_access_token só decodifica o JWT (sem client nem consulta)
+- AuthService._get_account: a segunda resolução do mesmo usuário não
+  consulta profiles/companies
+- com DATABASE_URL (migrations/006): UPDATE em profiles e companies
+  invalida o cache via NOTIFY
+"""
+import time
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.services import auth_service
+from app.services.auth_service import AuthService, subscribe_profile_invalidation, verify_access_token
+
+
+def wait_for(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def account(fake_supabase):
+    user_id, company_id = str(uuid.uuid4()), str(uuid.uuid4())
+    fake_supabase.rows = {
+        "profiles": {"id": user_id, "company_id": company_id, "role": "admin", "full_name": "Teste", "companies": None},
+        "companies": {"name": "Empresa Cache"},
+    }
+    yield user_id, company_id
+    auth_service.invalidate_company(company_id)
+
+
+def test_verify_access_token():
+    user_id, company_id = str(uuid.uuid4()), str(uuid.uuid4())
+    token = AuthService()._create_access_token({"sub": user_id, "email": "a@b.com", "company_id": company_id})
+
+    assert verify_access_token(token) == {"id": user_id, "email": "a@b.com", "company_id": company_id}
+    with pytest.raises(HTTPException) as error:
+        verify_access_token(token + "x")
+    assert error.value.status_code == 401
+
+
+def test_second_login_uses_profile_cache(fake_supabase, account):
+    user_id, company_id = account
+    service = AuthService()
+
+    first = service._get_account(fake_supabase, user_id)
+    queries = len(fake_supabase.queries)
+    second = service._get_account(fake_supabase, user_id)
+
+    assert queries > 0
+    assert len(fake_supabase.queries) == queries and second == first
+    assert first["company_name"] == "Empresa Cache"
+
+    auth_service.invalidate_company(company_id)
+    assert auth_service._profile_cache.get(user_id) is None
+
+
+@pytest.mark.db
+def test_notify_invalidates_profile_cache(database, fake_supabase, account):
+    user_id, company_id = account
+    service = AuthService()
+    subscribe_profile_invalidation(database)
+    database.execute("INSERT INTO public.companies (id, name) VALUES ($1::uuid, 'Cache login')", company_id)
+    database.execute("INSERT INTO auth.users (id, email) VALUES ($1::uuid, 'cache@example.com')", user_id)
+    database.execute("INSERT INTO public.profiles (id, company_id) VALUES ($1::uuid, $2::uuid)", user_id, company_id)
+    try:
+        service._get_account(fake_supabase, user_id)
+        database.execute("UPDATE public.profiles SET role = 'viewer' WHERE id = $1::uuid", user_id)
+        assert wait_for(lambda: auth_service._profile_cache.get(user_id) is None), "profile_changed"
+
+        service._get_account(fake_supabase, user_id)
+        database.execute("UPDATE public.companies SET name = 'Cache login 2' WHERE id = $1::uuid", company_id)
+        assert wait_for(lambda: auth_service._profile_cache.get(user_id) is None), "company_changed"
+    finally:
+        database.execute("DELETE FROM public.profiles WHERE id = $1::uuid", user_id)
+        database.execute("DELETE FROM auth.users WHERE id = $1::uuid", user_id)
+        database.execute("DELETE FROM public.companies WHERE id = $1::uuid", company_id)
@@ -0,0 +1,98 @@
+"""
+Eventos por empresa (WebSocket)
+===============================
+/api/events/ws (TestClient) enquanto update_all_records atualiza o
+monitoramento de uma empresa contra o stub do Portal (uma sanção nova em um
+dos documentos). Os eventos passam por NOTIFY, como entre instâncias
+(ServiceContainer.start):
+
+- conexão sem token válido é recusada
+- refresh.started, refresh.progress durante o refresh e refresh.finished
+  com os mesmos totais do retorno
+- target.changed só para o documento que mudou
+- outra empresa conectada não recebe nada
+"""
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app import monitoring_engine
+from app.core.config import settings
+from app.core.container import ServiceContainer
+from app.core.events import events
+from app.main import app
+
+pytestmark = pytest.mark.db
+
+SANCTIONED = "52998224725"
+ROWS = 40
+
+
+def receive_until(ws, last_event: str):
+    received = []
+    while True:
+        message = ws.receive_json()
+        received.append(message)
+        if message["event"] == last_event:
+            return received
+
+
+@pytest.fixture
+def container(database):
+    container = ServiceContainer()
+    container.start()
+    yield container
+    container.close()
+
+
+def test_invalid_token_rejected():
+    with pytest.raises(WebSocketDisconnect):
+        with TestClient(app).websocket_connect("/api/events/ws") as ws:
+            ws.send_json({"token": "invalido"})
+            ws.receive_json()
+
+
+def test_refresh_events_by_company(portal, database, container, make_company, access_token, monkeypatch):
+    monkeypatch.setattr(settings, "EVENTS_PROGRESS_INTERVAL_SECONDS", 0.2)
+    portal.delay = 0.02
+    portal.records[("ceis", SANCTIONED)] = [{"cpfCnpjSancionado": SANCTIONED}]
+    company_id, other_id = make_company("Teste eventos"), make_company("Teste eventos")
+    documents = [SANCTIONED] + [f"{i:011d}" for i in range(1, ROWS)]
+    database.execute(
+        """
+        INSERT INTO public.monitoring_targets (company_id, document, doc_type, current_status, data_json)
+        SELECT $1::uuid, document, 'CPF', 'ATIVO', '{"restriction_count": 0}'::jsonb
+        FROM unnest($2::text[]) AS document
+        """,
+        company_id, documents,
+    )
+    token, other_token = access_token(company_id), access_token(other_id)
+
+    client = TestClient(app)
+    with client.websocket_connect("/api/events/ws") as ws, client.websocket_connect("/api/events/ws") as other:
+        ws.send_json({"token": token})
+        other.send_json({"token": other_token})
+        assert ws.receive_json()["event"] == "subscribed" and other.receive_json()["event"] == "subscribed"
+
+        outcome = {}
+        worker = threading.Thread(target=lambda: outcome.update(monitoring_engine.update_all_records(company_id)))
+        worker.start()
+        received = receive_until(ws, "refresh.finished")
+        worker.join()
+
+        names = [m["event"] for m in received]
+        progress = [m["data"]["processed"] for m in received if m["event"] == "refresh.progress"]
+        finished = received[-1]["data"]
+        changed = [m["data"] for m in received if m["event"] == "target.changed"]
+        assert names[0] == "refresh.started" and received[0]["data"]["total"] == ROWS
+        assert len(progress) >= 2 and progress == sorted(progress), f"{progress}"
+        assert finished["refresh_id"] == outcome.get("refresh_id")
+        assert (finished["updated"], finished["errors"]) == (outcome["updated"], outcome["errors"])
+        assert [c["document"] for c in changed] == [SANCTIONED] and changed[0]["new_restrictions"] == 1
+
+        # Marcador publicado para a outra empresa: tem de ser a primeira mensagem dela
+        other.send_json({"ping": 1})  # mensagens do cliente são ignoradas
+        events.publish(other_id, "check.marker", {})
+        assert other.receive_json()["event"] == "check.marker"
@@ -0,0 +1,53 @@
+"""
+Requisições concorrentes não serializadas
+==========================================
+N requisições simultâneas a GET /api/dossiers/check-duplicate com um serviço
+falso cuja consulta bloqueia (time.sleep, como um client síncrono lento). Com
+as chamadas bloqueantes fora do event loop (app/core/concurrency.py), o tempo
+total fica próximo de uma única consulta; se as rotas bloqueassem o loop,
+seria N vezes.
+"""
+import asyncio
+import time
+
+import httpx
+
+from app.core.container import ServiceContainer, get_dossier_service
+from app.main import app
+
+REQUESTS = 10
+DELAY = 0.3
+
+
+class SlowDossierService:
+    """Serviço falso: consulta síncrona lenta"""
+
+    def check_duplicate(self, document: str, company_id: str):
+        time.sleep(DELAY)
+        return None
+
+
+async def fire(headers: dict) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.get("/api/dossiers/check-duplicate", params={"document": f"{i:014d}"}, headers=headers)
+            for i in range(REQUESTS)
+        ])
+        elapsed = time.perf_counter() - start
+    assert all(response.status_code == 200 for response in responses), [r.text for r in responses]
+    return elapsed
+
+
+def test_blocking_calls_do_not_serialize_requests(auth_headers):
+    container = ServiceContainer()
+    app.state.container = container
+    app.dependency_overrides[get_dossier_service] = SlowDossierService
+    try:
+        elapsed = asyncio.run(fire(auth_headers("bench-company")))
+    finally:
+        app.dependency_overrides.clear()
+        container.close()
+
+    assert elapsed < REQUESTS * DELAY * 0.5, f"{elapsed:.2f} s (serializado seria ~{REQUESTS * DELAY:.2f} s)"
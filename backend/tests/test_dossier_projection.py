@@ -0,0 +1,167 @@
+"""
+Projeção de seções e fontes do dossiê
+=====================================
+DossierService contra o Supabase em memória (que aplica as colunas do
+select, como o PostgREST), com um dossiê em v2 (payloads no payload store)
+e um ainda em v1:
+
+- _build_projection/_pop_projected: colunas e caminhos do report_data
+  pedidos, remontados no v2 parcial
+- get_by_id com sections: dossiê v2 em uma consulta só com as seções
+  pedidas; dossiê v1 busca o report_data completo (fallback) e devolve as
+  mesmas seções
+- GET /{id}/sections/{section} e /{id}/sources/{source}: seção/fonte
+  desconhecida 400, dossiê inexistente (ou de outra empresa) 404
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.container import get_dossier_service
+from app.main import app
+from app.services import report_format
+from app.services.auth_service import current_user, enforce_api_quota
+from app.services.dossier_service import DossierService, _build_projection, _pop_projected
+from app.services.report_format import SANCTION_SOURCES, sanction_source
+
+COMPANY = "empresa-a"
+
+
+def v1_report() -> dict:
+    qsa = [{"nome_socio": f"SOCIO {i}", "qualificacao_socio": "Sócio-Administrador"} for i in range(8)]
+    cadastral = {"success": True, "razao_social": "EMPRESA TESTE LTDA", "situacao_cadastral": "ATIVA", "qsa": qsa}
+    sanctions = {
+        "success": True,
+        "total_sanctions": 1,
+        "ceis": [{"id": 1, "cnpjSancionado": "11222333000181", "orgao": "Ministério " * 30}],
+        "cnep": [], "cepim": [], "leniencia": [],
+        "lists": {name: {"status": "completed"} for name in ("ceis", "cnep", "cepim", "leniencia")},
+    }
+    return {
+        "metadata": {"document_type": "CNPJ", "generated_at": "2026-01-01T00:00:00"},
+        "technical_report": {
+            "input": {"document": "11222333000181", "type": "CNPJ"},
+            "sources": {
+                "brasilapi_cnpj": {"ok": True, "data": cadastral},
+                "receitaws_cnpj": {"ok": False, "data": {}},
+                **{source: sanction_source(sanctions, key) for source, key in SANCTION_SOURCES.items()},
+            },
+            "derived": {
+                "company_summary": {k: cadastral.get(k) for k in report_format.COMPANY_SUMMARY_KEYS},
+                "qsa_enriched": qsa,
+            },
+        },
+        "sanctions": sanctions,
+        "ai_analysis": "Recomendação: Revisar.",
+    }
+
+
+def row(dossier_id: str, report_data: dict) -> dict:
+    return {
+        "id": dossier_id, "company_id": COMPANY, "document_value": "11222333000181",
+        "entity_name": "EMPRESA TESTE LTDA", "risk_level": "ALTO", "created_at": "2026-01-01T00:00:00",
+        "status_decisao": "PENDENTE", "report_data": report_data,
+    }
+
+
+@pytest.fixture
+def service(fake_supabase):
+    """Dossiê v2 (d2, com payloads externalizados) e dossiê v1 (d1)"""
+    service = DossierService(client=fake_supabase)
+    compact = service.payloads.externalize(report_format.compact_report_data(v1_report()), report_format.PAYLOAD_PATHS)
+    assert report_format.is_compact(compact) and {"$payload"} == set(compact["qsa"])
+    fake_supabase.rows["upstream_payloads"] = [
+        {"hash": r["hash"], "payload": r["payload"]}
+        for _, action, _, rows in fake_supabase.queries if action == "upsert" for r in rows
+    ]
+    fake_supabase.rows["dossiers"] = [row("d1", v1_report()), row("d2", compact)]
+    fake_supabase.queries.clear()
+    return service
+
+
+def dossier_selects(client) -> list:
+    return [(filters["id"], query) for table, action, filters, query in client.queries if table == "dossiers"]
+
+
+def test_build_projection():
+    assert _build_projection(None, None) == "*"
+    columns = _build_projection(["status_decisao"], None).split(",")
+    assert columns == ["id", "document_value", "entity_name", "risk_level", "created_at", "status_decisao"]
+    with pytest.raises(ValueError):
+        _build_projection(["senha"], None)
+
+    columns = _build_projection(None, [("sanctions",), ("sanctions", "ceis")]).split(",")
+    assert "report_data" not in columns
+    assert columns[-3:] == [
+        "rd_format_version:report_data->format_version",
+        "rd_sanctions:report_data->sanctions",
+        "rd_sanctions__ceis:report_data->sanctions->ceis",
+    ]
+
+
+def test_pop_projected():
+    projected = {"id": "d2", "rd_format_version": 2, "rd_cadastral": {"razao_social": "X"}, "rd_sanctions__ceis": None}
+    compact, stored = _pop_projected(projected, [("cadastral",), ("sanctions", "ceis")])
+    assert compact and stored == {"format_version": 2, "cadastral": {"razao_social": "X"}}
+    assert projected == {"id": "d2"}
+    assert _pop_projected({}, [("cadastral",)]) == (False, {"format_version": None})
+
+
+def test_get_by_id_projects_v2_sections(service, fake_supabase):
+    dossier = service.get_by_id("d2", COMPANY, fields=[], sections=["summary", "sanctions"])
+    expected = report_format.select_sections(v1_report(), ["summary", "sanctions"])
+    assert dossier["report_data"] == expected and set(dossier["report_data"]) == {"technical_report", "sanctions"}
+    [(_, select)] = dossier_selects(fake_supabase)
+    assert "report_data->cadastral" in select and "report_data->qsa" not in select and ",report_data," not in select
+
+    full = service.get_by_id("d2", COMPANY)
+    assert full["report_data"] == v1_report() and full["status_decisao"] == "PENDENTE"
+
+
+def test_get_by_id_v1_falls_back_to_full_report(service, fake_supabase):
+    dossier = service.get_by_id("d1", COMPANY, fields=[], sections=["qsa"])
+    assert dossier["report_data"] == report_format.select_sections(v1_report(), ["qsa"])
+    # Projeção sem format_version (v1) e então o report_data completo
+    selects = [select for _, select in dossier_selects(fake_supabase)]
+    assert len(selects) == 2 and selects[1] == "report_data"
+
+
+def test_get_by_id_invalid_or_missing(service):
+    with pytest.raises(ValueError):
+        service.get_by_id("d2", COMPANY, sections=["desconhecida"])
+    assert service.get_by_id("d2", "outra-empresa", sections=["sanctions"]) is None
+    assert service.get_by_id("nao-existe", COMPANY) is None
+
+
+@pytest.fixture
+def client(service):
+    user = {"id": "usuario", "company_id": COMPANY}
+    app.dependency_overrides[current_user] = lambda: user
+    app.dependency_overrides[enforce_api_quota] = lambda: user
+    app.dependency_overrides[get_dossier_service] = lambda: service
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_section_route(client):
+    response = client.get("/api/dossiers/d2/sections/sanctions")
+    assert response.status_code == 200
+    assert response.json() == {
+        "dossier_id": "d2", "section": "sanctions", "report_data": {"sanctions": v1_report()["sanctions"]}
+    }
+    assert client.get("/api/dossiers/d1/sections/qsa").json()["report_data"] == {
+        "technical_report": {"derived": {"qsa_enriched": v1_report()["technical_report"]["derived"]["qsa_enriched"]}}
+    }
+    assert client.get("/api/dossiers/d2/sections/desconhecida").status_code == 400
+    assert client.get("/api/dossiers/nao-existe/sections/sanctions").status_code == 404
+
+
+def test_source_route(client):
+    expected = v1_report()["technical_report"]["sources"]["transparencia_ceis"]
+    for dossier_id in ("d2", "d1"):
+        response = client.get(f"/api/dossiers/{dossier_id}/sources/transparencia_ceis")
+        assert response.status_code == 200
+        assert response.json() == {"dossier_id": dossier_id, "source": "transparencia_ceis", **expected}
+    assert client.get("/api/dossiers/d2/sources/desconhecida").status_code == 400
+    assert client.get("/api/dossiers/nao-existe/sources/transparencia_ceis").status_code == 404
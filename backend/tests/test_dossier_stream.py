@@ -0,0 +1,97 @@
+"""
+Criação de dossiê em streaming (SSE)
+====================================
+POST /api/dossiers/stream direto na aplicação ASGI, com o stub do Portal em
+que cada lista de sanções demora um pouco, IA stub e Postgres local:
+
+- as listas de sanções (consultadas em paralelo) chegam uma a uma, na
+  ordem em que respondem, antes do fim da consulta
+- o primeiro evento chega bem antes do dossiê gravado (saved)
+- ordem: sanctions_list..., sanctions, risk, saved, ai; o stream termina no
+  ai e a análise fica gravada no report_data
+"""
+import asyncio
+import json
+import time
+import uuid
+
+import pytest
+
+from app.core.container import get_dossier_service
+from app.main import app
+from app.services.auth_service import current_user, enforce_api_quota
+from app.services.dossier_service import DossierService
+
+pytestmark = pytest.mark.db
+
+CPF = "52998224725"
+
+
+async def stream_events():
+    """POST /api/dossiers/stream pela interface ASGI: [(segundos, evento, dados)]"""
+    body = json.dumps({"document": CPF, "enable_ai": True}).encode()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/api/dossiers/stream", "raw_path": b"/api/dossiers/stream",
+        "query_string": b"", "root_path": "", "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80),
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    }
+    sent = False
+    events, buffer = [], ""
+    start = time.perf_counter()
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        nonlocal buffer
+        if message["type"] == "http.response.start":
+            events.append((time.perf_counter() - start, "status", message["status"]))
+        elif message["type"] == "http.response.body":
+            buffer += message.get("body", b"").decode()
+            while "\n\n" in buffer:
+                block, buffer = buffer.split("\n\n", 1)
+                fields = dict(line.split(": ", 1) for line in block.split("\n") if not line.startswith(":"))
+                if "event" in fields:
+                    events.append((time.perf_counter() - start, fields["event"], json.loads(fields["data"])))
+
+    await app(scope, receive, send)
+    return events
+
+
+def test_dossier_stream_events(portal, database, make_company):
+    portal.delays.update({"ceis": 0.3, "cnep": 0.6})
+    portal.records[("ceis", CPF)] = [{"cpfCnpjSancionado": CPF}]
+    user = {"id": str(uuid.uuid4()), "company_id": make_company("Teste streaming")}
+    service = DossierService()
+    app.dependency_overrides[current_user] = lambda: user
+    app.dependency_overrides[enforce_api_quota] = lambda: user
+    app.dependency_overrides[get_dossier_service] = lambda: service
+    try:
+        events = asyncio.run(stream_events())
+    finally:
+        app.dependency_overrides.clear()
+
+    names = [name for _, name, _ in events]
+    at = {name: elapsed for elapsed, name, _ in reversed(events)}  # primeira ocorrência
+    lists = [data["list"] for _, name, data in events if name == "sanctions_list"]
+    assert events and events[0][2] == 200
+    assert lists == ["ceaf", "ceis", "cnep"]
+    assert names[2:] == ["sanctions_list"] * 3 + ["sanctions", "risk", "saved", "ai"], f"{names}"
+    assert at["sanctions_list"] < at["saved"] - 0.4
+
+    risk = next(data for _, name, data in events if name == "risk")
+    assert risk["risk_level"] == "ALTO"
+    saved = next(data for _, name, data in events if name == "saved")
+    assert saved["success"]
+    ai = next(data for _, name, data in events if name == "ai")
+    assert ai["dossier_id"] == saved["dossier_id"] and ai["analysis"]
+
+    stored = database.fetchrow(
+        "SELECT report_data->>'ai_status' AS ai_status FROM public.dossiers WHERE id = $1::uuid", saved["dossier_id"]
+    )
+    assert stored and stored["ai_status"] == ai["status"]
@@ -0,0 +1,52 @@
+"""
+Prazo e resultado parcial da consulta KYC
+=========================================
+run_kyc_check de um CPF contra o stub do Portal (sem sanções) com atraso
+por resposta:
+
+- Portal rápido: fontes completas e risco BAIXO
+- Portal lento com prazo: latência limitada pelo prazo, sanções timed_out e
+  resultado parcial com risco MÉDIO
+- sem prazo: espera o Portal
+"""
+import time
+
+import pytest
+
+from app import kyc_engine
+from app.core.deadline import Deadline
+
+CPF = "52998224725"
+
+
+@pytest.fixture
+def slow_portal(portal, no_sanctions_cache):
+    return portal
+
+
+def timed_check(portal, delay: float, deadline_seconds):
+    portal.delay = delay
+    deadline = Deadline.after(deadline_seconds) if deadline_seconds else None
+    start = time.perf_counter()
+    result = kyc_engine.run_kyc_check(CPF, deadline=deadline)
+    return result, time.perf_counter() - start
+
+
+def test_fast_portal_completes_within_deadline(slow_portal):
+    result, _ = timed_check(slow_portal, 0.0, 1.5)
+    assert result["sources"]["sanctions"] == kyc_engine.SOURCE_COMPLETED
+    assert not result["partial"] and result["risk_level"] == "BAIXO"
+
+
+def test_slow_portal_returns_partial_result_at_deadline(slow_portal):
+    result, elapsed = timed_check(slow_portal, 3.0, 1.0)
+    assert elapsed < 1.0 + 0.3
+    assert result["sources"]["sanctions"] == kyc_engine.SOURCE_TIMED_OUT
+    assert result["partial"] and result["missing_sources"] == ["sanctions"]
+    # sem confirmação das sanções o risco não fica BAIXO
+    assert result["risk_level"] == "MÉDIO"
+
+
+def test_without_deadline_waits_for_portal(slow_portal):
+    result, elapsed = timed_check(slow_portal, 1.0, None)
+    assert result["sources"]["sanctions"] == kyc_engine.SOURCE_COMPLETED and elapsed >= 1.0
@@ -0,0 +1,89 @@
+"""
+Cadastro idempotente no monitoramento
+=====================================
+add_monitored_record grava pelo upsert_monitoring_target (migrations/004):
+
+- dois cadastros simultâneos do mesmo documento (Postgres): um registro,
+  um resultado inserido e outro already_exists
+- PostgREST: SELECT + INSERT só quando a função não existe
+  (PGRST202/42883); outro erro do banco não cai no fallback; resposta
+  vazia (conflito concorrente) devolve o registro existente
+"""
+import threading
+
+import pytest
+from postgrest.exceptions import APIError
+
+from app import monitoring_engine
+
+CPF = "52998224725"
+
+
+@pytest.fixture
+def postgrest(fake_supabase, monkeypatch):
+    """monitoring_engine no Supabase em memória"""
+    monkeypatch.setattr(monitoring_engine, "_supabase_client", fake_supabase)
+    return fake_supabase
+
+
+def inserts(client) -> list:
+    return [payload for table, action, _, payload in client.queries if table == "monitoring_targets" and action == "insert"]
+
+
+@pytest.mark.db
+def test_concurrent_adds_create_one_target(portal, database, make_company):
+    company_id = make_company("Teste upsert")
+    # As duas consultas KYC terminam juntas, depois das duas buscas de existência
+    portal.delay = 0.2
+    barrier = threading.Barrier(2)
+    results = []
+
+    def add() -> None:
+        barrier.wait()
+        results.append(monitoring_engine.add_monitored_record(CPF, "", company_id))
+
+    threads = [threading.Thread(target=add) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    assert all(result["success"] for result in results), results
+    assert sorted(bool(result.get("already_exists")) for result in results) == [False, True]
+    assert results[0]["record_id"] == results[1]["record_id"]
+    assert database.fetchval(
+        "SELECT count(*) FROM public.monitoring_targets WHERE company_id = $1::uuid AND document = $2", company_id, CPF
+    ) == 1
+
+
+@pytest.mark.parametrize("code", ["PGRST202", "42883"])
+def test_fallback_without_upsert_function(portal, postgrest, code):
+    postgrest.functions["upsert_monitoring_target"] = APIError({"code": code, "message": "função não existe"})
+    result = monitoring_engine.add_monitored_record(CPF, "", "empresa-a")
+    assert result["success"] and not result.get("already_exists")
+    assert [record["document"] for record in inserts(postgrest)] == [CPF]
+
+
+def test_other_database_errors_propagate(portal, postgrest):
+    postgrest.functions["upsert_monitoring_target"] = APIError({"code": "57014", "message": "statement timeout"})
+    result = monitoring_engine.add_monitored_record(CPF, "", "empresa-a")
+    assert not result["success"] and "statement timeout" in result["error"]
+    assert not inserts(postgrest)
+
+
+def test_concurrent_conflict_returns_existing(portal, postgrest):
+    postgrest.rows["monitoring_targets"] = []
+
+    def conflict(params):
+        # O outro cadastro grava entre a busca de existência e o upsert, fora
+        # do snapshot da instrução: a função não devolve linha
+        postgrest.rows["monitoring_targets"] = [{
+            "id": "alvo-1", "company_id": "empresa-a", "document": CPF,
+            "data_json": {"entity_name": "Fulano", "restriction_count": 0},
+        }]
+        return []
+
+    postgrest.functions["upsert_monitoring_target"] = conflict
+    result = monitoring_engine.add_monitored_record(CPF, "", "empresa-a")
+    assert result["success"] and result["already_exists"] and result["record_id"] == "alvo-1"
+    assert not inserts(postgrest)
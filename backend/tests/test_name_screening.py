@@ -0,0 +1,158 @@
+"""
+Triagem por nome nas listas de sanções
+======================================
+Índice de nomes (app/services/name_screening.py) com nomes sintéticos de
+pessoas e empresas:
+
+- variações do nome sancionado (caixa, acentos, partículas, abreviações,
+  sufixo societário, erro de digitação, ordem) voltam em primeiro lugar
+- nomes fora das listas não passam de NAME_SCREENING_MIN_SCORE
+- top-k em milissegundos
+- screen_company: razão social e sócio do QSA com o CPF mascarado
+  (document_match quando os dígitos centrais batem)
+"""
+import random
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services.name_screening import NameIndex, SanctionedNames
+
+NAMES = 30000
+QUERIES = 500
+
+FIRST = (
+    "José João Antônio Francisco Carlos Paulo Pedro Lucas Luiz Marcos Luís Gabriel Rafael Daniel Marcelo Bruno "
+    "Eduardo Felipe Raimundo Rodrigo Manoel Mateus André Fernando Fábio Leonardo Gustavo Guilherme Leandro Tiago "
+    "Maria Ana Francisca Antônia Adriana Juliana Márcia Fernanda Patrícia Aline Sandra Camila Amanda Bruna Jéssica "
+    "Letícia Júlia Luciana Vanessa Mariana Gabriela Vera Vitória Larissa Cláudia Beatriz Luana Rita Sônia Renata"
+).split()
+LAST = (
+    "Silva Santos Oliveira Souza Rodrigues Ferreira Alves Pereira Lima Gomes Costa Ribeiro Martins Carvalho "
+    "Almeida Lopes Soares Fernandes Vieira Barbosa Rocha Dias Nascimento Andrade Moreira Nunes Marques Machado "
+    "Mendes Freitas Cardoso Ramos Gonçalves Santana Teixeira Araújo Cavalcanti Monteiro Moura Correia Batista "
+    "Campos Pinto Xavier Azevedo Medeiros Reis Brito Guimarães Chaves Queiroz Sales Menezes Coelho Fonseca "
+    "Magalhães Bezerra Farias Siqueira Vasconcelos Tavares Prado Peixoto Figueiredo Pacheco Borges Albuquerque"
+).split()
+BUSINESS = (
+    "Construtora Comércio Indústria Serviços Transportes Engenharia Distribuidora Alimentos Materiais Tecnologia "
+    "Consultoria Incorporadora Metalúrgica Farmácia Agropecuária Logística Informática Empreendimentos"
+).split()
+SUFFIXES = ("Ltda", "S/A", "ME", "EPP", "Eireli", "Ltda - ME")
+PARTICLES = ("da", "dos", "de", "das")
+
+
+def person(rng: random.Random) -> str:
+    parts = [rng.choice(FIRST)]
+    if rng.random() < 0.5:
+        parts.append(rng.choice(FIRST))
+    for _ in range(rng.choice((1, 2, 2, 3))):
+        if rng.random() < 0.3:
+            parts.append(rng.choice(PARTICLES))
+        parts.append(rng.choice(LAST))
+    if rng.random() < 0.05:
+        parts.append("Júnior")
+    return " ".join(parts)
+
+
+def company(rng: random.Random) -> str:
+    words = [rng.choice(BUSINESS), rng.choice(LAST)]
+    if rng.random() < 0.5:
+        words.insert(1, rng.choice(("e", "&", "de")))
+        words.append(rng.choice(LAST))
+    return " ".join(words + [rng.choice(SUFFIXES)])
+
+
+def variant(name: str, rng: random.Random) -> tuple:
+    """Como o nome aparece em outra fonte: (tipo, nome)"""
+    words = name.split()
+    kind = rng.choice(("caixa", "particulas", "abreviacoes", "digitacao", "ordem"))
+    if kind == "caixa":
+        return kind, rng.choice((name.lower(), name.upper().translate(str.maketrans("ÁÂÃÉÊÍÓÔÕÚÇ", "AAAEEIOOOUC"))))
+    if kind == "particulas":
+        return kind, " ".join(w for w in words if w.lower() not in PARTICLES)
+    if kind == "abreviacoes":
+        replaced = name.replace("Júnior", "Jr.").replace("Comércio", "Com.").replace("Indústria", "Ind.")
+        return kind, replaced.replace("Ltda - ME", "Ltda.").replace("S/A", "S.A.")
+    if kind == "digitacao":
+        # Letras trocadas na palavra mais longa
+        i = max(range(len(words)), key=lambda j: len(words[j]))
+        w = words[i]
+        p = rng.randrange(1, len(w) - 2)
+        words[i] = w[:p] + w[p + 1] + w[p] + w[p + 2:]
+        return kind, " ".join(words)
+    return kind, " ".join([words[0]] + words[:0:-1])
+
+
+@pytest.fixture(scope="module")
+def rows():
+    rng = random.Random(11)
+    return [
+        {"list_name": "ceis", "record_key": f"k{i}", "name": company(rng) if rng.random() < 0.4 else person(rng),
+         "document": None, "cpf_core": None}
+        for i in range(NAMES)
+    ]
+
+
+@pytest.fixture(scope="module")
+def index(rows):
+    return NameIndex(rows)
+
+
+def test_variants_rank_first(rows, index):
+    rng = random.Random(12)
+    k = settings.NAME_SCREENING_TOP_K
+    latencies, first, above, top_k, typos = [], 0, 0, 0, 0
+    for row in rng.sample(rows, QUERIES):
+        kind, query = variant(row["name"], rng)
+        t0 = time.perf_counter()
+        matches = index.search(query, k=k, candidates=settings.NAME_SCREENING_CANDIDATES)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        # Empate no score (mesmo nome normalizado, outra ordem) conta como primeiro lugar
+        ranks = [
+            m["score"] for m in matches
+            if any(r["record_key"] == row["record_key"] for r in m["records"])
+        ]
+        if kind == "digitacao":
+            typos += 1
+            top_k += bool(ranks)
+        elif ranks and ranks[0] == matches[0]["score"]:
+            first += 1
+            above += ranks[0] >= settings.NAME_SCREENING_MIN_SCORE
+    others = QUERIES - typos
+    assert first / others >= 0.99, f"{first / others:.1%} de {others}"
+    assert above / others >= 0.99, f"{above / others:.1%}"
+    assert top_k / typos >= 0.95, f"{top_k / typos:.1%} de {typos}"
+    latencies.sort()
+    assert latencies[int(len(latencies) * 0.99) - 1] < 50
+
+
+def test_outsiders_below_min_score(index):
+    known = {index.names[i] for i in range(len(index))}
+    outsiders = ["Zoraide Wanderleia Quixabeira", "Hidrelétrica Uirapuru Kwanza", "Yolanda Piovesan Zanetti", "Xingu Bioenergia Itapemirim"]
+    assert not known & set(outsiders)
+    assert not [n for n in outsiders if index.search(n, k=1, min_score=settings.NAME_SCREENING_MIN_SCORE)]
+
+
+def test_screen_company_name_and_partner(rows, monkeypatch):
+    monkeypatch.setattr(settings, "NAME_SCREENING_ENABLED", True)
+    sanctioned = SanctionedNames()
+    sanctioned.set_loader(lambda: [
+        {"list_name": "ceis", "record_key": "socio", "name": "RAIMUNDO NONATO DE VASCONCELOS", "document": None, "cpf_core": "456789"},
+        {"list_name": "cnep", "record_key": "empresa", "name": "CONSTRUTORA PIRAMIDE LTDA", "document": "11222333000181", "cpf_core": None},
+        *rows[:1000],
+    ])
+    assert sanctioned.reload()
+    screening = sanctioned.screen_company({
+        "razao_social": "Construtora Pirâmide S/A",
+        "qsa": [
+            {"nome_socio": "RAIMUNDO NONATO VASCONCELOS", "cnpj_cpf_do_socio": "***456789**", "qualificacao_socio": "Sócio-Administrador"},
+            {"nome_socio": "Homônimo De Ninguém", "cnpj_cpf_do_socio": "***000000**", "qualificacao_socio": "Sócio"},
+        ],
+    })
+    subjects = {(m["subject"], m["matched_name"]): m for m in screening["matches"]}
+    assert ("razao_social", "CONSTRUTORA PIRAMIDE LTDA") in subjects
+    match = subjects.get(("qsa", "RAIMUNDO NONATO DE VASCONCELOS"))
+    assert screening["checked"] == 3 and match is not None and match["document_match"]
+    assert match["qualificacao"] == "Sócio-Administrador"
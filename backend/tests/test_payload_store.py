@@ -0,0 +1,93 @@
+"""
+Payload store endereçado por conteúdo
+=====================================
+PayloadStore contra o Supabase em memória:
+
+- hash estável (JSON canônico: ordem das chaves não muda o hash)
+- payloads abaixo de MIN_EXTERNAL_BYTES ficam inline, sem gravação
+- externalize grava cada payload uma vez e deixa a referência; erro na
+  gravação mantém o documento inline
+- resolve em uma consulta para os hashes fora do cache; hash ausente no
+  banco fica como referência; erro na leitura devolve os documentos
+"""
+from collections import OrderedDict
+
+import pytest
+
+from app.services import payload_store
+from app.services.payload_store import MIN_EXTERNAL_BYTES, PAYLOAD_REF_KEY, PayloadStore, canonical_json, payload_hash
+
+PATHS = (("cadastral",), ("sanctions", "ceis"))
+
+
+def large(tag: str) -> dict:
+    payload = {"tag": tag, "qsa": [{"nome_socio": f"SOCIO {i}", "qualificacao": "Sócio"} for i in range(10)]}
+    assert len(canonical_json(payload).encode("utf-8")) >= MIN_EXTERNAL_BYTES
+    return payload
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    """Cache local do processo vazio em cada teste"""
+    monkeypatch.setattr(payload_store, "_cache", OrderedDict())
+
+
+def writes(client) -> list:
+    return [payload for table, action, _, payload in client.queries if action == "upsert"]
+
+
+def test_payload_hash_is_stable():
+    first = payload_hash({"b": 1, "a": [1, {"y": "ç", "x": None}]})
+    assert first == payload_hash({"a": [1, {"x": None, "y": "ç"}], "b": 1})
+    assert first.startswith("sha256:") and len(first) == len("sha256:") + 64
+    assert first != payload_hash({"b": 2, "a": [1, {"y": "ç", "x": None}]})
+
+
+def test_small_payloads_stay_inline(fake_supabase):
+    document = {"cadastral": {"razao_social": "TESTE"}, "sanctions": {"ceis": []}}
+    assert PayloadStore(fake_supabase).externalize(document, PATHS) is document
+    assert not fake_supabase.queries
+
+
+def test_externalize_writes_each_payload_once(fake_supabase):
+    payload = large("a")
+    document = {"cadastral": payload, "sanctions": {"ceis": dict(payload), "total_sanctions": 1}}
+    stored = PayloadStore(fake_supabase).externalize(document, PATHS)
+
+    ref = {PAYLOAD_REF_KEY: payload_hash(payload)}
+    assert stored == {"cadastral": ref, "sanctions": {"ceis": ref, "total_sanctions": 1}}
+    assert document["cadastral"] == payload  # o original não é alterado
+    [rows] = writes(fake_supabase)
+    assert [row["hash"] for row in rows] == [ref[PAYLOAD_REF_KEY]] and rows[0]["payload"] == payload
+
+
+def test_write_error_keeps_document_inline(fake_supabase):
+    fake_supabase.errors["upstream_payloads"] = RuntimeError("conexão recusada")
+    document = {"cadastral": large("a")}
+    assert PayloadStore(fake_supabase).externalize(document, PATHS) is document
+
+
+def test_resolve_with_missing_hashes(fake_supabase):
+    store = PayloadStore(fake_supabase)
+    known, cached = large("banco"), large("cache")
+    store.put_many([cached])
+    fake_supabase.rows["upstream_payloads"] = [{"hash": payload_hash(known), "payload": known}]
+    fake_supabase.queries.clear()
+
+    missing = {PAYLOAD_REF_KEY: "sha256:" + "0" * 64}
+    documents = [
+        {"cadastral": {PAYLOAD_REF_KEY: payload_hash(known)}, "outro": missing},
+        [{PAYLOAD_REF_KEY: payload_hash(cached)}],
+    ]
+    resolved = store.resolve(documents)
+    assert resolved == [{"cadastral": known, "outro": missing}, [cached]]
+
+    # Uma consulta, só com os hashes fora do cache
+    [(table, action, filters, _)] = fake_supabase.queries
+    assert table == "upstream_payloads" and action == "select"
+    assert sorted(filters["hash"]) == sorted([payload_hash(known), missing[PAYLOAD_REF_KEY]])
+
+    fake_supabase.errors["upstream_payloads"] = RuntimeError("conexão recusada")
+    assert store.resolve([{"x": missing}]) == [{"x": missing}]
+    # O que já foi resolvido vem do cache, sem consulta
+    assert store.resolve([{"x": {PAYLOAD_REF_KEY: payload_hash(known)}}]) == [{"x": known}]
@@ -0,0 +1,224 @@
+"""
+Lista PEP em memória
+====================
+- arquivo PEP sintético (ZIP com CSV em latin-1, colunas do Portal): CPF
+  mascarado pelos dígitos centrais, datas em ISO, registros com carência
+  encerrada fora do índice
+- ocorrências: CPF completo (PEP), dígitos centrais + nome (PEP, inclusive
+  com o nome escrito de outro jeito), só dígitos centrais (possível) e CPF
+  fora da lista; nível de risco de cada caso (compute_risk_level)
+- troca do índice sem indisponibilidade; importação antiga demais
+  (PEP_MAX_AGE_DAYS) desliga o índice
+- run_kyc_check de CPF contra o stub do Portal: evento pep, fonte pep em
+  sources e risco ALTO para PEP confirmado pelo nome
+- nome informado no dossiê e no monitoramento chega ao screen_cpf: dossiê
+  com risco ALTO e o nome como entity_name; o refresh do monitoramento usa o
+  holder_name guardado no data_json
+- importação por gerações (Postgres): a em uso só muda com a nova completa;
+  importação vazia falha sem mexer na atual; só as duas últimas ficam
+"""
+import io
+import random
+import threading
+import time
+import zipfile
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from app import kyc_engine, monitoring_engine
+from app.core.config import settings
+from app.services.dossier_service import DossierService
+from app.services.pep_list import PepImporter, PepIndex, PepList, PepStore, parse_pep_dump, pep_list
+
+ENTRIES = 20000
+
+HEADER = (
+    '"CPF";"Nome_PEP";"Sigla_Função";"Descrição_Função";"Nível_Função";"Nome_Órgão";'
+    '"Data_Início_Exercício";"Data_Fim_Exercício";"Data_Fim_Carência"'
+)
+FIRST = "JOSE JOAO ANTONIO FRANCISCO CARLOS PAULO MARIA ANA FRANCISCA ADRIANA JULIANA MARCIA".split()
+LAST = "SILVA SANTOS OLIVEIRA SOUZA RODRIGUES FERREIRA ALVES PEREIRA LIMA GOMES COSTA RIBEIRO".split()
+
+# CPFs fixos (válidos) dos casos de ocorrência
+PEP_FULL = "52998224725"       # no arquivo sem máscara
+PEP_MASKED = "11144477735"     # no arquivo mascarado, com nome
+PEP_EXPIRED = "98765432100"    # carência encerrada
+OUTSIDE = "39053344705"
+
+
+def masked(cpf: str) -> str:
+    return f"***.{cpf[3:6]}.{cpf[6:9]}-**"
+
+
+def pep_file(entries: int, seed: int = 5) -> bytes:
+    """ZIP com o CSV do arquivo PEP (latin-1, ';', datas dd/mm/aaaa)"""
+    rng = random.Random(seed)
+    lines = [
+        HEADER,
+        f'"{PEP_FULL[:3]}.{PEP_FULL[3:6]}.{PEP_FULL[6:9]}-{PEP_FULL[9:]}";"FULANO DE TAL";"DEP";"Deputado Federal";"1";'
+        f'"Câmara dos Deputados";"01/02/2023";"";""',
+        f'"{masked(PEP_MASKED)}";"MARIA APARECIDA DOS SANTOS";"SEC";"Secretário Municipal";"5";'
+        f'"Prefeitura Municipal";"01/01/2021";"31/12/2024";"31/12/2029"',
+        f'"{masked(PEP_EXPIRED)}";"ANTIGO OCUPANTE";"DIR";"Diretor";"4";"Autarquia";'
+        f'"01/01/2005";"31/12/2010";"31/12/2015"',
+    ]
+    for i in range(entries - 3):
+        cpf = f"{rng.randrange(10 ** 11):011d}"
+        if cpf[3:9] in (PEP_MASKED[3:9], OUTSIDE[3:9]):
+            continue
+        name = f"{rng.choice(FIRST)} {rng.choice(LAST)} {rng.choice(LAST)}"
+        start = date(2010, 1, 1) + timedelta(days=rng.randrange(5000))
+        lines.append(
+            f'"{masked(cpf)}";"{name}";"CC";"Cargo em Comissão";"{rng.randrange(1, 7)}";"Órgão {i % 300}";'
+            f'"{start:%d/%m/%Y}";"Sem informação";""'
+        )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("202601_PEP.csv", "\r\n".join(lines).encode("latin-1"))
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope="module")
+def pep_data() -> bytes:
+    return pep_file(ENTRIES)
+
+
+@pytest.fixture(scope="module")
+def rows(pep_data):
+    return [e.to_row() for e in parse_pep_dump(pep_data)]
+
+
+@pytest.fixture
+def loaded_pep_list(rows):
+    """Índice global (o usado por run_kyc_check) com o arquivo sintético"""
+    pep_list.set_loader(lambda: (rows, datetime.now(timezone.utc)))
+    assert pep_list.reload()
+    return pep_list
+
+
+def test_parse_pep_dump(pep_data):
+    entries = parse_pep_dump(pep_data)
+    by_core = {e.cpf_core: e for e in entries}
+    full = next((e for e in entries if e.cpf == PEP_FULL), None)
+    assert full is not None and full.cpf_core == PEP_FULL[3:9]
+    assert by_core[PEP_MASKED[3:9]].cpf is None
+    # Datas em ISO; vazio e texto como None
+    assert by_core[PEP_MASKED[3:9]].grace_end_date == "2029-12-31" and full.end_date is None
+    assert all(e.end_date is None for e in entries[3:10])
+
+    index = PepIndex([e.to_row() for e in entries])
+    assert len(index) == len(entries) - 1 and PEP_EXPIRED[3:9] not in index.by_core
+
+
+@pytest.mark.parametrize("cpf, name, match, is_pep, level", [
+    (PEP_FULL, None, "cpf", True, "ALTO"),
+    (PEP_MASKED, "Maria Aparecida dos Santos", "cpf_core_name", True, "ALTO"),
+    (PEP_MASKED, "MARIA APARESSIDA SANTTOS", "cpf_core_name", True, "ALTO"),
+    (PEP_MASKED, None, "cpf_core", False, "MÉDIO"),
+    (PEP_MASKED, "Joaquim Nabuco", "cpf_core", False, "MÉDIO"),
+    (OUTSIDE, None, None, False, "BAIXO"),
+    (PEP_EXPIRED, None, None, False, "BAIXO"),
+])
+def test_screen_cpf_match_and_risk(rows, cpf, name, match, is_pep, level):
+    loaded = PepList()
+    loaded.set_loader(lambda: (rows, datetime.now(timezone.utc)))
+    loaded.reload()
+    result = loaded.screen_cpf(cpf, name) if name else loaded.screen_cpf(cpf)
+    risk = kyc_engine.compute_risk_level("CPF", {}, {"total_sanctions": 0}, {"sanctions": "completed"}, result)
+    assert result["available"] and result["match"] == match and result["is_pep"] == is_pep
+    assert risk == level
+
+
+def test_match_carries_role(rows):
+    loaded = PepList()
+    loaded.set_loader(lambda: (rows, datetime.now(timezone.utc)))
+    loaded.reload()
+    role = loaded.screen_cpf(PEP_MASKED, "Maria Aparecida dos Santos")["matches"][0]
+    assert role["role"] == "Secretário Municipal" and role["agency"] == "Prefeitura Municipal"
+    assert role["grace_end_date"] == "2029-12-31"
+
+
+def test_swap_without_downtime(rows, loaded_pep_list):
+    newer = [dict(row, name="MARIA APARECIDA DOS SANTOS NOVA") if row["cpf_core"] == PEP_MASKED[3:9] else row for row in rows]
+    stop, seen = threading.Event(), {"unavailable": 0, "lookups": 0, "new": 0}
+
+    def reader() -> None:
+        while not stop.is_set():
+            result = loaded_pep_list.screen_cpf(PEP_MASKED)
+            seen["lookups"] += 1
+            seen["unavailable"] += not result["available"]
+            seen["new"] += bool(result["matches"]) and result["matches"][0]["name"].endswith("NOVA")
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    time.sleep(0.05)
+    loaded_pep_list.set_loader(lambda: (newer, datetime.now(timezone.utc)))
+    loaded_pep_list.reload()
+    time.sleep(0.05)
+    stop.set()
+    thread.join()
+    assert seen["unavailable"] == 0 and seen["new"] > 0, f"{seen}"
+
+    loaded_pep_list.set_loader(lambda: (rows, datetime.now(timezone.utc) - timedelta(days=settings.PEP_MAX_AGE_DAYS + 1)))
+    loaded_pep_list.reload()
+    assert not loaded_pep_list.screen_cpf(PEP_FULL)["available"]
+
+
+def test_run_kyc_check_pep_source(portal, loaded_pep_list):
+    events = []
+    result = kyc_engine.run_kyc_check(
+        PEP_MASKED, on_source=lambda name, data, status: events.append((name, status)), name="Maria Aparecida dos Santos"
+    )
+    assert ("pep", "completed") in events and result["sources"]["pep"] == "completed"
+    assert result["pep"]["is_pep"] and result["risk_level"] == "ALTO"
+    clean = kyc_engine.run_kyc_check(OUTSIDE)
+    assert clean["risk_level"] == "BAIXO" and clean["pep"]["match"] is None
+    company = kyc_engine.run_kyc_check("11222333000181")
+    assert company.get("sources", {}).get("pep") == "skipped"
+
+
+def test_holder_name_reaches_pep_check(portal, loaded_pep_list, fake_supabase, monkeypatch):
+    holder = "Maria Aparecida dos Santos"
+    prepared = DossierService(client=fake_supabase)._build_dossier(PEP_MASKED, "empresa-teste", False, name=holder)
+    assert prepared["success"], prepared.get("error")
+    assert prepared["record"]["risk_level"] == "ALTO" and prepared["record"]["entity_name"] == holder
+
+    # Sem o nome, só os dígitos centrais: possível ocorrência
+    prepared = DossierService(client=fake_supabase)._build_dossier(PEP_MASKED, "empresa-teste", False)
+    assert prepared["record"]["risk_level"] == "MÉDIO"
+
+    monkeypatch.setattr(monitoring_engine, "_supabase_client", fake_supabase)
+    refreshed = monitoring_engine._refresh_record(
+        {"document": PEP_MASKED, "doc_type": "CPF", "data_json": {"holder_name": holder, "restriction_count": 0}}
+    )
+    data = refreshed["update"]["data_json"]
+    assert refreshed["success"] and data["holder_name"] == holder and data["pep"]["is_pep"]
+
+
+@pytest.mark.db
+def test_import_generations(pep_data, database):
+    if database.fetchval("SELECT count(*) FROM public.pep_imports"):
+        pytest.skip("pep_imports já tem importações")
+    store, importer = PepStore(), PepImporter()
+    pep_list.set_loader(store.source)
+    entries = parse_pep_dump(pep_data)
+    try:
+        first = importer.ingest(entries, "teste/1")
+        rows, _ = store.source()
+        assert first["success"] and len(rows) == len(entries) - 1
+
+        failed = importer.ingest([], "teste/vazia")
+        latest = database.fetchval(
+            "SELECT id::text FROM public.pep_imports WHERE status = 'completed' ORDER BY finished_at DESC LIMIT 1"
+        )
+        assert not failed["success"] and latest == first["import_id"]
+
+        second = importer.ingest(entries[: len(entries) // 2], "teste/2")
+        third = importer.ingest(entries, "teste/3")
+        kept = {r["id"] for r in database.fetch("SELECT id::text AS id FROM public.pep_imports")}
+        assert kept == {second["import_id"], third["import_id"]}
+        # Índice do processo trocado na importação
+        assert pep_list.screen_cpf(PEP_FULL)["available"] and store.source()[0] is not None
+    finally:
+        database.execute("DELETE FROM public.pep_imports WHERE source LIKE 'teste/%'")
@@ -0,0 +1,109 @@
+"""
+Backend Postgres direto (DATABASE_URL)
+======================================
+Caminhos quentes pelos serviços com o Postgres direto: inserção de dossiês
+em lote, listagem paginada, estatísticas e listagem do monitoramento e a
+gravação do refresh em uma instrução.
+"""
+import uuid
+
+import pytest
+
+from app import monitoring_engine
+from app.services import pg_queries
+from app.services.dossier_service import DossierService
+
+pytestmark = pytest.mark.db
+
+ROWS = 200
+
+
+def dossier_record(company_id: str, idx: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "company_id": company_id,
+        "document_value": f"{idx:014d}",
+        "entity_name": f"Empresa {idx}",
+        "risk_level": "BAIXO",
+        "report_data": {"format_version": 2, "metadata": {"document_type": "CNPJ"}},
+        "status_decisao": "PENDENTE",
+        "aprovado_por_diretoria": False,
+    }
+
+
+def test_dossiers_batch_insert_and_listing(database, make_company):
+    company_id = make_company("Teste backend Postgres")
+    service = DossierService()
+
+    service._insert_dossiers([dossier_record(company_id, i) for i in range(ROWS)])
+    for i in range(ROWS):
+        pg_queries.insert_dossiers(database, [dossier_record(company_id, ROWS + i)])
+
+    dossiers, total = service.list_dossiers(company_id, page=2, page_size=20)
+    assert total == ROWS * 2
+    assert len(dossiers) == 20 and isinstance(dossiers[0]["created_at"], str)
+    _, total_empty = service.list_dossiers(company_id, page=10_000, page_size=20)
+    assert total_empty == ROWS * 2
+
+
+def test_monitoring_stats_listing_and_refresh_write(database, make_company):
+    company_id = make_company("Teste backend Postgres")
+    targets = [
+        {
+            "company_id": company_id,
+            "document": f"{i:011d}" if i % 2 else f"{i:014d}",
+            "doc_type": "CPF" if i % 2 else "CNPJ",
+            "current_status": "ATIVO" if i % 3 else "INATIVO",
+            "data_json": {"restriction_count": 1 if i % 5 == 0 else 0},
+        }
+        for i in range(ROWS)
+    ]
+    database.execute(
+        """
+        INSERT INTO public.monitoring_targets (company_id, document, doc_type, current_status, data_json)
+        SELECT company_id, document, doc_type, current_status, data_json
+        FROM jsonb_to_recordset($1::jsonb)
+            AS r(company_id uuid, document text, doc_type text, current_status text, data_json jsonb)
+        """,
+        targets,
+    )
+
+    stats = monitoring_engine.get_monitoring_stats(company_id)
+    expected = {
+        "total_monitored": ROWS,
+        "with_restrictions": sum(1 for t in targets if t["data_json"]["restriction_count"] > 0),
+        "active": sum(1 for t in targets if t["current_status"] == "ATIVO"),
+        "by_type": {
+            "CPF": sum(1 for t in targets if t["doc_type"] == "CPF"),
+            "CNPJ": sum(1 for t in targets if t["doc_type"] == "CNPJ"),
+        },
+    }
+    assert {k: stats.get(k) for k in expected} == expected
+
+    listed = monitoring_engine.get_all_monitored_records(page=1, page_size=10, filter_type="cpf", company_id=company_id)
+    assert listed["success"] and listed["total"] == expected["by_type"]["CPF"] and len(listed["records"]) == 10
+
+    current = pg_queries.monitoring_refresh_targets(database, company_id)
+    updates = [
+        {"document": t["document"], "data_json": {**t["data_json"], "restriction_count": 2}, "current_status": "ATIVO"}
+        for t in current
+    ]
+    assert pg_queries.update_monitoring_targets(database, company_id, updates) == ROWS
+    stats = monitoring_engine.get_monitoring_stats(company_id)
+    assert stats["with_restrictions"] == ROWS and stats["active"] == ROWS
+
+
+def test_add_monitored_record_existing_document_skips_kyc(database, make_company, monkeypatch):
+    company_id = make_company("Teste backend Postgres")
+    database.execute(
+        """
+        INSERT INTO public.monitoring_targets (company_id, document, doc_type, current_status, data_json)
+        VALUES ($1::uuid, '11222333000181', 'CNPJ', 'REGULAR', '{"entity_name": "Empresa", "restriction_count": 2}'::jsonb)
+        """,
+        company_id,
+    )
+    monkeypatch.setattr(monitoring_engine.kyc_engine, "run_kyc_check", pytest.fail)
+
+    result = monitoring_engine.add_monitored_record("11.222.333/0001-81", "", company_id)
+    assert result["success"] and result["already_exists"]
+    assert (result["entity_name"], result["restriction_count"]) == ("Empresa", 2)
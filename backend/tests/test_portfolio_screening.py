@@ -0,0 +1,217 @@
+"""
+Triagem da carteira contra as listas de sanções
+===============================================
+Duas empresas com registros monitorados e dossiês (parte com máscara de
+formatação) e um snapshot sintético das listas; a triagem vetorizada:
+
+- encontra as mesmas ocorrências de um laço simples em Python (documento
+  completo e CPF mascarado pelos dígitos centrais), gravadas em
+  sanctions_screening_hits
+- normaliza o documento formatado (529.982.247-25) antes do join; dossiê
+  sem document_type (a aplicação não grava o tipo) tem o tipo pelos dígitos
+- não traz a carteira de outra empresa
+- registra a vazão (linhas da carteira por segundo) na execução
+"""
+import random
+
+import pandas as pd
+import pytest
+
+from app.services.portfolio_screening import PORTFOLIO_COLUMNS, PortfolioScreening, normalize_portfolio
+
+ROWS = 6000
+KEY_PREFIX = "teste-triagem-"
+
+
+def formatted(document: str) -> str:
+    if len(document) == 11:
+        return f"{document[:3]}.{document[3:6]}.{document[6:9]}-{document[9:]}"
+    return f"{document[:2]}.{document[2:5]}.{document[5:8]}/{document[8:12]}-{document[12:]}"
+
+
+def build(rows: int, seed: int = 7):
+    """Carteira (company, source, document, doc_type) e registros das listas"""
+    rng = random.Random(seed)
+    portfolio = []
+    for i in range(rows):
+        doc_type = "CNPJ" if rng.random() < 0.4 else "CPF"
+        document = f"{rng.randrange(10 ** 14):014d}" if doc_type == "CNPJ" else f"{rng.randrange(10 ** 11):011d}"
+        company = i % 2
+        source = "dossier" if rng.random() < 0.25 else "monitoring"
+        portfolio.append((company, source, document, doc_type))
+
+    entries = []
+    sample = rng.sample(portfolio, max(20, rows // 200))
+    for n, (_, _, document, doc_type) in enumerate(sample):
+        list_name = ("ceis", "cnep", "cepim")[n % 3] if doc_type == "CNPJ" else ("ceis", "cnep")[n % 2]
+        if doc_type == "CPF" and n % 4 == 0:
+            # CPF mascarado no dump: só os dígitos centrais
+            entries.append((list_name, f"{KEY_PREFIX}{n}", None, "CPF", document[3:9], f"SANCIONADO {n}"))
+        else:
+            core = document[3:9] if doc_type == "CPF" else None
+            entries.append((list_name, f"{KEY_PREFIX}{n}", document, doc_type, core, f"SANCIONADO {n}"))
+    for n in range(len(sample), len(sample) + 2000):
+        # Sancionados fora da carteira
+        entries.append(("ceis", f"{KEY_PREFIX}{n}", f"{rng.randrange(10 ** 14):014d}", "CNPJ", None, None))
+    return portfolio, entries
+
+
+def expected_hits(portfolio, entries, company: int):
+    """Laço simples em Python (referência): (fonte, documento, record_key, match_type)"""
+    by_document, by_core = {}, {}
+    for list_name, key, document, doc_type, core, name in entries:
+        if document:
+            by_document.setdefault(document, []).append(key)
+        elif core:
+            by_core.setdefault(core, []).append(key)
+    hits = set()
+    for cid, source, document, doc_type in portfolio:
+        if cid != company:
+            continue
+        for key in by_document.get(document, []):
+            hits.add((source, document, key, "document"))
+        if doc_type == "CPF":
+            for key in by_core.get(document[3:9], []):
+                hits.add((source, document, key, "cpf_core"))
+    return hits
+
+
+def test_normalize_infers_missing_doc_type():
+    portfolio = pd.DataFrame(
+        [
+            ("dossier", "1", "c", "529.982.247-25", None),
+            ("dossier", "2", "c", "11.222.333/0001-81", None),
+            ("monitoring", "3", "c", "52998224725", "CPF"),
+        ],
+        columns=PORTFOLIO_COLUMNS,
+    )
+    frame = normalize_portfolio(portfolio)
+    assert list(frame["doc_type"]) == ["CPF", "CNPJ", "CPF"]
+    assert list(frame["document"]) == ["52998224725", "11222333000181", "52998224725"]
+    assert list(frame["cpf_core"].fillna("")) == ["982247", "", "982247"]
+
+
+@pytest.fixture
+def screening_data(database, make_company):
+    """Carteira das duas empresas e registros das listas; devolve (empresas, carteira, registros)"""
+    companies = [make_company("Teste triagem"), make_company("Teste triagem")]
+    portfolio, entries = build(ROWS)
+    for index, company_id in enumerate(companies):
+        mine = [(source, document, doc_type) for company, source, document, doc_type in portfolio if company == index]
+        targets = [(d, t) for s, d, t in mine if s == "monitoring"]
+        dossiers = [(d, t) for s, d, t in mine if s == "dossier"]
+        database.execute(
+            """
+            INSERT INTO public.monitoring_targets (company_id, document, doc_type, current_status, data_json)
+            SELECT $1::uuid, d.document, d.doc_type, 'REGULAR', '{}'::jsonb
+            FROM unnest($2::text[], $3::text[]) AS d(document, doc_type)
+            """,
+            company_id, [d for d, _ in targets], [t for _, t in targets],
+        )
+        # Como a aplicação grava: sem document_type; metade com o documento
+        # formatado (como digitado)
+        database.execute(
+            """
+            INSERT INTO public.dossiers (company_id, document_value, entity_name)
+            SELECT $1::uuid, document, 'Teste' FROM unnest($2::text[]) AS document
+            """,
+            company_id, [formatted(d) if i % 2 else d for i, (d, _) in enumerate(dossiers)],
+        )
+    database.execute(
+        """
+        INSERT INTO public.sanctions_entries (list_name, record_key, document, doc_type, cpf_core, name)
+        SELECT * FROM unnest($1::text[], $2::text[], $3::text[], $4::text[], $5::text[], $6::text[])
+        ON CONFLICT DO NOTHING
+        """,
+        *[list(column) for column in zip(*entries)],
+    )
+    yield companies, portfolio, entries
+    database.execute(
+        "DELETE FROM public.sanctions_screening_runs WHERE id IN "
+        "(SELECT run_id FROM public.sanctions_screening_hits WHERE company_id = ANY($1::uuid[]))",
+        companies,
+    )
+    database.execute("DELETE FROM public.sanctions_entries WHERE record_key LIKE $1", KEY_PREFIX + "%")
+
+
+@pytest.mark.db
+def test_screening_matches_reference_loop(database, screening_data):
+    companies, portfolio, entries = screening_data
+    result = PortfolioScreening().run(companies[0])
+    assert result["success"], result.get("error")
+
+    stored = database.fetch(
+        """
+        SELECT source, document, record_key, match_type, company_id::text AS company_id
+        FROM public.sanctions_screening_hits
+        WHERE run_id = $1::uuid AND record_key LIKE $2
+        """,
+        result["run_id"], KEY_PREFIX + "%",
+    )
+    found = {(r["source"], r["document"], r["record_key"], r["match_type"]) for r in stored}
+    assert found == expected_hits(portfolio, entries, 0)
+    assert any(match == "cpf_core" for *_, match in found)
+    # Dossiês formatados normalizados antes do join
+    assert any(source == "dossier" and len(document) in (11, 14) for source, document, *_ in found)
+    assert all(r["company_id"] == companies[0] for r in stored)
+
+    summary = database.fetchrow(
+        "SELECT status, portfolio_rows, hits, rows_per_second FROM public.sanctions_screening_runs WHERE id = $1::uuid",
+        result["run_id"],
+    )
+    assert summary["status"] == "completed" and summary["portfolio_rows"] == result["portfolio_rows"]
+    assert summary["rows_per_second"] and summary["rows_per_second"] > 0
+
+
+@pytest.mark.db
+def test_screening_all_companies(database, screening_data):
+    companies, _, _ = screening_data
+    result = PortfolioScreening().run()
+    assert result["success"], result.get("error")
+    both = database.fetchval(
+        """
+        SELECT count(DISTINCT company_id) FROM public.sanctions_screening_hits
+        WHERE run_id = $1::uuid AND company_id = ANY($2::uuid[])
+        """,
+        result["run_id"], companies,
+    )
+    assert both == 2
+
+
+@pytest.mark.db
+def test_dossier_without_document_type_matches_masked_cpf(database, make_company):
+    company_id = make_company("Teste triagem")
+    cpf = "52998224725"
+    # Como a aplicação grava o dossiê: sem document_type, documento formatado
+    database.execute(
+        "INSERT INTO public.dossiers (company_id, document_value, entity_name) VALUES ($1::uuid, $2, 'Teste')",
+        company_id, "529.982.247-25",
+    )
+    database.execute(
+        """
+        INSERT INTO public.monitoring_targets (company_id, document, doc_type, current_status, data_json)
+        VALUES ($1::uuid, $2, 'CPF', 'REGULAR', '{}'::jsonb)
+        """,
+        company_id, cpf,
+    )
+    database.execute(
+        """
+        INSERT INTO public.sanctions_entries (list_name, record_key, document, doc_type, cpf_core, name)
+        VALUES ('ceis', $1, NULL, 'CPF', $2, 'SANCIONADO')
+        """,
+        KEY_PREFIX + "mascarado", cpf[3:9],
+    )
+    try:
+        result = PortfolioScreening().run(company_id)
+        assert result["success"], result.get("error")
+        stored = database.fetch(
+            "SELECT source, document, doc_type, match_type FROM public.sanctions_screening_hits WHERE run_id = $1::uuid",
+            result["run_id"],
+        )
+        assert sorted((r["source"], r["document"], r["doc_type"], r["match_type"]) for r in stored) == [
+            ("dossier", cpf, "CPF", "cpf_core"),
+            ("monitoring", cpf, "CPF", "cpf_core"),
+        ]
+    finally:
+        database.execute("DELETE FROM public.sanctions_screening_runs WHERE company_id = $1::uuid", company_id)
+        database.execute("DELETE FROM public.sanctions_entries WHERE record_key LIKE $1", KEY_PREFIX + "%")
@@ -0,0 +1,111 @@
+"""
+Cotas por empresa
+=================
+- API: acima do plano a empresa recebe 429 com Retry-After, sem afetar as
+  outras; o uso aparece em /api/usage
+- APIs externas: o lote de uma empresa espera a cota do plano sem atrasar
+  outra empresa; fila acima de QUOTA_MAX_WAIT_SECONDS é recusada
+"""
+import threading
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import kyc_engine
+from app.core.config import settings
+from app.core.container import get_dossier_service
+from app.core.quotas import quota_scope, quotas
+from app.main import app
+
+
+class FakeDossierService:
+    def list_dossiers(self, company_id, page=1, page_size=20):
+        return [], 0
+
+
+class FakeResponse:
+    status_code = 200
+
+    def json(self):
+        return {"cep": "01001000"}
+
+
+class FakeSession:
+    def get(self, url, **kwargs):
+        return FakeResponse()
+
+
+@pytest.fixture(autouse=True)
+def quota_plans(monkeypatch):
+    monkeypatch.setattr(settings, "QUOTA_ENABLED", True)
+    monkeypatch.setattr(settings, "QUOTA_MAX_WAIT_SECONDS", 2)
+    # Sem Supabase: o plano das empresas é o padrão (basic)
+    monkeypatch.setattr(settings, "SUPABASE_URL", "")
+    monkeypatch.setattr(quotas, "plans", {"basic": {"api": 5, "upstream": 600}})
+
+
+def test_api_quota_per_company(auth_headers):
+    company_a, company_b = str(uuid.uuid4()), str(uuid.uuid4())
+    app.dependency_overrides[get_dossier_service] = FakeDossierService
+    try:
+        with TestClient(app) as client:
+            statuses = [client.get("/api/dossiers/", headers=auth_headers(company_a)).status_code for _ in range(8)]
+            assert statuses == [200] * 5 + [429] * 3
+
+            response = client.get("/api/dossiers/", headers=auth_headers(company_a))
+            assert response.status_code == 429 and int(response.headers.get("Retry-After", 0)) >= 1
+
+            assert client.get("/api/dossiers/", headers=auth_headers(company_b)).status_code == 200
+
+            usage = client.get("/api/usage/", headers=auth_headers(company_a)).json()
+            counters = usage["counters"].get("api", {})
+            assert usage["plan"] == "basic" and counters.get("allowed") == 5 and counters.get("rejected") == 4
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_upstream_quota_per_company():
+    kyc_engine.set_http_session(FakeSession())
+    company_a, company_b = str(uuid.uuid4()), str(uuid.uuid4())
+    bulk_calls = 630  # 600 imediatas (rajada) + 30 na fila (~3 s a 10/s)
+    errors = []
+
+    def bulk():
+        with quota_scope(company_a):
+            for _ in range(bulk_calls):
+                result = kyc_engine.query_cep("01001000")
+                if not result.get("success"):
+                    errors.append(result.get("error"))
+
+    start = time.perf_counter()
+    thread = threading.Thread(target=bulk)
+    thread.start()
+    time.sleep(0.2)
+
+    b_start = time.perf_counter()
+    with quota_scope(company_b):
+        ok_b = all(kyc_engine.query_cep("01001000").get("success") for _ in range(10))
+    b_elapsed = time.perf_counter() - b_start
+    thread.join()
+    elapsed = time.perf_counter() - start
+
+    counters = quotas.usage(company_a)["counters"]["viacep"]
+    assert ok_b and b_elapsed < 0.5, "empresa B esperou pelo lote de A"
+    assert counters["queued"] > 0 and elapsed >= 2, f"{elapsed:.1f} s, {counters}"
+    assert not errors, "lote sequencial só espera, sem recusas"
+
+    # 40 consultas simultâneas com o bucket vazio: ~4 s de fila > QUOTA_MAX_WAIT_SECONDS
+    def single():
+        with quota_scope(company_a):
+            result = kyc_engine.query_cep("01001000")
+            if not result.get("success"):
+                errors.append(result.get("error"))
+
+    threads = [threading.Thread(target=single) for _ in range(40)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert 10 <= len(errors) <= 30 and "Cota" in errors[0], f"{len(errors)} de 40 recusadas"
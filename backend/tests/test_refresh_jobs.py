@@ -0,0 +1,155 @@
+"""
+Jobs de atualização do monitoramento
+====================================
+POST /api/monitoring/refresh-jobs com a aplicação completa (TestClient com
+lifespan, workers do ServiceContainer) contra o stub do Portal (uma sanção
+nova em um dos documentos):
+
+- a criação responde 202 na hora, sem esperar a atualização
+- pedir de novo (POST ou PUT /all) devolve o mesmo job; PUT /all não é
+  mais tratado como documento
+- progresso gravado durante a execução, job completed com os totais
+- resultados: só o documento sancionado em changes
+- cancelamento interrompe o job entre registros
+- job "running" sem heartbeat (instância que caiu) é retomado
+- outra empresa não enxerga o job
+- worker que perdeu o job (sem heartbeat, retomado por outro) não grava
+  progresso, não encerra nem devolve à fila o job do novo dono
+"""
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services.refresh_jobs import JOB_COMPLETED, JOB_FAILED, RefreshJobStore
+
+pytestmark = pytest.mark.db
+
+SANCTIONED = "52998224725"
+ROWS = 40
+
+
+def wait_job(client, headers, job_id, until, timeout=30.0):
+    """Consulta o job até `until(job)` (ou o prazo); devolve os estados vistos"""
+    seen = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/monitoring/refresh-jobs/{job_id}", headers=headers).json()
+        seen.append(job)
+        if until(job):
+            break
+        time.sleep(0.05)
+    return seen
+
+
+def finished(job):
+    return job["status"] not in ("queued", "running")
+
+
+@pytest.fixture
+def refresh_app(portal, no_sanctions_cache, database, monkeypatch):
+    """Aplicação com um worker de jobs e prazos curtos"""
+    monkeypatch.setattr(settings, "REFRESH_JOB_WORKERS", 1)
+    monkeypatch.setattr(settings, "REFRESH_JOB_POLL_SECONDS", 0.5)
+    monkeypatch.setattr(settings, "REFRESH_JOB_STALE_SECONDS", 2)
+    monkeypatch.setattr(settings, "REFRESH_JOB_PROGRESS_SECONDS", 0.1)
+    portal.delay = 0.02
+    portal.records[("ceis", SANCTIONED)] = [{"cpfCnpjSancionado": SANCTIONED}]
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def company(database, make_company):
+    company_id = make_company("Teste jobs")
+    documents = [SANCTIONED] + [f"{i:011d}" for i in range(1, ROWS)]
+    database.execute(
+        """
+        INSERT INTO public.monitoring_targets (company_id, document, doc_type, current_status, data_json)
+        SELECT $1::uuid, document, 'CPF', 'ATIVO', '{"restriction_count": 0}'::jsonb
+        FROM unnest($2::text[]) AS document
+        """,
+        company_id, documents,
+    )
+    return company_id
+
+
+def test_refresh_job_lifecycle(refresh_app, company, make_company, auth_headers, database):
+    client = refresh_app
+    headers, other_headers = auth_headers(company), auth_headers(make_company("Teste jobs"))
+
+    start = time.perf_counter()
+    response = client.post("/api/monitoring/refresh-jobs", headers=headers)
+    elapsed = time.perf_counter() - start
+    job = response.json()
+    assert response.status_code == 202 and elapsed < 1.0
+
+    again = client.post("/api/monitoring/refresh-jobs", headers=headers).json()
+    put_all = client.put("/api/monitoring/all", headers=headers)
+    assert again["id"] == job["id"] and again["created"] is False
+    assert put_all.status_code == 202 and put_all.json().get("id") == job["id"]
+    assert client.get(f"/api/monitoring/refresh-jobs/{job['id']}", headers=other_headers).status_code == 404
+
+    seen = wait_job(client, headers, job["id"], finished)
+    final = seen[-1]
+    partial = sorted({s["processed"] for s in seen if s["status"] == "running" and 0 < s["processed"] < ROWS})
+    assert len(partial) >= 2, f"progresso visto: {partial}"
+    assert final["status"] == "completed"
+    assert (final["total"], final["processed"], final["updated"]) == (ROWS, ROWS, ROWS)
+
+    results = client.get(f"/api/monitoring/refresh-jobs/{job['id']}/results", headers=headers).json()
+    assert [c["document"] for c in results["changes"]] == [SANCTIONED] and results["errors"] == []
+
+    # Novo job depois do anterior encerrado, cancelado entre registros
+    job = client.post("/api/monitoring/refresh-jobs", headers=headers).json()
+    assert job["created"] is True
+    wait_job(client, headers, job["id"], lambda j: j["processed"] >= 3)
+    cancel = client.post(f"/api/monitoring/refresh-jobs/{job['id']}/cancel", headers=headers)
+    final = wait_job(client, headers, job["id"], finished)[-1]
+    assert cancel.status_code == 202 and final["status"] == "cancelled" and final["processed"] < ROWS
+
+    # Instância que caiu no meio do job: running, heartbeat antigo
+    stale_id = database.fetchval(
+        """
+        INSERT INTO public.monitoring_refresh_jobs (company_id, status, attempts, started_at, heartbeat_at)
+        VALUES ($1::uuid, 'running', 1, NOW() - INTERVAL '1 minute', NOW() - INTERVAL '1 minute')
+        RETURNING id::text
+        """,
+        company,
+    )
+    final = wait_job(client, headers, stale_id, finished)[-1]
+    assert final["status"] == "completed" and final["attempts"] == 2 and final["processed"] == ROWS
+
+    listed = client.get("/api/monitoring/refresh-jobs", headers=headers).json()
+    assert listed["total"] == 3 and listed["jobs"][0]["id"] == stale_id
+
+
+def test_reclaimed_job_fences_old_worker(database, make_company, monkeypatch):
+    monkeypatch.setattr(settings, "REFRESH_JOB_STALE_SECONDS", 60)
+    company_id = make_company("Teste jobs")
+    store = RefreshJobStore()
+    job_id = store.create(company_id)["id"]
+    first = store.claim()
+    assert first["id"] == job_id and first["claimed_by"]
+
+    # O primeiro worker ficou parado além do prazo: outro retoma o job
+    database.execute(
+        "UPDATE public.monitoring_refresh_jobs SET heartbeat_at = NOW() - INTERVAL '5 minutes' WHERE id = $1::uuid",
+        job_id,
+    )
+    second = store.claim()
+    assert second["id"] == job_id and second["claimed_by"] != first["claimed_by"] and second["attempts"] == 2
+
+    counters = {"total": ROWS, "processed": 7, "updated": 7, "errors": 0}
+    assert store.save_progress(job_id, first["claimed_by"], counters) is True
+    assert store.finish(job_id, first["claimed_by"], JOB_FAILED, counters, {"changes": [], "errors": []}, "antigo") is False
+    store.requeue(job_id, first["claimed_by"])
+    job = store.get(company_id, job_id)
+    assert (job["status"], job["processed"], job["error"]) == ("running", 0, None)
+
+    assert store.save_progress(job_id, second["claimed_by"], counters) is False
+    assert store.finish(job_id, second["claimed_by"], JOB_COMPLETED, counters, {"changes": [], "errors": []})
+    job = store.get(company_id, job_id)
+    assert (job["status"], job["processed"]) == ("completed", 7)
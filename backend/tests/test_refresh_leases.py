@@ -0,0 +1,190 @@
+"""
+Refresh contínuo com leases entre processos
+===========================================
+scripts/run_refresh_worker.py (--until-idle) em 1 e depois em N processos
+contra o stub do Portal (100 ms por chamada):
+
+- cada registro vencido é consultado uma única vez, mesmo com N processos
+  disputando a fila (SKIP LOCKED + lease)
+- a vazão com N processos cresce perto de N vezes
+- registros com lease expirado (worker que caiu) são retomados; com lease
+  válido de outro worker, ou atualizados há pouco, ficam de fora
+- falhas voltam à fila só depois de REFRESH_RETRY_SECONDS
+- a gravação do refresh só libera o lease do próprio dono: registro com
+  lease de outro worker fica de fora; a atualização pedida pelo usuário
+  (sem lease) grava sem mexer no lease
+"""
+import os
+import subprocess
+import sys
+from collections import Counter
+
+import pytest
+
+from app import kyc_engine, monitoring_engine
+
+pytestmark = pytest.mark.db
+
+FAILING = "99999999999"
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROWS = 120
+WORKERS = 3
+
+
+def run_workers(processes: int, env: dict, company_id: str) -> None:
+    """N processos de refresh até esvaziar a fila da empresa"""
+    script = os.path.join(BACKEND_DIR, "scripts", "run_refresh_worker.py")
+    procs = [
+        subprocess.Popen(
+            [sys.executable, script, "--until-idle", "--company-id", company_id],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        )
+        for _ in range(processes)
+    ]
+    for proc in procs:
+        output = proc.communicate(timeout=300)[0]
+        assert proc.returncode == 0, output[-500:]
+
+
+def refresh_window(db, company_id: str, documents: list) -> float:
+    """Intervalo entre a primeira e a última gravação (sem o startup dos processos)"""
+    return db.fetchval(
+        """
+        SELECT EXTRACT(EPOCH FROM max(refreshed_at) - min(refreshed_at))::float
+        FROM public.monitoring_targets
+        WHERE company_id = $1::uuid AND document = ANY($2::text[])
+        """,
+        company_id, documents,
+    )
+
+
+@pytest.fixture
+def worker_env(portal, database_url):
+    portal.delay = 0.1
+    for sanctions_list in kyc_engine.SANCTIONS_LISTS.values():
+        portal.delays[(sanctions_list.endpoint, FAILING)] = 4  # passa do prazo do lote
+    return {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "TRANSPARENCIA_BASE_URL": portal.base_url,
+        "REFRESH_JOB_WORKERS": "0",
+        "REFRESH_CLAIM_BATCH": "10",
+        "REFRESH_WORKER_CONCURRENCY": "4",
+        "REFRESH_LEASE_SECONDS": "30",
+        "MONITORING_REFRESH_INTERVAL_HOURS": "1",
+        "KYC_BATCH_DEADLINE_SECONDS": "2",
+    }
+
+
+def test_refresh_leases_across_processes(worker_env, portal, database, make_company):
+    company_id = make_company("Teste leases")
+    documents = [f"{i:011d}" for i in range(1, ROWS + 1)]
+    database.execute(
+        """
+        INSERT INTO public.monitoring_targets (company_id, document, doc_type, current_status, data_json)
+        SELECT $1::uuid, document, 'CPF', 'REGULAR', '{"restriction_count": 0}'::jsonb
+        FROM unnest($2::text[]) AS document
+        """,
+        company_id, documents,
+    )
+
+    half = documents[: ROWS // 2]
+    database.execute(
+        "UPDATE public.monitoring_targets SET refreshed_at = NOW() WHERE company_id = $1::uuid AND document = ANY($2::text[])",
+        company_id, documents[ROWS // 2:],
+    )
+    run_workers(1, worker_env, company_id)
+    window_one = refresh_window(database, company_id, half)
+
+    portal.clear_calls()
+    database.execute(
+        "UPDATE public.monitoring_targets SET refreshed_at = NULL WHERE company_id = $1::uuid AND document = ANY($2::text[])",
+        company_id, documents,
+    )
+    # Worker que caiu (lease expirado), lease válido de outro worker,
+    # atualizado há pouco e um documento em que a consulta falha
+    crashed, leased, fresh = ["88800000001", "88800000002"], ["77700000001"], ["66600000001"]
+    database.execute(
+        """
+        INSERT INTO public.monitoring_targets
+            (company_id, document, doc_type, current_status, data_json, refreshed_at, lease_owner, lease_expires_at)
+        SELECT $1::uuid, d.document, 'CPF', 'REGULAR', '{"restriction_count": 0}'::jsonb, d.refreshed_at, d.owner, d.expires
+        FROM (VALUES
+            ($2, NULL::timestamptz, 'worker-que-caiu', NOW() - INTERVAL '1 minute'),
+            ($3, NULL::timestamptz, 'worker-que-caiu', NOW() - INTERVAL '1 minute'),
+            ($4, NULL::timestamptz, 'outro-worker', NOW() + INTERVAL '10 minutes'),
+            ($5, NOW(), NULL, NULL),
+            ($6, NULL::timestamptz, NULL, NULL)
+        ) AS d(document, refreshed_at, owner, expires)
+        """,
+        company_id, *crashed, *leased, *fresh, FAILING,
+    )
+    run_workers(WORKERS, worker_env, company_id)
+    window_many = refresh_window(database, company_id, documents)
+
+    ceis = Counter({doc: n for (lista, doc), n in portal.calls.items() if lista == "ceis"})
+    repeated = [doc for doc in documents if ceis[doc] != 1]
+    assert not repeated, f"{len(repeated)} repetidos/ausentes"
+    refreshed = database.fetchval(
+        """
+        SELECT count(*) FROM public.monitoring_targets
+        WHERE company_id = $1::uuid AND document = ANY($2::text[])
+          AND refreshed_at IS NOT NULL AND lease_owner IS NULL
+        """,
+        company_id, documents,
+    )
+    assert refreshed == ROWS
+
+    speedup = (ROWS / window_many) / (len(half) / window_one)
+    assert speedup >= WORKERS * 0.6, f"{speedup:.1f}x a vazão de 1 processo"
+
+    assert all(ceis[doc] == 1 for doc in crashed)
+    assert all(ceis[doc] == 0 for doc in leased + fresh)
+    assert database.fetchval(
+        "SELECT lease_owner FROM public.monitoring_targets WHERE company_id = $1::uuid AND document = $2",
+        company_id, leased[0],
+    ) == "outro-worker"
+
+    failing = database.fetchrow(
+        """
+        SELECT refreshed_at, lease_owner, lease_expires_at > NOW() + INTERVAL '1 minute' AS waiting
+        FROM public.monitoring_targets WHERE company_id = $1::uuid AND document = $2
+        """,
+        company_id, FAILING,
+    )
+    assert failing["refreshed_at"] is None and failing["lease_owner"] is None and failing["waiting"]
+    assert ceis[FAILING] == 1
+
+
+def test_refresh_write_respects_lease_owner(database, make_company):
+    company_id = make_company("Teste leases")
+    mine, other, free = "88800000011", "77700000011", "66600000011"
+    database.execute(
+        """
+        INSERT INTO public.monitoring_targets
+            (company_id, document, doc_type, current_status, data_json, lease_owner, lease_expires_at)
+        SELECT $1::uuid, d.document, 'CPF', 'REGULAR', '{}'::jsonb, d.owner, d.expires
+        FROM (VALUES
+            ($2, 'meu-worker', NOW() + INTERVAL '10 minutes'),
+            ($3, 'outro-worker', NOW() + INTERVAL '10 minutes'),
+            ($4, NULL, NULL)
+        ) AS d(document, owner, expires)
+        """,
+        company_id, mine, other, free,
+    )
+
+    def targets():
+        rows = database.fetch(
+            "SELECT document, current_status, lease_owner FROM public.monitoring_targets WHERE company_id = $1::uuid",
+            company_id,
+        )
+        return {r["document"]: (r["current_status"], r["lease_owner"]) for r in rows}
+
+    updates = [{"document": d, "data_json": {}, "current_status": "ATIVO"} for d in (mine, other, free)]
+    assert monitoring_engine._write_refreshes(company_id, updates, "meu-worker") == 2
+    assert targets() == {mine: ("ATIVO", None), other: ("REGULAR", "outro-worker"), free: ("ATIVO", None)}
+
+    # Atualização pedida pelo usuário: grava todos e mantém o lease do outro worker
+    updates = [{**u, "current_status": "ALERTA"} for u in updates]
+    assert monitoring_engine._write_refreshes(company_id, updates) == 3
+    assert targets() == {mine: ("ALERTA", None), other: ("ALERTA", "outro-worker"), free: ("ALERTA", None)}
@@ -0,0 +1,136 @@
+"""
+report_data compacto (v2)
+=========================
+- v1 completo (cadastro, QSA, ReceitaWS, sanções por lista, chave extra)
+  -> compact_report_data -> expand_report_data devolve o mesmo v1, menor
+  no banco
+- dados v1 passam sem alteração pela expansão e v2 pela compactação;
+  dossiê antigo sem o bloco `sanctions` tem as sanções refeitas das fontes
+- scripts/migrate_report_data_v2.py --dry-run conta e mede os dossiês sem
+  gravar nada
+"""
+import copy
+import importlib.util
+import os
+
+import pytest
+
+from app.services import report_format
+from app.services.report_format import (
+    COMPANY_SUMMARY_KEYS, SANCTION_SOURCES, compact_report_data, expand_report_data, sanction_source,
+)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def v1_report() -> dict:
+    """report_data como _build_dossier monta (formato do frontend)"""
+    qsa = [{"nome_socio": "FULANO DE TAL", "qualificacao_socio": "Sócio-Administrador"}]
+    cadastral = {
+        "success": True,
+        "razao_social": "EMPRESA TESTE LTDA",
+        "nome_fantasia": "TESTE",
+        "situacao_cadastral": "ATIVA",
+        "data_abertura": "2010-01-01",
+        "capital_social": 100000.0,
+        "porte": "ME",
+        "natureza_juridica": "206-2 - Sociedade Empresária Limitada",
+        "endereco": {"municipio": "SAO PAULO", "uf": "SP"},
+        "qsa": qsa,
+    }
+    receitaws = {
+        "success": True,
+        "razao_social": "EMPRESA TESTE LTDA",
+        "situacao_cadastral": "ATIVA",
+        "qsa": qsa,
+        "atividade_principal": [{"code": "62.01-5-01", "text": "Desenvolvimento de software"}],
+    }
+    sanctions = {
+        "success": True,
+        "total_sanctions": 1,
+        "ceis": [{"id": 1, "cnpjSancionado": "11222333000181"}],
+        "cnep": [],
+        "cepim": [],
+        "leniencia": [],
+        "lists": {
+            "ceis": {"status": "completed", "records": 1},
+            "cnep": {"status": "completed", "records": 0},
+            "cepim": {"status": "failed", "error": "HTTP 503"},
+            "leniencia": {"status": "completed", "records": 0},
+            "ceaf": {"status": "skipped"},
+        },
+    }
+    return {
+        "metadata": {"document_type": "CNPJ", "generated_at": "2026-01-01T00:00:00", "partial": False},
+        "technical_report": {
+            "input": {"document": "11222333000181", "type": "CNPJ"},
+            "sources": {
+                "brasilapi_cnpj": {"ok": True, "data": cadastral},
+                "receitaws_cnpj": {"ok": True, "data": receitaws},
+                **{source: sanction_source(sanctions, key) for source, key in SANCTION_SOURCES.items()},
+            },
+            "derived": {
+                "company_summary": {k: cadastral.get(k) for k in COMPANY_SUMMARY_KEYS},
+                "qsa_enriched": qsa,
+            },
+        },
+        "sanctions": sanctions,
+        "ai_analysis": "Recomendação: Revisar.",
+        "pep": {"available": True, "is_pep": False, "match": None},
+    }
+
+
+def test_v2_roundtrip():
+    original = v1_report()
+    compact = compact_report_data(copy.deepcopy(original))
+    assert compact["format_version"] == report_format.REPORT_FORMAT_VERSION
+    assert "qsa" not in compact["cadastral"] and compact["pep"] == original["pep"]
+    # A ReceitaWS guarda só o que difere do cadastro
+    assert set(compact["receitaws"]["data"]) == {"atividade_principal"}
+    assert report_format.json_size(compact) < report_format.json_size(original)
+
+    assert expand_report_data(compact) == original
+    assert compact_report_data(compact) is compact
+
+
+def test_v1_passes_through_unchanged():
+    original = v1_report()
+    stored = copy.deepcopy(original)
+    assert expand_report_data(stored) is stored and stored == original
+
+
+def test_legacy_report_without_sanctions_block():
+    legacy = v1_report()
+    del legacy["sanctions"]
+    expanded = expand_report_data(compact_report_data(legacy))
+    sanctions = expanded["sanctions"]
+    assert sanctions["total_sanctions"] == 1 and sanctions["success"]
+    assert sanctions["ceis"] == legacy["technical_report"]["sources"]["transparencia_ceis"]["data"]
+
+
+@pytest.fixture
+def migrate_script():
+    path = os.path.join(BACKEND_DIR, "scripts", "migrate_report_data_v2.py")
+    spec = importlib.util.spec_from_file_location("migrate_report_data_v2", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_migrate_dry_run(migrate_script, fake_supabase, monkeypatch, capsys):
+    monkeypatch.setattr(migrate_script, "create_client", lambda url, key: fake_supabase)
+    monkeypatch.setattr(migrate_script, "PAGE_SIZE", 2)
+    monkeypatch.setattr(migrate_script.settings, "SUPABASE_URL", "http://supabase.teste")
+    monkeypatch.setattr(migrate_script.settings, "SUPABASE_KEY", "chave")
+    fake_supabase.rows["dossiers"] = [
+        {"id": "d1", "document_value": "11222333000181", "report_data": v1_report()},
+        {"id": "d2", "document_value": "11222333000181", "report_data": compact_report_data(v1_report())},
+        {"id": "d3", "document_value": "52998224725", "report_data": v1_report()},
+    ]
+
+    migrate_script.migrate(dry_run=True)
+    output = capsys.readouterr().out
+    assert "Migrados: 2 | Já migrados: 1" in output and "d1 (11222333000181)" in output
+    # Nada gravado: nem os dossiês nem o payload store
+    assert all(action == "select" for _, action, _, _ in fake_supabase.queries)
+    assert {table for table, *_ in fake_supabase.queries} == {"dossiers"}
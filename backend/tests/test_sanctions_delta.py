@@ -0,0 +1,182 @@
+"""
+Ingestão por delta das listas de sanções
+========================================
+Três dumps sucessivos do CEIS (ZIP com CSV latin-1, como no Portal) contra
+o stub do Portal, com duas empresas monitorando uma carteira de registros:
+
+- dia 1 (baseline): só grava o snapshot, nenhuma consulta ao Portal
+- dia 2: entra um CPF monitorado pelas duas empresas e um CPF mascarado
+  (***.456.789-**) de uma delas; sai a sanção de outro CPF monitorado.
+  Só esses registros são reconsultados, em todas as empresas, e as
+  restrições são atualizadas
+- dia 3 (dump igual): delta vazio, nenhuma consulta
+- dump vazio ou que remove mais que SANCTIONS_DELTA_MAX_REMOVED_SHARE do
+  snapshot é recusado sem tocar no snapshot (salvo com force)
+"""
+import io
+import zipfile
+
+import pytest
+
+from app.core.config import settings
+from app.services.sanctions_delta import SanctionsDeltaIngester
+from app.services.sanctions_dumps import parse_dump
+
+ROWS = 200
+SHARED = "52998224725"       # entra no dia 2; monitorado pelas duas empresas
+MASKED = "11145678900"       # entra no dia 2 mascarado (***.456.789-**)
+LIFTED = "39053344705"       # sai no dia 2
+HEADERS = [
+    "CADASTRO", "CÓDIGO DA SANÇÃO", "TIPO DE PESSOA", "CPF OU CNPJ DO SANCIONADO",
+    "NOME DO SANCIONADO", "CATEGORIA DA SANÇÃO", "DATA INÍCIO SANÇÃO",
+]
+
+
+def dump(documents) -> bytes:
+    """ZIP com o CSV do CEIS (latin-1, ';'), como no download do Portal"""
+    lines = [";".join(f'"{h}"' for h in HEADERS)]
+    for i, document in enumerate(documents):
+        lines.append(";".join(f'"{v}"' for v in [
+            "CEIS", str(1000 + i), "F", document, f"PESSOA SANCIONADA {i}", "Impedimento", "01/01/2026",
+        ]))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("20260101_CEIS.csv", "\r\n".join(lines).encode("latin-1"))
+    return buffer.getvalue()
+
+
+def restrictions(db, company_id: str, document: str) -> int:
+    return db.fetchval(
+        """
+        SELECT (data_json->>'restriction_count')::int FROM public.monitoring_targets
+        WHERE company_id = $1::uuid AND document = $2
+        """,
+        company_id, document,
+    )
+
+
+@pytest.fixture
+def ceis_snapshot(database):
+    """Snapshot do CEIS vazio (o dia 1 é o baseline); removido ao final"""
+    if database.fetchval("SELECT count(*) FROM public.sanctions_list_imports WHERE list_name = 'ceis'"):
+        pytest.skip("snapshot do CEIS já existe neste banco")
+    yield
+    database.execute("DELETE FROM public.sanctions_list_imports WHERE list_name = 'ceis'")
+    database.execute("DELETE FROM public.sanctions_entries WHERE list_name = 'ceis'")
+
+
+class MemorySnapshotStore:
+    """Snapshot em memória com a interface de SanctionsSnapshotStore"""
+
+    def __init__(self, entries):
+        self.entries = {e.record_key: {"document": e.document, "cpf_core": e.cpf_core} for e in entries}
+        self.imports = []
+
+    def start_import(self, list_name, source):
+        self.imports.append({"list_name": list_name, "source": source})
+        return str(len(self.imports))
+
+    def finish_import(self, import_id, fields):
+        self.imports[int(import_id) - 1].update(fields)
+
+    def has_previous_import(self, list_name):
+        return True
+
+    def snapshot(self, list_name):
+        return dict(self.entries)
+
+    def apply(self, list_name, added, removed_keys):
+        for key in removed_keys:
+            del self.entries[key]
+        for e in added:
+            self.entries[e.record_key] = {"document": e.document, "cpf_core": e.cpf_core}
+
+    def notify_changed(self, list_name):
+        pass
+
+    def targets_for(self, documents, cpf_cores):
+        return []
+
+
+@pytest.fixture
+def memory_store():
+    return MemorySnapshotStore(parse_dump("ceis", dump([f"{i:014d}" for i in range(100)])))
+
+
+def test_empty_dump_rejected(memory_store):
+    result = SanctionsDeltaIngester(store=memory_store).ingest("ceis", parse_dump("ceis", dump([])), "vazio")
+    assert not result["success"] and "sem registros" in result["error"]
+    assert len(memory_store.entries) == 100 and memory_store.imports[-1]["status"] == "failed"
+
+
+def test_large_removal_needs_force(memory_store, monkeypatch):
+    monkeypatch.setattr(settings, "SANCTIONS_DELTA_MAX_REMOVED_SHARE", 0.2)
+    ingester = SanctionsDeltaIngester(store=memory_store)
+    truncated = parse_dump("ceis", dump([f"{i:014d}" for i in range(70)]))
+
+    result = ingester.ingest("ceis", truncated, "truncado")
+    assert not result["success"] and "30%" in result["error"]
+    assert len(memory_store.entries) == 100
+
+    # Remoção dentro do limite passa sem force
+    assert ingester.ingest("ceis", parse_dump("ceis", dump([f"{i:014d}" for i in range(90)])), "dia")["success"]
+    assert len(memory_store.entries) == 90
+
+    result = ingester.ingest("ceis", truncated, "truncado", force=True)
+    assert result["success"] and result["removed"] == 20 and len(memory_store.entries) == 70
+
+
+@pytest.mark.db
+def test_delta_rescreens_only_affected_targets(portal, no_sanctions_cache, database, ceis_snapshot, make_company):
+    company_a, company_b = make_company("Teste delta"), make_company("Teste delta")
+    portfolio = [f"{i:011d}" for i in range(1, ROWS)]
+    targets = {
+        company_a: portfolio[: ROWS // 2] + [SHARED, LIFTED],
+        company_b: portfolio[ROWS // 2:] + [SHARED, MASKED],
+    }
+    for company_id, documents in targets.items():
+        database.execute(
+            """
+            INSERT INTO public.monitoring_targets (company_id, document, doc_type, current_status, data_json)
+            SELECT $1::uuid, document, 'CPF', 'REGULAR',
+                   jsonb_build_object('restriction_count', CASE WHEN document = $3 THEN 1 ELSE 0 END)
+            FROM unnest($2::text[]) AS document
+            """,
+            company_id, documents, LIFTED,
+        )
+
+    # Outras pessoas sancionadas (não monitoradas) dão volume ao dump
+    others = [f"***.{i:03d}.{i:03d}-**" for i in range(200, 400)]
+    day1 = others + [LIFTED]
+    day2 = others + [SHARED, "***.456.789-**"]
+    ingester = SanctionsDeltaIngester()
+
+    entries = parse_dump("ceis", dump(day1))
+    assert len(entries) == len(day1) and entries[-1].document == LIFTED
+    assert entries[0].cpf_core == "200200" and entries[0].document is None
+
+    result = ingester.ingest("ceis", entries, "dia-1")
+    assert result["baseline"] and result["affected_targets"] == 0 and not portal.calls
+
+    portal.records[("ceis", SHARED)] = [{"cpfCnpjSancionado": SHARED}]
+    portal.records[("ceis", MASKED)] = [{"cpfCnpjSancionado": MASKED}]
+    result = ingester.ingest("ceis", parse_dump("ceis", dump(day2)), "dia-2")
+    assert result["added"] == 2 and result["removed"] == 1
+    assert result["affected_targets"] == 4 and result["rescreened"] == 4
+    assert set(portal.document_calls()) == {SHARED, MASKED, LIFTED}
+    assert restrictions(database, company_a, SHARED) == 1 and restrictions(database, company_b, SHARED) == 1
+    assert restrictions(database, company_b, MASKED) == 1 and restrictions(database, company_a, LIFTED) == 0
+    assert result["changed"] == 4
+    untouched = database.fetchval(
+        """
+        SELECT count(*) FROM public.monitoring_targets
+        WHERE company_id = ANY($1::uuid[]) AND refreshed_at IS NULL AND lease_owner IS NULL
+        """,
+        [company_a, company_b],
+    )
+    assert untouched == ROWS - 1
+
+    portal.clear_calls()
+    result = ingester.ingest("ceis", parse_dump("ceis", dump(day2)), "dia-3")
+    assert (result["added"], result["removed"], result["affected_targets"]) == (0, 0, 0) and not portal.calls
+    assert database.fetchval("SELECT count(*) FROM public.sanctions_entries WHERE list_name = 'ceis'") == len(day2)
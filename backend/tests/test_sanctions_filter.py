@@ -0,0 +1,163 @@
+"""
+Filtro negativo de sanções
+==========================
+- Bloom filter: nenhum falso negativo e taxa de falso positivo perto da
+  configurada (SANCTIONS_FILTER_FP_RATE)
+- query_sanctions contra o stub do Portal: documento descartado pelo filtro
+  responde sem chamadas; sancionado (CNPJ ou CPF mascarado no dump) é
+  consultado normalmente; sem filtro (listas desatualizadas) tudo é
+  consultado
+- importações (Postgres): o filtro só fica disponível com as três listas
+  importadas e um documento que entra na lista passa pelo filtro já no
+  rescreen da própria importação
+- mix de consultas com 97% de documentos sem sanção: a maior parte das
+  chamadas ao Portal é economizada, e a economia aparece em
+  /api/usage/sanctions-filter (autenticado)
+"""
+import io
+import random
+import zipfile
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import kyc_engine
+from app.core.config import settings
+from app.core.sanctions_filter import BloomFilter, filter_key, sanctions_filter
+from app.main import app
+from app.services.sanctions_delta import SanctionsDeltaIngester, SanctionsSnapshotStore
+from app.services.sanctions_dumps import SANCTIONS_LISTS, parse_dump
+
+ENTRIES = 30000
+MIX = 20000
+CLEAN_SHARE = 0.97
+
+
+def random_documents(n: int, seed: int):
+    rng = random.Random(seed)
+    return [
+        (f"{rng.randrange(10 ** 14):014d}", "CNPJ") if rng.random() < 0.5 else (f"{rng.randrange(10 ** 11):011d}", "CPF")
+        for _ in range(n)
+    ]
+
+
+def dump(list_name: str, documents) -> bytes:
+    """ZIP com o CSV da lista (latin-1, ';')"""
+    lines = ['"CPF OU CNPJ DO SANCIONADO";"TIPO DE PESSOA";"NOME DO SANCIONADO"']
+    for i, document in enumerate(documents):
+        person_type = "J" if len(document.replace(".", "")) == 14 else "F"
+        lines.append(f'"{document}";"{person_type}";"SANCIONADO {list_name.upper()} {i}"')
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr(f"{list_name}.csv", "\r\n".join(lines).encode("latin-1"))
+    return buffer.getvalue()
+
+
+def portal_calls(portal, document: str) -> int:
+    return portal.document_calls()[document]
+
+
+@pytest.fixture
+def dump_lists(monkeypatch):
+    """Só as listas importadas dos dumps (cobertas pelo filtro)"""
+    monkeypatch.setattr(settings, "SANCTIONS_LISTS_ENABLED", "ceis,cnep,cepim")
+
+
+def test_bloom_filter_false_positive_rate():
+    members = {filter_key(doc, doc_type) for doc, doc_type in random_documents(ENTRIES, 1)}
+    bloom = BloomFilter(len(members), settings.SANCTIONS_FILTER_FP_RATE)
+    for key in members:
+        bloom.add(key)
+    assert all(key in bloom for key in members)
+
+    probes = [filter_key(doc, doc_type) for doc, doc_type in random_documents(100_000, 2)]
+    probes = [key for key in probes if key not in members]
+    observed = sum(key in bloom for key in probes) / len(probes)
+    assert observed <= settings.SANCTIONS_FILTER_FP_RATE * 2, f"{observed:.4%}"
+
+
+def test_query_sanctions_skips_filtered_documents(portal, dump_lists):
+    cnpj, cpf, clean_cnpj, clean_cpf = "11222333000181", "52998224725", "45997418000153", "11144477735"
+    for document in (cnpj, cpf):
+        record = {"cpfCnpjSancionado": document, "cnpjCpfSancionado": document, "cnpj": document}
+        for endpoint in ("ceis", "cnep", "cepim"):
+            portal.records[(endpoint, document)] = [record]
+    rows = [
+        {"document": cnpj, "doc_type": "CNPJ", "cpf_core": None},
+        # CPF mascarado no dump: só os dígitos centrais
+        {"document": None, "doc_type": "CPF", "cpf_core": cpf[3:9]},
+    ]
+    imported_at = datetime.now(timezone.utc)
+    sanctions_filter.set_loader(lambda: (rows, imported_at))
+    assert sanctions_filter.reload()
+
+    results = {doc: kyc_engine.query_sanctions(doc, doc_type) for doc, doc_type in
+               [(cnpj, "CNPJ"), (cpf, "CPF"), (clean_cnpj, "CNPJ"), (clean_cpf, "CPF")]}
+    assert portal_calls(portal, clean_cnpj) == 0 and portal_calls(portal, clean_cpf) == 0
+    assert results[clean_cnpj].get("screened_by") == "sanctions_filter"
+    assert results[clean_cpf]["success"] and results[clean_cpf]["total_sanctions"] == 0
+    assert portal_calls(portal, cnpj) == 3 and portal_calls(portal, cpf) == 2
+    assert results[cnpj]["total_sanctions"] == 3 and results[cpf]["total_sanctions"] == 2
+
+    lists = []
+    kyc_engine.query_sanctions(clean_cnpj, "CNPJ", on_list=lambda name, items: lists.append(name))
+    assert lists == ["ceis", "cnep", "cepim"]
+
+    stale = datetime.now(timezone.utc) - timedelta(hours=settings.SANCTIONS_FILTER_MAX_AGE_HOURS + 1)
+    sanctions_filter.set_loader(lambda: (rows, stale))
+    sanctions_filter.reload()
+    portal.clear_calls()
+    kyc_engine.query_sanctions(clean_cpf, "CPF")
+    assert portal_calls(portal, clean_cpf) == 2
+
+
+@pytest.mark.db
+def test_filter_follows_imports(portal, dump_lists, database):
+    if database.fetchval("SELECT count(*) FROM public.sanctions_list_imports"):
+        pytest.skip("banco com importações de listas")
+
+    store = SanctionsSnapshotStore()
+    sanctions_filter.set_loader(store.filter_source)
+    ingester = SanctionsDeltaIngester(store=store)
+    documents = {name: [f"{i:014d}" for i in range(n * 1000, n * 1000 + 50)] for n, name in enumerate(SANCTIONS_LISTS, 1)}
+    added, clean = "99888777000166", "12312312000100"
+    try:
+        for name in SANCTIONS_LISTS[:-1]:
+            ingester.ingest(name, parse_dump(name, dump(name, documents[name])), "teste-filtro")
+        assert not sanctions_filter.reload()
+
+        last = SANCTIONS_LISTS[-1]
+        ingester.ingest(last, parse_dump(last, dump(last, documents[last])), "teste-filtro")
+        assert sanctions_filter.reload() and sanctions_filter.check(clean, "CNPJ") is False
+        assert all(sanctions_filter.check(doc, "CNPJ") for docs in documents.values() for doc in docs)
+
+        # Documento que entra na lista: o filtro deste processo é reconstruído
+        # antes do rescreen da importação
+        ingester.ingest("ceis", parse_dump("ceis", dump("ceis", documents["ceis"] + [added])), "teste-filtro")
+        assert sanctions_filter.check(added, "CNPJ") is True
+    finally:
+        database.execute("DELETE FROM public.sanctions_list_imports WHERE source = 'teste-filtro'")
+        database.execute("DELETE FROM public.sanctions_entries WHERE name LIKE 'SANCIONADO %'")
+
+
+def test_filter_saves_most_portal_calls(auth_headers):
+    """Mix sintético com CLEAN_SHARE de documentos sem sanção"""
+    listed = random_documents(ENTRIES, 3)
+    rows = [{"document": doc, "doc_type": doc_type, "cpf_core": None} for doc, doc_type in listed]
+    sanctions_filter.set_loader(lambda: (rows, datetime.now(timezone.utc)))
+    assert sanctions_filter.reload()
+    rng = random.Random(4)
+    documents = [doc if rng.random() < CLEAN_SHARE else rng.choice(listed) for doc in random_documents(MIX, 5)]
+
+    before = sum(3 if doc_type == "CNPJ" else 2 for _, doc_type in documents)
+    skipped = [(doc, doc_type) for doc, doc_type in documents if sanctions_filter.check(doc, doc_type) is False]
+    saved = sum(3 if doc_type == "CNPJ" else 2 for _, doc_type in skipped)
+    assert saved / before >= CLEAN_SHARE * (1 - settings.SANCTIONS_FILTER_FP_RATE * 2) - 0.01, f"{saved / before:.1%}"
+
+    client = TestClient(app)
+    assert client.get("/api/usage/sanctions-filter").status_code in (401, 403)
+    stats = client.get("/api/usage/sanctions-filter", headers=auth_headers("empresa-a")).json()
+    assert stats["available"] and stats["entries"] == len({filter_key(*doc) for doc in listed})
+    assert stats["saved_calls"] >= saved and stats["lookups"]["skipped"] >= len(skipped)
+    assert stats["estimated_fp_rate"] <= settings.SANCTIONS_FILTER_FP_RATE * 2
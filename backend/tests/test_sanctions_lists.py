@@ -0,0 +1,157 @@
+"""
+Listas de sanções em paralelo
+=============================
+query_sanctions contra o stub do Portal (atraso por chamada, paginação de
+15 registros):
+
+- listas consultadas em paralelo: o tempo da consulta é o da lista mais
+  lenta, não a soma; cada tipo de documento só consulta as listas dele
+  (CEAF com CPF mascarado, acordos de leniência só CNPJ)
+- paginação: todas as páginas lidas; acima de SANCTIONS_LIST_MAX_PAGES a
+  lista fica completed com truncated
+- lista com erro ou fora do prazo: status próprio (failed/timed_out, com o
+  erro) e as demais listas mantidas; success=False só se a lista for
+  essencial (core) - opcional deixa o resultado parcial (partial, warning)
+  e o refresh do monitoramento mantém os registros anteriores dela
+- cache por lista: repetição sem chamadas; lista com erro não fica em
+  cache; clear_sanctions_cache descarta só a lista pedida
+- filtro negativo: só as listas importadas dos dumps são dispensadas
+- lista registrada com register_sanctions_list entra na consulta
+"""
+import json
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from app import kyc_engine, monitoring_engine
+from app.core.config import settings
+from app.core.deadline import Deadline
+from app.core.sanctions_filter import sanctions_filter
+
+DELAY = 0.2
+
+
+@pytest.fixture
+def lists_portal(portal, monkeypatch):
+    monkeypatch.setattr(settings, "SANCTIONS_LIST_MAX_PAGES", 3)
+    portal.delay = DELAY
+    return portal
+
+
+def test_lists_queried_in_parallel(lists_portal):
+    cnpj, cpf = "11222333000181", "52998224725"
+    # O Portal devolve também registros parecidos: o filtro local descarta
+    lists_portal.records[("ceis", cnpj)] = [{"cnpjSancionado": cnpj}, {"cnpjSancionado": "99999999000199"}]
+    lists_portal.records[("acordos-leniencia", cnpj)] = [{"sancoes": [{"cnpjFormatado": "11.222.333/0001-81"}]}]
+    lists_portal.records[("ceaf", cpf)] = [{"pessoa": {"cpfFormatado": "***.982.247-**"}}]
+
+    started = time.monotonic()
+    result = kyc_engine.query_sanctions(cnpj, "CNPJ")
+    elapsed = time.monotonic() - started
+    assert elapsed < DELAY * 2.5
+    assert lists_portal.lists_called(cnpj) == ["acordos-leniencia", "ceis", "cepim", "cnep"]
+    assert result["success"] and len(result["ceis"]) == 1 and len(result["leniencia"]) == 1
+    assert result["total_sanctions"] == 2 and result["lists"]["ceaf"]["status"] == kyc_engine.SOURCE_SKIPPED
+
+    result = kyc_engine.query_sanctions(cpf, "CPF")
+    assert result["success"] and len(result["ceaf"]) == 1
+    assert lists_portal.lists_called(cpf) == ["ceaf", "ceis", "cnep"]
+
+
+def test_pagination_and_truncation(lists_portal):
+    document, large = "45997418000153", "60746948000112"
+    lists_portal.records[("cnep", document)] = [{"cnpjCpfSancionado": document, "n": i} for i in range(20)]
+    lists_portal.records[("cnep", large)] = [{"cnpjCpfSancionado": large, "n": i} for i in range(100)]
+
+    result = kyc_engine.query_sanctions(document, "CNPJ")
+    status = result["lists"]["cnep"]
+    assert len(result["cnep"]) == 20 and status["pages"] == 2 and not status.get("truncated")
+
+    result = kyc_engine.query_sanctions(large, "CNPJ")
+    status = result["lists"]["cnep"]
+    assert result["success"] and len(result["cnep"]) == 3 * lists_portal.page_size
+    assert status["pages"] == 3 and status.get("truncated")
+
+
+def test_optional_list_failure_is_partial(lists_portal):
+    document = "33000167000101"
+    lists_portal.records[("ceis", document)] = [{"cnpjSancionado": document}]
+    lists_portal.errors[("acordos-leniencia", document)] = 503
+    result = kyc_engine.query_sanctions(document, "CNPJ")
+    status = result["lists"]["leniencia"]
+    assert result["success"] and result.get("partial") and "leniencia" in result["warning"]
+    assert status["status"] == kyc_engine.SOURCE_FAILED and status["error"] == "HTTP 503"
+    assert len(result["ceis"]) == 1 and result["lists"]["ceis"]["status"] == kyc_engine.SOURCE_COMPLETED
+
+    # O refresh mantém os registros anteriores da lista opcional
+    previous = {"sanctions": {"leniencia": {"$payload": "sha256:anterior"}, "lists": {"leniencia": {"records": 2}}}}
+    kyc_data = {"doc_type": "CNPJ", "cadastral_data": {}, "sources": {"sanctions": kyc_engine.SOURCE_COMPLETED},
+                "sanctions": json.loads(json.dumps(result))}
+    monitoring_engine._carry_over_failed_lists(kyc_data, previous)
+    assert kyc_data["sanctions"]["leniencia"] == {"$payload": "sha256:anterior"}
+    assert kyc_data["sanctions"]["total_sanctions"] == 3 and kyc_data["risk_level"] == "ALTO"
+
+    # Lista com erro não fica em cache
+    lists_portal.clear_calls()
+    del lists_portal.errors[("acordos-leniencia", document)]
+    result = kyc_engine.query_sanctions(document, "CNPJ")
+    assert result["success"] and lists_portal.lists_called(document) == ["acordos-leniencia"]
+
+
+def test_core_list_failure_fails_sanctions(lists_portal):
+    core = "07526557000100"
+    lists_portal.errors[("ceis", core)] = 503
+    result = kyc_engine.query_sanctions(core, "CNPJ")
+    assert not result["success"] and "ceis" in result["error"]
+    assert result["lists"]["ceis"]["status"] == kyc_engine.SOURCE_FAILED
+
+
+def test_list_past_deadline_times_out(lists_portal):
+    slow = "00000000000191"
+    lists_portal.delays[("cnep", slow)] = 3
+    started = time.monotonic()
+    result = kyc_engine.query_sanctions(slow, "CNPJ", Deadline.after(1))
+    elapsed = time.monotonic() - started
+    assert elapsed < 1.5 and not result["success"]
+    assert result["lists"]["cnep"]["status"] == kyc_engine.SOURCE_TIMED_OUT
+    assert result["lists"]["ceis"]["status"] == kyc_engine.SOURCE_COMPLETED
+
+
+def test_cache_per_list(lists_portal):
+    document = "11222333000181"
+    lists_portal.records[("ceis", document)] = [{"cnpjSancionado": document}]
+    kyc_engine.query_sanctions(document, "CNPJ")
+
+    lists_portal.clear_calls()
+    result = kyc_engine.query_sanctions(document, "CNPJ")
+    assert not lists_portal.calls and len(result["ceis"]) == 1
+    assert all(result["lists"][name]["cached"] for name in ("ceis", "cnep", "cepim", "leniencia"))
+
+    kyc_engine.clear_sanctions_cache("ceis")
+    result = kyc_engine.query_sanctions(document, "CNPJ")
+    assert lists_portal.lists_called(document) == ["ceis"] and len(result["ceis"]) == 1
+
+
+def test_filter_skips_only_dump_lists(lists_portal):
+    document = "19131243000197"
+    sanctions_filter.set_loader(lambda: ([{"document": "11222333000181", "doc_type": "CNPJ", "cpf_core": None}],
+                                         datetime.now(timezone.utc)))
+    sanctions_filter.reload()
+    result = kyc_engine.query_sanctions(document, "CNPJ")
+    screened = [name for name, status in result["lists"].items() if status.get("screened_by")]
+    assert result["success"] and screened == ["ceis", "cnep", "cepim"]
+    assert lists_portal.lists_called(document) == ["acordos-leniencia"]
+
+
+def test_registered_list_is_queried(lists_portal, monkeypatch):
+    document = "27865757000102"
+    monkeypatch.setattr(settings, "SANCTIONS_LISTS_ENABLED", settings.SANCTIONS_LISTS_ENABLED + ",cnd")
+    monkeypatch.setitem(kyc_engine.SANCTIONS_LISTS, "cnd", None)  # removida ao final
+    monkeypatch.setitem(kyc_engine._list_caches, "cnd", None)
+    kyc_engine.register_sanctions_list(kyc_engine.SanctionsList("cnd", "cnd-teste", {"CNPJ": "cnpj"}, ("empresa.cnpj",)))
+    lists_portal.records[("cnd-teste", document)] = [{"empresa": {"cnpj": document}}, {"empresa": {"cnpj": "1"}}]
+
+    result = kyc_engine.query_sanctions(document, "CNPJ")
+    assert len(result.get("cnd", [])) == 1 and result["total_sanctions"] == 1
+    assert result["lists"]["cnd"]["status"] == kyc_engine.SOURCE_COMPLETED
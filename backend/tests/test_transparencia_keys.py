@@ -0,0 +1,78 @@
+"""
+Pool de chaves do Portal da Transparência
+=========================================
+Consultas concorrentes a query_sanctions (CEIS, CNEP e CEPIM por CNPJ)
+contra o stub do Portal com limite por chave:
+
+- o pool completa todas as consultas; chave revogada (401) e chave com 429
+  (Retry-After) entram em cooldown depois das chamadas já em andamento
+- o uso fica distribuído entre as chaves válidas
+- uma chave só atende ~o limite dela
+"""
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import kyc_engine
+from app.core.config import settings
+from app.core.key_pool import ApiKeyPool, fingerprint
+from app.core.upstream_limits import LocalRateStore, upstream_limiter
+
+PER_MINUTE = 60
+REVOKED = "chave-revogada"
+TIGHT = "chave-apertada"  # portal aceita só 5 chamadas
+VALID = ["chave-a", "chave-b", "chave-c"]
+LISTS = 3
+THREADS = 8
+DOCUMENTS = 50  # 150 chamadas: mais que o limite de uma chave (60/min)
+
+
+@pytest.fixture
+def key_limited_portal(portal, no_sanctions_cache, monkeypatch):
+    """Portal com limite por chave, 401 para a chave revogada"""
+    monkeypatch.setattr(settings, "QUOTA_MAX_WAIT_SECONDS", 2)
+    monkeypatch.setattr(settings, "SANCTIONS_LISTS_ENABLED", "ceis,cnep,cepim")
+
+    def respond(endpoint, document, key, hits):
+        if key == REVOKED:
+            return 401, {"erro": "chave inválida"}, {}
+        if (key == TIGHT and hits > 5) or hits > PER_MINUTE + 10:
+            return 429, {"erro": "limite excedido"}, {"Retry-After": "30"}
+        return 200, [], {}
+
+    portal.responder = respond
+    yield portal
+    upstream_limiter.set_store(LocalRateStore())
+
+
+def run_queries(monkeypatch, portal, keys):
+    portal.clear_calls()
+    upstream_limiter.set_store(LocalRateStore())
+    monkeypatch.setattr(kyc_engine, "transparencia_keys", ApiKeyPool("transparencia", keys, per_minute=PER_MINUTE))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        results = list(pool.map(lambda i: kyc_engine.query_sanctions(f"{i:014d}", "CNPJ"), range(DOCUMENTS)))
+    return results, time.perf_counter() - start
+
+
+def test_key_pool_spreads_calls_and_cools_down_bad_keys(key_limited_portal, monkeypatch):
+    results, elapsed = run_queries(monkeypatch, key_limited_portal, VALID + [REVOKED, TIGHT])
+    hits = dict(key_limited_portal.keys)
+    cooldown = {s["key"]: s["cooldown_seconds"] for s in kyc_engine.transparencia_keys.status()}
+
+    assert all(r.get("success") for r in results)
+    # chamadas já em andamento com a chave (até 8 threads, uma por lista) ainda chegam ao portal
+    in_flight = THREADS * LISTS
+    assert hits.get(REVOKED, 0) <= in_flight and cooldown[fingerprint(REVOKED)] > 0
+    assert hits.get(TIGHT, 0) <= 5 + in_flight and 25 < cooldown[fingerprint(TIGHT)] <= 30
+    # orçamento de cada chave: PER_MINUTE mais o que recarregou durante a rodada
+    budget = math.ceil(PER_MINUTE * (1 + elapsed / 60))
+    assert all(25 <= hits.get(key, 0) <= budget for key in VALID), f"{hits}"
+
+
+def test_single_key_serves_about_its_limit(key_limited_portal, monkeypatch):
+    results, _ = run_queries(monkeypatch, key_limited_portal, ["chave-unica"])
+    ok = sum(1 for r in results if r.get("success"))
+    assert ok < DOCUMENTS and ok * LISTS <= PER_MINUTE + 3, f"{ok} consultas"
@@ -0,0 +1,81 @@
+"""
+Limite global das APIs externas entre instâncias
+================================================
+- com o orçamento no Postgres (PgRateStore) processos concorrentes respeitam
+  o limite global; com buckets locais cada processo gasta o limite inteiro
+- coordenador fora: modo degradado com a fatia local do limite
+"""
+import multiprocessing
+import time
+
+import pytest
+
+from app.core.database import close_database, get_database
+from app.core.quotas import QuotaExceeded
+from app.core.upstream_limits import PgRateStore, UpstreamLimiter
+
+API = "test_upstream"
+LIMIT = 120.0
+WORKERS = 3
+SECONDS = 4.0
+
+
+def worker(shared: bool, queue) -> None:
+    store = PgRateStore.from_database(get_database()) if shared else None
+    limiter = UpstreamLimiter(store=store, limits={API: LIMIT})
+    calls = 0
+    deadline = time.monotonic() + SECONDS
+    while time.monotonic() < deadline:
+        try:
+            limiter.acquire(API, max_wait=max(deadline - time.monotonic(), 0))
+            if time.monotonic() <= deadline:
+                calls += 1
+        except QuotaExceeded:
+            time.sleep(0.05)
+    close_database()
+    queue.put(calls)
+
+
+def run(shared: bool) -> list:
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    processes = [context.Process(target=worker, args=(shared, queue)) for _ in range(WORKERS)]
+    for p in processes:
+        p.start()
+    counts = [queue.get(timeout=SECONDS + 30) for _ in processes]
+    for p in processes:
+        p.join()
+    return counts
+
+
+@pytest.mark.db
+def test_shared_budget_across_processes(database):
+    database.execute("DELETE FROM public.upstream_rate_buckets WHERE name = $1", API)
+    database.execute("DELETE FROM public.upstream_rate_instances WHERE name = $1", API)
+    close_database()  # cada processo abre o próprio pool
+
+    expected = LIMIT + LIMIT * SECONDS / 60
+    local = run(False)
+    shared = run(True)
+    assert sum(local) >= expected * (WORKERS - 0.5), f"buckets locais: {local}"
+    assert sum(shared) <= expected * 1.05, f"compartilhado: {shared}"
+    assert min(shared) >= sum(shared) / WORKERS * 0.5, f"fatias desequilibradas: {shared}"
+
+
+def test_degraded_mode_uses_local_share():
+    class DownStore:
+        def take(self, *args):
+            raise ConnectionError("coordenador fora")
+
+    limiter = UpstreamLimiter(store=DownStore(), limits={API: LIMIT})
+    for _ in range(10):
+        limiter.acquire(API, max_wait=0)
+    assert limiter.degraded
+
+    # Fatia local = LIMIT / UPSTREAM_FALLBACK_INSTANCES (padrão 2): 60 fichas
+    allowed = 10
+    with pytest.raises(QuotaExceeded):
+        while allowed < 200:
+            limiter.acquire(API, max_wait=0)
+            allowed += 1
+    assert allowed == 60
@@ -167,11 +167,15 @@ export default function DossierPage() {
       ? aiAnalysis
       : aiAnalysis
       ? JSON.stringify(aiAnalysis, null, 2)
+      : reportData?.ai_status === 'PENDENTE'
+      ? 'Análise de IA em processamento. Recarregue a página em alguns segundos.'
       : null;
   const mediaFindings = reportData?.media_findings;
   const ceis = sources?.transparencia_ceis;
   const cnep = sources?.transparencia_cnep;
   const cepim = sources?.transparencia_cepim;
+  const ceaf = sources?.transparencia_ceaf;
+  const leniencia = sources?.transparencia_leniencia;
   const filterSanctions = (items: any[]) => {
     if (!documentDigits) return [];
     return items.filter((item) => {
@@ -184,10 +188,13 @@ export default function DossierPage() {
         item?.cnpj,
         item?.cpf,
         item?.codigoFormatado,
-      ]
-        .filter(Boolean)
-        .map((value) => String(value).replace(/\D/g, ''));
-      return candidates.includes(documentDigits);
+        ...(Array.isArray(item?.sancoes) ? item.sancoes.map((s: any) => s?.cnpjFormatado) : []),
+      ].filter(Boolean);
+      return candidates.some((value) => {
+        const digits = String(value).replace(/\D/g, '');
+        // CPF mascarado pelo Portal (***.456.789-**): compara os dígitos centrais
+        return digits === documentDigits || (String(value).includes('*') && digits === documentDigits.slice(3, 9));
+      });
     });
   };
   const ceisListRaw = ceis?.ok && Array.isArray(ceis.data) ? ceis.data : [];
@@ -196,6 +203,16 @@ export default function DossierPage() {
   const ceisList = filterSanctions(ceisListRaw);
   const cnepList = filterSanctions(cnepListRaw);
   const cepimList = filterSanctions(cepimListRaw);
+  const ceafList = filterSanctions(ceaf?.ok && Array.isArray(ceaf.data) ? ceaf.data : []);
+  const leniencyList = filterSanctions(leniencia?.ok && Array.isArray(leniencia.data) ? leniencia.data : []);
+  const sanctionGroups = [
+    { label: 'CEIS', source: ceis, list: ceisList },
+    { label: 'CNEP', source: cnep, list: cnepList },
+    { label: 'CEPIM', source: cepim, list: cepimList },
+    { label: 'CEAF', source: ceaf, list: ceafList },
+    { label: 'Acordos de leniência', source: leniencia, list: leniencyList },
+  ];
+  const sanctionsCount = sanctionGroups.reduce((total, group) => total + group.list.length, 0);
 
   const getRiskColor = (level?: string) => {
     const colors = {
@@ -386,48 +403,38 @@ export default function DossierPage() {
         )}
 
         {/* Sanções */}
-        {(sanctions || ceis || cnep || cepim) && (
+        {(sanctions || ceis || cnep || cepim || ceaf || leniencia) && (
           <div className="bg-white rounded-lg shadow mb-6">
             <div className="px-6 py-4 border-b border-gray-200">
               <h2 className="text-xl font-semibold text-gray-800">⚖️ Sanções e Restrições</h2>
             </div>
             <div className="p-6 space-y-4 text-gray-900">
               <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
-                <div className="bg-gray-50 p-4 rounded">
-                  <p className="text-sm text-gray-600">CEIS</p>
-                  <p className="text-2xl font-bold text-gray-900">{ceisList.length}</p>
-                  {!ceis?.ok && ceis && (
-                    <p className="text-xs text-red-600 mt-1">Falha: {ceis.error || 'erro'}</p>
-                  )}
-                </div>
-                <div className="bg-gray-50 p-4 rounded">
-                  <p className="text-sm text-gray-600">CNEP</p>
-                  <p className="text-2xl font-bold text-gray-900">{cnepList.length}</p>
-                  {!cnep?.ok && cnep && (
-                    <p className="text-xs text-red-600 mt-1">Falha: {cnep.error || 'erro'}</p>
-                  )}
-                </div>
-                <div className="bg-gray-50 p-4 rounded">
-                  <p className="text-sm text-gray-600">CEPIM</p>
-                  <p className="text-2xl font-bold text-gray-900">{cepimList.length}</p>
-                  {!cepim?.ok && cepim && (
-                    <p className="text-xs text-red-600 mt-1">Falha: {cepim.error || 'erro'}</p>
-                  )}
-                </div>
+                {sanctionGroups
+                  .filter((group) => group.source)
+                  .map((group) => (
+                    <div key={group.label} className="bg-gray-50 p-4 rounded">
+                      <p className="text-sm text-gray-600">{group.label}</p>
+                      <p className="text-2xl font-bold text-gray-900">{group.list.length}</p>
+                      {!group.source?.ok && (
+                        <p className="text-xs text-red-600 mt-1">Falha: {group.source?.error || 'erro'}</p>
+                      )}
+                    </div>
+                  ))}
               </div>
 
-              {(ceisList.length + cnepList.length + cepimList.length) === 0 && (
+              {sanctionsCount === 0 && (
                 <p className="text-green-600">✓ Nenhuma sanção encontrada</p>
               )}
 
-              {(ceisList.length > 0 || cnepList.length > 0 || cepimList.length > 0) && (
+              {sanctionsCount > 0 && (
                 <details className="group">
                   <summary className="cursor-pointer list-none flex items-center justify-between">
                     <span className="font-medium text-gray-800">Detalhes</span>
                     <span className="text-sm text-gray-500 group-open:rotate-180 transition-transform">▾</span>
                   </summary>
                   <div className="mt-4 space-y-6 text-sm text-gray-700">
-                    {[{ label: 'CEIS', list: ceisList }, { label: 'CNEP', list: cnepList }, { label: 'CEPIM', list: cepimList }]
+                    {sanctionGroups
                       .filter((group) => group.list.length > 0)
                       .map((group) => (
                         <div key={group.label}>
@@ -438,16 +445,18 @@ export default function DossierPage() {
                                 item?.sancionado?.nome ||
                                 item?.pessoa?.nome ||
                                 item?.pessoa?.razaoSocialReceita ||
+                                item?.sancoes?.[0]?.razaoSocial ||
                                 'Sancionado';
                               const code =
                                 item?.sancionado?.codigoFormatado ||
                                 item?.pessoa?.cnpjFormatado ||
                                 item?.pessoa?.cpfFormatado ||
+                                item?.sancoes?.[0]?.cnpjFormatado ||
                                 '-';
-                              const tipo = item?.tipoSancao?.descricaoResumida || item?.tipoSancao?.descricaoPortal || '-';
-                              const orgao = item?.orgaoSancionador?.nome || item?.fonteSancao?.nomeExibicao || '-';
-                              const inicio = formatDateShort(item?.dataInicioSancao);
-                              const fim = formatDateShort(item?.dataFimSancao);
+                              const tipo = item?.tipoSancao?.descricaoResumida || item?.tipoSancao?.descricaoPortal || item?.punicao?.tipoPunicao?.descricao || item?.situacaoAcordo || '-';
+                              const orgao = item?.orgaoSancionador?.nome || item?.fonteSancao?.nomeExibicao || item?.orgaoLotacao?.nome || item?.orgaoResponsavel || '-';
+                              const inicio = formatDateShort(item?.dataInicioSancao || item?.dataPublicacao || item?.dataInicioAcordo);
+                              const fim = formatDateShort(item?.dataFimSancao || item?.dataFimAcordo);
                               return (
                                 <div key={index} className="border border-gray-200 rounded-lg p-3">
                                   <div className="flex flex-col md:flex-row md:items-start md:justify-between gap-2">
@@ -3,8 +3,9 @@
 import { useEffect, useState } from 'react';
 import { useRouter } from 'next/navigation';
 import { authService } from '@/services/auth';
+import { subscribeCompanyEvents } from '@/services/events';
 import { monitoringService } from '@/services/monitoring';
-import { MonitoringRecord, MonitoringStats, MonitoringChange } from '@/types';
+import { MonitoringRecord, MonitoringStats, MonitoringChange, RefreshJob } from '@/types';
 import Header from '@/components/Header';
 
 export default function MonitoringPage() {
@@ -14,6 +15,7 @@ export default function MonitoringPage() {
   const [recentChanges, setRecentChanges] = useState<MonitoringChange[]>([]);
   const [loading, setLoading] = useState(true);
   const [updating, setUpdating] = useState(false);
+  const [refreshProgress, setRefreshProgress] = useState<{ processed: number; total: number } | null>(null);
   const [newDocument, setNewDocument] = useState('');
   const [newNotes, setNewNotes] = useState('');
   const [adding, setAdding] = useState(false);
@@ -27,6 +29,31 @@ export default function MonitoringPage() {
     }
 
     loadData();
+
+    // Eventos da empresa: registros alterados no refresh e refresh iniciado
+    // em outra aba/usuário, sem consultar a API durante a atualização
+    return subscribeCompanyEvents((event) => {
+      if (event.event === 'refresh.progress') {
+        setRefreshProgress({ processed: event.data.processed ?? 0, total: event.data.total ?? 0 });
+      } else if (event.event === 'refresh.finished') {
+        setRefreshProgress(null);
+        loadData();
+      } else if (event.event === 'target.changed') {
+        const restrictions = event.data.new_restrictions ?? 0;
+        setRecords((current) => current.map((record) => (
+          record.document === event.data.document
+            ? {
+                ...record,
+                restriction_count: restrictions,
+                has_restrictions: restrictions > 0,
+                status: event.data.current_status || record.status,
+              }
+            : record
+        )));
+      } else if (event.event === 'events.dropped') {
+        loadData();
+      }
+    });
   }, [router]);
 
   const loadData = async () => {
@@ -103,13 +130,20 @@ export default function MonitoringPage() {
     setUpdating(true);
 
     try {
-      await monitoringService.updateAll();
-      setSuccess('Todos os registros foram atualizados!');
+      const job = await monitoringService.updateAll((progress: RefreshJob) => {
+        setRefreshProgress({ processed: progress.processed, total: progress.total });
+      });
+      setSuccess(
+        job.status === 'cancelled'
+          ? `Atualização cancelada (${job.processed} de ${job.total} registros)`
+          : 'Todos os registros foram atualizados!'
+      );
       await loadData();
     } catch (err: any) {
-      setError(err.response?.data?.detail || 'Erro ao atualizar registros');
+      setError(err.response?.data?.detail || err.message || 'Erro ao atualizar registros');
     } finally {
       setUpdating(false);
+      setRefreshProgress(null);
     }
   };
 
@@ -294,10 +328,14 @@ export default function MonitoringPage() {
             <h2 className="text-xl font-semibold text-gray-800">📋 Registros Monitorados</h2>
             <button
               onClick={handleUpdateAll}
-              disabled={updating}
+              disabled={updating || refreshProgress !== null}
               className="px-4 py-2 bg-primary text-white rounded-lg hover:bg-primary-dark disabled:opacity-50"
             >
-              {updating ? '🔄 Atualizando...' : '🔄 Atualizar Todos'}
+              {refreshProgress
+                ? `🔄 Atualizando... ${refreshProgress.processed}/${refreshProgress.total}`
+                : updating
+                ? '🔄 Atualizando...'
+                : '🔄 Atualizar Todos'}
             </button>
           </div>
           <div className="p-6">
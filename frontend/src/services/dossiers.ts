@@ -4,8 +4,17 @@
  * Serviço de dossiês
  */
 
-import api from './api';
-import { Dossier, CreateDossierRequest, BatchDossiersRequest, CreateDossierResponse } from '@/types';
+import api, { API_URL } from './api';
+import {
+  Dossier,
+  CreateDossierRequest,
+  DossierStreamEvent,
+  BatchDossiersRequest,
+  CreateDossierResponse,
+  DossierReportData,
+  DossierSection,
+  DossierSource,
+} from '@/types';
 
 const DOSSIER_TIMEOUT_MS = 30000;
 
@@ -20,6 +29,59 @@ export const dossiersService = {
     return response.data;
   },
 
+  /**
+   * Cria um novo dossiê recebendo cada seção assim que fica pronta
+   *
+   * Eventos (SSE): pep (só CPF), cadastral, address, sanctions_list,
+   * sanctions, risk, name_screening (só CNPJ), saved (mesmo corpo de
+   * create) e ai. Usa fetch porque EventSource não envia POST nem o
+   * cabeçalho Authorization.
+   */
+  async createStream(
+    data: CreateDossierRequest,
+    onEvent: (event: DossierStreamEvent) => void
+  ): Promise<void> {
+    const token = localStorage.getItem('access_token');
+    const response = await fetch(`${API_URL}/api/dossiers/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Accept: 'text/event-stream',
+        ...(token ? { Authorization: `Bearer ${token}` } : {}),
+      },
+      body: JSON.stringify(data),
+    });
+    if (!response.ok || !response.body) {
+      const detail = await response.json().catch(() => ({}));
+      throw { response: { status: response.status, data: detail } };
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let end = buffer.indexOf('\n\n');
+      while (end >= 0) {
+        const block = buffer.slice(0, end);
+        buffer = buffer.slice(end + 2);
+        end = buffer.indexOf('\n\n');
+
+        let event = '';
+        let payload = '';
+        for (const line of block.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) payload += line.slice(6);
+        }
+        if (event) {
+          onEvent({ event: event as DossierStreamEvent['event'], data: JSON.parse(payload) });
+        }
+      }
+    }
+  },
+
   /**
    * Lista dossiês
    */
@@ -33,9 +95,39 @@ export const dossiersService = {
 
   /**
    * Obtém dossiê por ID
+   *
+   * `fields` e `sections` restringem o payload (projeção feita no banco).
+   * Sem opções, retorna o dossiê completo.
    */
-  async getById(dossierId: string): Promise<Dossier> {
+  async getById(
+    dossierId: string,
+    options?: { fields?: string[]; sections?: DossierSection[] }
+  ): Promise<Dossier> {
     const response = await api.get<Dossier>(`/api/dossiers/${dossierId}`, {
+      params: {
+        fields: options?.fields?.join(','),
+        sections: options?.sections?.join(','),
+      },
+      timeout: DOSSIER_TIMEOUT_MS,
+    });
+    return response.data;
+  },
+
+  /**
+   * Obtém uma seção do report_data sob demanda (ex: qsa, sources)
+   */
+  async getSection(dossierId: string, section: DossierSection): Promise<Partial<DossierReportData>> {
+    const response = await api.get(`/api/dossiers/${dossierId}/sections/${section}`, {
+      timeout: DOSSIER_TIMEOUT_MS,
+    });
+    return response.data.report_data;
+  },
+
+  /**
+   * Obtém uma fonte bruta do dossiê sob demanda (ex: transparencia_ceis)
+   */
+  async getSource(dossierId: string, source: DossierSource): Promise<{ ok?: boolean; data?: any }> {
+    const response = await api.get(`/api/dossiers/${dossierId}/sources/${source}`, {
       timeout: DOSSIER_TIMEOUT_MS,
     });
     return response.data;
@@ -0,0 +1,48 @@
+/**
+ * Events Service
+ * ==============
+ * Eventos em tempo real da empresa (WebSocket /api/events/ws): progresso do
+ * refresh do monitoramento, mudanças por registro e progresso de lotes
+ */
+
+import { API_URL } from './api';
+import { CompanyEvent } from '@/types';
+
+const RECONNECT_DELAY_MS = 3000;
+
+/**
+ * Assina os eventos da empresa do usuário logado
+ *
+ * Reconecta automaticamente se a conexão cair. Em `events.dropped` (eventos
+ * perdidos por conexão lenta), recarregue o estado pela API.
+ *
+ * @returns Função que encerra a assinatura
+ */
+export function subscribeCompanyEvents(onEvent: (event: CompanyEvent) => void): () => void {
+  let socket: WebSocket | null = null;
+  let stopped = false;
+  let retry: ReturnType<typeof setTimeout> | null = null;
+
+  const connect = () => {
+    socket = new WebSocket(`${API_URL.replace(/^http/, 'ws')}/api/events/ws`);
+    socket.onopen = () => {
+      // O navegador não envia Authorization no WebSocket: token na 1ª mensagem
+      socket?.send(JSON.stringify({ token: localStorage.getItem('access_token') }));
+    };
+    socket.onmessage = (message) => {
+      onEvent(JSON.parse(message.data) as CompanyEvent);
+    };
+    socket.onclose = () => {
+      if (!stopped) {
+        retry = setTimeout(connect, RECONNECT_DELAY_MS);
+      }
+    };
+  };
+
+  connect();
+  return () => {
+    stopped = true;
+    if (retry) clearTimeout(retry);
+    socket?.close();
+  };
+}
@@ -5,18 +5,45 @@
  */
 
 import api from './api';
-import { MonitoringRecord, MonitoringStats, MonitoringChange } from '@/types';
+import { subscribeCompanyEvents } from './events';
+import {
+  MonitoringRecord,
+  MonitoringStats,
+  MonitoringChange,
+  RefreshJob,
+  RefreshJobResults,
+} from '@/types';
 
 const MONITORING_TIMEOUT_MS = 30000;
+const REFRESH_JOB_OPEN = ['queued', 'running'];
+
+/**
+ * Job com os contadores de um evento refresh.progress/refresh.finished
+ */
+function applyRefreshEvent(job: RefreshJob, data: any, finished: boolean): RefreshJob {
+  const counters = {
+    total: data.total ?? job.total,
+    processed: data.processed ?? job.processed,
+    updated: data.updated ?? job.updated,
+    errors: data.errors ?? job.errors,
+  };
+  if (!finished) {
+    return { ...job, ...counters, status: 'running' };
+  }
+  const status = data.error ? 'failed' : data.cancelled ? 'cancelled' : 'completed';
+  return { ...job, ...counters, status, error: data.error ?? null };
+}
 
 export const monitoringService = {
   /**
-   * Adiciona documento ao monitoramento
+   * Adiciona documento ao monitoramento (name: titular do CPF, confirma
+   * a ocorrência PEP pelos dígitos centrais)
    */
-  async add(document: string, notes?: string): Promise<MonitoringRecord> {
+  async add(document: string, notes?: string, name?: string): Promise<MonitoringRecord> {
     const response = await api.post<MonitoringRecord>('/api/monitoring/', {
       document,
       notes: notes || '',
+      name: name || undefined,
     }, {
       timeout: MONITORING_TIMEOUT_MS,
     });
@@ -63,15 +90,97 @@ export const monitoringService = {
   },
 
   /**
-   * Atualiza todos os documentos
+   * Enfileira a atualização de todos os documentos (devolve o job já aberto, se houver)
    */
-  async updateAll(): Promise<any> {
-    const response = await api.put('/api/monitoring/all', undefined, {
+  async createRefreshJob(): Promise<RefreshJob> {
+    const response = await api.post<RefreshJob>('/api/monitoring/refresh-jobs', undefined, {
+      timeout: MONITORING_TIMEOUT_MS,
+    });
+    return response.data;
+  },
+
+  async getRefreshJob(jobId: string): Promise<RefreshJob> {
+    const response = await api.get<RefreshJob>(`/api/monitoring/refresh-jobs/${jobId}`, {
+      timeout: MONITORING_TIMEOUT_MS,
+    });
+    return response.data;
+  },
+
+  async cancelRefreshJob(jobId: string): Promise<RefreshJob> {
+    const response = await api.post<RefreshJob>(`/api/monitoring/refresh-jobs/${jobId}/cancel`, undefined, {
       timeout: MONITORING_TIMEOUT_MS,
     });
     return response.data;
   },
 
+  async getRefreshJobResults(jobId: string): Promise<RefreshJobResults> {
+    const response = await api.get<RefreshJobResults>(`/api/monitoring/refresh-jobs/${jobId}/results`, {
+      timeout: MONITORING_TIMEOUT_MS,
+    });
+    return response.data;
+  },
+
+  /**
+   * Atualiza todos os documentos: cria o job e acompanha pelos eventos da
+   * empresa (refresh.progress/refresh.finished) até terminar
+   *
+   * Ao assinar (e a cada reconexão) e em `events.dropped` o job é relido
+   * pela API: eventos anteriores à assinatura não se perdem.
+   */
+  async updateAll(onProgress?: (job: RefreshJob) => void): Promise<RefreshJob> {
+    let job = await this.createRefreshJob();
+    onProgress?.(job);
+    if (!REFRESH_JOB_OPEN.includes(job.status)) {
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Erro ao atualizar registros');
+      }
+      return job;
+    }
+
+    return new Promise<RefreshJob>((resolve, reject) => {
+      let settled = false;
+      const settle = (final: RefreshJob) => {
+        if (settled) return;
+        settled = true;
+        unsubscribe();
+        onProgress?.(final);
+        if (final.status === 'failed') {
+          reject(new Error(final.error || 'Erro ao atualizar registros'));
+        } else {
+          resolve(final);
+        }
+      };
+      const reload = () => {
+        this.getRefreshJob(job.id)
+          .then((latest) => {
+            if (settled) return;
+            job = latest;
+            if (REFRESH_JOB_OPEN.includes(latest.status)) {
+              onProgress?.(latest);
+            } else {
+              settle(latest);
+            }
+          })
+          .catch(() => {
+            // Mantém a espera pelos eventos
+          });
+      };
+
+      const unsubscribe = subscribeCompanyEvents((event) => {
+        if (event.event === 'subscribed' || event.event === 'events.dropped') {
+          reload();
+        } else if (event.data?.refresh_id !== job.id) {
+          return;
+        } else if (event.event === 'refresh.progress') {
+          job = applyRefreshEvent(job, event.data, false);
+          onProgress?.(job);
+        } else if (event.event === 'refresh.finished') {
+          settle(applyRefreshEvent(job, event.data, true));
+        }
+      });
+    });
+  },
+
   /**
    * Remove documento
    */
@@ -43,6 +43,7 @@ export interface Dossier {
 export interface DossierReportData {
   technical_report: any; // JSON do KYC engine
   ai_analysis: string | null;
+  ai_status?: 'PENDENTE' | 'CONCLUIDO' | 'ERRO';
   media_findings: string | null;
   metadata: {
     generated_at: string;
@@ -51,10 +52,31 @@ export interface DossierReportData {
   };
 }
 
+// Seções do report_data que podem ser carregadas sob demanda
+export type DossierSection =
+  | 'metadata'
+  | 'input'
+  | 'summary'
+  | 'qsa'
+  | 'sources'
+  | 'sanctions'
+  | 'ai_analysis';
+
+export type DossierSource =
+  | 'brasilapi_cnpj'
+  | 'receitaws_cnpj'
+  | 'transparencia_ceis'
+  | 'transparencia_cnep'
+  | 'transparencia_cepim'
+  | 'transparencia_ceaf'
+  | 'transparencia_leniencia';
+
 export interface CreateDossierRequest {
   document: string;
   enable_ai: boolean;
   cep?: string;
+  // Nome do titular do CPF: confirma a ocorrência PEP pelos dígitos centrais
+  name?: string;
 }
 
 export interface BatchDossiersRequest {
@@ -72,6 +94,41 @@ export interface CreateDossierResponse {
   error?: string;
 }
 
+// Dossier Create Stream (POST /api/dossiers/stream, Server-Sent Events)
+export type DossierStreamEventName =
+  | 'pep'
+  | 'cadastral'
+  | 'address'
+  | 'sanctions_list'
+  | 'sanctions'
+  | 'risk'
+  | 'name_screening'
+  | 'saved'
+  | 'ai'
+  | 'error';
+
+export interface DossierStreamEvent {
+  event: DossierStreamEventName;
+  data: any;
+}
+
+// Company Events (/api/events/ws)
+export type CompanyEventName =
+  | 'subscribed'
+  | 'refresh.started'
+  | 'refresh.progress'
+  | 'refresh.finished'
+  | 'target.changed'
+  | 'batch.started'
+  | 'batch.progress'
+  | 'batch.finished'
+  | 'events.dropped';
+
+export interface CompanyEvent {
+  event: CompanyEventName;
+  data: any;
+}
+
 // Monitoring
 export interface MonitoringRecord {
   id: string;
@@ -96,6 +153,35 @@ export interface MonitoringStats {
   last_update: string | null;
 }
 
+export type RefreshJobStatus = 'queued' | 'running' | 'completed' | 'failed' | 'cancelled';
+
+export interface RefreshJob {
+  id: string;
+  company_id: string;
+  status: RefreshJobStatus;
+  total: number;
+  processed: number;
+  updated: number;
+  errors: number;
+  cancel_requested: boolean;
+  error?: string | null;
+  created_at: string;
+  started_at?: string | null;
+  finished_at?: string | null;
+  created?: boolean;
+}
+
+export interface RefreshJobResults {
+  job: RefreshJob;
+  changes: {
+    document: string;
+    old_restrictions: number;
+    new_restrictions: number;
+    current_status: string;
+  }[];
+  errors: { document: string; error: string }[];
+}
+
 export interface MonitoringChange {
   document: string;
   detected_at?: string;
@@ -0,0 +1,31 @@
+-- ============================================
+-- Migração 001 - Payloads externos endereçados por conteúdo
+-- ============================================
+-- Respostas de BrasilAPI, ReceitaWS e Portal da Transparência passam a ser
+-- gravadas uma única vez, com chave no hash do JSON canônico.
+-- dossiers.report_data e monitoring_targets.data_json guardam apenas
+-- referências {"$payload": "sha256:..."} (ver backend/app/services/payload_store.py).
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS public.upstream_payloads (
+    hash TEXT PRIMARY KEY,              -- 'sha256:<hex>' do JSON canônico
+    payload JSONB NOT NULL,
+    size_bytes INTEGER,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Payloads são compartilhados entre empresas (sem company_id): só o backend
+-- (service_role) lê e grava; o usuário recebe os dados já resolvidos pela API
+ALTER TABLE public.upstream_payloads ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Payloads visíveis para usuários autenticados" ON public.upstream_payloads;
+DROP POLICY IF EXISTS "Payloads visíveis só para o backend" ON public.upstream_payloads;
+CREATE POLICY "Payloads visíveis só para o backend"
+    ON public.upstream_payloads FOR SELECT
+    USING (auth.role() = 'service_role');
+
+DROP POLICY IF EXISTS "Usuários autenticados podem gravar payloads" ON public.upstream_payloads;
+DROP POLICY IF EXISTS "Só o backend grava payloads" ON public.upstream_payloads;
+CREATE POLICY "Só o backend grava payloads"
+    ON public.upstream_payloads FOR INSERT
+    WITH CHECK (auth.role() = 'service_role');
@@ -0,0 +1,22 @@
+-- ============================================
+-- Migração 002 - Análise de IA assíncrona
+-- ============================================
+-- A fila de IA (backend/app/services/ai_pipeline.py) grava ai_analysis e
+-- ai_status no report_data com um único UPDATE, sem reescrever o JSON inteiro.
+-- SECURITY INVOKER: as políticas RLS de dossiers continuam valendo.
+-- ============================================
+
+CREATE OR REPLACE FUNCTION public.set_dossier_ai_analysis(
+    p_dossier_id UUID,
+    p_company_id UUID,
+    p_status TEXT,
+    p_analysis TEXT
+)
+RETURNS VOID AS $$
+    UPDATE public.dossiers
+    SET report_data = jsonb_set(
+            jsonb_set(report_data, '{ai_status}', to_jsonb(p_status)),
+            '{ai_analysis}', to_jsonb(p_analysis)
+        )
+    WHERE id = p_dossier_id AND company_id = p_company_id;
+$$ LANGUAGE sql SECURITY INVOKER;
@@ -0,0 +1,32 @@
+-- ============================================
+-- Migração 003 - Alinha o setup ao schema em produção
+-- ============================================
+-- O setup_database.sql cria colunas que o backend não usa mais
+-- (document_type NOT NULL) e não cria as que ele usa (dossiers.decisor_id,
+-- monitoring_targets.doc_type), ver SCHEMA_ATUAL.md. Sem esta migração um
+-- Postgres criado só com o setup rejeita os inserts do backend.
+--
+-- Idempotente: no banco em produção as colunas já existem e nada muda.
+-- ============================================
+
+ALTER TABLE public.dossiers ADD COLUMN IF NOT EXISTS decisor_id UUID;
+ALTER TABLE public.dossiers ALTER COLUMN entity_name DROP NOT NULL;
+
+ALTER TABLE public.monitoring_targets ADD COLUMN IF NOT EXISTS doc_type TEXT;
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'dossiers' AND column_name = 'document_type'
+    ) THEN
+        ALTER TABLE public.dossiers ALTER COLUMN document_type DROP NOT NULL;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'monitoring_targets' AND column_name = 'document_type'
+    ) THEN
+        ALTER TABLE public.monitoring_targets ALTER COLUMN document_type DROP NOT NULL;
+    END IF;
+END $$;
@@ -0,0 +1,71 @@
+-- ============================================
+-- Migração 004 - Índices compostos e upsert do monitoramento
+-- ============================================
+-- Todas as consultas filtram por empresa primeiro; os índices passam a ser
+-- (company_id, ...) e substituem os de coluna única em company_id.
+--
+-- monitoring_targets: um registro por (company_id, document). O cadastro vira
+-- um único INSERT ... ON CONFLICT (ver upsert_monitoring_target), sem a
+-- corrida entre o SELECT de existência e o INSERT.
+--
+-- dossiers: NÃO é único por documento (o usuário pode gerar um novo dossiê
+-- para o mesmo documento); o índice composto atende check_duplicate e a
+-- listagem paginada.
+-- ============================================
+
+-- Remove duplicatas de monitoramento (mantém o registro mais recente; created_at
+-- nulo conta como o mais antigo)
+DELETE FROM public.monitoring_targets t
+USING public.monitoring_targets d
+WHERE t.company_id = d.company_id
+  AND t.document = d.document
+  AND (COALESCE(t.created_at, '-infinity'), t.id) < (COALESCE(d.created_at, '-infinity'), d.id);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'monitoring_targets_company_document_key'
+    ) THEN
+        ALTER TABLE public.monitoring_targets
+            ADD CONSTRAINT monitoring_targets_company_document_key UNIQUE (company_id, document);
+    END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_monitoring_company_created
+    ON public.monitoring_targets (company_id, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_dossiers_company_document
+    ON public.dossiers (company_id, document_value, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_dossiers_company_created
+    ON public.dossiers (company_id, created_at DESC);
+
+-- Cobertos pelos índices compostos (company_id é o prefixo)
+DROP INDEX IF EXISTS public.idx_monitoring_company_id;
+DROP INDEX IF EXISTS public.idx_dossiers_company_id;
+
+
+-- Cadastro idempotente em uma ida ao banco: insere ou devolve o existente
+-- (inserted = false). SECURITY INVOKER: as políticas RLS continuam valendo.
+CREATE OR REPLACE FUNCTION public.upsert_monitoring_target(
+    p_company_id UUID,
+    p_document TEXT,
+    p_doc_type TEXT,
+    p_current_status TEXT,
+    p_data_json JSONB
+)
+RETURNS TABLE (id UUID, data_json JSONB, inserted BOOLEAN) AS $$
+    WITH ins AS (
+        INSERT INTO public.monitoring_targets (company_id, document, doc_type, current_status, data_json)
+        VALUES (p_company_id, p_document, p_doc_type, p_current_status, p_data_json)
+        ON CONFLICT (company_id, document) DO NOTHING
+        RETURNING monitoring_targets.id, monitoring_targets.data_json
+    )
+    SELECT ins.id, ins.data_json, TRUE FROM ins
+    UNION ALL
+    SELECT t.id, t.data_json, FALSE
+    FROM public.monitoring_targets t
+    WHERE t.company_id = p_company_id
+      AND t.document = p_document
+      AND NOT EXISTS (SELECT 1 FROM ins);
+$$ LANGUAGE sql VOLATILE SECURITY INVOKER;
@@ -0,0 +1,91 @@
+-- ============================================
+-- Migração 005 - RLS sem subconsulta a profiles por linha
+-- ============================================
+-- As políticas usavam `company_id IN (SELECT company_id FROM profiles
+-- WHERE id = auth.uid())`, reavaliando auth.uid() (e a RLS de profiles)
+-- durante a varredura de dossiers/monitoring_targets.
+--
+-- Agora a empresa do usuário vem de public.current_company_id():
+--   1. claim `company_id` do app_metadata do JWT (só gravável pelo servidor,
+--      sem consulta), ou
+--   2. profiles.company_id do usuário (fallback; a RLS de profiles já
+--      libera o próprio perfil)
+-- e as políticas a chamam dentro de `(SELECT ...)`, que o planner avalia uma
+-- única vez por instrução (InitPlan) em vez de uma vez por linha.
+--
+-- Para preencher a claim:
+--   UPDATE auth.users SET raw_app_meta_data =
+--       raw_app_meta_data || jsonb_build_object('company_id', p.company_id)
+--   FROM public.profiles p WHERE p.id = auth.users.id;
+-- ============================================
+
+CREATE OR REPLACE FUNCTION public.current_company_id()
+RETURNS UUID AS $$
+    SELECT COALESCE(
+        (NULLIF(current_setting('request.jwt.claims', true), '')::jsonb -> 'app_metadata' ->> 'company_id')::uuid,
+        (SELECT company_id FROM public.profiles WHERE id = auth.uid())
+    );
+$$ LANGUAGE sql STABLE;
+
+
+-- profiles
+DROP POLICY IF EXISTS "Usuários podem ver seu próprio perfil" ON public.profiles;
+CREATE POLICY "Usuários podem ver seu próprio perfil"
+    ON public.profiles FOR SELECT
+    USING (id = (SELECT auth.uid()));
+
+-- companies
+DROP POLICY IF EXISTS "Companies são visíveis para usuários da própria empresa" ON public.companies;
+CREATE POLICY "Companies são visíveis para usuários da própria empresa"
+    ON public.companies FOR SELECT
+    USING (id = (SELECT public.current_company_id()));
+
+-- dossiers
+DROP POLICY IF EXISTS "Usuários veem apenas dossiês da própria empresa" ON public.dossiers;
+CREATE POLICY "Usuários veem apenas dossiês da própria empresa"
+    ON public.dossiers FOR SELECT
+    USING (company_id = (SELECT public.current_company_id()));
+
+DROP POLICY IF EXISTS "Usuários podem criar dossiês para própria empresa" ON public.dossiers;
+CREATE POLICY "Usuários podem criar dossiês para própria empresa"
+    ON public.dossiers FOR INSERT
+    WITH CHECK (company_id = (SELECT public.current_company_id()));
+
+DROP POLICY IF EXISTS "Usuários podem atualizar dossiês da própria empresa" ON public.dossiers;
+CREATE POLICY "Usuários podem atualizar dossiês da própria empresa"
+    ON public.dossiers FOR UPDATE
+    USING (company_id = (SELECT public.current_company_id()));
+
+-- monitoring_targets
+DROP POLICY IF EXISTS "Usuários veem apenas monitoramentos da própria empresa" ON public.monitoring_targets;
+CREATE POLICY "Usuários veem apenas monitoramentos da própria empresa"
+    ON public.monitoring_targets FOR SELECT
+    USING (company_id = (SELECT public.current_company_id()));
+
+DROP POLICY IF EXISTS "Usuários podem criar monitoramentos para própria empresa" ON public.monitoring_targets;
+CREATE POLICY "Usuários podem criar monitoramentos para própria empresa"
+    ON public.monitoring_targets FOR INSERT
+    WITH CHECK (company_id = (SELECT public.current_company_id()));
+
+DROP POLICY IF EXISTS "Usuários podem atualizar monitoramentos da própria empresa" ON public.monitoring_targets;
+CREATE POLICY "Usuários podem atualizar monitoramentos da própria empresa"
+    ON public.monitoring_targets FOR UPDATE
+    USING (company_id = (SELECT public.current_company_id()));
+
+DROP POLICY IF EXISTS "Usuários podem deletar monitoramentos da própria empresa" ON public.monitoring_targets;
+CREATE POLICY "Usuários podem deletar monitoramentos da própria empresa"
+    ON public.monitoring_targets FOR DELETE
+    USING (company_id = (SELECT public.current_company_id()));
+
+-- upstream_payloads
+DROP POLICY IF EXISTS "Payloads visíveis para usuários autenticados" ON public.upstream_payloads;
+DROP POLICY IF EXISTS "Payloads visíveis só para o backend" ON public.upstream_payloads;
+CREATE POLICY "Payloads visíveis só para o backend"
+    ON public.upstream_payloads FOR SELECT
+    USING ((SELECT auth.role()) = 'service_role');
+
+DROP POLICY IF EXISTS "Usuários autenticados podem gravar payloads" ON public.upstream_payloads;
+DROP POLICY IF EXISTS "Só o backend grava payloads" ON public.upstream_payloads;
+CREATE POLICY "Só o backend grava payloads"
+    ON public.upstream_payloads FOR INSERT
+    WITH CHECK ((SELECT auth.role()) = 'service_role');
@@ -0,0 +1,40 @@
+-- ============================================
+-- Migração 006 - Invalidação do cache de perfis do login
+-- ============================================
+-- O backend guarda perfil/empresa do usuário em cache (TTL) para não
+-- consultar profiles e companies a cada login. Estes triggers avisam o
+-- backend (LISTEN, via DATABASE_URL) quando um perfil ou empresa muda:
+--   profile_changed -> payload = profiles.id
+--   company_changed -> payload = companies.id
+-- Sem DATABASE_URL o cache expira só pelo TTL (AUTH_PROFILE_CACHE_TTL_SECONDS).
+-- ============================================
+
+CREATE OR REPLACE FUNCTION public.notify_profile_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('profile_changed', OLD.id::text);
+        RETURN OLD;
+    END IF;
+    PERFORM pg_notify('profile_changed', NEW.id::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.notify_company_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('company_changed', OLD.id::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notify_profiles_changed ON public.profiles;
+CREATE TRIGGER notify_profiles_changed
+    AFTER INSERT OR UPDATE OR DELETE ON public.profiles
+    FOR EACH ROW EXECUTE FUNCTION public.notify_profile_changed();
+
+DROP TRIGGER IF EXISTS notify_companies_changed ON public.companies;
+CREATE TRIGGER notify_companies_changed
+    AFTER UPDATE OR DELETE ON public.companies
+    FOR EACH ROW EXECUTE FUNCTION public.notify_company_changed();
@@ -0,0 +1,11 @@
+-- ============================================
+-- Migração 007 - Plano da empresa (cotas por tenant)
+-- ============================================
+-- companies.plan define os limites por minuto da empresa na API e nas
+-- consultas externas (QUOTA_PLANS no backend, ver app/core/quotas.py).
+-- Planos desconhecidos usam QUOTA_DEFAULT_PLAN.
+-- Mudanças de plano chegam ao backend pelo NOTIFY company_changed (006).
+-- ============================================
+
+ALTER TABLE public.companies
+    ADD COLUMN IF NOT EXISTS plan TEXT NOT NULL DEFAULT 'basic';
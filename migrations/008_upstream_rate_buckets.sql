@@ -0,0 +1,115 @@
+-- ============================================
+-- Migração 008 - Limite global das APIs externas
+-- ============================================
+-- Um token bucket por API externa (brasilapi, receitaws, viacep,
+-- transparencia), compartilhado por todas as instâncias do backend
+-- (ver backend/app/core/upstream_limits.py).
+--
+-- take_upstream_tokens reabastece e reserva em uma única instrução (a linha
+-- do bucket fica bloqueada só durante a chamada) e devolve:
+--   0   -> pode chamar agora
+--   t>0 -> reservado; chamar depois de t segundos
+--   -t  -> a espera (t) passaria de p_max_wait; nada foi reservado
+--
+-- Justiça entre instâncias: cada instância registra o quanto usou no minuto
+-- corrente; sob disputa, quem já passou da sua fatia (limite / instâncias
+-- ativas no último minuto) espera o fim da sua janela.
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS public.upstream_rate_buckets (
+    name TEXT PRIMARY KEY,
+    per_minute DOUBLE PRECISION NOT NULL,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS public.upstream_rate_instances (
+    name TEXT NOT NULL,
+    instance_id TEXT NOT NULL,
+    window_start TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    used DOUBLE PRECISION NOT NULL DEFAULT 0,
+    last_seen TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (name, instance_id)
+);
+
+-- Só o backend (service_role / conexão direta) acessa
+ALTER TABLE public.upstream_rate_buckets ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.upstream_rate_instances ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION public.take_upstream_tokens(
+    p_name TEXT,
+    p_instance TEXT,
+    p_tokens DOUBLE PRECISION,
+    p_per_minute DOUBLE PRECISION,
+    p_max_wait DOUBLE PRECISION
+)
+RETURNS DOUBLE PRECISION AS $$
+DECLARE
+    v_now TIMESTAMPTZ := clock_timestamp();
+    v_tokens DOUBLE PRECISION;
+    v_updated_at TIMESTAMPTZ;
+    v_used DOUBLE PRECISION;
+    v_window_start TIMESTAMPTZ;
+    v_active INTEGER;
+    v_wait DOUBLE PRECISION := 0;
+BEGIN
+    INSERT INTO public.upstream_rate_buckets (name, per_minute, tokens, updated_at)
+    VALUES (p_name, p_per_minute, p_per_minute, v_now)
+    ON CONFLICT (name) DO NOTHING;
+
+    SELECT tokens, updated_at INTO v_tokens, v_updated_at
+    FROM public.upstream_rate_buckets
+    WHERE name = p_name
+    FOR UPDATE;
+
+    -- Reabastece (capacidade = limite de um minuto)
+    v_tokens := LEAST(
+        p_per_minute,
+        v_tokens + GREATEST(EXTRACT(EPOCH FROM v_now - v_updated_at), 0) * p_per_minute / 60.0
+    );
+
+    INSERT INTO public.upstream_rate_instances AS i (name, instance_id, window_start, used, last_seen)
+    VALUES (p_name, p_instance, v_now, 0, v_now)
+    ON CONFLICT (name, instance_id) DO UPDATE
+        SET last_seen = v_now,
+            window_start = CASE WHEN i.window_start < v_now - INTERVAL '1 minute' THEN v_now ELSE i.window_start END,
+            used = CASE WHEN i.window_start < v_now - INTERVAL '1 minute' THEN 0 ELSE i.used END
+    RETURNING used, window_start INTO v_used, v_window_start;
+
+    IF v_tokens < p_tokens THEN
+        IF p_per_minute <= 0 THEN
+            RETURN -60;
+        END IF;
+        v_wait := (p_tokens - v_tokens) * 60.0 / p_per_minute;
+
+        SELECT count(*) INTO v_active
+        FROM public.upstream_rate_instances
+        WHERE name = p_name AND last_seen > v_now - INTERVAL '1 minute';
+
+        IF v_used + p_tokens > p_per_minute / GREATEST(v_active, 1) THEN
+            v_wait := GREATEST(
+                v_wait,
+                EXTRACT(EPOCH FROM v_window_start + INTERVAL '1 minute' - v_now)
+            );
+        END IF;
+
+        IF v_wait > p_max_wait THEN
+            UPDATE public.upstream_rate_buckets
+            SET tokens = v_tokens, per_minute = p_per_minute, updated_at = v_now
+            WHERE name = p_name;
+            RETURN -v_wait;
+        END IF;
+    END IF;
+
+    -- Saldo negativo = reservas na fila, liberadas pelo reabastecimento
+    UPDATE public.upstream_rate_buckets
+    SET tokens = v_tokens - p_tokens, per_minute = p_per_minute, updated_at = v_now
+    WHERE name = p_name;
+
+    UPDATE public.upstream_rate_instances
+    SET used = used + p_tokens
+    WHERE name = p_name AND instance_id = p_instance;
+
+    RETURN v_wait;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
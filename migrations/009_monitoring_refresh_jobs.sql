@@ -0,0 +1,74 @@
+-- ============================================
+-- Migração 009 - Jobs de atualização do monitoramento
+-- ============================================
+-- POST /api/monitoring/refresh-jobs grava um job e responde na hora; os
+-- workers do backend (backend/app/services/refresh_jobs.py, em qualquer
+-- instância) pegam os jobs da fila com claim_monitoring_refresh_job.
+--
+-- O worker renova heartbeat_at enquanto processa; um job 'running' sem
+-- heartbeat há mais de p_stale_seconds (instância caiu) volta a ser pego.
+-- Cancelamento: cancel_requested, conferido pelo worker entre registros.
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS public.monitoring_refresh_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    company_id UUID NOT NULL REFERENCES public.companies(id) ON DELETE CASCADE,
+    requested_by UUID,
+    status TEXT NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'completed', 'failed', 'cancelled')),
+    total INTEGER NOT NULL DEFAULT 0,
+    processed INTEGER NOT NULL DEFAULT 0,
+    updated INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    -- {"changes": [...], "errors": [...]} (limitado a REFRESH_JOB_RESULTS_LIMIT itens cada)
+    results JSONB NOT NULL DEFAULT '{"changes": [], "errors": []}'::jsonb,
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    heartbeat_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ
+);
+
+-- Um job aberto por empresa (novo pedido devolve o job em andamento)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_refresh_jobs_one_open
+    ON public.monitoring_refresh_jobs (company_id)
+    WHERE status IN ('queued', 'running');
+
+-- Fila (jobs abertos) e histórico por empresa
+CREATE INDEX IF NOT EXISTS idx_refresh_jobs_open
+    ON public.monitoring_refresh_jobs (created_at)
+    WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS idx_refresh_jobs_company_created
+    ON public.monitoring_refresh_jobs (company_id, created_at DESC);
+
+ALTER TABLE public.monitoring_refresh_jobs ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Usuários veem jobs de atualização da própria empresa" ON public.monitoring_refresh_jobs;
+CREATE POLICY "Usuários veem jobs de atualização da própria empresa"
+    ON public.monitoring_refresh_jobs FOR SELECT
+    USING (company_id = (SELECT public.current_company_id()));
+
+-- Pega o job mais antigo da fila (ou abandonado) para este worker
+CREATE OR REPLACE FUNCTION public.claim_monitoring_refresh_job(p_stale_seconds DOUBLE PRECISION)
+RETURNS SETOF public.monitoring_refresh_jobs AS $$
+    UPDATE public.monitoring_refresh_jobs j
+    SET status = 'running',
+        started_at = COALESCE(j.started_at, clock_timestamp()),
+        heartbeat_at = clock_timestamp(),
+        attempts = j.attempts + 1,
+        processed = 0,
+        updated = 0,
+        errors = 0
+    WHERE j.id = (
+        SELECT id
+        FROM public.monitoring_refresh_jobs
+        WHERE status = 'queued'
+           OR (status = 'running' AND heartbeat_at < clock_timestamp() - make_interval(secs => p_stale_seconds))
+        ORDER BY created_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING j.*;
+$$ LANGUAGE sql VOLATILE;
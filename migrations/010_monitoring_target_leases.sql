@@ -0,0 +1,82 @@
+-- ============================================
+-- Migração 010 - Refresh do monitoramento com leases por registro
+-- ============================================
+-- Vários processos de refresh (backend/scripts/run_refresh_worker.py ou
+-- MONITORING_REFRESH_WORKERS no backend) dividem monitoring_targets sem
+-- processar o mesmo registro duas vezes:
+--
+-- - claim_monitoring_targets: pega em lote os registros vencidos
+--   (refreshed_at antes de p_due_before) sem lease válido, com
+--   FOR UPDATE SKIP LOCKED, e grava o lease (dono + expiração)
+-- - renew_monitoring_target_leases: o worker renova os leases enquanto
+--   processa o lote; worker que cai deixa o lease expirar e os registros
+--   voltam a ser pegos por outro
+-- - release_monitoring_target_leases: falhas devolvem o registro com
+--   espera (lease sem dono até NOW() + p_retry_seconds)
+--
+-- A gravação do refresh (pg_queries.update_monitoring_targets) marca
+-- refreshed_at e limpa o lease.
+-- ============================================
+
+ALTER TABLE public.monitoring_targets ADD COLUMN IF NOT EXISTS refreshed_at TIMESTAMPTZ;
+ALTER TABLE public.monitoring_targets ADD COLUMN IF NOT EXISTS lease_owner TEXT;
+ALTER TABLE public.monitoring_targets ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+
+-- Fila dos vencidos (nunca atualizados primeiro)
+CREATE INDEX IF NOT EXISTS idx_monitoring_refresh_due
+    ON public.monitoring_targets (refreshed_at NULLS FIRST);
+
+CREATE OR REPLACE FUNCTION public.claim_monitoring_targets(
+    p_owner TEXT,
+    p_limit INTEGER,
+    p_lease_seconds DOUBLE PRECISION,
+    p_due_before TIMESTAMPTZ,
+    p_company_id UUID DEFAULT NULL
+)
+RETURNS TABLE (id UUID, company_id UUID, document TEXT, doc_type TEXT, data_json JSONB) AS $$
+    UPDATE public.monitoring_targets t
+    SET lease_owner = p_owner,
+        lease_expires_at = clock_timestamp() + make_interval(secs => p_lease_seconds)
+    WHERE t.id IN (
+        SELECT c.id
+        FROM public.monitoring_targets c
+        WHERE (c.refreshed_at IS NULL OR c.refreshed_at < p_due_before)
+          AND (c.lease_expires_at IS NULL OR c.lease_expires_at < clock_timestamp())
+          AND (p_company_id IS NULL OR c.company_id = p_company_id)
+        ORDER BY c.refreshed_at NULLS FIRST
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING t.id, t.company_id, t.document, t.doc_type, t.data_json;
+$$ LANGUAGE sql VOLATILE;
+
+CREATE OR REPLACE FUNCTION public.renew_monitoring_target_leases(
+    p_owner TEXT,
+    p_ids UUID[],
+    p_lease_seconds DOUBLE PRECISION
+)
+RETURNS INTEGER AS $$
+    WITH renewed AS (
+        UPDATE public.monitoring_targets
+        SET lease_expires_at = clock_timestamp() + make_interval(secs => p_lease_seconds)
+        WHERE id = ANY(p_ids) AND lease_owner = p_owner
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM renewed;
+$$ LANGUAGE sql VOLATILE;
+
+CREATE OR REPLACE FUNCTION public.release_monitoring_target_leases(
+    p_owner TEXT,
+    p_ids UUID[],
+    p_retry_seconds DOUBLE PRECISION
+)
+RETURNS INTEGER AS $$
+    WITH released AS (
+        UPDATE public.monitoring_targets
+        SET lease_owner = NULL,
+            lease_expires_at = clock_timestamp() + make_interval(secs => p_retry_seconds)
+        WHERE id = ANY(p_ids) AND lease_owner = p_owner
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM released;
+$$ LANGUAGE sql VOLATILE;
@@ -0,0 +1,62 @@
+-- ============================================
+-- Migração 011 - Snapshot das listas de sanções e ingestão por delta
+-- ============================================
+-- O ingester (backend/app/services/sanctions_delta.py) importa o dump diário
+-- de CEIS/CNEP/CEPIM do Portal da Transparência, compara com o snapshot
+-- anterior (sanctions_entries) e re-verifica só os registros monitorados
+-- cujos documentos entraram ou saíram da lista, em todas as empresas.
+--
+-- - sanctions_entries: uma linha por registro do dump (record_key = hash do
+--   registro); document é o CPF/CNPJ completo, cpf_core os 6 dígitos
+--   centrais do CPF (os dumps mascaram o CPF de pessoa física)
+-- - sanctions_list_imports: histórico das importações e do delta
+-- - índice reverso documento -> monitoring_targets: por documento e, para
+--   CPF mascarado, pelos dígitos centrais
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS public.sanctions_entries (
+    list_name TEXT NOT NULL CHECK (list_name IN ('ceis', 'cnep', 'cepim')),
+    record_key TEXT NOT NULL,
+    document TEXT,
+    doc_type TEXT,
+    cpf_core TEXT,
+    name TEXT,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    first_seen_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_seen_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (list_name, record_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_sanctions_entries_document
+    ON public.sanctions_entries (document) WHERE document IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_sanctions_entries_cpf_core
+    ON public.sanctions_entries (cpf_core) WHERE cpf_core IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS public.sanctions_list_imports (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    list_name TEXT NOT NULL,
+    source TEXT,
+    records INTEGER NOT NULL DEFAULT 0,
+    added INTEGER NOT NULL DEFAULT 0,
+    removed INTEGER NOT NULL DEFAULT 0,
+    affected_documents INTEGER NOT NULL DEFAULT 0,
+    affected_targets INTEGER NOT NULL DEFAULT 0,
+    rescreened INTEGER NOT NULL DEFAULT 0,
+    baseline BOOLEAN NOT NULL DEFAULT FALSE,
+    status TEXT NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'completed', 'failed')),
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_sanctions_imports_list_created
+    ON public.sanctions_list_imports (list_name, created_at DESC);
+
+-- Dados públicos do Portal, mas só o backend (service role) lê e grava
+ALTER TABLE public.sanctions_entries ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.sanctions_list_imports ENABLE ROW LEVEL SECURITY;
+
+-- Índice reverso documento -> registros monitorados (todas as empresas)
+CREATE INDEX IF NOT EXISTS idx_monitoring_document ON public.monitoring_targets (document);
+CREATE INDEX IF NOT EXISTS idx_monitoring_cpf_core
+    ON public.monitoring_targets (substr(document, 4, 6)) WHERE doc_type = 'CPF';
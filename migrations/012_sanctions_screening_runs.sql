@@ -0,0 +1,64 @@
+-- ============================================
+-- Migração 012 - Triagem da carteira inteira contra as listas de sanções
+-- ============================================
+-- Para auditoria, backend/app/services/portfolio_screening.py cruza todos os
+-- documentos da carteira (dossiês e registros monitorados) com o snapshot
+-- das listas (sanctions_entries, migrations/011) em memória, de uma vez,
+-- sem consultar o Portal.
+--
+-- - sanctions_screening_runs: uma linha por execução (empresa ou todas),
+--   com volumes e vazão (linhas da carteira por segundo)
+-- - sanctions_screening_hits: ocorrências da execução; match_type
+--   'document' (CPF/CNPJ completo) ou 'cpf_core' (CPF mascarado no dump,
+--   mesmos dígitos centrais - a confirmar pela consulta ao Portal)
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS public.sanctions_screening_runs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    company_id UUID REFERENCES public.companies(id) ON DELETE CASCADE,
+    status TEXT NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'completed', 'failed')),
+    portfolio_rows INTEGER NOT NULL DEFAULT 0,
+    entries INTEGER NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    subjects_hit INTEGER NOT NULL DEFAULT 0,
+    elapsed_seconds DOUBLE PRECISION,
+    rows_per_second DOUBLE PRECISION,
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS public.sanctions_screening_hits (
+    id BIGSERIAL PRIMARY KEY,
+    run_id UUID NOT NULL REFERENCES public.sanctions_screening_runs(id) ON DELETE CASCADE,
+    company_id UUID NOT NULL REFERENCES public.companies(id) ON DELETE CASCADE,
+    source TEXT NOT NULL CHECK (source IN ('dossier', 'monitoring')),
+    subject_id UUID NOT NULL,
+    document TEXT NOT NULL,
+    doc_type TEXT NOT NULL,
+    list_name TEXT NOT NULL,
+    record_key TEXT NOT NULL,
+    match_type TEXT NOT NULL CHECK (match_type IN ('document', 'cpf_core')),
+    name TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_screening_runs_company_created
+    ON public.sanctions_screening_runs (company_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_screening_hits_run
+    ON public.sanctions_screening_hits (run_id);
+CREATE INDEX IF NOT EXISTS idx_screening_hits_company_document
+    ON public.sanctions_screening_hits (company_id, document);
+
+ALTER TABLE public.sanctions_screening_runs ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.sanctions_screening_hits ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Usuários veem triagens da própria empresa" ON public.sanctions_screening_runs;
+CREATE POLICY "Usuários veem triagens da própria empresa"
+    ON public.sanctions_screening_runs FOR SELECT
+    USING (company_id = (SELECT public.current_company_id()));
+
+DROP POLICY IF EXISTS "Usuários veem ocorrências de triagem da própria empresa" ON public.sanctions_screening_hits;
+CREATE POLICY "Usuários veem ocorrências de triagem da própria empresa"
+    ON public.sanctions_screening_hits FOR SELECT
+    USING (company_id = (SELECT public.current_company_id()));
@@ -0,0 +1,50 @@
+-- ============================================
+-- Migração 013 - Lista de Pessoas Expostas Politicamente (PEP)
+-- ============================================
+-- O importador (backend/scripts/import_pep_dump.py, ver
+-- backend/app/services/pep_list.py) grava o arquivo PEP do Portal da
+-- Transparência como uma nova geração (pep_imports) e só a marca como
+-- completed depois de gravar todos os registros: quem lê usa sempre a
+-- última geração completa, sem ver importação pela metade. A geração
+-- anterior fica guardada (processos que ainda estejam carregando); as mais
+-- antigas são removidas em cascata.
+--
+-- - pep_entries: uma linha por exercício de função do arquivo; cpf é o CPF
+--   completo (quando vier sem máscara), cpf_core os 6 dígitos centrais (o
+--   arquivo do Portal mascara o CPF: ***.456.789-**)
+-- - grace_end_date: fim da carência (a pessoa continua PEP por 5 anos
+--   depois de deixar a função)
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS public.pep_imports (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    source TEXT,
+    records INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'completed', 'failed')),
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_pep_imports_status_finished
+    ON public.pep_imports (status, finished_at DESC);
+
+CREATE TABLE IF NOT EXISTS public.pep_entries (
+    import_id UUID NOT NULL REFERENCES public.pep_imports(id) ON DELETE CASCADE,
+    record_key TEXT NOT NULL,
+    cpf TEXT,
+    cpf_core TEXT,
+    name TEXT NOT NULL,
+    role TEXT,
+    role_acronym TEXT,
+    role_level TEXT,
+    agency TEXT,
+    start_date DATE,
+    end_date DATE,
+    grace_end_date DATE,
+    PRIMARY KEY (import_id, record_key)
+);
+
+-- Dados públicos do Portal, mas só o backend (service role) lê e grava
+ALTER TABLE public.pep_imports ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.pep_entries ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,22 @@
+-- ============================================
+-- Migração 014 - upstream_payloads só para o backend
+-- ============================================
+-- As políticas das migrações 001 e 005 liberavam SELECT e INSERT para
+-- qualquer usuário autenticado. Como a tabela não tem company_id, qualquer
+-- empresa lia pelo PostgREST os payloads (cadastro, QSA, sanções) das
+-- demais e podia gravar linhas com qualquer hash, envenenando o store
+-- endereçado por conteúdo. Os payloads são resolvidos pelo backend
+-- (service_role / conexão direta) antes de chegar ao usuário.
+-- ============================================
+
+DROP POLICY IF EXISTS "Payloads visíveis para usuários autenticados" ON public.upstream_payloads;
+DROP POLICY IF EXISTS "Payloads visíveis só para o backend" ON public.upstream_payloads;
+CREATE POLICY "Payloads visíveis só para o backend"
+    ON public.upstream_payloads FOR SELECT
+    USING ((SELECT auth.role()) = 'service_role');
+
+DROP POLICY IF EXISTS "Usuários autenticados podem gravar payloads" ON public.upstream_payloads;
+DROP POLICY IF EXISTS "Só o backend grava payloads" ON public.upstream_payloads;
+CREATE POLICY "Só o backend grava payloads"
+    ON public.upstream_payloads FOR INSERT
+    WITH CHECK ((SELECT auth.role()) = 'service_role');
@@ -0,0 +1,38 @@
+-- ============================================
+-- Migração 015 - Reserva dos jobs de atualização com token
+-- ============================================
+-- Um worker parado (GC, rede) além de REFRESH_JOB_STALE_SECONDS perde o
+-- job para outro worker, mas continuava gravando progresso, encerrando ou
+-- devolvendo o job à fila por cima do novo dono.
+--
+-- claim_monitoring_refresh_job grava em claimed_by um token novo a cada
+-- reserva; o progresso, o encerramento e a devolução à fila
+-- (pg_queries.save_refresh_job_progress/finish_refresh_job/
+-- requeue_refresh_job e o caminho PostgREST em refresh_jobs.py) só valem
+-- com o token da reserva atual.
+-- ============================================
+
+ALTER TABLE public.monitoring_refresh_jobs ADD COLUMN IF NOT EXISTS claimed_by UUID;
+
+CREATE OR REPLACE FUNCTION public.claim_monitoring_refresh_job(p_stale_seconds DOUBLE PRECISION)
+RETURNS SETOF public.monitoring_refresh_jobs AS $$
+    UPDATE public.monitoring_refresh_jobs j
+    SET status = 'running',
+        claimed_by = gen_random_uuid(),
+        started_at = COALESCE(j.started_at, clock_timestamp()),
+        heartbeat_at = clock_timestamp(),
+        attempts = j.attempts + 1,
+        processed = 0,
+        updated = 0,
+        errors = 0
+    WHERE j.id = (
+        SELECT id
+        FROM public.monitoring_refresh_jobs
+        WHERE status = 'queued'
+           OR (status = 'running' AND heartbeat_at < clock_timestamp() - make_interval(secs => p_stale_seconds))
+        ORDER BY created_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING j.*;
+$$ LANGUAGE sql VOLATILE;
@@ -20,12 +20,6 @@ CREATE TABLE IF NOT EXISTS public.companies (
 -- RLS para companies
 ALTER TABLE public.companies ENABLE ROW LEVEL SECURITY;
 
-CREATE POLICY "Companies são visíveis para usuários da própria empresa"
-    ON public.companies FOR SELECT
-    USING (id IN (
-        SELECT company_id FROM public.profiles WHERE id = auth.uid()
-    ));
-
 
 -- 2. TABELA: profiles (Perfis de usuários)
 -- ============================================
@@ -43,7 +37,23 @@ ALTER TABLE public.profiles ENABLE ROW LEVEL SECURITY;
 
 CREATE POLICY "Usuários podem ver seu próprio perfil"
     ON public.profiles FOR SELECT
-    USING (id = auth.uid());
+    USING (id = (SELECT auth.uid()));
+
+-- Empresa do usuário: claim company_id do app_metadata do JWT ou, sem ela,
+-- profiles.company_id. Nas políticas, `(SELECT ...)` é avaliado uma vez por
+-- instrução, não por linha (ver migrations/005)
+CREATE OR REPLACE FUNCTION public.current_company_id()
+RETURNS UUID AS $$
+    SELECT COALESCE(
+        (NULLIF(current_setting('request.jwt.claims', true), '')::jsonb -> 'app_metadata' ->> 'company_id')::uuid,
+        (SELECT company_id FROM public.profiles WHERE id = auth.uid())
+    );
+$$ LANGUAGE sql STABLE;
+
+-- Policy de companies depende de profiles (criada após a tabela)
+CREATE POLICY "Companies são visíveis para usuários da própria empresa"
+    ON public.companies FOR SELECT
+    USING (id = (SELECT public.current_company_id()));
 
 
 -- 3. TABELA: dossiers (Dossiês de KYC)
@@ -83,21 +93,15 @@ ALTER TABLE public.dossiers ENABLE ROW LEVEL SECURITY;
 
 CREATE POLICY "Usuários veem apenas dossiês da própria empresa"
     ON public.dossiers FOR SELECT
-    USING (company_id IN (
-        SELECT company_id FROM public.profiles WHERE id = auth.uid()
-    ));
+    USING (company_id = (SELECT public.current_company_id()));
 
 CREATE POLICY "Usuários podem criar dossiês para própria empresa"
     ON public.dossiers FOR INSERT
-    WITH CHECK (company_id IN (
-        SELECT company_id FROM public.profiles WHERE id = auth.uid()
-    ));
+    WITH CHECK (company_id = (SELECT public.current_company_id()));
 
 CREATE POLICY "Usuários podem atualizar dossiês da própria empresa"
     ON public.dossiers FOR UPDATE
-    USING (company_id IN (
-        SELECT company_id FROM public.profiles WHERE id = auth.uid()
-    ));
+    USING (company_id = (SELECT public.current_company_id()));
 
 
 -- 4. TABELA: monitoring_targets (Monitoramento Contínuo)
@@ -134,30 +138,45 @@ ALTER TABLE public.monitoring_targets ENABLE ROW LEVEL SECURITY;
 
 CREATE POLICY "Usuários veem apenas monitoramentos da própria empresa"
     ON public.monitoring_targets FOR SELECT
-    USING (company_id IN (
-        SELECT company_id FROM public.profiles WHERE id = auth.uid()
-    ));
+    USING (company_id = (SELECT public.current_company_id()));
 
 CREATE POLICY "Usuários podem criar monitoramentos para própria empresa"
     ON public.monitoring_targets FOR INSERT
-    WITH CHECK (company_id IN (
-        SELECT company_id FROM public.profiles WHERE id = auth.uid()
-    ));
+    WITH CHECK (company_id = (SELECT public.current_company_id()));
 
 CREATE POLICY "Usuários podem atualizar monitoramentos da própria empresa"
     ON public.monitoring_targets FOR UPDATE
-    USING (company_id IN (
-        SELECT company_id FROM public.profiles WHERE id = auth.uid()
-    ));
+    USING (company_id = (SELECT public.current_company_id()));
 
 CREATE POLICY "Usuários podem deletar monitoramentos da própria empresa"
     ON public.monitoring_targets FOR DELETE
-    USING (company_id IN (
-        SELECT company_id FROM public.profiles WHERE id = auth.uid()
-    ));
+    USING (company_id = (SELECT public.current_company_id()));
 
 
--- 5. FUNÇÃO: Atualizar updated_at automaticamente
+-- 5. TABELA: upstream_payloads (Respostas externas endereçadas por conteúdo)
+-- ============================================
+-- Ver migrations/001_upstream_payloads.sql
+CREATE TABLE IF NOT EXISTS public.upstream_payloads (
+    hash TEXT PRIMARY KEY,              -- 'sha256:<hex>' do JSON canônico
+    payload JSONB NOT NULL,
+    size_bytes INTEGER,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- RLS para upstream_payloads (compartilhados entre empresas, sem company_id):
+-- só o backend lê e grava; o usuário recebe os dados resolvidos pela API
+ALTER TABLE public.upstream_payloads ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Payloads visíveis só para o backend"
+    ON public.upstream_payloads FOR SELECT
+    USING ((SELECT auth.role()) = 'service_role');
+
+CREATE POLICY "Só o backend grava payloads"
+    ON public.upstream_payloads FOR INSERT
+    WITH CHECK ((SELECT auth.role()) = 'service_role');
+
+
+-- 6. FUNÇÃO: Atualizar updated_at automaticamente
 -- ============================================
 CREATE OR REPLACE FUNCTION public.update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -189,6 +208,510 @@ CREATE TRIGGER update_monitoring_updated_at
     FOR EACH ROW EXECUTE FUNCTION public.update_updated_at_column();
 
 
+-- 7. FUNÇÃO: Gravar análise de IA no report_data (ver migrations/002)
+-- ============================================
+CREATE OR REPLACE FUNCTION public.set_dossier_ai_analysis(
+    p_dossier_id UUID,
+    p_company_id UUID,
+    p_status TEXT,
+    p_analysis TEXT
+)
+RETURNS VOID AS $$
+    UPDATE public.dossiers
+    SET report_data = jsonb_set(
+            jsonb_set(report_data, '{ai_status}', to_jsonb(p_status)),
+            '{ai_analysis}', to_jsonb(p_analysis)
+        )
+    WHERE id = p_dossier_id AND company_id = p_company_id;
+$$ LANGUAGE sql SECURITY INVOKER;
+
+
+-- 8. ALINHAMENTO: colunas usadas pelo backend (ver migrations/003)
+-- ============================================
+ALTER TABLE public.dossiers ADD COLUMN IF NOT EXISTS decisor_id UUID;
+ALTER TABLE public.dossiers ALTER COLUMN entity_name DROP NOT NULL;
+ALTER TABLE public.dossiers ALTER COLUMN document_type DROP NOT NULL;
+
+ALTER TABLE public.monitoring_targets ADD COLUMN IF NOT EXISTS doc_type TEXT;
+ALTER TABLE public.monitoring_targets ALTER COLUMN document_type DROP NOT NULL;
+
+
+-- 9. ÍNDICES COMPOSTOS E UPSERT DO MONITORAMENTO (ver migrations/004)
+-- ============================================
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'monitoring_targets_company_document_key'
+    ) THEN
+        ALTER TABLE public.monitoring_targets
+            ADD CONSTRAINT monitoring_targets_company_document_key UNIQUE (company_id, document);
+    END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_monitoring_company_created
+    ON public.monitoring_targets (company_id, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_dossiers_company_document
+    ON public.dossiers (company_id, document_value, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_dossiers_company_created
+    ON public.dossiers (company_id, created_at DESC);
+
+-- Cobertos pelos índices compostos (company_id é o prefixo)
+DROP INDEX IF EXISTS public.idx_monitoring_company_id;
+DROP INDEX IF EXISTS public.idx_dossiers_company_id;
+
+
+-- Cadastro idempotente em uma ida ao banco: insere ou devolve o existente
+-- (inserted = false). SECURITY INVOKER: as políticas RLS continuam valendo.
+CREATE OR REPLACE FUNCTION public.upsert_monitoring_target(
+    p_company_id UUID,
+    p_document TEXT,
+    p_doc_type TEXT,
+    p_current_status TEXT,
+    p_data_json JSONB
+)
+RETURNS TABLE (id UUID, data_json JSONB, inserted BOOLEAN) AS $$
+    WITH ins AS (
+        INSERT INTO public.monitoring_targets (company_id, document, doc_type, current_status, data_json)
+        VALUES (p_company_id, p_document, p_doc_type, p_current_status, p_data_json)
+        ON CONFLICT (company_id, document) DO NOTHING
+        RETURNING monitoring_targets.id, monitoring_targets.data_json
+    )
+    SELECT ins.id, ins.data_json, TRUE FROM ins
+    UNION ALL
+    SELECT t.id, t.data_json, FALSE
+    FROM public.monitoring_targets t
+    WHERE t.company_id = p_company_id
+      AND t.document = p_document
+      AND NOT EXISTS (SELECT 1 FROM ins);
+$$ LANGUAGE sql VOLATILE SECURITY INVOKER;
+
+
+-- 10. NOTIFY: invalidação do cache de perfis do login (ver migrations/006)
+-- ============================================
+CREATE OR REPLACE FUNCTION public.notify_profile_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('profile_changed', OLD.id::text);
+        RETURN OLD;
+    END IF;
+    PERFORM pg_notify('profile_changed', NEW.id::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION public.notify_company_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('company_changed', OLD.id::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notify_profiles_changed ON public.profiles;
+CREATE TRIGGER notify_profiles_changed
+    AFTER INSERT OR UPDATE OR DELETE ON public.profiles
+    FOR EACH ROW EXECUTE FUNCTION public.notify_profile_changed();
+
+DROP TRIGGER IF EXISTS notify_companies_changed ON public.companies;
+CREATE TRIGGER notify_companies_changed
+    AFTER UPDATE OR DELETE ON public.companies
+    FOR EACH ROW EXECUTE FUNCTION public.notify_company_changed();
+
+
+-- 11. PLANO DA EMPRESA: cotas por tenant (ver migrations/007)
+-- ============================================
+ALTER TABLE public.companies
+    ADD COLUMN IF NOT EXISTS plan TEXT NOT NULL DEFAULT 'basic';
+
+
+-- 12. LIMITE GLOBAL DAS APIs EXTERNAS (ver migrations/008)
+-- ============================================
+CREATE TABLE IF NOT EXISTS public.upstream_rate_buckets (
+    name TEXT PRIMARY KEY,
+    per_minute DOUBLE PRECISION NOT NULL,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS public.upstream_rate_instances (
+    name TEXT NOT NULL,
+    instance_id TEXT NOT NULL,
+    window_start TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    used DOUBLE PRECISION NOT NULL DEFAULT 0,
+    last_seen TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (name, instance_id)
+);
+
+-- Só o backend (service_role / conexão direta) acessa
+ALTER TABLE public.upstream_rate_buckets ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.upstream_rate_instances ENABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION public.take_upstream_tokens(
+    p_name TEXT,
+    p_instance TEXT,
+    p_tokens DOUBLE PRECISION,
+    p_per_minute DOUBLE PRECISION,
+    p_max_wait DOUBLE PRECISION
+)
+RETURNS DOUBLE PRECISION AS $$
+DECLARE
+    v_now TIMESTAMPTZ := clock_timestamp();
+    v_tokens DOUBLE PRECISION;
+    v_updated_at TIMESTAMPTZ;
+    v_used DOUBLE PRECISION;
+    v_window_start TIMESTAMPTZ;
+    v_active INTEGER;
+    v_wait DOUBLE PRECISION := 0;
+BEGIN
+    INSERT INTO public.upstream_rate_buckets (name, per_minute, tokens, updated_at)
+    VALUES (p_name, p_per_minute, p_per_minute, v_now)
+    ON CONFLICT (name) DO NOTHING;
+
+    SELECT tokens, updated_at INTO v_tokens, v_updated_at
+    FROM public.upstream_rate_buckets
+    WHERE name = p_name
+    FOR UPDATE;
+
+    -- Reabastece (capacidade = limite de um minuto)
+    v_tokens := LEAST(
+        p_per_minute,
+        v_tokens + GREATEST(EXTRACT(EPOCH FROM v_now - v_updated_at), 0) * p_per_minute / 60.0
+    );
+
+    INSERT INTO public.upstream_rate_instances AS i (name, instance_id, window_start, used, last_seen)
+    VALUES (p_name, p_instance, v_now, 0, v_now)
+    ON CONFLICT (name, instance_id) DO UPDATE
+        SET last_seen = v_now,
+            window_start = CASE WHEN i.window_start < v_now - INTERVAL '1 minute' THEN v_now ELSE i.window_start END,
+            used = CASE WHEN i.window_start < v_now - INTERVAL '1 minute' THEN 0 ELSE i.used END
+    RETURNING used, window_start INTO v_used, v_window_start;
+
+    IF v_tokens < p_tokens THEN
+        IF p_per_minute <= 0 THEN
+            RETURN -60;
+        END IF;
+        v_wait := (p_tokens - v_tokens) * 60.0 / p_per_minute;
+
+        SELECT count(*) INTO v_active
+        FROM public.upstream_rate_instances
+        WHERE name = p_name AND last_seen > v_now - INTERVAL '1 minute';
+
+        IF v_used + p_tokens > p_per_minute / GREATEST(v_active, 1) THEN
+            v_wait := GREATEST(
+                v_wait,
+                EXTRACT(EPOCH FROM v_window_start + INTERVAL '1 minute' - v_now)
+            );
+        END IF;
+
+        IF v_wait > p_max_wait THEN
+            UPDATE public.upstream_rate_buckets
+            SET tokens = v_tokens, per_minute = p_per_minute, updated_at = v_now
+            WHERE name = p_name;
+            RETURN -v_wait;
+        END IF;
+    END IF;
+
+    -- Saldo negativo = reservas na fila, liberadas pelo reabastecimento
+    UPDATE public.upstream_rate_buckets
+    SET tokens = v_tokens - p_tokens, per_minute = p_per_minute, updated_at = v_now
+    WHERE name = p_name;
+
+    UPDATE public.upstream_rate_instances
+    SET used = used + p_tokens
+    WHERE name = p_name AND instance_id = p_instance;
+
+    RETURN v_wait;
+END;
+$$ LANGUAGE plpgsql VOLATILE;
+
+
+-- ============================================
+-- 13. JOBS DE ATUALIZAÇÃO DO MONITORAMENTO (ver migrations/009 e 015)
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS public.monitoring_refresh_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    company_id UUID NOT NULL REFERENCES public.companies(id) ON DELETE CASCADE,
+    requested_by UUID,
+    status TEXT NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'completed', 'failed', 'cancelled')),
+    total INTEGER NOT NULL DEFAULT 0,
+    processed INTEGER NOT NULL DEFAULT 0,
+    updated INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    -- Token da reserva atual (novo a cada claim; ver migrations/015)
+    claimed_by UUID,
+    -- {"changes": [...], "errors": [...]} (limitado a REFRESH_JOB_RESULTS_LIMIT itens cada)
+    results JSONB NOT NULL DEFAULT '{"changes": [], "errors": []}'::jsonb,
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    heartbeat_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ
+);
+
+-- Um job aberto por empresa (novo pedido devolve o job em andamento)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_refresh_jobs_one_open
+    ON public.monitoring_refresh_jobs (company_id)
+    WHERE status IN ('queued', 'running');
+
+-- Fila (jobs abertos) e histórico por empresa
+CREATE INDEX IF NOT EXISTS idx_refresh_jobs_open
+    ON public.monitoring_refresh_jobs (created_at)
+    WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS idx_refresh_jobs_company_created
+    ON public.monitoring_refresh_jobs (company_id, created_at DESC);
+
+ALTER TABLE public.monitoring_refresh_jobs ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Usuários veem jobs de atualização da própria empresa" ON public.monitoring_refresh_jobs;
+CREATE POLICY "Usuários veem jobs de atualização da própria empresa"
+    ON public.monitoring_refresh_jobs FOR SELECT
+    USING (company_id = (SELECT public.current_company_id()));
+
+-- Pega o job mais antigo da fila (ou abandonado) para este worker
+CREATE OR REPLACE FUNCTION public.claim_monitoring_refresh_job(p_stale_seconds DOUBLE PRECISION)
+RETURNS SETOF public.monitoring_refresh_jobs AS $$
+    UPDATE public.monitoring_refresh_jobs j
+    SET status = 'running',
+        claimed_by = gen_random_uuid(),
+        started_at = COALESCE(j.started_at, clock_timestamp()),
+        heartbeat_at = clock_timestamp(),
+        attempts = j.attempts + 1,
+        processed = 0,
+        updated = 0,
+        errors = 0
+    WHERE j.id = (
+        SELECT id
+        FROM public.monitoring_refresh_jobs
+        WHERE status = 'queued'
+           OR (status = 'running' AND heartbeat_at < clock_timestamp() - make_interval(secs => p_stale_seconds))
+        ORDER BY created_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING j.*;
+$$ LANGUAGE sql VOLATILE;
+
+
+-- ============================================
+-- 14. REFRESH DO MONITORAMENTO COM LEASES (ver migrations/010)
+-- ============================================
+
+ALTER TABLE public.monitoring_targets ADD COLUMN IF NOT EXISTS refreshed_at TIMESTAMPTZ;
+ALTER TABLE public.monitoring_targets ADD COLUMN IF NOT EXISTS lease_owner TEXT;
+ALTER TABLE public.monitoring_targets ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+
+-- Fila dos vencidos (nunca atualizados primeiro)
+CREATE INDEX IF NOT EXISTS idx_monitoring_refresh_due
+    ON public.monitoring_targets (refreshed_at NULLS FIRST);
+
+CREATE OR REPLACE FUNCTION public.claim_monitoring_targets(
+    p_owner TEXT,
+    p_limit INTEGER,
+    p_lease_seconds DOUBLE PRECISION,
+    p_due_before TIMESTAMPTZ,
+    p_company_id UUID DEFAULT NULL
+)
+RETURNS TABLE (id UUID, company_id UUID, document TEXT, doc_type TEXT, data_json JSONB) AS $$
+    UPDATE public.monitoring_targets t
+    SET lease_owner = p_owner,
+        lease_expires_at = clock_timestamp() + make_interval(secs => p_lease_seconds)
+    WHERE t.id IN (
+        SELECT c.id
+        FROM public.monitoring_targets c
+        WHERE (c.refreshed_at IS NULL OR c.refreshed_at < p_due_before)
+          AND (c.lease_expires_at IS NULL OR c.lease_expires_at < clock_timestamp())
+          AND (p_company_id IS NULL OR c.company_id = p_company_id)
+        ORDER BY c.refreshed_at NULLS FIRST
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING t.id, t.company_id, t.document, t.doc_type, t.data_json;
+$$ LANGUAGE sql VOLATILE;
+
+CREATE OR REPLACE FUNCTION public.renew_monitoring_target_leases(
+    p_owner TEXT,
+    p_ids UUID[],
+    p_lease_seconds DOUBLE PRECISION
+)
+RETURNS INTEGER AS $$
+    WITH renewed AS (
+        UPDATE public.monitoring_targets
+        SET lease_expires_at = clock_timestamp() + make_interval(secs => p_lease_seconds)
+        WHERE id = ANY(p_ids) AND lease_owner = p_owner
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM renewed;
+$$ LANGUAGE sql VOLATILE;
+
+CREATE OR REPLACE FUNCTION public.release_monitoring_target_leases(
+    p_owner TEXT,
+    p_ids UUID[],
+    p_retry_seconds DOUBLE PRECISION
+)
+RETURNS INTEGER AS $$
+    WITH released AS (
+        UPDATE public.monitoring_targets
+        SET lease_owner = NULL,
+            lease_expires_at = clock_timestamp() + make_interval(secs => p_retry_seconds)
+        WHERE id = ANY(p_ids) AND lease_owner = p_owner
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM released;
+$$ LANGUAGE sql VOLATILE;
+
+
+-- ============================================
+-- 15. SNAPSHOT DAS LISTAS DE SANÇÕES (ver migrations/011)
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS public.sanctions_entries (
+    list_name TEXT NOT NULL CHECK (list_name IN ('ceis', 'cnep', 'cepim')),
+    record_key TEXT NOT NULL,
+    document TEXT,
+    doc_type TEXT,
+    cpf_core TEXT,
+    name TEXT,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    first_seen_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_seen_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (list_name, record_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_sanctions_entries_document
+    ON public.sanctions_entries (document) WHERE document IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_sanctions_entries_cpf_core
+    ON public.sanctions_entries (cpf_core) WHERE cpf_core IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS public.sanctions_list_imports (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    list_name TEXT NOT NULL,
+    source TEXT,
+    records INTEGER NOT NULL DEFAULT 0,
+    added INTEGER NOT NULL DEFAULT 0,
+    removed INTEGER NOT NULL DEFAULT 0,
+    affected_documents INTEGER NOT NULL DEFAULT 0,
+    affected_targets INTEGER NOT NULL DEFAULT 0,
+    rescreened INTEGER NOT NULL DEFAULT 0,
+    baseline BOOLEAN NOT NULL DEFAULT FALSE,
+    status TEXT NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'completed', 'failed')),
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_sanctions_imports_list_created
+    ON public.sanctions_list_imports (list_name, created_at DESC);
+
+-- Dados públicos do Portal, mas só o backend (service role) lê e grava
+ALTER TABLE public.sanctions_entries ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.sanctions_list_imports ENABLE ROW LEVEL SECURITY;
+
+-- Índice reverso documento -> registros monitorados (todas as empresas)
+CREATE INDEX IF NOT EXISTS idx_monitoring_document ON public.monitoring_targets (document);
+CREATE INDEX IF NOT EXISTS idx_monitoring_cpf_core
+    ON public.monitoring_targets (substr(document, 4, 6)) WHERE doc_type = 'CPF';
+
+
+-- ============================================
+-- 16. TRIAGEM DA CARTEIRA CONTRA AS LISTAS DE SANÇÕES (ver migrations/012)
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS public.sanctions_screening_runs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    company_id UUID REFERENCES public.companies(id) ON DELETE CASCADE,
+    status TEXT NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'completed', 'failed')),
+    portfolio_rows INTEGER NOT NULL DEFAULT 0,
+    entries INTEGER NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    subjects_hit INTEGER NOT NULL DEFAULT 0,
+    elapsed_seconds DOUBLE PRECISION,
+    rows_per_second DOUBLE PRECISION,
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS public.sanctions_screening_hits (
+    id BIGSERIAL PRIMARY KEY,
+    run_id UUID NOT NULL REFERENCES public.sanctions_screening_runs(id) ON DELETE CASCADE,
+    company_id UUID NOT NULL REFERENCES public.companies(id) ON DELETE CASCADE,
+    source TEXT NOT NULL CHECK (source IN ('dossier', 'monitoring')),
+    subject_id UUID NOT NULL,
+    document TEXT NOT NULL,
+    doc_type TEXT NOT NULL,
+    list_name TEXT NOT NULL,
+    record_key TEXT NOT NULL,
+    match_type TEXT NOT NULL CHECK (match_type IN ('document', 'cpf_core')),
+    name TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_screening_runs_company_created
+    ON public.sanctions_screening_runs (company_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_screening_hits_run
+    ON public.sanctions_screening_hits (run_id);
+CREATE INDEX IF NOT EXISTS idx_screening_hits_company_document
+    ON public.sanctions_screening_hits (company_id, document);
+
+ALTER TABLE public.sanctions_screening_runs ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.sanctions_screening_hits ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Usuários veem triagens da própria empresa" ON public.sanctions_screening_runs;
+CREATE POLICY "Usuários veem triagens da própria empresa"
+    ON public.sanctions_screening_runs FOR SELECT
+    USING (company_id = (SELECT public.current_company_id()));
+
+DROP POLICY IF EXISTS "Usuários veem ocorrências de triagem da própria empresa" ON public.sanctions_screening_hits;
+CREATE POLICY "Usuários veem ocorrências de triagem da própria empresa"
+    ON public.sanctions_screening_hits FOR SELECT
+    USING (company_id = (SELECT public.current_company_id()));
+
+
+-- ============================================
+-- 17. LISTA DE PESSOAS EXPOSTAS POLITICAMENTE - PEP (ver migrations/013)
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS public.pep_imports (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    source TEXT,
+    records INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'completed', 'failed')),
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_pep_imports_status_finished
+    ON public.pep_imports (status, finished_at DESC);
+
+CREATE TABLE IF NOT EXISTS public.pep_entries (
+    import_id UUID NOT NULL REFERENCES public.pep_imports(id) ON DELETE CASCADE,
+    record_key TEXT NOT NULL,
+    cpf TEXT,
+    cpf_core TEXT,
+    name TEXT NOT NULL,
+    role TEXT,
+    role_acronym TEXT,
+    role_level TEXT,
+    agency TEXT,
+    start_date DATE,
+    end_date DATE,
+    grace_end_date DATE,
+    PRIMARY KEY (import_id, record_key)
+);
+
+-- Dados públicos do Portal, mas só o backend (service role) lê e grava
+ALTER TABLE public.pep_imports ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.pep_entries ENABLE ROW LEVEL SECURITY;
+
+
 -- ============================================
 -- DADOS DE EXEMPLO (OPCIONAL - para desenvolvimento)
 -- ============================================